@@ -11,13 +11,28 @@ from django.http import HttpResponse
 from datetime import timedelta, datetime
 from decimal import Decimal
 from dateutil.relativedelta import relativedelta
-import csv
+
+
+# Domains shown on the teacher revenue dashboard and export
+DASHBOARD_DOMAINS = ['workshops', 'courses', 'private_teaching']
+
+
+def _transaction_row(entry):
+    """Dashboard/export row for a revenue ledger entry"""
+    student = entry.student
+    return {
+        'date': entry.occurred_at,
+        'type': entry.display_type,
+        'description': entry.description,
+        'student': (student.get_full_name() or student.username) if student else '',
+        'amount': entry.gross_amount,
+    }
 
 
 class TeacherRevenueDashboardView(LoginRequiredMixin, TemplateView):
     """
     Unified revenue dashboard for teachers across all teaching domains.
-    Single source of truth: Database payment records only.
+    Single source of truth: the revenue ledger (apps.payments.ledger).
     """
     template_name = 'accounts/teacher_revenue_dashboard.html'
 
@@ -71,99 +86,43 @@ class TeacherRevenueDashboardView(LoginRequiredMixin, TemplateView):
             custom_end = None
 
         # =====================================================================
-        # WORKSHOPS REVENUE
-        # =====================================================================
-        from apps.workshops.models import WorkshopRegistration
-
-        workshop_registrations = WorkshopRegistration.objects.filter(
-            session__workshop__instructor=user,
-            status='registered',  # Only confirmed registrations
-        ).filter(
-            Q(payment_status='paid') | Q(payment_status='completed') | Q(payment_status='not_required')  # Support old and new payment statuses
-        ).select_related('session__workshop')
-
-        # Apply custom date range if provided
-        if custom_start:
-            workshop_registrations = workshop_registrations.filter(registration_date__gte=custom_start)
-        if custom_end:
-            workshop_registrations = workshop_registrations.filter(registration_date__lte=custom_end)
-
-        workshops_total = workshop_registrations.aggregate(
-            total=Sum('payment_amount')
-        )['total'] or Decimal('0.00')
-
-        workshops_this_month = workshop_registrations.filter(
-            registration_date__gte=this_month_start
-        ).aggregate(total=Sum('payment_amount'))['total'] or Decimal('0.00')
-
-        workshops_this_year = workshop_registrations.filter(
-            registration_date__gte=this_year_start
-        ).aggregate(total=Sum('payment_amount'))['total'] or Decimal('0.00')
-
-        workshops_count = workshop_registrations.count()
-
+        # REVENUE BY DOMAIN (one grouped query over the revenue ledger)
         # =====================================================================
-        # COURSES REVENUE
-        # =====================================================================
-        from apps.courses.models import CourseEnrollment
-
-        course_enrollments = CourseEnrollment.objects.filter(
-            course__instructor=user,
-            payment_status='completed',  # Only completed payments
-            is_active=True
-        ).select_related('course')
-
-        # Apply custom date range if provided
-        if custom_start:
-            course_enrollments = course_enrollments.filter(paid_at__gte=custom_start)
-        if custom_end:
-            course_enrollments = course_enrollments.filter(paid_at__lte=custom_end)
-
-        courses_total = course_enrollments.aggregate(
-            total=Sum('payment_amount')
-        )['total'] or Decimal('0.00')
-
-        courses_this_month = course_enrollments.filter(
-            paid_at__gte=this_month_start
-        ).aggregate(total=Sum('payment_amount'))['total'] or Decimal('0.00')
-
-        courses_this_year = course_enrollments.filter(
-            paid_at__gte=this_year_start
-        ).aggregate(total=Sum('payment_amount'))['total'] or Decimal('0.00')
-
-        courses_count = course_enrollments.count()
-
-        # =====================================================================
-        # PRIVATE TEACHING REVENUE
-        # =====================================================================
-        from apps.private_teaching.models import Order
-
-        private_orders = Order.objects.filter(
-            items__lesson__teacher=user,
-            payment_status='completed'  # Only completed payments
-        ).distinct().prefetch_related('items__lesson')
-
-        # Apply custom date range if provided
-        if custom_start:
-            private_orders = private_orders.filter(created_at__gte=custom_start)
-        if custom_end:
-            private_orders = private_orders.filter(created_at__lte=custom_end)
+        from apps.payments.ledger import ledger_entries
+        from apps.payments.models import LedgerEntry
+
+        entries = ledger_entries(user, custom_start, custom_end).filter(domain__in=DASHBOARD_DOMAINS)
+        charges = Q(entry_type=LedgerEntry.CHARGE)
+
+        by_domain = {
+            row['domain']: row
+            for row in entries.order_by().values('domain').annotate(
+                total=Sum('gross_amount'),
+                this_month=Sum('gross_amount', filter=Q(occurred_at__gte=this_month_start)),
+                this_year=Sum('gross_amount', filter=Q(occurred_at__gte=this_year_start)),
+                count=Count('id', filter=charges),
+                lessons=Count('id', filter=charges & Q(source_type=LedgerEntry.ORDER_ITEM)),
+            )
+        }
 
-        private_total = private_orders.aggregate(
-            total=Sum('total_amount')
-        )['total'] or Decimal('0.00')
+        def domain_figure(domain, key):
+            value = by_domain.get(domain, {}).get(key)
+            return value or (0 if key in ('count', 'lessons') else Decimal('0.00'))
 
-        private_this_month = private_orders.filter(
-            created_at__gte=this_month_start
-        ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
+        workshops_total = domain_figure('workshops', 'total')
+        workshops_this_month = domain_figure('workshops', 'this_month')
+        workshops_this_year = domain_figure('workshops', 'this_year')
+        workshops_count = domain_figure('workshops', 'count')
 
-        private_this_year = private_orders.filter(
-            created_at__gte=this_year_start
-        ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
+        courses_total = domain_figure('courses', 'total')
+        courses_this_month = domain_figure('courses', 'this_month')
+        courses_this_year = domain_figure('courses', 'this_year')
+        courses_count = domain_figure('courses', 'count')
 
-        # PERFORMANCE FIX: Count lessons directly from OrderItem instead of iterating orders
-        from apps.private_teaching.models import OrderItem
-        private_lessons_count = OrderItem.objects.filter(order__in=private_orders).count()
+        private_total = domain_figure('private_teaching', 'total')
+        private_this_month = domain_figure('private_teaching', 'this_month')
+        private_this_year = domain_figure('private_teaching', 'this_year')
+        private_lessons_count = domain_figure('private_teaching', 'lessons')
 
         # =====================================================================
         # COMBINED TOTALS
@@ -175,7 +134,7 @@ class TeacherRevenueDashboardView(LoginRequiredMixin, TemplateView):
         # =====================================================================
         # SUMMARY STATISTICS
         # =====================================================================
-        total_transactions = workshops_count + courses_count + private_orders.count()
+        total_transactions = workshops_count + courses_count + domain_figure('private_teaching', 'count')
         average_transaction = grand_total / total_transactions if total_transactions > 0 else Decimal('0.00')
 
         # Find top domain
@@ -190,69 +149,29 @@ class TeacherRevenueDashboardView(LoginRequiredMixin, TemplateView):
         # =====================================================================
         # RECENT TRANSACTIONS (Last 10 across all domains)
         # =====================================================================
-        recent_transactions = []
-
-        # Add workshop registrations
-        for reg in workshop_registrations.order_by('-registration_date')[:10]:
-            recent_transactions.append({
-                'date': reg.registration_date,
-                'type': 'Workshop',
-                'description': f"{reg.session.workshop.title} - {reg.session.start_datetime.strftime('%b %d, %Y')}",
-                'student': reg.student.get_full_name() or reg.student.username,
-                'amount': reg.payment_amount,
-            })
-
-        # Add course enrollments
-        for enrollment in course_enrollments.filter(paid_at__isnull=False).order_by('-paid_at')[:10]:
-            recent_transactions.append({
-                'date': enrollment.paid_at,
-                'type': 'Course',
-                'description': enrollment.course.title,
-                'student': enrollment.student.get_full_name() or enrollment.student.username,
-                'amount': enrollment.payment_amount,
-            })
-
-        # Add private teaching orders
-        for order in private_orders.order_by('-created_at')[:10]:
-            recent_transactions.append({
-                'date': order.created_at,
-                'type': 'Private Lesson',
-                'description': f"{order.items.count()} lesson(s)",
-                'student': order.student.get_full_name() or order.student.username,
-                'amount': order.total_amount,
-            })
-
-        # Sort all transactions by date (most recent first)
-        recent_transactions.sort(key=lambda x: x['date'], reverse=True)
-        recent_transactions = recent_transactions[:10]  # Keep only top 10
+        recent_transactions = [
+            _transaction_row(entry)
+            for entry in entries.select_related('student').order_by('-occurred_at', '-id')[:10]
+        ]
 
         # =====================================================================
         # MONTHLY BREAKDOWN (Last 6 months)
         # =====================================================================
-        six_months_ago = now - relativedelta(months=6)
-        monthly_data = []
+        first_month_start = (now - relativedelta(months=5)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        monthly_totals = {}
+        for row in entries.filter(occurred_at__gte=first_month_start).order_by().annotate(
+            month=TruncMonth('occurred_at')
+        ).values('month', 'domain').annotate(total=Sum('gross_amount')):
+            monthly_totals[(row['month'].strftime('%Y-%m'), row['domain'])] = row['total'] or Decimal('0.00')
 
+        monthly_data = []
         for i in range(6):
             month_start = (now - relativedelta(months=5-i)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            month_end = (month_start + relativedelta(months=1)) - timedelta(seconds=1)
-
-            # Workshops for this month
-            workshops_month = workshop_registrations.filter(
-                registration_date__gte=month_start,
-                registration_date__lte=month_end
-            ).aggregate(total=Sum('payment_amount'))['total'] or Decimal('0.00')
-
-            # Courses for this month
-            courses_month = course_enrollments.filter(
-                paid_at__gte=month_start,
-                paid_at__lte=month_end
-            ).aggregate(total=Sum('payment_amount'))['total'] or Decimal('0.00')
-
-            # Private for this month
-            private_month = private_orders.filter(
-                created_at__gte=month_start,
-                created_at__lte=month_end
-            ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
+            month_key = month_start.strftime('%Y-%m')
+
+            workshops_month = monthly_totals.get((month_key, 'workshops'), Decimal('0.00'))
+            courses_month = monthly_totals.get((month_key, 'courses'), Decimal('0.00'))
+            private_month = monthly_totals.get((month_key, 'private_teaching'), Decimal('0.00'))
 
             monthly_data.append({
                 'month': month_start.strftime('%b %Y'),
@@ -338,7 +257,7 @@ class TeacherRevenueDashboardView(LoginRequiredMixin, TemplateView):
 
 class TeacherRevenueExportView(LoginRequiredMixin, View):
     """
-    Export revenue data as CSV file
+    Export revenue data as a streamed CSV (or XLSX with ?format=xlsx) file
     """
     def get(self, request):
         user = request.user
@@ -365,98 +284,25 @@ class TeacherRevenueExportView(LoginRequiredMixin, View):
             except ValueError:
                 pass
 
-        # Create CSV response
-        response = HttpResponse(content_type='text/csv')
-        filename = f'revenue_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-        writer = csv.writer(response)
-        writer.writerow(['Date', 'Type', 'Description', 'Student', 'Amount (£)'])
-
-        # =====================================================================
-        # FETCH ALL TRANSACTIONS
-        # =====================================================================
-        from apps.workshops.models import WorkshopRegistration
-        from apps.courses.models import CourseEnrollment
-        from apps.private_teaching.models import Order
-
-        all_transactions = []
-
-        # Workshop registrations
-        workshop_registrations = WorkshopRegistration.objects.filter(
-            session__workshop__instructor=user,
-            status='registered',
-        ).filter(
-            Q(payment_status='paid') | Q(payment_status='completed') | Q(payment_status='not_required')  # Support old and new payment statuses
-        ).select_related('session__workshop', 'student')
-
-        if custom_start:
-            workshop_registrations = workshop_registrations.filter(registration_date__gte=custom_start)
-        if custom_end:
-            workshop_registrations = workshop_registrations.filter(registration_date__lte=custom_end)
-
-        for reg in workshop_registrations:
-            all_transactions.append({
-                'date': reg.registration_date,
-                'type': 'Workshop',
-                'description': f"{reg.session.workshop.title} - {reg.session.start_datetime.strftime('%b %d, %Y')}",
-                'student': reg.student.get_full_name() or reg.student.username,
-                'amount': float(reg.payment_amount),
-            })
-
-        # Course enrollments
-        course_enrollments = CourseEnrollment.objects.filter(
-            course__instructor=user,
-            payment_status='completed',
-            is_active=True,
-            paid_at__isnull=False
-        ).select_related('course', 'student')
-
-        if custom_start:
-            course_enrollments = course_enrollments.filter(paid_at__gte=custom_start)
-        if custom_end:
-            course_enrollments = course_enrollments.filter(paid_at__lte=custom_end)
-
-        for enrollment in course_enrollments:
-            all_transactions.append({
-                'date': enrollment.paid_at,
-                'type': 'Course',
-                'description': enrollment.course.title,
-                'student': enrollment.student.get_full_name() or enrollment.student.username,
-                'amount': float(enrollment.payment_amount),
-            })
-
-        # Private teaching orders
-        private_orders = Order.objects.filter(
-            items__lesson__teacher=user,
-            payment_status='completed'
-        ).distinct().select_related('student').prefetch_related('items__lesson')
-
-        if custom_start:
-            private_orders = private_orders.filter(created_at__gte=custom_start)
-        if custom_end:
-            private_orders = private_orders.filter(created_at__lte=custom_end)
-
-        for order in private_orders:
-            all_transactions.append({
-                'date': order.created_at,
-                'type': 'Private Lesson',
-                'description': f"{order.items.count()} lesson(s)",
-                'student': order.student.get_full_name() or order.student.username,
-                'amount': float(order.total_amount),
-            })
-
-        # Sort by date (most recent first)
-        all_transactions.sort(key=lambda x: x['date'], reverse=True)
-
-        # Write transactions to CSV
-        for transaction in all_transactions:
-            writer.writerow([
-                transaction['date'].strftime('%Y-%m-%d %H:%M'),
-                transaction['type'],
-                transaction['description'],
-                transaction['student'],
-                f"{transaction['amount']:.2f}",
-            ])
-
-        return response
+        from apps.core.exports import export_format, export_response
+        from apps.payments.ledger import ledger_entries
+
+        entries = ledger_entries(user, custom_start, custom_end).filter(
+            domain__in=DASHBOARD_DOMAINS
+        ).select_related('student').order_by('-occurred_at', '-id')
+
+        def rows():
+            yield ['Date', 'Type', 'Description', 'Student', 'Amount (£)']
+            # Server-side cursor: rows are written as they are fetched
+            for entry in entries.iterator(chunk_size=2000):
+                transaction = _transaction_row(entry)
+                yield [
+                    transaction['date'].strftime('%Y-%m-%d %H:%M'),
+                    transaction['type'],
+                    transaction['description'],
+                    transaction['student'],
+                    transaction['amount'].quantize(Decimal('0.01')),
+                ]
+
+        filename = f'revenue_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}'
+        return export_response(rows(), filename, export_format(request), sheet_name='Revenue')
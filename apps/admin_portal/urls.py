@@ -9,6 +9,8 @@ app_name = 'admin_portal'
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('finance/', views.finance_report, name='finance_report'),
+    path('stripe-health/', views.stripe_health, name='stripe_health'),
     path('support/', include('apps.admin_portal.urls_support')),
 
     # Teacher applications admin - inline to avoid namespace issues
@@ -4,7 +4,8 @@ Admin Portal views.
 from django.shortcuts import render
 from django.utils import timezone
 from django.db.models import Count
-from datetime import timedelta
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 from .decorators import admin_required
 
 
@@ -58,3 +59,182 @@ def dashboard(request):
     }
 
     return render(request, 'admin_portal/dashboard.html', context)
+
+
+# Periods offered on the finance report
+FINANCE_PERIODS = [
+    ('tax_year', 'This tax year'),
+    ('last_tax_year', 'Last tax year'),
+    ('month', 'This month'),
+    ('30', 'Last 30 days'),
+    ('90', 'Last 90 days'),
+    ('all', 'All time'),
+    ('custom', 'Custom'),
+]
+
+FINANCE_SORTS = ['gross', 'commission', 'net', 'refunds']
+
+
+def _finance_period(request):
+    """
+    Resolve the report period from GET params to whole local days.
+
+    Returns:
+        (start_day, end_day, period) - start_day is None for all time
+    """
+    from apps.payments.rollups import tax_year_start, tax_year_end
+
+    period = request.GET.get('period', 'tax_year')
+    today = timezone.localdate()
+
+    if period == 'last_tax_year':
+        start = tax_year_start(tax_year_start(today) - timedelta(days=1))
+        return start, tax_year_end(start), period
+    if period == 'month':
+        return today.replace(day=1), today, period
+    if period in ('30', '90'):
+        return today - timedelta(days=int(period)), today, period
+    if period == 'all':
+        return None, today, period
+    if period == 'custom':
+        try:
+            start = datetime.strptime(request.GET.get('start_date', ''), '%Y-%m-%d').date()
+            end = datetime.strptime(request.GET.get('end_date', ''), '%Y-%m-%d').date()
+            if start <= end:
+                return start, end, period
+        except ValueError:
+            pass
+
+    start = tax_year_start(today)
+    return start, tax_year_end(start), 'tax_year'
+
+
+@admin_required
+def finance_report(request):
+    """
+    Platform finance report: gross volume, commission earned, refunds and
+    top teachers by domain and period.
+
+    Everything is read from the revenue rollups in a few grouped queries
+    (domain totals, one page of teachers, their per-domain split and the
+    monthly trend), so the cost doesn't grow with the number of teachers.
+    ?format=csv or ?format=xlsx streams the full teacher table.
+    """
+    from django.core.paginator import Paginator
+    from apps.core.exports import FORMATS, export_response
+    from apps.payments import rollups
+    from apps.payments.models import RevenueRollup, StripePayment
+
+    start_day, end_day, period = _finance_period(request)
+
+    domains = dict(StripePayment.DOMAIN_CHOICES)
+    domain = request.GET.get('domain', '')
+    if domain not in domains:
+        domain = ''
+
+    sort = request.GET.get('sort', 'gross')
+    if sort not in FINANCE_SORTS:
+        sort = 'gross'
+
+    teachers = rollups.teacher_totals(start_day, end_day, domain=domain or None, order_by=sort)
+
+    file_format = request.GET.get('format', '')
+    if file_format in FORMATS:
+        def rows():
+            pence = Decimal('0.01')
+            yield [
+                'Teacher', 'Email', 'Gross (£)', 'Commission (£)', 'Refunds (£)',
+                'Teacher Net (£)', 'Charges', 'Refunds Issued'
+            ]
+            for row in teachers.iterator(chunk_size=2000):
+                name = f"{row['teacher__first_name']} {row['teacher__last_name']}".strip()
+                yield [
+                    name or row['teacher__username'],
+                    row['teacher__email'],
+                    row['gross'].quantize(pence),
+                    row['commission'].quantize(pence),
+                    row['refunds'].quantize(pence),
+                    row['net'].quantize(pence),
+                    row['count'],
+                    row['refund_count'],
+                ]
+
+        filename = f"platform_finance_{start_day or 'all'}_to_{end_day}{'_' + domain if domain else ''}"
+        return export_response(rows(), filename, file_format, sheet_name='Teachers')
+
+    # Platform totals per domain
+    by_domain = rollups.domain_totals(None, start_day, end_day)
+    domain_rows = [
+        {
+            'key': key,
+            'name': name,
+            **by_domain.get(key, {
+                'gross': Decimal('0.00'),
+                'commission': Decimal('0.00'),
+                'net': Decimal('0.00'),
+                'refunds': Decimal('0.00'),
+                'count': 0,
+                'refund_count': 0,
+            }),
+        }
+        for key, name in domains.items()
+    ]
+    totals = {
+        field: sum(row[field] for row in domain_rows)
+        for field in ('gross', 'commission', 'net', 'refunds', 'count', 'refund_count')
+    }
+
+    # One page of teachers, with their per-domain split
+    page_obj = Paginator(teachers, 25).get_page(request.GET.get('page'))
+    page_teachers = list(page_obj.object_list)
+    split = rollups.teacher_domain_totals(
+        [row['teacher_id'] for row in page_teachers], start_day, end_day
+    )
+    for row in page_teachers:
+        name = f"{row['teacher__first_name']} {row['teacher__last_name']}".strip()
+        row['name'] = name or row['teacher__username']
+        row['domains'] = [
+            {'name': domains[key], **split[row['teacher_id']][key]}
+            for key in domains
+            if key in split[row['teacher_id']]
+        ]
+
+    # Monthly trend across the period (whole months)
+    trend_start = start_day.replace(day=1) if start_day else date.min
+    monthly = rollups.trend(None, RevenueRollup.MONTH, trend_start, domain=domain or None, until=end_day)
+
+    query = request.GET.copy()
+    query.pop('page', None)
+    query.pop('format', None)
+
+    context = {
+        'period': period,
+        'periods': FINANCE_PERIODS,
+        'start_day': start_day,
+        'end_day': end_day,
+        'domain': domain,
+        'domain_name': domains.get(domain, ''),
+        'domains': domains,
+        'sort': sort,
+        'domain_rows': domain_rows,
+        'totals': totals,
+        'page_obj': page_obj,
+        'teachers': page_teachers,
+        'monthly': monthly,
+        'query_string': query.urlencode(),
+    }
+
+    return render(request, 'admin_portal/finance_report.html', context)
+
+
+@admin_required
+def stripe_health(request):
+    """
+    Stripe gateway circuit breaker state and per-call latency histograms as
+    JSON, for monitoring. Figures are for the web process that serves the
+    request, since the last restart.
+    """
+    from django.http import JsonResponse
+    from apps.payments.stripe_gateway import get_gateway
+
+    return JsonResponse(get_gateway().stats())
@@ -1,6 +1,9 @@
 from django.contrib import admin
 from django.utils.html import format_html
 
+from . import email_outbox
+from .models import OutboxEmail
+
 
 # ============================================================================
 # ADMIN MIXINS FOR COMMON FUNCTIONALITY
@@ -231,3 +234,25 @@ class ColoredStatusMixin:
 
 
 # Register your models here.
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    """Email outbox: queue state and delivery errors"""
+    list_display = ['created_at', 'subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['subject', 'to']
+    date_hierarchy = 'created_at'
+    readonly_fields = [
+        'subject', 'to', 'message', 'status', 'batch_id', 'attempts', 'next_attempt_at',
+        'locked_at', 'last_error', 'created_at', 'sent_at',
+    ]
+    actions = ['requeue_emails']
+
+    @admin.action(description='Requeue selected dead-lettered emails')
+    def requeue_emails(self, request, queryset):
+        requeued = email_outbox.requeue_dead(queryset)
+        self.message_user(request, f"Requeued {requeued} email(s)")
+
+    def has_add_permission(self, request):
+        return False
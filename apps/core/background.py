@@ -0,0 +1,70 @@
+"""
+Background Work
+
+The email outbox, the Stripe webhook inbox and the workshop interest fan-out
+all hand work to a small in-process thread pool once the triggering
+transaction commits, and keep a standalone management command (run from
+recordered.crontab) for whatever the web process doesn't finish.
+
+- BackgroundPool is that pool: started on first use, sized by a setting, and
+  switched off (leaving everything to the command) when the setting is 0.
+- requeue_dead() gives a queue's dead-lettered rows a fresh set of attempts.
+  Queue models share the PENDING/DEAD statuses and the attempts,
+  next_attempt_at and locked_at fields.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundPool:
+    """In-process worker pool whose size comes from a setting"""
+
+    def __init__(self, name: str, workers_setting: str, default_workers: int):
+        self.name = name
+        self.workers_setting = workers_setting
+        self.default_workers = default_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args):
+        """
+        Run fn(*args) on the pool.
+        Does nothing when the workers setting is 0.
+        """
+        workers = getattr(settings, self.workers_setting, self.default_workers)
+        if workers <= 0:
+            return
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=self.name)
+        self._executor.submit(self._run, fn, *args)
+
+    def _run(self, fn: Callable, *args):
+        """Pool entry point: each thread has its own DB connection, closed when done"""
+        try:
+            fn(*args)
+        except Exception as e:
+            logger.error(f"Background worker {self.name} failed: {e}")
+        finally:
+            connection.close()
+
+
+def requeue_dead(queryset) -> int:
+    """Give the dead-lettered rows of a queue model a fresh set of attempts"""
+    model = queryset.model
+    return queryset.filter(status=model.DEAD).update(
+        status=model.PENDING,
+        attempts=0,
+        next_attempt_at=timezone.now(),
+        locked_at=None
+    )
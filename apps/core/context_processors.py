@@ -0,0 +1,15 @@
+"""
+Context processors for core app.
+"""
+
+from django.conf import settings
+
+
+def live_events(request):
+    """
+    Tell base.html whether to open the live events connection.
+
+    Off unless LIVE_EVENTS_ENABLED is set, because the stream only works
+    when the site is served through recordered.asgi.
+    """
+    return {'live_events_enabled': getattr(settings, 'LIVE_EVENTS_ENABLED', False)}
@@ -0,0 +1,308 @@
+"""
+Transactional Email Outbox
+
+EMAIL_BACKEND points at OutboxEmailBackend, so every send_mail() and
+EmailMessage.send() in the project - notification services, password resets,
+email verification - writes an OutboxEmail row instead of talking to SMTP:
+
+- The row is written in the caller's transaction. If the request or webhook
+  that triggered the email rolls back, the email is never sent; once it
+  commits, the email can't be lost. Request handlers never wait on SMTP.
+- Once the transaction commits, schedule() hands a drain() to a small
+  in-process thread pool (EMAIL_OUTBOX_WORKERS threads).
+- `manage.py send_email_outbox` runs the same drain() as a standalone worker
+  and picks up whatever the web process didn't send. recordered.crontab runs
+  it with --once every minute, so retries go out on a quiet site too.
+
+drain() claims up to EMAIL_OUTBOX_BATCH_SIZE due emails with one UPDATE and
+sends them over a single connection to EMAIL_DELIVERY_BACKEND (the real
+SMTP/console backend), reconnecting if the server drops it. A failed email is
+retried with exponential backoff (EMAIL_OUTBOX_RETRY_BASE_SECONDS, doubling)
+and dead-lettered after EMAIL_OUTBOX_MAX_ATTEMPTS; dead emails can be
+requeued from the admin or the command.
+"""
+
+import base64
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import background
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+_pool = background.BackgroundPool('email-outbox', 'EMAIL_OUTBOX_WORKERS', 1)
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+# =============================================================================
+# SERIALIZATION
+# =============================================================================
+
+def serialize(message) -> Dict:
+    """JSON-safe form of an EmailMessage (or EmailMultiAlternatives)"""
+    attachments = []
+    for attachment in message.attachments:
+        if not isinstance(attachment, tuple):
+            raise ValueError('MIME attachments cannot be queued in the email outbox')
+        filename, content, mimetype = attachment
+        if isinstance(content, str):
+            content = content.encode()
+        attachments.append([filename, base64.b64encode(content).decode(), mimetype])
+
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': list(message.to),
+        'cc': list(message.cc),
+        'bcc': list(message.bcc),
+        'reply_to': list(message.reply_to),
+        'headers': dict(message.extra_headers),
+        'content_subtype': message.content_subtype,
+        'alternatives': [list(alternative) for alternative in getattr(message, 'alternatives', [])],
+        'attachments': attachments,
+    }
+
+
+def deserialize(data: Dict, connection=None) -> EmailMultiAlternatives:
+    message = EmailMultiAlternatives(
+        subject=data['subject'],
+        body=data['body'],
+        from_email=data['from_email'],
+        to=data['to'],
+        cc=data['cc'],
+        bcc=data['bcc'],
+        reply_to=data['reply_to'],
+        headers=data['headers'],
+        alternatives=[tuple(alternative) for alternative in data['alternatives']],
+        connection=connection,
+    )
+    message.content_subtype = data['content_subtype']
+    for filename, content, mimetype in data['attachments']:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+# =============================================================================
+# QUEUEING
+# =============================================================================
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """Email backend that queues messages in the outbox instead of sending them"""
+
+    def send_messages(self, email_messages) -> int:
+        rows = [
+            OutboxEmail(
+                subject=message.subject[:998],
+                to=list(message.recipients()),
+                message=serialize(message),
+            )
+            for message in email_messages
+            if message.recipients()
+        ]
+        if not rows:
+            return 0
+        try:
+            # Savepoint, so a failed insert doesn't break the caller's transaction
+            with transaction.atomic():
+                OutboxEmail.objects.bulk_create(rows)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            logger.exception(f"Failed to queue {len(rows)} email(s)")
+            return 0
+        transaction.on_commit(schedule)
+        return len(rows)
+
+
+def schedule():
+    """
+    Drain the outbox on the in-process worker pool.
+    Does nothing when EMAIL_OUTBOX_WORKERS is 0 (send_email_outbox only).
+    """
+    _pool.submit(drain)
+
+
+# =============================================================================
+# SENDING
+# =============================================================================
+
+def due_emails():
+    """Emails ready for an attempt, oldest first"""
+    return OutboxEmail.objects.filter(
+        status__in=[OutboxEmail.PENDING, OutboxEmail.FAILED],
+        next_attempt_at__lte=timezone.now()
+    ).order_by('next_attempt_at', 'id')
+
+
+def claim_batch(size: Optional[int] = None) -> List[OutboxEmail]:
+    """
+    Claim up to size due emails for this worker.
+    Rows another worker claimed in the meantime fail the status check in the
+    UPDATE, so each email is claimed once.
+    """
+    size = size or _setting('EMAIL_OUTBOX_BATCH_SIZE', 50)
+    ids = list(due_emails().values_list('id', flat=True)[:size])
+    if not ids:
+        return []
+
+    batch_id = uuid.uuid4()
+    now = timezone.now()
+    OutboxEmail.objects.filter(
+        id__in=ids,
+        status__in=[OutboxEmail.PENDING, OutboxEmail.FAILED],
+        next_attempt_at__lte=now
+    ).update(status=OutboxEmail.SENDING, batch_id=batch_id, locked_at=now)
+    return list(OutboxEmail.objects.filter(batch_id=batch_id, status=OutboxEmail.SENDING).order_by('id'))
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before the next attempt: base, 2x base, 4x base, ..."""
+    base = _setting('EMAIL_OUTBOX_RETRY_BASE_SECONDS', 60)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def _record_failure(email: OutboxEmail, error: Exception):
+    email.attempts += 1
+    email.last_error = ''.join(traceback.format_exception(error))[-5000:]
+    email.locked_at = None
+    if email.attempts >= _setting('EMAIL_OUTBOX_MAX_ATTEMPTS', 5):
+        email.status = OutboxEmail.DEAD
+        logger.error(f"Email {email.pk} to {email.to} dead-lettered after {email.attempts} attempts: {error}")
+    else:
+        email.status = OutboxEmail.FAILED
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+        logger.warning(
+            f"Email {email.pk} to {email.to} failed on attempt {email.attempts}, "
+            f"retrying at {email.next_attempt_at}: {error}"
+        )
+    email.save(update_fields=['status', 'attempts', 'next_attempt_at', 'locked_at', 'last_error'])
+
+
+def send_batch(emails: List[OutboxEmail]) -> Dict[str, int]:
+    """
+    Send claimed emails over one connection to the delivery backend.
+
+    Returns:
+        {'sent': int, 'failed': int}
+    """
+    backend = _setting('EMAIL_DELIVERY_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+    mail_connection = get_connection(backend, fail_silently=False)
+    sent_ids = []
+    failed = 0
+
+    try:
+        for email in emails:
+            try:
+                mail_connection.open()  # No-op while the connection is up
+                deserialize(email.message, connection=mail_connection).send()
+            except Exception as e:
+                # The server may have dropped the connection; start a fresh one for the next email
+                try:
+                    mail_connection.close()
+                except Exception:
+                    pass
+                _record_failure(email, e)
+                failed += 1
+            else:
+                sent_ids.append(email.pk)
+    finally:
+        try:
+            mail_connection.close()
+        except Exception:
+            pass
+
+        if sent_ids:
+            OutboxEmail.objects.filter(pk__in=sent_ids).update(
+                status=OutboxEmail.SENT,
+                sent_at=timezone.now(),
+                locked_at=None,
+                last_error=''
+            )
+
+    if sent_ids or failed:
+        logger.info(f"Email outbox batch: sent {len(sent_ids)}, failed {failed}")
+    return {'sent': len(sent_ids), 'failed': failed}
+
+
+def drain(max_batches: Optional[int] = None) -> Dict[str, int]:
+    """
+    Claim and send due emails batch by batch until none are left.
+    Safe to run from several threads or processes at once.
+
+    Returns:
+        {'sent': int, 'failed': int}
+    """
+    results = {'sent': 0, 'failed': 0}
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        emails = claim_batch()
+        if not emails:
+            break
+        batches += 1
+        outcome = send_batch(emails)
+        results['sent'] += outcome['sent']
+        results['failed'] += outcome['failed']
+
+    return results
+
+
+# =============================================================================
+# MAINTENANCE
+# =============================================================================
+
+def requeue_stale(minutes: Optional[int] = None) -> int:
+    """
+    Release emails claimed by a worker that died mid-batch.
+    They may have reached the mail server already, so they are sent again.
+    """
+    minutes = _setting('EMAIL_OUTBOX_STALE_MINUTES', 10) if minutes is None else minutes
+    cutoff = timezone.now() - timedelta(minutes=minutes)
+    return OutboxEmail.objects.filter(
+        status=OutboxEmail.SENDING,
+        locked_at__lt=cutoff
+    ).update(status=OutboxEmail.PENDING, batch_id=None, locked_at=None, next_attempt_at=timezone.now())
+
+
+def requeue_dead(queryset=None) -> int:
+    """Give dead-lettered emails a fresh set of attempts"""
+    return background.requeue_dead(OutboxEmail.objects.all() if queryset is None else queryset)
+
+
+def purge_sent(days: int) -> int:
+    """Delete sent emails older than days"""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = OutboxEmail.objects.filter(status=OutboxEmail.SENT, sent_at__lt=cutoff).delete()
+    return deleted
+
+
+def outbox_stats() -> Dict:
+    """
+    Queue depth.
+
+    Returns:
+        {'counts': {status: int, ...}, 'oldest_due': datetime or None}
+    """
+    counts = {status: 0 for status, _ in OutboxEmail.STATUS_CHOICES}
+    for row in OutboxEmail.objects.order_by().values('status').annotate(count=Count('id')):
+        counts[row['status']] = row['count']
+
+    return {
+        'counts': counts,
+        'oldest_due': due_emails().values_list('created_at', flat=True).first(),
+    }
@@ -0,0 +1,210 @@
+"""
+Streaming spreadsheet exports shared across apps
+
+Export views hand a generator of rows to export_response(), which streams
+them to the client as CSV or XLSX while the rows are produced. Views should
+feed it from queryset.iterator(chunk_size=...) so memory stays flat however
+long the history is, and the first bytes go out before the query finishes.
+
+XLSX files are written directly as a zip of SpreadsheetML parts (one sheet,
+inline strings, no styles), so no spreadsheet library is needed and nothing
+is buffered beyond the current chunk.
+"""
+
+import csv
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterable, Iterator, Sequence
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+
+CSV = 'csv'
+XLSX = 'xlsx'
+FORMATS = (CSV, XLSX)
+
+CONTENT_TYPES = {
+    CSV: 'text/csv',
+    XLSX: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def export_format(request) -> str:
+    """Requested export format (?format=xlsx), defaulting to CSV"""
+    requested = request.GET.get('format', CSV).lower()
+    return requested if requested in FORMATS else CSV
+
+
+def export_response(rows: Iterable[Sequence], filename: str, file_format: str = CSV, sheet_name: str = 'Export'):
+    """
+    Stream rows as a CSV or XLSX attachment.
+
+    Args:
+        rows: Iterable of row sequences, ideally a generator over
+            queryset.iterator() so nothing is held in memory
+        filename: Attachment name without extension
+        file_format: CSV or XLSX
+        sheet_name: Worksheet name (XLSX only)
+    """
+    if file_format == XLSX:
+        content = stream_xlsx(rows, sheet_name)
+    else:
+        content = stream_csv(rows)
+
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[file_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    return response
+
+
+# =============================================================================
+# CSV
+# =============================================================================
+
+class _Echo:
+    """File-like object that hands back whatever is written to it"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows: Iterable[Sequence]) -> Iterator[str]:
+    """Encode rows as CSV one line at a time"""
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+# =============================================================================
+# XLSX
+# =============================================================================
+
+class _Drain:
+    """Write-only stream that collects zip output until it is drained"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+XLSX_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+
+XLSX_SHEET_END = '</sheetData></worksheet>'
+
+# Control characters that are not allowed in XML 1.0
+_ILLEGAL_XML_CHARS = dict.fromkeys(c for c in range(32) if c not in (9, 10, 13))
+
+
+def _column_letter(index: int) -> str:
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_cell(ref: str, value) -> str:
+    if value is None or value == '':
+        return ''
+    if isinstance(value, bool):
+        value = 'Yes' if value else 'No'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    if isinstance(value, datetime):
+        value = value.strftime('%Y-%m-%d %H:%M')
+    elif isinstance(value, date):
+        value = value.strftime('%Y-%m-%d')
+    text = escape(str(value).translate(_ILLEGAL_XML_CHARS))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(number: int, row: Sequence) -> str:
+    cells = ''.join(
+        _xlsx_cell(f'{_column_letter(index)}{number}', value)
+        for index, value in enumerate(row)
+    )
+    return f'<row r="{number}">{cells}</row>'
+
+
+def stream_xlsx(rows: Iterable[Sequence], sheet_name: str = 'Export', batch_size: int = 500) -> Iterator[bytes]:
+    """
+    Encode rows as a single-sheet XLSX workbook, yielding compressed bytes
+    every batch_size rows. Numbers (int, float, Decimal) become numeric
+    cells; everything else is written as text.
+    """
+    drain = _Drain()
+    with zipfile.ZipFile(drain, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        workbook.writestr('[Content_Types].xml', XLSX_CONTENT_TYPES)
+        workbook.writestr('_rels/.rels', XLSX_ROOT_RELS)
+        workbook.writestr('xl/workbook.xml', XLSX_WORKBOOK.format(name=escape(sheet_name[:31], {'"': '&quot;'})))
+        workbook.writestr('xl/_rels/workbook.xml.rels', XLSX_WORKBOOK_RELS)
+        yield drain.drain()
+
+        with workbook.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(XLSX_SHEET_START.encode())
+            for number, row in enumerate(rows, start=1):
+                sheet.write(_xlsx_row(number, row).encode())
+                if number % batch_size == 0:
+                    yield drain.drain()
+            sheet.write(XLSX_SHEET_END.encode())
+
+    yield drain.drain()
@@ -0,0 +1,132 @@
+"""
+Keyset Pagination
+
+Cursor-based paging for message threads and other newest-first lists:
+
+- A cursor is an opaque token for a row's (timestamp, id). Pages continue
+  strictly before or after it, so they use the (parent, timestamp) index and
+  a page deep in a long history costs the same as the newest one. Rows
+  written while someone is paging never shift or repeat.
+- thread_page() returns the newest page of a thread, the page before a
+  cursor ("load older") or everything after one ("fetch new"), always
+  oldest first, ready to render.
+- Thread views answer ?before= / ?after= requests with
+  thread_fragment_response(): the rendered rows plus the cursors to continue
+  from (static/js/thread_history.js).
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+
+
+def encode_cursor(timestamp: datetime, pk) -> str:
+    """Opaque cursor for a row's (timestamp, id)"""
+    raw = f"{timestamp.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Returns:
+        (timestamp, id) - the id as a string, for the caller's filter to coerce
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    try:
+        timestamp, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(timestamp), pk
+    except (UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+class ThreadPage(NamedTuple):
+    items: List
+    older_cursor: Optional[str]  # None when there is nothing older
+    newer_cursor: Optional[str]  # Pass as ?after= to fetch what comes next
+    has_newer: bool = False  # An ?after= fetch stopped at the limit
+
+
+def _cursor_for(row, field: str) -> str:
+    return encode_cursor(getattr(row, field), row.pk)
+
+
+def _filter(queryset, condition):
+    """Apply a cursor condition; an id of the wrong type is a malformed cursor"""
+    try:
+        return queryset.filter(condition)
+    except ValidationError as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def thread_page(queryset, field: str, limit: int, before: Optional[str] = None,
+                after: Optional[str] = None) -> ThreadPage:
+    """
+    One page of a thread ordered by (field, id), oldest first.
+
+    Args:
+        field: Timestamp the thread is ordered by, e.g. 'created_at'
+        before: Cursor; return the page just older than it
+        after: Cursor; return up to limit rows newer than it
+
+    Raises:
+        ValueError: if a cursor is malformed
+    """
+    if after:
+        timestamp, pk = decode_cursor(after)
+        rows = list(_filter(queryset, Q(**{f'{field}__gt': timestamp}) | Q(**{field: timestamp, 'pk__gt': pk}))
+                    .order_by(field, 'pk')[:limit + 1])
+        has_newer = len(rows) > limit
+        rows = rows[:limit]
+        return ThreadPage(rows, None, _cursor_for(rows[-1], field) if rows else after, has_newer)
+
+    if before:
+        timestamp, pk = decode_cursor(before)
+        queryset = _filter(queryset, Q(**{f'{field}__lt': timestamp}) | Q(**{field: timestamp, 'pk__lt': pk}))
+
+    rows = list(queryset.order_by(f'-{field}', '-pk')[:limit + 1])
+    older_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        older_cursor = _cursor_for(rows[-1], field)
+    rows.reverse()
+
+    newer_cursor = None
+    if not before and rows:
+        newer_cursor = _cursor_for(rows[-1], field)
+    return ThreadPage(rows, older_cursor, newer_cursor)
+
+
+def is_fragment_request(request) -> bool:
+    return 'before' in request.GET or 'after' in request.GET
+
+
+def thread_fragment_response(request, template_name: str, queryset, field: str, limit: int, **context):
+    """
+    JSON answer to a ?before= / ?after= request: {"html", "count",
+    "older_cursor", "newer_cursor", "has_newer"}. The page's rows are passed
+    to the template as `items`.
+    """
+    try:
+        page = thread_page(
+            queryset, field, limit,
+            before=request.GET.get('before') or None,
+            after=request.GET.get('after') or None
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    return JsonResponse({
+        'html': render_to_string(template_name, {**context, 'items': page.items}, request=request),
+        'count': len(page.items),
+        'older_cursor': page.older_cursor,
+        'newer_cursor': page.newer_cursor,
+        'has_newer': page.has_newer,
+    })
@@ -0,0 +1,218 @@
+"""
+Live Events (Server-Sent Events)
+
+Pushes new messages and unread badge changes to open pages, so users no
+longer reload conversations, tickets and lesson requests to see replies:
+
+- Pages open one EventSource on `/core/live/` (static/js/live_events.js).
+  Every connection follows its user's `user:<id>` topic (badge counts) plus
+  the topics the page asks for: `conversation:<id>`, `ticket:<number>` or
+  `lesson_request:<id>`, each checked by can_subscribe().
+- Models publish with publish_on_commit() once the write commits. Events go
+  through an in-process broker straight onto the queues of the connections
+  subscribed to the topic; nothing is queried unless someone is listening.
+- Each connection sends a heartbeat every LIVE_EVENTS_HEARTBEAT_SECONDS and
+  re-reads the badge counter (one primary key lookup), which also picks up
+  changes published by other worker processes. Connections close after
+  LIVE_EVENTS_MAX_CONNECTION_SECONDS and the browser reconnects.
+
+The stream is an async iterator: serve the project through recordered.asgi
+(gunicorn with uvicorn workers, see deploy.sh) so an open connection doesn't
+hold a worker thread. Pages only connect when LIVE_EVENTS_ENABLED is on, and
+the endpoint answers 204 to WSGI requests.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Union
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+# Reconnect delay suggested to the browser
+RETRY_MS = 3000
+
+# Queued in place of the events a slow connection missed
+OVERFLOW = 'resync'
+
+
+def _setting(name: str, default: int) -> int:
+    return getattr(settings, name, default)
+
+
+def format_event(event: str, data) -> str:
+    """One SSE frame"""
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+# =============================================================================
+# BROKER
+# =============================================================================
+
+class Subscription:
+    """One open connection's event queue, owned by its event loop"""
+
+    def __init__(self, topics: List[str], loop, size: int):
+        self.topics = topics
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=size)
+        self.overflowed = False
+
+    def deliver(self, event: str, data):
+        """Runs on the subscription's loop"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait((event, data))
+        except asyncio.QueueFull:
+            # The client isn't keeping up: drop what's queued and tell it to reload
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((OVERFLOW, {}))
+
+
+class EventBroker:
+    """In-process topic fan-out; publish() is safe to call from any thread"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        subscription = Subscription(
+            list(topics), asyncio.get_running_loop(), _setting('LIVE_EVENTS_QUEUE_SIZE', 100)
+        )
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers[topic].discard(subscription)
+                if not self._subscribers[topic]:
+                    del self._subscribers[topic]
+
+    def has_subscribers(self, topics: Iterable[str]) -> bool:
+        with self._lock:
+            return any(topic in self._subscribers for topic in topics)
+
+    def publish(self, topics: Iterable[str], event: str, data) -> int:
+        """Queue an event for every connection following any of topics; returns how many"""
+        with self._lock:
+            subscriptions = set()
+            for topic in topics:
+                subscriptions.update(self._subscribers.get(topic, ()))
+
+        delivered = 0
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event, data)
+                delivered += 1
+            except RuntimeError:
+                # Loop already closed; the connection is going away
+                pass
+        return delivered
+
+
+broker = EventBroker()
+
+
+def publish_on_commit(topics: List[str], event: str, data: Union[Dict, Callable[[], Dict]]):
+    """
+    Publish an event once the current transaction commits.
+    data may be a callable, evaluated at commit time and only when someone
+    is subscribed.
+    """
+    if not broker.has_subscribers(topics):
+        return
+
+    def publish():
+        try:
+            broker.publish(topics, event, data() if callable(data) else data)
+        except Exception as e:
+            logger.error(f"Failed to publish live event {event} to {topics}: {e}")
+
+    transaction.on_commit(publish)
+
+
+# =============================================================================
+# SUBSCRIBING
+# =============================================================================
+
+def can_subscribe(user, topic: str) -> bool:
+    """Whether user may follow a page topic"""
+    kind, _, key = topic.partition(':')
+    try:
+        if kind == 'conversation':
+            from apps.messaging.models import Conversation
+            return Conversation.objects.filter(
+                Q(participant_1=user) | Q(participant_2=user), pk=key
+            ).exists()
+
+        if kind == 'ticket':
+            from apps.support.models import Ticket
+            tickets = Ticket.objects.filter(ticket_number=key)
+            if not user.is_staff:
+                tickets = tickets.filter(Q(user=user) | Q(email=user.email))
+            return tickets.exists()
+
+        if kind == 'lesson_request':
+            from apps.private_teaching.models import LessonRequest
+            return LessonRequest.objects.filter(
+                Q(student=user) | Q(lessons__teacher=user), pk=key
+            ).exists()
+    except (ValueError, ValidationError):
+        return False
+    return False
+
+
+async def event_stream(user, topics: List[str]):
+    """
+    SSE frames for one connection: the current badge, then events as they
+    are published, with heartbeats in between, until the connection's
+    lifetime is up.
+    """
+    from apps.messaging.unread import badge_counts
+
+    heartbeat = _setting('LIVE_EVENTS_HEARTBEAT_SECONDS', 15)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + _setting('LIVE_EVENTS_MAX_CONNECTION_SECONDS', 300)
+    subscription = broker.subscribe(topics)
+
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        badge = await sync_to_async(badge_counts)(user.pk)
+        yield format_event('badge', badge)
+
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event, data = await asyncio.wait_for(subscription.queue.get(), timeout=min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                # Badge changes published by another worker process only show up here
+                current = await sync_to_async(badge_counts)(user.pk)
+                if current != badge:
+                    badge = current
+                    yield format_event('badge', badge)
+                else:
+                    yield ": heartbeat\n\n"
+                continue
+
+            if event == 'badge':
+                badge = data
+            yield format_event(event, data)
+            if event == OVERFLOW:
+                break
+    finally:
+        broker.unsubscribe(subscription)
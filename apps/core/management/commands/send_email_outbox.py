@@ -0,0 +1,75 @@
+"""
+Management command to send queued emails from the outbox.
+
+The web process sends queued emails in background threads as they are
+committed. This command is the standalone worker: it sends retries as they
+fall due, picks up emails left behind by a restart, and is the only worker
+when EMAIL_OUTBOX_WORKERS is 0. Run it under systemd/supervisor, or from cron
+with --once.
+
+Usage:
+    python manage.py send_email_outbox
+    python manage.py send_email_outbox --once
+    python manage.py send_email_outbox --requeue-dead
+    python manage.py send_email_outbox --purge-sent 30
+    python manage.py send_email_outbox --stats
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from apps.core import email_outbox
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails in batches with retries and dead-lettering'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit')
+        parser.add_argument('--poll-interval', type=float, default=5, help='Seconds between polls when the outbox is empty')
+        parser.add_argument('--requeue-dead', action='store_true', help='Give dead-lettered emails a fresh set of attempts and exit')
+        parser.add_argument('--purge-sent', type=int, metavar='DAYS', help='Delete emails sent more than DAYS days ago and exit')
+        parser.add_argument('--stats', action='store_true', help='Show queue depth and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            stats = email_outbox.outbox_stats()
+            for status, count in stats['counts'].items():
+                self.stdout.write(f'{status:>8}: {count}')
+            if stats['oldest_due']:
+                self.stdout.write(f"Oldest due email queued {stats['oldest_due']:%Y-%m-%d %H:%M:%S}")
+            return
+
+        if options['requeue_dead']:
+            requeued = email_outbox.requeue_dead()
+            self.stdout.write(self.style.SUCCESS(f'Requeued {requeued} dead-lettered emails'))
+            return
+
+        if options['purge_sent'] is not None:
+            if options['purge_sent'] < 1:
+                raise CommandError('--purge-sent must be at least 1 day')
+            deleted = email_outbox.purge_sent(options['purge_sent'])
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} sent emails'))
+            return
+
+        self.stdout.write('Sending email outbox')
+        try:
+            while True:
+                close_old_connections()
+                stale = email_outbox.requeue_stale()
+                if stale:
+                    self.stdout.write(self.style.WARNING(f'Requeued {stale} emails abandoned mid-batch'))
+
+                results = email_outbox.drain()
+                if results['sent'] or results['failed']:
+                    self.stdout.write(f"Sent {results['sent']}, failed {results['failed']}")
+
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS('Email outbox worker stopped'))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core', '0001_update_site_domain'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=998)),
+                ('to', models.JSONField(default=list, help_text='All recipients (to, cc and bcc)')),
+                ('message', models.JSONField(help_text='Serialized EmailMessage (see email_outbox.serialize)')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed (will retry)'), ('dead', 'Dead letter')], default='pending', max_length=20)),
+                ('batch_id', models.UUIDField(blank=True, help_text='Claim of the worker sending it', null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Not claimed again before this time')),
+                ('locked_at', models.DateTimeField(blank=True, help_text='When a worker claimed the email', null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Outbox Email',
+                'verbose_name_plural': 'Outbox Emails',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='core_outbox_status_b2f640_idx')],
+            },
+        ),
+    ]
@@ -2,6 +2,7 @@ import uuid
 
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 class PayableModel(models.Model):
@@ -355,3 +356,55 @@ class BaseCancellationRequest(models.Model):
         self.status = self.COMPLETED
         self.refund_processed_at = timezone.now()
         self.save()
+
+
+class OutboxEmail(models.Model):
+    """
+    Outgoing email waiting to be handed to the mail server.
+
+    The outbox email backend (email_outbox.py) writes a row here instead of
+    talking to SMTP, inside whatever transaction the sending code is in, so
+    an email exists exactly when the change that triggered it was committed.
+    Workers send due rows in batches over one SMTP connection, retrying
+    failures with backoff.
+    """
+
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    DEAD = 'dead'
+
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed (will retry)'),
+        (DEAD, 'Dead letter'),
+    ]
+
+    subject = models.CharField(max_length=998)
+    to = models.JSONField(default=list, help_text="All recipients (to, cc and bcc)")
+    message = models.JSONField(help_text="Serialized EmailMessage (see email_outbox.serialize)")
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    batch_id = models.UUIDField(null=True, blank=True, help_text="Claim of the worker sending it")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now, help_text="Not claimed again before this time")
+    locked_at = models.DateTimeField(null=True, blank=True, help_text="When a worker claimed the email")
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'Outbox Email'
+        verbose_name_plural = 'Outbox Emails'
+        indexes = [
+            # Workers claim due emails: status in (pending, failed), next_attempt_at <= now
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to)} ({self.status})"
@@ -270,6 +270,45 @@ class BaseNotificationService:
         user_str = str(user)
         return user_str if user_str else fallback
 
+    @staticmethod
+    def render_templated_email(template_path, context, default_subject='Notification'):
+        """
+        Render an email template pair into its parts.
+
+        Args:
+            template_path: Path to the plain text template (the .html sibling is optional)
+            context: Dictionary of context variables for template
+            default_subject: Fallback subject if not in template
+
+        Returns:
+            (subject, text_message, html_message) - html_message is None
+            when there is no HTML template
+        """
+        # Ensure site_name is in context
+        if 'site_name' not in context:
+            context['site_name'] = BaseNotificationService.get_site_name()
+
+        # Render plain text template
+        subject_and_message = render_to_string(template_path, context)
+
+        # Extract subject from first line
+        lines = subject_and_message.strip().split('\n')
+        subject = lines[0].replace('Subject: ', '').strip() if lines else default_subject
+        text_message = '\n'.join(lines[1:]).strip()
+
+        # Check if HTML template exists
+        html_template_path = template_path.replace('.txt', '.html')
+        html_message = None
+
+        try:
+            # Try to render HTML template
+            html_message = render_to_string(html_template_path, context)
+        except Exception:
+            # HTML template doesn't exist, that's OK - we'll send plain text only
+            pass
+
+        return subject, text_message, html_message
+
     @staticmethod
     def send_templated_email(
         template_path,
@@ -303,28 +342,9 @@ class BaseNotificationService:
             HTML (.html): Use {% block subject %}Your subject here{% endblock %} in template
         """
         try:
-            # Ensure site_name is in context
-            if 'site_name' not in context:
-                context['site_name'] = BaseNotificationService.get_site_name()
-
-            # Render plain text template
-            subject_and_message = render_to_string(template_path, context)
-
-            # Extract subject from first line
-            lines = subject_and_message.strip().split('\n')
-            subject = lines[0].replace('Subject: ', '').strip() if lines else default_subject
-            text_message = '\n'.join(lines[1:]).strip()
-
-            # Check if HTML template exists
-            html_template_path = template_path.replace('.txt', '.html')
-            html_message = None
-
-            try:
-                # Try to render HTML template
-                html_message = render_to_string(html_template_path, context)
-            except Exception:
-                # HTML template doesn't exist, that's OK - we'll send plain text only
-                pass
+            subject, text_message, html_message = BaseNotificationService.render_templated_email(
+                template_path, context, default_subject
+            )
 
             # Send multipart email if we have HTML, otherwise plain text only
             if html_message:
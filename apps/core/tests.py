@@ -1,4 +1,5 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.urls import reverse
 from django.contrib.auth.models import User
 from apps.core.notifications import BaseNotificationService
 from apps.accounts.models import UserProfile
@@ -193,3 +194,156 @@ class BaseNotificationServiceIntegrationTestCase(TestCase):
 
         # All checks passed - ready to send notification
         self.assertTrue(is_valid and should_send)
+
+
+@override_settings(
+    EMAIL_BACKEND='apps.core.email_outbox.OutboxEmailBackend',
+    EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_OUTBOX_MAX_ATTEMPTS=2,
+)
+class EmailOutboxTestCase(TestCase):
+    """Tests for the transactional email outbox"""
+
+    def test_emails_are_queued_and_sent_in_a_batch(self):
+        from django.core import mail
+        from django.db import transaction
+        from apps.core import email_outbox
+        from apps.core.models import OutboxEmail
+
+        for index in range(3):
+            BaseNotificationService.send_simple_email(
+                subject=f'Lesson {index}', message='See you soon', recipient_list=[f'student{index}@example.com']
+            )
+        try:
+            with transaction.atomic():
+                BaseNotificationService.send_simple_email(
+                    subject='Rolled back', message='Never sent', recipient_list=['nobody@example.com']
+                )
+                raise RuntimeError('triggering change failed')
+        except RuntimeError:
+            pass
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.PENDING).count(), 3)
+
+        with patch('apps.core.email_outbox.get_connection', wraps=email_outbox.get_connection) as get_connection:
+            self.assertEqual(email_outbox.drain(), {'sent': 3, 'failed': 0})
+        get_connection.assert_called_once()  # One connection for the whole batch
+        self.assertEqual([message.subject for message in mail.outbox], ['Lesson 0', 'Lesson 1', 'Lesson 2'])
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.SENT).count(), 3)
+
+    def test_failed_email_is_retried_then_dead_lettered(self):
+        from django.core.mail import EmailMultiAlternatives
+        from apps.core import email_outbox
+        from apps.core.models import OutboxEmail
+
+        message = EmailMultiAlternatives('Receipt', 'Thanks', 'shop@example.com', ['buyer@example.com'])
+        message.attach_alternative('<p>Thanks</p>', 'text/html')
+        message.attach('receipt.txt', 'Total: 10.00', 'text/plain')
+        message.send()
+        email = OutboxEmail.objects.get()
+
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('refused')):
+            self.assertEqual(email_outbox.drain(), {'sent': 0, 'failed': 1})
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutboxEmail.FAILED)
+            self.assertEqual(email_outbox.drain(), {'sent': 0, 'failed': 0})  # Not due yet
+
+            OutboxEmail.objects.update(next_attempt_at=email.created_at)
+            self.assertEqual(email_outbox.drain(), {'sent': 0, 'failed': 1})
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutboxEmail.DEAD)
+            self.assertIn('OSError: refused', email.last_error)
+
+        from django.core import mail
+        self.assertEqual(email_outbox.requeue_dead(), 1)
+        self.assertEqual(email_outbox.drain(), {'sent': 1, 'failed': 0})
+        sent = mail.outbox[0]
+        self.assertEqual(sent.alternatives[0][1], 'text/html')
+        self.assertEqual(sent.attachments[0][:2], ('receipt.txt', 'Total: 10.00'))
+
+
+class LiveEventsTestCase(TestCase):
+    """Tests for the server-sent events stream"""
+
+    def setUp(self):
+        from apps.messaging.models import Conversation
+
+        self.teacher = User.objects.create_user(username='teacher')
+        self.student = User.objects.create_user(username='student')
+        self.outsider = User.objects.create_user(username='outsider')
+        self.conversation = Conversation.objects.create(
+            domain='private_teaching', participant_1=self.teacher, participant_2=self.student
+        )
+
+    def send(self, content):
+        from apps.messaging.models import Message
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Message.objects.create(conversation=self.conversation, sender=self.student, content=content)
+
+    async def test_stream_pushes_messages_and_badge(self):
+        import json
+        from asgiref.sync import sync_to_async
+        from apps.core.live_events import event_stream
+
+        stream = event_stream(self.teacher, [f'user:{self.teacher.pk}', f'conversation:{self.conversation.pk}'])
+        self.assertEqual(await anext(stream), 'retry: 3000\n\n')
+        self.assertIn('"total": 0', await anext(stream))
+
+        await sync_to_async(self.send)('Hello')
+        frames = [await anext(stream), await anext(stream)]
+        await stream.aclose()
+
+        events = {}
+        for frame in frames:
+            event_line, data_line = frame.strip().split('\n')
+            events[event_line.removeprefix('event: ')] = json.loads(data_line.removeprefix('data: '))
+        self.assertEqual(events['badge']['total'], 1)
+        self.assertEqual(events['message']['content'], 'Hello')
+        self.assertEqual(events['message']['conversation'], str(self.conversation.pk))
+
+    def test_nothing_is_queued_without_subscribers(self):
+        with patch('apps.core.live_events.broker.publish') as publish:
+            self.send('Hello')
+        publish.assert_not_called()
+
+    def test_page_topics_are_checked(self):
+        from apps.core.live_events import can_subscribe
+
+        topic = f'conversation:{self.conversation.pk}'
+        self.assertTrue(can_subscribe(self.student, topic))
+        self.assertFalse(can_subscribe(self.outsider, topic))
+        self.assertFalse(can_subscribe(self.student, 'conversation:not-a-uuid'))
+        self.assertFalse(can_subscribe(self.student, f'user:{self.teacher.pk}'))
+
+        from asgiref.sync import async_to_sync
+
+        profile = self.outsider.profile
+        profile.profile_completed = True
+        profile.email_verified = True
+        profile.save()
+        self.async_client.force_login(self.outsider)
+        response = async_to_sync(self.async_client.get)(reverse('core:live_events'), {'topic': topic})
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_not_streamed_over_wsgi(self):
+        profile = self.student.profile
+        profile.profile_completed = True
+        profile.email_verified = True
+        profile.save()
+        self.client.force_login(self.student)
+
+        response = self.client.get(reverse('core:live_events'))
+        self.assertEqual(response.status_code, 204)
+
+        # Pages don't connect unless live events are switched on
+        response = self.client.get(reverse('messaging:inbox'))
+        self.assertNotContains(response, 'id="live-events"')
+        with self.settings(LIVE_EVENTS_ENABLED=True):
+            response = self.client.get(reverse('messaging:inbox'))
+        self.assertContains(response, 'id="live-events"')
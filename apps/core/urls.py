@@ -1,6 +1,7 @@
 from django.urls import path
 from . import views
 from .views_audio_upload import audio_upload
+from .views_live_events import live_events
 
 app_name = 'core'
 
@@ -13,4 +14,5 @@ urlpatterns = [
     path('forms/', views.FormExampleView.as_view(), name='forms'),
     path('interactive/', views.InteractiveView.as_view(), name='interactive'),
     path('audio-upload/', audio_upload, name='audio_upload'),
+    path('live/', live_events, name='live_events'),
 ]
\ No newline at end of file
@@ -0,0 +1,45 @@
+"""
+Server-sent events endpoint for live pages (see live_events.py)
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+
+from .live_events import can_subscribe, event_stream
+
+# Page topics one connection may follow
+MAX_TOPICS = 5
+
+
+async def live_events(request):
+    """
+    Stream events for the current user.
+
+    GET params:
+        topic: Page topic to follow as well as the user's own, e.g.
+            conversation:<id> (repeatable, up to MAX_TOPICS)
+
+    Returns 204 (no stream) when served over WSGI, where the response
+    can't be streamed and would hold a worker for the whole connection.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+
+    page_topics = request.GET.getlist('topic')
+    if len(page_topics) > MAX_TOPICS:
+        return HttpResponse(status=400)
+    for topic in page_topics:
+        if not await sync_to_async(can_subscribe)(user, topic):
+            return HttpResponseForbidden()
+
+    response = StreamingHttpResponse(
+        event_stream(user, [f'user:{user.pk}', *page_topics]),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream
+    return response
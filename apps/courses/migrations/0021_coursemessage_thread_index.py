@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-16 21:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0020_add_content_rating'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coursemessage',
+            index=models.Index(fields=['parent_message', 'sent_at'], name='courses_cou_parent__f86791_idx'),
+        ),
+    ]
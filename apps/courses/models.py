@@ -13,7 +13,7 @@ This module contains all models related to:
 import uuid
 import random
 import string
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils.text import slugify
 from django.urls import reverse
@@ -856,6 +856,7 @@ class CourseMessage(models.Model):
         indexes = [
             models.Index(fields=['recipient', 'read_at']),
             models.Index(fields=['course', 'sent_at']),
+            models.Index(fields=['parent_message', 'sent_at']),
         ]
 
     def __str__(self):
@@ -863,12 +864,37 @@ class CourseMessage(models.Model):
         recipient_name = self.recipient.get_full_name() or self.recipient.username
         return f"From {sender_name} to {recipient_name}: {self.subject}"
 
+    def save(self, *args, **kwargs):
+        """New unread messages count towards the recipient's unread badge"""
+        from apps.messaging.unread import course_message_received
+
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding and self.read_at is None:
+                course_message_received(self.recipient_id)
+
     def mark_as_read(self):
         """Mark message as read"""
+        from apps.messaging.unread import course_message_read
+
         if not self.is_read:
             self.is_read = True
             self.read_at = timezone.now()
-            self.save(update_fields=['is_read', 'read_at'])
+            with transaction.atomic():
+                # Only the request that actually flips it updates the badge
+                if CourseMessage.objects.filter(pk=self.pk, is_read=False).update(is_read=True, read_at=self.read_at):
+                    course_message_read(self.recipient_id)
+
+    def mark_replies_as_read(self, user):
+        """Mark every unread reply to user in this thread as read, with one UPDATE"""
+        from apps.messaging.unread import course_message_read
+
+        with transaction.atomic():
+            marked = self.replies.filter(recipient=user, is_read=False).update(is_read=True, read_at=timezone.now())
+            if marked:
+                course_message_read(user.pk, marked)
+        return marked
 
 
 # ============================================================================
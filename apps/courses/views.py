@@ -4,6 +4,7 @@ Views for courses app.
 
 import json
 
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
@@ -17,6 +18,7 @@ from django.http import JsonResponse
 from django.utils import timezone
 from datetime import timedelta
 
+from apps.core import keyset
 from apps.core.views import (
     BaseCheckoutSuccessView, BaseCheckoutCancelView, SearchableListViewMixin,
     SuccessMessageMixin, SetUserFieldMixin, CourseOwnershipMixin, CourseContextMixin
@@ -1935,6 +1937,8 @@ class MessageComposeView(LoginRequiredMixin, CreateView):
 class MessageThreadView(LoginRequiredMixin, DetailView):
     """
     View a message thread (original message + all replies).
+    Shows the newest THREAD_PAGE_SIZE replies; ?before= / ?after= return
+    older or newer ones as a JSON fragment (apps/core/keyset.py).
     """
     model = CourseMessage
     template_name = 'courses/messages/thread.html'
@@ -1950,6 +1954,18 @@ class MessageThreadView(LoginRequiredMixin, DetailView):
 
         return obj
 
+    def get_replies(self):
+        return self.object.replies.select_related('sender')
+
+    def get(self, request, *args, **kwargs):
+        if keyset.is_fragment_request(request):
+            self.object = self.get_object()
+            return keyset.thread_fragment_response(
+                request, 'courses/messages/_replies.html', self.get_replies(), 'sent_at',
+                settings.THREAD_PAGE_SIZE, message=self.object
+            )
+        return super().get(request, *args, **kwargs)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
@@ -1957,15 +1973,14 @@ class MessageThreadView(LoginRequiredMixin, DetailView):
         if self.object.recipient == self.request.user and not self.object.is_read:
             self.object.mark_as_read()
 
-        # Get all replies
-        replies = self.object.replies.select_related('sender').order_by('sent_at')
-
         # Mark unread replies as read
-        for reply in replies:
-            if reply.recipient == self.request.user and not reply.is_read:
-                reply.mark_as_read()
+        self.object.mark_replies_as_read(self.request.user)
 
-        context['replies'] = replies
+        # Newest page of replies
+        page = keyset.thread_page(self.get_replies(), 'sent_at', settings.THREAD_PAGE_SIZE)
+        context['replies'] = page.items
+        context['older_cursor'] = page.older_cursor
+        context['newer_cursor'] = page.newer_cursor
         context['reply_form'] = MessageReplyForm()
 
         # Determine if user can reply
@@ -2423,6 +2438,9 @@ class CourseCancellationRequestView(LoginRequiredMixin, View):
                 cancellation.admin_notes = 'Automatic refund - within 7-day trial period'
                 cancellation.save()
 
+                from apps.payments.ledger import record_course_refund
+                record_course_refund(cancellation, stripe_payment)
+
                 # Deactivate enrollment
                 enrollment.is_active = False
                 enrollment.save()
@@ -2635,6 +2653,9 @@ class AdminApproveCancellationView(LoginRequiredMixin, UserPassesTestMixin, View
                 # Mark refund as processed
                 cancellation.mark_refund_processed()
 
+                from apps.payments.ledger import record_course_refund
+                record_course_refund(cancellation, stripe_payment)
+
                 # Deactivate enrollment
                 enrollment.is_active = False
                 enrollment.save()
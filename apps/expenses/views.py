@@ -4,15 +4,16 @@ from django.contrib import messages
 from django.urls import reverse_lazy
 from django.db.models import Q, Sum, Count
 from django.db.models.functions import TruncMonth
-from django.http import HttpResponse, JsonResponse
+from django.http import JsonResponse
 from django.utils import timezone
-import csv
 import json
 from datetime import datetime, timedelta
+from decimal import Decimal
 
 from .models import Expense, ExpenseCategory
 from .forms import ExpenseForm, ExpenseCategoryForm, ExpenseFilterForm
 from .mixins import TeacherOrAdminRequiredMixin
+from apps.core.exports import export_format, export_response
 
 
 class ExpenseDashboardView(TeacherOrAdminRequiredMixin, TemplateView):
@@ -232,7 +233,7 @@ class CategoryDeleteView(TeacherOrAdminRequiredMixin, DeleteView):
 
 
 class ExpenseExportCSVView(TeacherOrAdminRequiredMixin, View):
-    """Export expenses to CSV"""
+    """Export expenses as a streamed CSV (or XLSX with ?format=xlsx) file"""
 
     def get(self, request, *args, **kwargs):
         # Get filtered queryset using same logic as list view
@@ -262,41 +263,35 @@ class ExpenseExportCSVView(TeacherOrAdminRequiredMixin, View):
                 Q(notes__icontains=search)
             )
 
-        expenses = expenses.order_by('-date')
-
-        # Create CSV response
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="expenses_{timezone.now().strftime("%Y%m%d")}.csv"'
-
-        writer = csv.writer(response)
-
-        # Write header
-        writer.writerow([
-            'Date',
-            'Business Area',
-            'Category',
-            'Description',
-            'Supplier',
-            'Amount (£)',
-            'Payment Method',
-            'Workshop',
-            'Notes',
-            'Receipt File'
-        ])
-
-        # Write data
-        for expense in expenses:
-            writer.writerow([
-                expense.date.strftime('%Y-%m-%d'),
-                expense.get_business_area_display(),
-                expense.category.name,
-                expense.description,
-                expense.supplier,
-                f'{expense.amount:.2f}',
-                expense.get_payment_method_display(),
-                expense.workshop.title if expense.workshop else '',
-                expense.notes,
-                'Yes' if expense.receipt_file else 'No'
-            ])
-
-        return response
+        expenses = expenses.order_by('-date', '-id')
+
+        def rows():
+            yield [
+                'Date',
+                'Business Area',
+                'Category',
+                'Description',
+                'Supplier',
+                'Amount (£)',
+                'Payment Method',
+                'Workshop',
+                'Notes',
+                'Receipt File'
+            ]
+            # Server-side cursor: rows are written as they are fetched
+            for expense in expenses.iterator(chunk_size=2000):
+                yield [
+                    expense.date.strftime('%Y-%m-%d'),
+                    expense.get_business_area_display(),
+                    expense.category.name,
+                    expense.description,
+                    expense.supplier,
+                    expense.amount.quantize(Decimal('0.01')),
+                    expense.get_payment_method_display(),
+                    expense.workshop.title if expense.workshop else '',
+                    expense.notes,
+                    'Yes' if expense.receipt_file else 'No'
+                ]
+
+        filename = f'expenses_{timezone.now().strftime("%Y%m%d")}'
+        return export_response(rows(), filename, export_format(request), sheet_name='Expenses')
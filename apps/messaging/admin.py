@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Conversation, ConversationReadStatus, Message
+from .models import Conversation, ConversationReadStatus, Message, PendingMessageNotification
 
 
 class MessageInline(admin.TabularInline):
@@ -17,7 +17,8 @@ class ConversationAdmin(admin.ModelAdmin):
     search_fields = ('participant_1__username', 'participant_1__email',
                      'participant_2__username', 'participant_2__email',
                      'workshop__title')
-    readonly_fields = ('id', 'created_at', 'updated_at')
+    readonly_fields = ('id', 'created_at', 'updated_at', 'last_message_sender', 'last_message_preview',
+                       'last_message_at', 'participant_1_unread', 'participant_2_unread')
     inlines = [MessageInline]
 
     fieldsets = (
@@ -27,6 +28,11 @@ class ConversationAdmin(admin.ModelAdmin):
         ('Context', {
             'fields': ('workshop', 'child_profile')
         }),
+        ('Inbox', {
+            'fields': ('last_message_sender', 'last_message_preview', 'last_message_at',
+                       'participant_1_unread', 'participant_2_unread'),
+            'classes': ('collapse',)
+        }),
         ('Metadata', {
             'fields': ('id', 'created_at', 'updated_at'),
             'classes': ('collapse',)
@@ -79,3 +85,13 @@ class MessageAdmin(admin.ModelAdmin):
         """Show preview of message content"""
         return obj.content[:75] + '...' if len(obj.content) > 75 else obj.content
     get_content_preview.short_description = 'Content'
+
+
+@admin.register(PendingMessageNotification)
+class PendingMessageNotificationAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'message_count', 'first_message_at', 'due_at')
+    search_fields = ('recipient__username', 'recipient__email')
+    readonly_fields = ('recipient', 'message_count', 'first_message_at', 'due_at')
+
+    def has_add_permission(self, request):
+        return False
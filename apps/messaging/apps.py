@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class MessagingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.messaging'
+
+    def ready(self):
+        """Keep the SQLite message search index and its triggers in place after migrations"""
+        from django.db.models.signals import post_migrate
+        from .search import install_sqlite_index
+
+        post_migrate.connect(install_sqlite_index, sender=self)
@@ -0,0 +1,161 @@
+"""
+Message Notification Digests
+
+An active conversation used to send one email per message. New message
+emails are now coalesced per recipient:
+
+- queue_notification() is called for each new message. The first message
+  to a recipient opens a PendingMessageNotification window of
+  MESSAGE_DIGEST_WINDOW_MINUTES; later messages only bump its count.
+- When the window is due, flush_due() sends one email covering every message
+  the recipient received since it opened, grouped by conversation. Messages
+  they have read in the meantime (ConversationReadStatus) are left out, and
+  if they have read everything no email is sent at all.
+- Windows are flushed by an in-process timer started when the window opens,
+  and by `manage.py send_message_digests` (every minute from
+  recordered.crontab), which catches anything a restart dropped. A new
+  message to a window that is already overdue flushes it straight away.
+
+MESSAGE_DIGEST_WINDOW_MINUTES = 0 sends each message's email immediately.
+"""
+
+import logging
+import threading
+from datetime import timedelta
+from typing import Dict
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from .models import ConversationReadStatus, Message, PendingMessageNotification
+
+logger = logging.getLogger(__name__)
+
+
+def window() -> timedelta:
+    return timedelta(minutes=getattr(settings, 'MESSAGE_DIGEST_WINDOW_MINUTES', 10))
+
+
+# =============================================================================
+# QUEUEING
+# =============================================================================
+
+def queue_notification(message):
+    """Add a new message to its recipient's digest window, opening one if needed"""
+    from .notifications import MessageNotificationService
+
+    if not window():
+        MessageNotificationService.send_new_message_notification(message)
+        return
+
+    recipient = message.conversation.get_other_participant(message.sender)
+    pending = PendingMessageNotification.objects.filter(recipient=recipient)
+    if pending.update(message_count=F('message_count') + 1):
+        # A window past its due time lost its timer (e.g. to a restart): flush it now
+        overdue = pending.filter(due_at__lte=timezone.now()).first()
+        if overdue:
+            transaction.on_commit(lambda: flush(overdue))
+        return
+
+    try:
+        with transaction.atomic():
+            PendingMessageNotification.objects.create(
+                recipient=recipient,
+                first_message_at=message.created_at,
+                due_at=message.created_at + window()
+            )
+    except IntegrityError:
+        # Another request opened the window first
+        pending.update(message_count=F('message_count') + 1)
+        return
+
+    transaction.on_commit(schedule_flush)
+
+
+def schedule_flush():
+    """Flush due windows once the window that was just opened falls due"""
+    timer = threading.Timer(window().total_seconds() + 1, _flush_in_thread)
+    timer.daemon = True
+    timer.start()
+
+
+def _flush_in_thread():
+    """Timer entry point: the thread has its own DB connection, closed when done"""
+    try:
+        flush_due()
+    except Exception as e:
+        logger.error(f"Message digest flush failed: {e}")
+    finally:
+        connection.close()
+
+
+# =============================================================================
+# SENDING
+# =============================================================================
+
+def unread_messages(recipient, since):
+    """Messages to recipient since the given time that they haven't read yet"""
+    read = ConversationReadStatus.objects.filter(
+        conversation=OuterRef('conversation'),
+        user=recipient,
+        last_read_at__gte=OuterRef('created_at')
+    )
+    return Message.objects.filter(
+        Q(conversation__participant_1=recipient) | Q(conversation__participant_2=recipient),
+        created_at__gte=since
+    ).exclude(
+        sender=recipient
+    ).exclude(
+        Exists(read)
+    ).select_related(
+        'sender',
+        'conversation__participant_1',
+        'conversation__participant_2',
+        'conversation__workshop',
+        'conversation__course',
+        'conversation__child_profile',
+        'conversation__private_lesson_assignment__assignment',
+    ).order_by('conversation__updated_at', 'conversation_id', 'created_at')
+
+
+def flush(pending: PendingMessageNotification) -> str:
+    """
+    Send the digest for one window and close it.
+
+    Returns:
+        'sent', 'suppressed' (everything already read or the email wasn't
+        sent) or 'claimed' (another worker closed the window first)
+    """
+    from .notifications import MessageNotificationService
+
+    with transaction.atomic():
+        # Deleting the row is the claim: only one worker gets a count of 1
+        deleted, _ = PendingMessageNotification.objects.filter(pk=pending.pk).delete()
+        if not deleted:
+            return 'claimed'
+
+        messages = list(unread_messages(pending.recipient, pending.first_message_at))
+        if not messages:
+            logger.info(f"Message digest for {pending.recipient.username} suppressed - all messages read")
+            return 'suppressed'
+
+        sent = MessageNotificationService.send_message_digest(pending.recipient, messages)
+    return 'sent' if sent else 'suppressed'
+
+
+def flush_due() -> Dict[str, int]:
+    """
+    Send every digest whose window has closed.
+
+    Returns:
+        {'sent': int, 'suppressed': int}
+    """
+    results = {'sent': 0, 'suppressed': 0}
+    due = PendingMessageNotification.objects.filter(due_at__lte=timezone.now()).select_related('recipient__profile')
+    for pending in due:
+        outcome = flush(pending)
+        if outcome in results:
+            results[outcome] += 1
+    return results
@@ -0,0 +1,43 @@
+"""
+Management command to send new message digests whose window has closed.
+
+The web process flushes each digest window with a timer when it opens. This
+command catches windows the timer missed (restarts, several web processes).
+Run it from cron every few minutes, or continuously under
+systemd/supervisor.
+
+Usage:
+    python manage.py send_message_digests --once
+    python manage.py send_message_digests --poll-interval 60
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.messaging import digests
+
+
+class Command(BaseCommand):
+    help = 'Send coalesced new message emails whose digest window has closed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Flush due digests once and exit')
+        parser.add_argument('--poll-interval', type=float, default=60, help='Seconds between polls')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                close_old_connections()
+                results = digests.flush_due()
+                if results['sent'] or results['suppressed']:
+                    self.stdout.write(f"Sent {results['sent']} digests, suppressed {results['suppressed']}")
+
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS('Message digest worker stopped'))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0003_remove_conversation_unique_private_teaching_conversation_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingMessageNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_message_at', models.DateTimeField(help_text='Messages from this time on are included')),
+                ('due_at', models.DateTimeField(db_index=True, help_text='When the digest is sent')),
+                ('message_count', models.PositiveIntegerField(default=1)),
+                ('recipient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pending_message_notification', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['due_at'],
+            },
+        ),
+    ]
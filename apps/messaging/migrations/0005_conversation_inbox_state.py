@@ -0,0 +1,91 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_inbox_state(apps, schema_editor):
+    """Fill in the last message snapshot and unread counters for existing conversations"""
+    Conversation = apps.get_model('messaging', 'Conversation')
+    ConversationReadStatus = apps.get_model('messaging', 'ConversationReadStatus')
+    Message = apps.get_model('messaging', 'Message')
+
+    last_read = {
+        (status.conversation_id, status.user_id): status.last_read_at
+        for status in ConversationReadStatus.objects.all()
+    }
+
+    for conversation in Conversation.objects.iterator():
+        messages = Message.objects.filter(conversation_id=conversation.pk)
+        last_message = messages.order_by('-created_at').first()
+        if not last_message:
+            continue
+
+        unread = {}
+        for field, user_id in [('participant_1_unread', conversation.participant_1_id),
+                               ('participant_2_unread', conversation.participant_2_id)]:
+            received = messages.exclude(sender_id=user_id)
+            read_at = last_read.get((conversation.pk, user_id))
+            if read_at:
+                received = received.filter(created_at__gt=read_at)
+            unread[field] = received.count()
+
+        Conversation.objects.filter(pk=conversation.pk).update(
+            last_message_id=last_message.pk,
+            last_message_sender_id=last_message.sender_id,
+            last_message_preview=last_message.content[:200],
+            last_message_at=last_message.created_at,
+            updated_at=max(conversation.updated_at, last_message.created_at),
+            **unread
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0004_pending_message_notification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, help_text='Most recent message in the conversation', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_preview',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_sender',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='participant_1_unread',
+            field=models.PositiveIntegerField(default=0, help_text="Messages participant 1 hasn't read yet"),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='participant_2_unread',
+            field=models.PositiveIntegerField(default=0, help_text="Messages participant 2 hasn't read yet"),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['participant_1', '-updated_at', '-id'], name='messaging_c_partici_9809e9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['participant_2', '-updated_at', '-id'], name='messaging_c_partici_e19f53_idx'),
+        ),
+        migrations.RunPython(backfill_inbox_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('messaging', '0005_conversation_inbox_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadMessageCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_message_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('messaging_unread', models.PositiveIntegerField(default=0, help_text='Unread conversation messages')),
+                ('course_unread', models.PositiveIntegerField(default=0, help_text='Unread legacy course messages')),
+            ],
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+# PostgreSQL full-text indexes for apps/messaging/search.py. The indexed
+# expression must stay identical to the SearchVector search() matches with.
+# SQLite gets FTS5 tables from search.install_sqlite_index() instead.
+SEARCH_CONFIG = 'english'
+
+SEARCH_INDEXES = [
+    ('messaging', 'Message', ('content',), 'messaging_message_search_idx'),
+    ('private_teaching', 'LessonRequestMessage', ('message',), 'pt_lessonreqmsg_search_idx'),
+    ('private_teaching', 'ApplicationMessage', ('message',), 'pt_applicationmsg_search_idx'),
+    ('courses', 'CourseMessage', ('subject', 'body'), 'courses_coursemsg_search_idx'),
+    ('support', 'TicketMessage', ('message',), 'support_ticketmsg_search_idx'),
+]
+
+
+def search_indexes(apps):
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    for app_label, model_name, fields, name in SEARCH_INDEXES:
+        model = apps.get_model(app_label, model_name)
+        yield model, GinIndex(SearchVector(*fields, config=SEARCH_CONFIG), name=name)
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model, index in search_indexes(apps):
+        schema_editor.add_index(model, index)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model, index in search_indexes(apps):
+        schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0006_unread_message_counter'),
+        ('private_teaching', '0027_schedule_version'),
+        ('courses', '0021_coursemessage_thread_index'),
+        ('support', '0004_ticketmessage_thread_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
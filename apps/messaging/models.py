@@ -1,7 +1,11 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.db.models import F, Q
+from django.utils import timezone
+
+# Length of the last message snapshot shown in the inbox
+PREVIEW_LENGTH = 200
 
 
 class Conversation(models.Model):
@@ -73,6 +77,34 @@ class Conversation(models.Model):
         help_text="Assignment this conversation is about (if applicable)"
     )
 
+    # Inbox state, kept up to date by Message.save() and mark_as_read() so
+    # the inbox never has to look at the messages themselves
+    last_message = models.ForeignKey(
+        'Message',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        help_text="Most recent message in the conversation"
+    )
+    last_message_sender = models.ForeignKey(
+        User,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='+'
+    )
+    last_message_preview = models.CharField(max_length=PREVIEW_LENGTH, blank=True)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    participant_1_unread = models.PositiveIntegerField(
+        default=0,
+        help_text="Messages participant 1 hasn't read yet"
+    )
+    participant_2_unread = models.PositiveIntegerField(
+        default=0,
+        help_text="Messages participant 2 hasn't read yet"
+    )
+
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True, db_index=True)
@@ -80,6 +112,9 @@ class Conversation(models.Model):
     class Meta:
         ordering = ['-updated_at']
         indexes = [
+            # Inbox: a participant's conversations, most recently active first
+            models.Index(fields=['participant_1', '-updated_at', '-id']),
+            models.Index(fields=['participant_2', '-updated_at', '-id']),
             models.Index(fields=['domain', '-updated_at']),
             models.Index(fields=['workshop', '-updated_at']),
             models.Index(fields=['course', '-updated_at']),
@@ -129,28 +164,56 @@ class Conversation(models.Model):
         """Get the other person in this conversation"""
         return self.participant_2 if user == self.participant_1 else self.participant_1
 
+    def unread_field(self, user):
+        """Name of the unread counter belonging to user"""
+        return 'participant_1_unread' if user.pk == self.participant_1_id else 'participant_2_unread'
+
     def get_unread_count(self, user):
         """Get unread message count for a user"""
-        last_read = self.read_status.filter(user=user).first()
-
-        # Use Message.objects instead of self.messages to avoid issues with prefetch slicing
-        messages_qs = Message.objects.filter(conversation=self)
-
-        if not last_read:
-            # Never read - count all messages not from this user
-            return messages_qs.exclude(sender=user).count()
-        # Count messages after last read that aren't from this user
-        return messages_qs.filter(
-            created_at__gt=last_read.last_read_at
-        ).exclude(sender=user).count()
+        return getattr(self, self.unread_field(user))
 
     def mark_as_read(self, user):
         """Mark conversation as read for a user"""
-        ConversationReadStatus.objects.update_or_create(
-            conversation=self,
-            user=user,
-            defaults={'last_read_at': models.functions.Now()}
+        field = self.unread_field(user)
+        with transaction.atomic():
+            ConversationReadStatus.objects.update_or_create(
+                conversation=self,
+                user=user,
+                defaults={'last_read_at': models.functions.Now()}
+            )
+            had_unread = Conversation.objects.filter(pk=self.pk, **{f'{field}__gt': 0}).update(**{field: 0})
+            if had_unread:
+                from .unread import conversation_read
+                conversation_read(user.pk)
+        setattr(self, field, 0)
+
+    def record_message(self, message):
+        """
+        Update the inbox state for a new message: the last message snapshot,
+        the recipient's unread counter and updated_at, in one UPDATE, plus
+        the recipient's unread badge. Counters are incremented in the
+        database, so concurrent senders don't lose counts.
+        """
+        from .unread import message_received
+
+        if message.sender_id == self.participant_1_id:
+            recipient_id, recipient_field = self.participant_2_id, 'participant_2_unread'
+        else:
+            recipient_id, recipient_field = self.participant_1_id, 'participant_1_unread'
+        values = {
+            'last_message': message,
+            'last_message_sender_id': message.sender_id,
+            'last_message_preview': message.content[:PREVIEW_LENGTH],
+            'last_message_at': message.created_at,
+            'updated_at': timezone.now(),
+        }
+        Conversation.objects.filter(pk=self.pk).update(
+            **values, **{recipient_field: F(recipient_field) + 1}
         )
+        message_received(recipient_id)
+        for name, value in values.items():
+            setattr(self, name, value)
+        setattr(self, recipient_field, getattr(self, recipient_field) + 1)
 
     def get_display_title(self, for_user):
         """Get display title from perspective of for_user"""
@@ -217,3 +280,71 @@ class Message(models.Model):
         sender_name = self.sender.get_full_name() or self.sender.username
         preview = self.content[:50] + '...' if len(self.content) > 50 else self.content
         return f"{sender_name}: {preview}"
+
+    def save(self, *args, **kwargs):
+        """New messages update their conversation's inbox state in the same transaction"""
+        from apps.core.live_events import publish_on_commit
+
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                self.conversation.record_message(self)
+                publish_on_commit([f'conversation:{self.conversation_id}'], 'message', self.live_event_data)
+
+    def live_event_data(self):
+        """Payload of the live `message` event"""
+        return {
+            'id': str(self.id),
+            'conversation': str(self.conversation_id),
+            'sender': self.sender_id,
+            'sender_name': self.sender.get_full_name() or self.sender.username,
+            'content': self.content,
+            'created_at': self.created_at,
+        }
+
+
+class PendingMessageNotification(models.Model):
+    """
+    Open digest window for a recipient's new message emails.
+
+    The first message to a recipient opens the window; later messages only
+    bump the count. When due_at passes, digests.py sends one email covering
+    every message still unread and deletes the row.
+    """
+
+    recipient = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='pending_message_notification'
+    )
+    first_message_at = models.DateTimeField(help_text="Messages from this time on are included")
+    due_at = models.DateTimeField(db_index=True, help_text="When the digest is sent")
+    message_count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        ordering = ['due_at']
+
+    def __str__(self):
+        return f"{self.recipient.username}: {self.message_count} message(s) due {self.due_at}"
+
+
+class UnreadMessageCounter(models.Model):
+    """
+    A user's unread message totals for the navbar badge.
+
+    Built from the messages themselves the first time it's needed, then kept
+    up to date in place as messages arrive and are read (see unread.py).
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='unread_message_counter'
+    )
+    messaging_unread = models.PositiveIntegerField(default=0, help_text="Unread conversation messages")
+    course_unread = models.PositiveIntegerField(default=0, help_text="Unread legacy course messages")
+
+    def __str__(self):
+        return f"{self.user.username}: {self.messaging_unread} + {self.course_unread} unread"
@@ -12,6 +12,27 @@ logger = logging.getLogger(__name__)
 class MessageNotificationService(BaseNotificationService):
     """Service for sending message-related email notifications"""
 
+    @staticmethod
+    def _context_info(conversation):
+        """What the conversation is about, e.g. 'Workshop: Consort Playing'"""
+        if conversation.domain == 'workshop' and conversation.workshop:
+            return f"Workshop: {conversation.workshop.title}"
+        elif conversation.domain == 'course' and conversation.course:
+            return f"Course: {conversation.course.title}"
+        elif conversation.domain == 'private_teaching':
+            if conversation.child_profile:
+                return f"Private Teaching - {conversation.child_profile.full_name}"
+            return "Private Teaching"
+        return ""
+
+    @staticmethod
+    def _conversation_url(conversation):
+        return MessageNotificationService.build_absolute_url(
+            'messaging:conversation_detail',
+            kwargs={'conversation_id': str(conversation.id)},
+            use_https=True
+        )
+
     @staticmethod
     def send_new_message_notification(message):
         """
@@ -36,23 +57,10 @@ class MessageNotificationService(BaseNotificationService):
                 return False
 
             # Build conversation URL
-            conversation_url = MessageNotificationService.build_absolute_url(
-                'messaging:conversation_detail',
-                kwargs={'conversation_id': str(conversation.id)},
-                use_https=True
-            )
+            conversation_url = MessageNotificationService._conversation_url(conversation)
 
             # Determine context based on domain
-            context_info = ""
-            if conversation.domain == 'workshop' and conversation.workshop:
-                context_info = f"Workshop: {conversation.workshop.title}"
-            elif conversation.domain == 'course' and conversation.course:
-                context_info = f"Course: {conversation.course.title}"
-            elif conversation.domain == 'private_teaching':
-                if conversation.child_profile:
-                    context_info = f"Private Teaching - {conversation.child_profile.full_name}"
-                else:
-                    context_info = "Private Teaching"
+            context_info = MessageNotificationService._context_info(conversation)
 
             # Build email context
             context = {
@@ -82,3 +90,64 @@ class MessageNotificationService(BaseNotificationService):
         except Exception as e:
             logger.error(f"Failed to send new message notification: {str(e)}")
             return False
+
+    @staticmethod
+    def send_message_digest(recipient, messages):
+        """
+        Send one email covering several new messages, grouped by conversation.
+        A single message gets the regular new message email.
+        Only sends if recipient has email_on_new_message enabled.
+
+        Args:
+            recipient: User the messages were sent to
+            messages: Unread messages, ordered by conversation then time
+        """
+        if len(messages) == 1:
+            return MessageNotificationService.send_new_message_notification(messages[0])
+
+        try:
+            if not MessageNotificationService.check_opt_out(recipient, 'email_on_new_message'):
+                logger.info(f"Skipping message digest - {recipient.username} has notifications disabled")
+                return False
+
+            is_valid, email = MessageNotificationService.validate_email(recipient, 'Recipient')
+            if not is_valid:
+                return False
+
+            threads = []
+            for message in messages:
+                conversation = message.conversation
+                if not threads or threads[-1]['conversation'] != conversation:
+                    threads.append({
+                        'conversation': conversation,
+                        'title': conversation.get_display_title(recipient),
+                        'context_info': MessageNotificationService._context_info(conversation),
+                        'conversation_url': MessageNotificationService._conversation_url(conversation),
+                        'messages': [],
+                    })
+                threads[-1]['messages'].append({
+                    'sender_name': MessageNotificationService.get_display_name(message.sender),
+                    'message': message,
+                })
+
+            context = {
+                'recipient': recipient,
+                'recipient_name': MessageNotificationService.get_display_name(recipient),
+                'threads': threads,
+                'message_count': len(messages),
+                'inbox_url': MessageNotificationService.build_absolute_url('messaging:inbox', use_https=True),
+                'site_name': MessageNotificationService.get_site_name(),
+            }
+
+            return MessageNotificationService.send_templated_email(
+                template_path='messaging/emails/message_digest.txt',
+                context=context,
+                recipient_list=[email],
+                default_subject='New Messages',
+                fail_silently=False,
+                log_description=f"Message digest ({len(messages)} messages) to {recipient.username}"
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to send message digest: {str(e)}")
+            return False
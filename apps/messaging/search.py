@@ -0,0 +1,307 @@
+"""
+Message Search
+
+Full-text search over every message thread a user takes part in:
+conversations, lesson request and application threads, course messages
+and support tickets.
+
+- Each message table has a full-text index maintained by the database as
+  rows are written. On PostgreSQL it is a GIN index on the table's
+  to_tsvector() (migration 0007); on SQLite, used in development, it is an
+  FTS5 table kept in step by triggers (install_sqlite_index(), run after
+  every migrate because SQLite drops triggers when Django rebuilds a table).
+- search() matches the query against each source, restricted to the rows
+  the user can read (the same rules as the thread pages), and merges the
+  best MESSAGE_SEARCH_RESULTS of each by rank.
+- Snippets come from ts_headline() / snippet() with the matched terms
+  marked; they are escaped and the matches wrapped in <mark>.
+"""
+
+import logging
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import SafeString, mark_safe
+
+logger = logging.getLogger(__name__)
+
+# Text search configuration (stemming) on PostgreSQL; SQLite uses the porter tokenizer
+SEARCH_CONFIG = 'english'
+
+# Snippet markers around matched terms, replaced by <mark> after escaping
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+
+class Source(NamedTuple):
+    kind: str
+    label: str
+    model: str  # app_label.ModelName
+    fields: Tuple[str, ...]  # Searched text; the last one is used for PostgreSQL snippets
+    timestamp: str
+    visible: Callable  # user -> queryset of the rows they can read
+    related: Tuple[str, ...]  # select_related() for building results
+
+
+class SearchResult(NamedTuple):
+    kind: str
+    label: str
+    title: str
+    author: str
+    snippet: SafeString
+    url: str
+    created_at: datetime
+    rank: float
+
+
+def _setting(name: str, default: int) -> int:
+    return getattr(settings, name, default)
+
+
+# =============================================================================
+# SOURCES
+# =============================================================================
+
+def _conversation_messages(user):
+    from .models import Message
+    return Message.objects.filter(Q(conversation__participant_1=user) | Q(conversation__participant_2=user))
+
+
+def _lesson_request_messages(user):
+    from apps.private_teaching.models import LessonRequest, LessonRequestMessage
+    # A subquery rather than a join through lessons, which would repeat each
+    # message once per lesson in the request
+    return LessonRequestMessage.objects.filter(
+        lesson_request__in=LessonRequest.objects.filter(Q(student=user) | Q(lessons__teacher=user))
+    )
+
+
+def _application_messages(user):
+    from apps.private_teaching.models import ApplicationMessage
+    return ApplicationMessage.objects.filter(Q(application__applicant=user) | Q(application__teacher=user))
+
+
+def _course_messages(user):
+    from apps.courses.models import CourseMessage
+    return CourseMessage.objects.filter(Q(sender=user) | Q(recipient=user))
+
+
+def _ticket_messages(user):
+    from apps.support.models import TicketMessage
+    if user.is_staff:
+        return TicketMessage.objects.all()
+    own = Q(ticket__user=user)
+    if user.email:
+        own |= Q(ticket__email=user.email)
+    return TicketMessage.objects.filter(own, is_internal_note=False)
+
+
+SOURCES = [
+    Source('message', 'Conversation', 'messaging.Message', ('content',), 'created_at',
+           _conversation_messages, ('sender', 'conversation__participant_1', 'conversation__participant_2')),
+    Source('lesson_request', 'Lesson request', 'private_teaching.LessonRequestMessage', ('message',), 'created_at',
+           _lesson_request_messages, ('author', 'lesson_request')),
+    Source('application', 'Application', 'private_teaching.ApplicationMessage', ('message',), 'created_at',
+           _application_messages, ('author', 'application__applicant', 'application__teacher')),
+    Source('course', 'Course message', 'courses.CourseMessage', ('subject', 'body'), 'sent_at',
+           _course_messages, ('sender', 'course')),
+    Source('ticket', 'Support ticket', 'support.TicketMessage', ('message',), 'created_at',
+           _ticket_messages, ('author', 'ticket')),
+]
+
+
+def _name(user) -> str:
+    return user.get_full_name() or user.username
+
+
+def _describe(source: Source, row, user) -> Tuple[str, str, str]:
+    """(title, author, url) of a matched row, as the user sees it"""
+    if source.kind == 'message':
+        other = row.conversation.get_other_participant(user)
+        return (
+            f"Conversation with {_name(other)}" if other else "Conversation",
+            _name(row.sender),
+            reverse('messaging:conversation_detail', args=[row.conversation_id])
+        )
+
+    if source.kind == 'lesson_request':
+        view = 'student_request_detail' if row.lesson_request.student_id == user.pk else 'lesson_request_detail'
+        return (
+            f"Lesson request #{row.lesson_request_id}",
+            _name(row.author),
+            reverse(f'private_teaching:{view}', args=[row.lesson_request_id])
+        )
+
+    if source.kind == 'application':
+        application = row.application
+        if application.applicant_id == user.pk:
+            title, view = f"Application to {_name(application.teacher)}", 'student_application_detail'
+        else:
+            title, view = f"Application from {_name(application.applicant)}", 'teacher_application_detail'
+        return title, _name(row.author), reverse(f'private_teaching:{view}', args=[row.application_id])
+
+    if source.kind == 'course':
+        return (
+            f"{row.subject} ({row.course.title})",
+            _name(row.sender),
+            reverse('courses:message_thread', args=[row.parent_message_id or row.pk])
+        )
+
+    ticket = row.ticket
+    return (
+        f"{ticket.ticket_number} - {ticket.subject}",
+        _name(row.author) if row.author else row.author_name,
+        ticket.get_absolute_url()
+    )
+
+
+# =============================================================================
+# INDEX
+# =============================================================================
+
+def fts_table(model) -> str:
+    """SQLite FTS5 table holding a model's searchable text"""
+    return f"{model._meta.db_table}_search"
+
+
+def install_sqlite_index(using='default', **kwargs):
+    """
+    Create any missing FTS5 tables (filled from the existing rows) and the
+    triggers that keep them in step. Safe to run repeatedly; connected to
+    post_migrate.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return
+
+    qn = db.ops.quote_name
+    tables = set(db.introspection.table_names())
+    with db.cursor() as cursor:
+        for source in SOURCES:
+            model = apps.get_model(source.model)
+            table, fts = model._meta.db_table, fts_table(model)
+            if table not in tables:
+                continue
+
+            columns = ', '.join(qn(model._meta.get_field(name).column) for name in source.fields)
+            new_values = ', '.join(f"new.{qn(model._meta.get_field(name).column)}" for name in source.fields)
+            assignments = ', '.join(
+                f"{qn(model._meta.get_field(name).column)} = new.{qn(model._meta.get_field(name).column)}"
+                for name in source.fields
+            )
+            pk = qn(model._meta.pk.column)
+
+            if fts not in tables:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE {qn(fts)} USING fts5({columns}, object_id UNINDEXED, "
+                    f"tokenize='porter unicode61')"
+                )
+                cursor.execute(f"INSERT INTO {qn(fts)} ({columns}, object_id) SELECT {columns}, {pk} FROM {qn(table)}")
+                logger.info(f"Built search index {fts}")
+
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {qn(fts + '_insert')} AFTER INSERT ON {qn(table)} BEGIN "
+                f"INSERT INTO {qn(fts)} ({columns}, object_id) VALUES ({new_values}, new.{pk}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {qn(fts + '_update')} AFTER UPDATE OF {columns} ON {qn(table)} BEGIN "
+                f"UPDATE {qn(fts)} SET {assignments} WHERE object_id = old.{pk}; END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {qn(fts + '_delete')} AFTER DELETE ON {qn(table)} BEGIN "
+                f"DELETE FROM {qn(fts)} WHERE object_id = old.{pk}; END"
+            )
+
+
+# =============================================================================
+# SEARCHING
+# =============================================================================
+
+def highlight(snippet: str) -> SafeString:
+    """Escape a snippet and wrap its marked matches in <mark>"""
+    return mark_safe(escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+
+def _fts_query(query: str) -> str:
+    """User input as an FTS5 query: every word must match, each quoted so operators are literal"""
+    return ' '.join('"%s"' % term.replace('"', '""') for term in query.split())
+
+
+def _match_postgresql(source: Source, queryset, query: str, limit: int) -> List[Tuple[object, float, str]]:
+    from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+
+    # Same expression as the GIN index, so the match uses it
+    vector = SearchVector(*source.fields, config=SEARCH_CONFIG)
+    search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+    rows = queryset.annotate(
+        document=vector
+    ).filter(
+        document=search_query
+    ).annotate(
+        rank=SearchRank(vector, search_query),
+        snippet=SearchHeadline(
+            source.fields[-1], search_query, config=SEARCH_CONFIG,
+            start_sel=MATCH_START, stop_sel=MATCH_END, max_words=30, min_words=10
+        )
+    ).order_by('-rank', f'-{source.timestamp}').values_list('pk', 'rank', 'snippet')[:limit]
+    return list(rows)
+
+
+def _match_sqlite(source: Source, queryset, query: str, limit: int) -> List[Tuple[object, float, str]]:
+    model = queryset.model
+    fts = connection.ops.quote_name(fts_table(model))
+    visible_sql, visible_params = queryset.values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        # bm25() is lower for better matches
+        cursor.execute(
+            f"SELECT object_id, -bm25({fts}), snippet({fts}, -1, %s, %s, '…', 24) FROM {fts} "
+            f"WHERE {fts} MATCH %s AND object_id IN ({visible_sql}) ORDER BY bm25({fts}) LIMIT %s",
+            [MATCH_START, MATCH_END, _fts_query(query), *visible_params, limit]
+        )
+        return cursor.fetchall()
+
+
+def search(user, query: str) -> List[SearchResult]:
+    """
+    Messages the user can read that match query, best first.
+    Every word must match (in any form: "practicing" finds "practice").
+    """
+    query = query.strip()
+    if not query:
+        return []
+
+    limit = _setting('MESSAGE_SEARCH_RESULTS', 50)
+    match = _match_postgresql if connection.vendor == 'postgresql' else _match_sqlite
+
+    results = []
+    for source in SOURCES:
+        matches = match(source, source.visible(user), query, limit)
+        if not matches:
+            continue
+
+        model = apps.get_model(source.model)
+        rows = model.objects.select_related(*source.related).in_bulk([pk for pk, _, _ in matches])
+        for pk, rank, snippet in matches:
+            row = rows.get(model._meta.pk.to_python(pk))
+            if row is None:
+                continue
+            title, author, url = _describe(source, row, user)
+            results.append(SearchResult(
+                kind=source.kind,
+                label=source.label,
+                title=title,
+                author=author,
+                snippet=highlight(snippet),
+                url=url,
+                created_at=getattr(row, source.timestamp),
+                rank=rank
+            ))
+
+    results.sort(key=lambda result: (result.rank, result.created_at), reverse=True)
+    return results[:limit]
@@ -1,3 +1,355 @@
-from django.test import TestCase
+from datetime import date, time, timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.courses.models import Course, CourseMessage
+from apps.private_teaching.models import LessonRequest, LessonRequestMessage, Subject
+from apps.support.models import Ticket, TicketMessage
+from apps.messaging import digests, search, unread, views
+from apps.messaging.models import (
+    Conversation, ConversationReadStatus, Message, PendingMessageNotification, UnreadMessageCounter
+)
+from lessons.models import Lesson
+
+
+@override_settings(MESSAGE_DIGEST_WINDOW_MINUTES=10)
+class MessageDigestTestCase(TestCase):
+    """Tests for coalescing new message emails into per-recipient digests"""
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher', email='teacher@example.com', first_name='Tess')
+        self.parent = User.objects.create_user(username='parent', email='parent@example.com', first_name='Pat')
+        self.other_parent = User.objects.create_user(username='other', email='other@example.com')
+        self.conversation = Conversation.objects.create(
+            domain='private_teaching', participant_1=self.teacher, participant_2=self.parent
+        )
+        self.other_conversation = Conversation.objects.create(
+            domain='private_teaching', participant_1=self.teacher, participant_2=self.other_parent
+        )
+
+    def send(self, conversation, sender, content):
+        message = Message.objects.create(conversation=conversation, sender=sender, content=content)
+        digests.queue_notification(message)
+        return message
+
+    def flush_later(self):
+        later = timezone.now() + timedelta(minutes=11)
+        with patch('django.utils.timezone.now', return_value=later):
+            return digests.flush_due()
+
+    def test_messages_in_window_are_sent_as_one_digest(self):
+        self.send(self.conversation, self.parent, 'Can we move Tuesday?')
+        self.send(self.conversation, self.parent, 'Or Wednesday works too')
+        self.send(self.other_conversation, self.other_parent, 'Thanks for the lesson')
+        self.send(self.conversation, self.teacher, 'Wednesday is fine')
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(PendingMessageNotification.objects.get(recipient=self.teacher).message_count, 3)
+        self.assertEqual(digests.flush_due(), {'sent': 0, 'suppressed': 0})  # Window still open
+
+        self.assertEqual(self.flush_later(), {'sent': 2, 'suppressed': 0})
+        self.assertFalse(PendingMessageNotification.objects.exists())
+        by_recipient = {message.to[0]: message for message in mail.outbox}
+        digest = by_recipient['teacher@example.com']
+        self.assertIn('3 new messages', digest.subject)
+        for content in ['Can we move Tuesday?', 'Or Wednesday works too', 'Thanks for the lesson']:
+            self.assertIn(content, digest.body)
+        self.assertIn('Wednesday is fine', by_recipient['parent@example.com'].body)
+
+    def test_digest_leaves_out_read_messages(self):
+        self.send(self.conversation, self.parent, 'Can we move Tuesday?')
+        self.send(self.other_conversation, self.other_parent, 'Thanks for the lesson')
+        ConversationReadStatus.objects.create(conversation=self.conversation, user=self.teacher)
+
+        self.assertEqual(self.flush_later(), {'sent': 1, 'suppressed': 0})
+        self.assertNotIn('Can we move Tuesday?', mail.outbox[0].body)
+        self.assertIn('Thanks for the lesson', mail.outbox[0].body)
+
+        # Nothing left unread: no email at all
+        self.send(self.conversation, self.parent, 'See you then')
+        self.conversation.mark_as_read(self.teacher)
+        self.assertEqual(self.flush_later(), {'sent': 0, 'suppressed': 1})
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_overdue_window_is_flushed_by_the_next_message(self):
+        self.send(self.conversation, self.parent, 'Can we move Tuesday?')
+        # The window's timer was lost, e.g. the process restarted
+        PendingMessageNotification.objects.update(due_at=timezone.now() - timedelta(minutes=1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.send(self.conversation, self.parent, 'Or Wednesday works too')
+
+        self.assertFalse(PendingMessageNotification.objects.exists())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('2 new messages', mail.outbox[0].subject)
+
+    @override_settings(MESSAGE_DIGEST_WINDOW_MINUTES=0)
+    def test_zero_window_sends_immediately(self):
+        self.send(self.conversation, self.parent, 'Can we move Tuesday?')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(PendingMessageNotification.objects.exists())
+
+
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class InboxStateTestCase(TestCase):
+    """Tests for the denormalised inbox state and the keyset-paginated inbox"""
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher')
+        self.parents = [User.objects.create_user(username=f'parent{i}') for i in range(5)]
+        self.conversations = [
+            Conversation.objects.create(domain='private_teaching', participant_1=self.teacher, participant_2=parent)
+            for parent in self.parents
+        ]
+
+    def test_counters_follow_messages_and_reads(self):
+        conversation = self.conversations[0]
+        Message.objects.create(conversation=conversation, sender=self.parents[0], content='Hello')
+        last = Message.objects.create(conversation=conversation, sender=self.parents[0], content='Are you there?')
+        Message.objects.create(conversation=conversation, sender=self.teacher, content='Yes!')
+
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.get_unread_count(self.teacher), 2)
+        self.assertEqual(conversation.get_unread_count(self.parents[0]), 1)
+        self.assertEqual(conversation.last_message_preview, 'Yes!')
+        self.assertEqual(conversation.last_message_sender, self.teacher)
+        self.assertGreater(conversation.last_message_at, last.created_at)
+        self.assertEqual(conversation.updated_at.date(), conversation.last_message_at.date())
+
+        conversation.mark_as_read(self.teacher)
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.get_unread_count(self.teacher), 0)
+        self.assertEqual(conversation.get_unread_count(self.parents[0]), 1)
+
+    def test_inbox_is_one_query_per_page(self):
+        for conversation, parent in zip(self.conversations, self.parents):
+            Message.objects.create(conversation=conversation, sender=parent, content=f'From {parent.username}')
+        profile = self.teacher.profile
+        profile.profile_completed = True
+        profile.email_verified = True
+        profile.save()
+        self.client.force_login(self.teacher)
+
+        with patch.object(views, 'INBOX_PAGE_SIZE', 2):
+            seen = []
+            params = {}
+            while True:
+                response = self.client.get(reverse('messaging:inbox'), params)
+                self.assertEqual(response.status_code, 200)
+                items = response.context['conversations']
+                self.assertLessEqual(len(items), 2)
+                self.assertEqual(response.context['total_unread'], 5)
+                self.assertTrue(all(item['unread_count'] == 1 for item in items))
+                seen.extend(item['conversation'].last_message_preview for item in items)
+                if not response.context['next_cursor']:
+                    break
+                params = {'cursor': response.context['next_cursor']}
+
+        # Most recently active first, each conversation once
+        self.assertEqual(seen, [f'From {parent.username}' for parent in reversed(self.parents)])
+
+        # The page is one query however many conversations it shows
+        with CaptureQueriesContext(connection) as five:
+            self.client.get(reverse('messaging:inbox'))
+        for index in range(5, 15):
+            parent = User.objects.create_user(username=f'parent{index}')
+            conversation = Conversation.objects.create(
+                domain='private_teaching', participant_1=self.teacher, participant_2=parent
+            )
+            Message.objects.create(conversation=conversation, sender=parent, content='Hi')
+        with CaptureQueriesContext(connection) as fifteen:
+            self.client.get(reverse('messaging:inbox'))
+        self.assertEqual(len(fifteen), len(five))
+
+
+@override_settings(THREAD_PAGE_SIZE=3, STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class ThreadHistoryTestCase(TestCase):
+    """Tests for keyset paging of a conversation's messages"""
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher')
+        self.parent = User.objects.create_user(username='parent')
+        self.conversation = Conversation.objects.create(
+            domain='private_teaching', participant_1=self.teacher, participant_2=self.parent
+        )
+        self.sent = [self.send(f'Message {index}') for index in range(7)]
+        profile = self.teacher.profile
+        profile.profile_completed = True
+        profile.email_verified = True
+        profile.save()
+        self.client.force_login(self.teacher)
+        self.url = reverse('messaging:conversation_detail', args=[self.conversation.id])
+
+    def send(self, content):
+        return Message.objects.create(conversation=self.conversation, sender=self.parent, content=content)
+
+    def ids(self, messages):
+        return [message.id for message in messages]
+
+    def test_pages_cover_the_thread_once_and_fetch_only_new_messages(self):
+        response = self.client.get(self.url)
+        self.assertEqual(self.ids(response.context['messages']), self.ids(self.sent[-3:]))
+        newer_cursor = response.context['newer_cursor']
+
+        # Older pages, oldest first within each page, without gaps or repeats
+        shown = list(response.context['messages'])
+        cursor = response.context['older_cursor']
+        while cursor:
+            page = self.client.get(self.url, {'before': cursor}).json()
+            self.assertLessEqual(page['count'], 3)
+            cursor = page['older_cursor']
+            shown = list(Message.objects.filter(
+                id__in=[message.id for message in self.sent if str(message.id) in page['html']]
+            ).order_by('created_at')) + shown
+        self.assertEqual(self.ids(shown), self.ids(self.sent))
+
+        # Only what arrived after the newest message shown
+        self.assertEqual(self.client.get(self.url, {'after': newer_cursor}).json()['count'], 0)
+        new = [self.send('Later'), self.send('Even later')]
+        page = self.client.get(self.url, {'after': newer_cursor}).json()
+        self.assertEqual(page['count'], 2)
+        self.assertFalse(page['has_newer'])
+        self.assertIn(f'data-message-id="{new[0].id}"', page['html'])
+        self.assertNotIn(f'data-message-id="{self.sent[-1].id}"', page['html'])
+        self.assertEqual(self.client.get(self.url, {'after': page['newer_cursor']}).json()['count'], 0)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'before': 'not-a-cursor'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'after': 'bm90fGFjdXJzb3I='}).status_code, 400)
+
+
+class UnreadBadgeTestCase(TestCase):
+    """Tests for the per-user unread badge counter"""
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher')
+        self.student = User.objects.create_user(username='student')
+        self.conversation = Conversation.objects.create(
+            domain='private_teaching', participant_1=self.teacher, participant_2=self.student
+        )
+        self.course = Course.objects.create(
+            slug='recorder-basics', title='Recorder Basics', cost='0.00', instructor=self.teacher
+        )
+
+    def course_message(self):
+        return CourseMessage.objects.create(
+            sender=self.student, recipient=self.teacher, course=self.course, subject='Question', body='Help'
+        )
+
+    def test_counter_is_built_lazily_then_kept_up_to_date(self):
+        Message.objects.create(conversation=self.conversation, sender=self.student, content='Hello')
+        self.course_message()
+        self.assertFalse(UnreadMessageCounter.objects.exists())
+
+        self.assertEqual(unread.badge_counts(self.teacher.pk), {'messaging': 1, 'course': 1, 'total': 2})
+        with self.assertNumQueries(1):
+            unread.badge_counts(self.teacher.pk)
+
+        Message.objects.create(conversation=self.conversation, sender=self.student, content='Still there?')
+        Message.objects.create(conversation=self.conversation, sender=self.teacher, content='Yes')
+        course_message = self.course_message()
+        self.assertEqual(unread.badge_counts(self.teacher.pk), {'messaging': 2, 'course': 2, 'total': 4})
+
+        self.conversation.mark_as_read(self.teacher)
+        course_message.mark_as_read()
+        course_message.mark_as_read()  # Already read: no change
+        self.assertEqual(unread.badge_counts(self.teacher.pk), {'messaging': 0, 'course': 1, 'total': 1})
+
+        # Matches a recount from the messages themselves
+        UnreadMessageCounter.objects.all().delete()
+        self.assertEqual(unread.badge_counts(self.teacher.pk), {'messaging': 0, 'course': 1, 'total': 1})
+        self.assertEqual(unread.badge_counts(self.student.pk)['messaging'], 1)
+
+
+class MessageSearchTestCase(TestCase):
+    """Tests for full-text message search"""
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher', email='teacher@example.com')
+        self.parent = User.objects.create_user(username='parent', email='parent@example.com')
+        self.stranger = User.objects.create_user(username='stranger', email='stranger@example.com')
+        self.conversation = Conversation.objects.create(
+            domain='private_teaching', participant_1=self.teacher, participant_2=self.parent
+        )
+        self.course = Course.objects.create(
+            slug='recorder-basics', title='Recorder Basics', cost='0.00', instructor=self.teacher
+        )
+
+    def kinds(self, user, query):
+        return [result.kind for result in search.search(user, query)]
+
+    def test_matches_stemmed_words_with_highlighted_snippets(self):
+        message = Message.objects.create(
+            conversation=self.conversation, sender=self.parent, content='Is <b>alto</b> practice every day enough?'
+        )
+        CourseMessage.objects.create(
+            sender=self.parent, recipient=self.teacher, course=self.course,
+            subject='Practicing scales', body='Which scales should I start with?'
+        )
+
+        results = search.search(self.teacher, 'practicing')
+        self.assertEqual(sorted(result.kind for result in results), ['course', 'message'])
+        result = next(result for result in results if result.kind == 'message')
+        self.assertIn('<mark>practice</mark>', result.snippet)
+        self.assertIn('&lt;b&gt;alto&lt;/b&gt;', result.snippet)
+        self.assertEqual(result.url, reverse('messaging:conversation_detail', args=[self.conversation.id]))
+
+        # Every word must match, and edits are re-indexed
+        self.assertEqual(self.kinds(self.teacher, 'alto scales'), [])
+        Message.objects.filter(pk=message.pk).update(content='Tenor it is')
+        self.assertEqual(self.kinds(self.teacher, 'alto'), [])
+        self.assertEqual(self.kinds(self.teacher, 'tenor'), ['message'])
+        message.delete()
+        self.assertEqual(self.kinds(self.teacher, 'tenor'), [])
+
+    def test_only_searches_threads_the_user_takes_part_in(self):
+        Message.objects.create(conversation=self.conversation, sender=self.parent, content='Recital on Friday')
+        ticket = Ticket.objects.create(
+            user=self.parent, name='Parent', email='parent@example.com', subject='Recital tickets', description='?'
+        )
+        TicketMessage.objects.create(ticket=ticket, author=self.parent, message='Where is the recital?')
+        TicketMessage.objects.create(
+            ticket=ticket, author=self.teacher, message='Recital venue unconfirmed', is_internal_note=True
+        )
+
+        self.assertEqual(sorted(self.kinds(self.parent, 'recital')), ['message', 'ticket'])
+        self.assertEqual(self.kinds(self.teacher, 'recital'), ['message'])
+        self.assertEqual(self.kinds(self.stranger, 'recital'), [])
+
+        self.teacher.is_staff = True
+        self.assertEqual(sorted(self.kinds(self.teacher, 'recital')), ['message', 'ticket', 'ticket'])
+
+        # Search syntax in the query is taken literally
+        self.assertEqual(self.kinds(self.parent, 'recital OR "friday'), [])
+        self.assertEqual(self.kinds(self.parent, '   '), [])
+
+    def test_lesson_request_with_several_lessons_matches_each_message_once(self):
+        lesson_request = LessonRequest.objects.create(student=self.parent)
+        subject = Subject.objects.create(teacher=self.teacher, subject='Recorder', base_price_60min=40)
+        for day in (1, 8, 15):
+            Lesson.objects.create(
+                lesson_request=lesson_request, student=self.parent, teacher=self.teacher, subject=subject,
+                lesson_date=date(2026, 3, day), lesson_time=time(17, 0), duration_in_minutes='30',
+                location='Online', approved_status='Pending', status='Draft'
+            )
+        LessonRequestMessage.objects.create(
+            lesson_request=lesson_request, author=self.parent, message='Could we move the recital piece?'
+        )
+
+        self.assertEqual(self.kinds(self.teacher, 'recital'), ['lesson_request'])
+        self.assertEqual(self.kinds(self.parent, 'recital'), ['lesson_request'])
+        self.assertEqual(self.kinds(self.stranger, 'recital'), [])
 
-# Create your tests here.
@@ -0,0 +1,109 @@
+"""
+Unread Message Badge
+
+The navbar badge used to count unread messages on every page render. The
+totals now live in an UnreadMessageCounter row per user:
+
+- badge_counts() reads the row: one primary key lookup per request. A user
+  without a row gets one built from the messages themselves.
+- New conversation messages and course messages increment the recipient's
+  row in the transaction that creates them.
+- Reading a conversation recounts the reader's messaging total from the
+  per-conversation counters; reading a course message decrements the
+  course total.
+- Every change is pushed to the user's open pages as a live `badge` event
+  (apps/core/live_events.py).
+
+Counters only ever change in the database (F() updates), so every web
+process sees the same numbers. A user whose row hasn't been built yet is
+simply left alone until their next page view builds it.
+"""
+
+from typing import Dict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Conversation, UnreadMessageCounter
+
+
+def conversation_unread_total(user_id) -> int:
+    """Unread conversation messages, summed from the per-conversation counters"""
+    totals = Conversation.objects.filter(
+        Q(participant_1_id=user_id) | Q(participant_2_id=user_id)
+    ).aggregate(
+        as_p1=Coalesce(Sum('participant_1_unread', filter=Q(participant_1_id=user_id)), 0),
+        as_p2=Coalesce(Sum('participant_2_unread', filter=Q(participant_2_id=user_id)), 0)
+    )
+    return totals['as_p1'] + totals['as_p2']
+
+
+def course_unread_total(user_id) -> int:
+    """Unread legacy course messages"""
+    from apps.courses.models import CourseMessage
+
+    return CourseMessage.objects.filter(recipient_id=user_id, read_at__isnull=True).count()
+
+
+def rebuild(user_id) -> UnreadMessageCounter:
+    """Count a user's unread messages from scratch and store the result"""
+    values = {
+        'messaging_unread': conversation_unread_total(user_id),
+        'course_unread': course_unread_total(user_id),
+    }
+    try:
+        with transaction.atomic():
+            counter, _ = UnreadMessageCounter.objects.update_or_create(user_id=user_id, defaults=values)
+    except IntegrityError:
+        # Another request built it at the same time
+        counter = UnreadMessageCounter.objects.get(user_id=user_id)
+    return counter
+
+
+def badge_counts(user_id) -> Dict[str, int]:
+    """
+    Returns:
+        {'messaging': int, 'course': int, 'total': int}
+    """
+    counter = UnreadMessageCounter.objects.filter(user_id=user_id).first() or rebuild(user_id)
+    return {
+        'messaging': counter.messaging_unread,
+        'course': counter.course_unread,
+        'total': counter.messaging_unread + counter.course_unread,
+    }
+
+
+# =============================================================================
+# UPDATES
+# =============================================================================
+
+def publish_badge(user_id):
+    """Push the new counts to the user's open pages once the change commits"""
+    from apps.core.live_events import publish_on_commit
+
+    publish_on_commit([f'user:{user_id}'], 'badge', lambda: badge_counts(user_id))
+
+
+def message_received(user_id):
+    UnreadMessageCounter.objects.filter(user_id=user_id).update(messaging_unread=F('messaging_unread') + 1)
+    publish_badge(user_id)
+
+
+def conversation_read(user_id):
+    UnreadMessageCounter.objects.filter(user_id=user_id).update(
+        messaging_unread=conversation_unread_total(user_id)
+    )
+    publish_badge(user_id)
+
+
+def course_message_received(user_id):
+    UnreadMessageCounter.objects.filter(user_id=user_id).update(course_unread=F('course_unread') + 1)
+    publish_badge(user_id)
+
+
+def course_message_read(user_id, count=1):
+    UnreadMessageCounter.objects.filter(user_id=user_id).update(
+        course_unread=Greatest(F('course_unread') - count, Value(0))
+    )
+    publish_badge(user_id)
@@ -5,7 +5,9 @@ app_name = 'messaging'
 
 urlpatterns = [
     path('', views.inbox, name='inbox'),
+    path('search/', views.search_messages, name='search'),
     path('conversation/<uuid:conversation_id>/', views.conversation_detail, name='conversation_detail'),
+    path('conversation/<uuid:conversation_id>/read/', views.mark_conversation_read, name='mark_conversation_read'),
     path('start/workshop/<uuid:workshop_id>/', views.start_workshop_conversation, name='start_workshop_conversation'),
     path('start/course/<slug:course_slug>/', views.start_course_conversation, name='start_course_conversation'),
     path('start/private-teaching/<int:teacher_id>/', views.start_private_teaching_conversation, name='start_private_teaching_conversation'),
@@ -1,25 +1,38 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages as django_messages
-from django.db.models import Q, Prefetch
-from django.core.exceptions import PermissionDenied
+from django.db.models import Case, F, Q, Prefetch, Sum, When
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import HttpResponse
+from django.views.decorators.http import require_POST
 from django.utils import timezone
 
+from apps.core import keyset
+from . import digests, search
 from .models import Conversation, Message
-from .notifications import MessageNotificationService
 from apps.workshops.models import Workshop, WorkshopRegistration
 from apps.private_teaching.models import TeacherStudentApplication, PrivateLessonAssignment
 from apps.courses.models import Course, CourseEnrollment
 
 
+# Conversations per inbox page
+INBOX_PAGE_SIZE = 30
+
+
 @login_required
 def inbox(request):
     """
     Unified inbox showing all conversations for the user.
+
+    Unread counts and the last message come from the conversation's own
+    inbox state (see Conversation.record_message), so a page is one query.
+    Pages are keyed on (updated_at, id) rather than offsets: ?cursor=<next_cursor>
+    continues after the last conversation of the previous page.
     """
     user = request.user
 
-    # Filter by domain if requested (must be done before prefetch)
+    # Filter by domain if requested
     domain_filter = request.GET.get('domain')
 
     # Get all conversations where user is a participant
@@ -31,8 +44,25 @@ def inbox(request):
     if domain_filter:
         conversations = conversations.filter(domain=domain_filter)
 
-    # Now add select_related (no prefetch to avoid slicing issues)
-    conversations = conversations.select_related(
+    conversations = conversations.annotate(
+        unread_count=Case(
+            When(participant_1=user, then=F('participant_1_unread')),
+            default=F('participant_2_unread')
+        )
+    )
+    total_unread = conversations.aggregate(total=Sum('unread_count'))['total'] or 0
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            updated_at, conversation_id = keyset.decode_cursor(cursor)
+            conversations = conversations.filter(
+                Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=conversation_id)
+            )
+        except (ValueError, ValidationError):
+            return redirect('messaging:inbox')
+
+    page = list(conversations.select_related(
         'participant_1',
         'participant_2',
         'workshop',
@@ -40,26 +70,25 @@ def inbox(request):
         'child_profile',
         'private_lesson_assignment',
         'private_lesson_assignment__assignment'
-    ).order_by('-updated_at')
-
-    # Annotate with unread counts
-    conversations_with_unread = []
-    for conv in conversations:
-        unread_count = conv.get_unread_count(user)
-        # Get last message with a separate query (more reliable than prefetch slicing)
-        last_message = Message.objects.filter(conversation=conv).order_by('-created_at').first()
-
-        conversations_with_unread.append({
-            'conversation': conv,
-            'unread_count': unread_count,
-            'last_message': last_message,
-            'other_participant': conv.get_other_participant(user),
-        })
+    ).order_by('-updated_at', '-id')[:INBOX_PAGE_SIZE + 1])
+
+    next_cursor = None
+    if len(page) > INBOX_PAGE_SIZE:
+        page = page[:INBOX_PAGE_SIZE]
+        next_cursor = keyset.encode_cursor(page[-1].updated_at, page[-1].id)
 
     context = {
-        'conversations': conversations_with_unread,
+        'conversations': [
+            {
+                'conversation': conv,
+                'unread_count': conv.unread_count,
+                'other_participant': conv.get_other_participant(user),
+            }
+            for conv in page
+        ],
         'domain_filter': domain_filter,
-        'total_unread': sum(c['unread_count'] for c in conversations_with_unread),
+        'total_unread': total_unread,
+        'next_cursor': next_cursor,
     }
 
     return render(request, 'messaging/inbox.html', context)
@@ -69,6 +98,10 @@ def inbox(request):
 def conversation_detail(request, conversation_id):
     """
     View a specific conversation and send messages.
+
+    Shows the newest THREAD_PAGE_SIZE messages. ?before=<cursor> and
+    ?after=<cursor> return older or newer messages as a JSON fragment
+    (apps/core/keyset.py), so a long conversation never loads in full.
     """
     user = request.user
 
@@ -79,12 +112,15 @@ def conversation_detail(request, conversation_id):
     if user not in [conversation.participant_1, conversation.participant_2]:
         raise PermissionDenied("You don't have permission to view this conversation.")
 
+    history = conversation.messages.select_related('sender')
+    if request.method == 'GET' and keyset.is_fragment_request(request):
+        return keyset.thread_fragment_response(
+            request, 'messaging/_messages.html', history, 'created_at', settings.THREAD_PAGE_SIZE
+        )
+
     # Mark as read
     conversation.mark_as_read(user)
 
-    # Get all messages
-    messages_list = conversation.messages.select_related('sender').order_by('created_at')
-
     # Handle new message submission
     if request.method == 'POST':
         content = request.POST.get('content', '').strip()
@@ -94,22 +130,56 @@ def conversation_detail(request, conversation_id):
                 sender=user,
                 content=content
             )
-            # Send email notification to recipient
-            MessageNotificationService.send_new_message_notification(message)
+            # Email the recipient, coalesced with their other new messages
+            digests.queue_notification(message)
 
             return redirect('messaging:conversation_detail', conversation_id=conversation.id)
         else:
             django_messages.error(request, 'Message cannot be empty.')
 
+    # Newest page of messages
+    page = keyset.thread_page(history, 'created_at', settings.THREAD_PAGE_SIZE)
+
     context = {
         'conversation': conversation,
-        'messages': messages_list,
+        'messages': page.items,
+        'older_cursor': page.older_cursor,
+        'newer_cursor': page.newer_cursor,
         'other_participant': conversation.get_other_participant(user),
     }
 
     return render(request, 'messaging/conversation_detail.html', context)
 
 
+@login_required
+@require_POST
+def mark_conversation_read(request, conversation_id):
+    """
+    Mark a conversation as read without reloading it.
+    Used when a live message is shown on an open conversation page.
+    """
+    conversation = get_object_or_404(Conversation, id=conversation_id)
+    if request.user not in [conversation.participant_1, conversation.participant_2]:
+        raise PermissionDenied("You don't have permission to view this conversation.")
+
+    conversation.mark_as_read(request.user)
+    return HttpResponse(status=204)
+
+
+@login_required
+def search_messages(request):
+    """
+    Search every message thread the user takes part in: conversations,
+    lesson requests, applications, course messages and support tickets.
+    """
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+        'results': search.search(request.user, query) if query else [],
+    }
+    return render(request, 'messaging/search.html', context)
+
+
 @login_required
 def start_workshop_conversation(request, workshop_id):
     """
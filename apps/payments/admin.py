@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import StripePayment
+from .models import StripePayment, LedgerEntry, WebhookEvent
+from . import webhook_inbox
 
 
 @admin.register(StripePayment)
@@ -69,3 +70,65 @@ class StripePaymentAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'completed_at')
         }),
     )
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    """Read-only view of the append-only revenue ledger"""
+    list_display = [
+        'occurred_at',
+        'entry_type',
+        'domain',
+        'teacher',
+        'student',
+        'description',
+        'gross_amount',
+        'commission_amount',
+        'net_amount',
+    ]
+    list_filter = ['entry_type', 'domain', 'source_type', 'occurred_at']
+    search_fields = ['teacher__email', 'student__email', 'description', 'source_id']
+    date_hierarchy = 'occurred_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    """Stripe webhook inbox: queue state, errors and processing times"""
+    list_display = [
+        'received_at',
+        'event_type',
+        'stripe_event_id',
+        'status',
+        'attempts',
+        'next_attempt_at',
+        'processing_ms',
+        'processed_at',
+    ]
+    list_filter = ['status', 'event_type', 'received_at']
+    search_fields = ['stripe_event_id', 'event_type']
+    date_hierarchy = 'received_at'
+    readonly_fields = [
+        'stripe_event_id', 'event_type', 'payload', 'status', 'attempts', 'next_attempt_at',
+        'locked_at', 'last_error', 'processing_ms', 'received_at', 'processed_at',
+    ]
+    actions = ['requeue_events']
+
+    @admin.action(description='Requeue selected dead-lettered events')
+    def requeue_events(self, request, queryset):
+        requeued = webhook_inbox.requeue_dead(queryset)
+        self.message_user(request, f"Requeued {requeued} event(s)")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
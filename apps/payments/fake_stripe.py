@@ -0,0 +1,385 @@
+"""
+Local Stripe Stand-in
+
+A small in-memory imitation of the parts of the Stripe API this project
+calls, for development and load testing without network access or a Stripe
+account:
+
+- POST /v1/checkout/sessions, GET /v1/checkout/sessions/<id>
+- GET /v1/payment_intents/<id>
+- POST /v1/refunds
+- GET /pay/<session id>, the hosted checkout page: pays immediately and
+  redirects to the session's success_url
+
+FakeStripe.serve() starts it on a local port and returns the URL to use as
+settings.STRIPE_API_BASE, which the Stripe gateway picks up. complete_checkout() and the refunds endpoint produce the same events
+real Stripe sends (checkout.session.completed, payment_intent.succeeded,
+charge.refunded), signed with the webhook secret exactly as Stripe signs
+them, so StripeWebhookView verifies them unchanged. Events are handed to the
+deliver callable, which posts them to the webhook.
+
+POSTs honour the Idempotency-Key header. Setting latency (seconds) or
+outage (an HTTP status such as 503) on the instance simulates a degraded
+Stripe for testing timeouts and the circuit breaker.
+
+Run it standalone with `manage.py fake_stripe`; the load test driver
+(payments_load_test) runs it in-process.
+"""
+
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlparse
+
+import stripe
+from django.conf import settings
+from django.test import override_settings
+
+logger = logging.getLogger(__name__)
+
+
+def sign_payload(payload: str, secret: str, timestamp: Optional[int] = None) -> str:
+    """Stripe-Signature header for a webhook payload (t=...,v1=HMAC-SHA256)"""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signature = hmac.new(secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={signature}'
+
+
+def http_deliverer(webhook_url: str, timeout: float = 30) -> Callable[[str, str], int]:
+    """deliver callable that POSTs events to a running webhook endpoint"""
+    def deliver(payload: str, signature: str) -> int:
+        request = urllib.request.Request(
+            webhook_url,
+            data=payload.encode(),
+            headers={'Content-Type': 'application/json', 'Stripe-Signature': signature},
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status
+    return deliver
+
+
+def decode_form(body: str) -> Dict:
+    """
+    Decode Stripe's form encoding (metadata[domain]=x, line_items[0][quantity]=1)
+    into nested dicts and lists.
+    """
+    result = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        parts = re.findall(r'[^\[\]]+', key)
+        target = result
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+
+    def listify(value):
+        if isinstance(value, dict):
+            if value and all(key.isdigit() for key in value):
+                return [listify(value[key]) for key in sorted(value, key=int)]
+            return {key: listify(item) for key, item in value.items()}
+        return value
+
+    return listify(result)
+
+
+class FakeStripeError(Exception):
+    def __init__(self, status: int, message: str, param: str = ''):
+        super().__init__(message)
+        self.status = status
+        self.param = param
+
+
+class FakeStripe:
+    """
+    In-memory Stripe account. Thread-safe; all state lives on the instance.
+
+    Args:
+        webhook_secret: Secret used to sign events (settings.STRIPE_WEBHOOK_SECRET)
+        deliver: Called with (payload, signature) for each event; returns the
+            HTTP status of the webhook response. Events are only recorded when None.
+    """
+
+    def __init__(self, webhook_secret: str, deliver: Optional[Callable[[str, str], int]] = None):
+        self.webhook_secret = webhook_secret
+        self.deliver = deliver
+        self.sessions = {}
+        self.payment_intents = {}
+        self.charges = {}
+        self.refunds = {}
+        self.events = []
+        self.idempotent_responses = {}
+        self.latency = 0
+        self.outage = None
+        self.base_url = 'https://checkout.stripe.test'
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _id(self, prefix: str) -> str:
+        return f'{prefix}_fake{next(self._ids):06d}{secrets.token_hex(4)}'
+
+    # =========================================================================
+    # API
+    # =========================================================================
+
+    def create_checkout_session(self, params: Dict) -> Dict:
+        line_items = params.get('line_items') or []
+        if not line_items:
+            raise FakeStripeError(400, 'Missing required param: line_items.', 'line_items')
+        amount_total = sum(
+            int(item['price_data']['unit_amount']) * int(item.get('quantity', 1))
+            for item in line_items
+        )
+        session_id = self._id('cs_test')
+        session = {
+            'id': session_id,
+            'object': 'checkout.session',
+            'amount_total': amount_total,
+            'currency': line_items[0]['price_data'].get('currency', 'gbp'),
+            'customer_email': params.get('customer_email'),
+            'metadata': params.get('metadata', {}),
+            'mode': params.get('mode', 'payment'),
+            'payment_intent': None,
+            'payment_status': 'unpaid',
+            'status': 'open',
+            'success_url': params.get('success_url'),
+            'cancel_url': params.get('cancel_url'),
+            'url': f'{self.base_url}/pay/{session_id}',
+            'created': int(time.time()),
+        }
+        with self._lock:
+            self.sessions[session_id] = session
+        return session
+
+    def retrieve(self, collection: Dict, object_id: str, param: str) -> Dict:
+        try:
+            return collection[object_id]
+        except KeyError:
+            raise FakeStripeError(404, f"No such {param}: '{object_id}'", param)
+
+    def create_refund(self, params: Dict) -> Dict:
+        payment_intent = self.retrieve(self.payment_intents, params.get('payment_intent', ''), 'payment_intent')
+        charge = self.charges[payment_intent['latest_charge']]
+        with self._lock:
+            remaining = charge['amount'] - charge['amount_refunded']
+            amount = int(params.get('amount', remaining))
+            if amount <= 0 or amount > remaining:
+                raise FakeStripeError(400, f'Refund amount ({amount}) is greater than unrefunded amount ({remaining}).', 'amount')
+            refund = {
+                'id': self._id('re'),
+                'object': 'refund',
+                'amount': amount,
+                'charge': charge['id'],
+                'currency': charge['currency'],
+                'metadata': params.get('metadata', {}),
+                'payment_intent': payment_intent['id'],
+                'reason': params.get('reason'),
+                'status': 'succeeded',
+                'created': int(time.time()),
+            }
+            self.refunds[refund['id']] = refund
+            charge['amount_refunded'] += amount
+            charge['refunded'] = charge['amount_refunded'] == charge['amount']
+            charge_snapshot = json.loads(json.dumps(charge))
+        self.emit('charge.refunded', charge_snapshot)
+        return refund
+
+    # =========================================================================
+    # SIMULATION
+    # =========================================================================
+
+    def complete_checkout(self, session_id: str) -> List[Dict]:
+        """
+        Pay for a checkout session as a customer would: creates the payment
+        intent and charge, then emits checkout.session.completed and
+        payment_intent.succeeded.
+
+        Returns:
+            emit() results in delivery order
+        """
+        session = self.retrieve(self.sessions, session_id, 'checkout.session')
+        with self._lock:
+            if session['status'] != 'open':
+                raise FakeStripeError(400, f'Checkout session {session_id} is already {session["status"]}')
+            payment_intent_id = self._id('pi')
+            charge = {
+                'id': self._id('ch'),
+                'object': 'charge',
+                'amount': session['amount_total'],
+                'amount_refunded': 0,
+                'currency': session['currency'],
+                'paid': True,
+                'payment_intent': payment_intent_id,
+                'refunded': False,
+                'status': 'succeeded',
+                'created': int(time.time()),
+            }
+            payment_intent = {
+                'id': payment_intent_id,
+                'object': 'payment_intent',
+                'amount': session['amount_total'],
+                'amount_received': session['amount_total'],
+                'currency': session['currency'],
+                'latest_charge': charge['id'],
+                'metadata': session['metadata'],
+                'status': 'succeeded',
+                'created': int(time.time()),
+            }
+            self.charges[charge['id']] = charge
+            self.payment_intents[payment_intent_id] = payment_intent
+            session.update(status='complete', payment_status='paid', payment_intent=payment_intent_id)
+
+        return [
+            self.emit('checkout.session.completed', session),
+            self.emit('payment_intent.succeeded', payment_intent),
+        ]
+
+    def emit(self, event_type: str, data_object: Dict) -> Dict:
+        """
+        Build, sign and deliver an event.
+
+        Returns:
+            {'event': dict, 'status': webhook HTTP status, 'ms': delivery time}
+        """
+        event = {
+            'id': self._id('evt'),
+            'object': 'event',
+            'api_version': stripe.api_version,
+            'created': int(time.time()),
+            'type': event_type,
+            'livemode': False,
+            'data': {'object': data_object},
+        }
+        payload = json.dumps(event)
+        with self._lock:
+            self.events.append(event)
+
+        status, elapsed_ms = None, None
+        if self.deliver:
+            started = time.perf_counter()
+            status = self.deliver(payload, sign_payload(payload, self.webhook_secret))
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        return {'event': event, 'status': status, 'ms': elapsed_ms}
+
+    # =========================================================================
+    # HTTP SERVER
+    # =========================================================================
+
+    def serve(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Start the API server in a background thread and return its base URL"""
+        fake = self
+
+        class Handler(_FakeStripeHandler):
+            stripe_account = fake
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True, name='fake-stripe').start()
+        self.base_url = f'http://{host}:{self._server.server_address[1]}'
+        return self.base_url
+
+    def shutdown(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @contextmanager
+    def patched(self, host: str = '127.0.0.1', port: int = 0):
+        """Serve, and point the Stripe gateway at this server until exit"""
+        base_url = self.serve(host, port)
+        try:
+            with override_settings(
+                STRIPE_API_BASE=base_url,
+                STRIPE_SECRET_KEY=settings.STRIPE_SECRET_KEY or 'sk_test_fake',
+                STRIPE_MAX_NETWORK_RETRIES=0,
+            ):
+                yield self
+        finally:
+            self.shutdown()
+
+
+class _FakeStripeHandler(BaseHTTPRequestHandler):
+    """Routes Stripe API requests to a FakeStripe account"""
+
+    stripe_account: FakeStripe = None
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # Headers and body are written separately on keep-alive connections
+
+    def log_message(self, format, *args):
+        logger.debug(f"fake stripe: {format % args}")
+
+    def _respond(self, status: int, body: Dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Request-Id', f'req_fake{secrets.token_hex(6)}')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _pay(self, session_id: str):
+        """Hosted checkout page: pays straight away and returns to the success URL"""
+        self.stripe_account.complete_checkout(session_id)
+        session = self.stripe_account.sessions[session_id]
+        self.send_response(303)
+        self.send_header('Location', (session['success_url'] or '/').replace('{CHECKOUT_SESSION_ID}', session_id))
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _handle(self, method: str):
+        account = self.stripe_account
+        path = urlparse(self.path).path.rstrip('/')
+        length = int(self.headers.get('Content-Length') or 0)
+        params = decode_form(self.rfile.read(length).decode()) if length else {}
+
+        if account.latency:
+            time.sleep(account.latency)
+        if account.outage and path.startswith('/v1/'):
+            self._respond(account.outage, {'error': {'type': 'api_error', 'message': 'Simulated outage.'}})
+            return
+
+        idempotency_key = self.headers.get('Idempotency-Key') if method == 'POST' else None
+        if idempotency_key and idempotency_key in account.idempotent_responses:
+            self._respond(*account.idempotent_responses[idempotency_key])
+            return
+
+        routes = [
+            ('POST', r'/v1/checkout/sessions', lambda: account.create_checkout_session(params)),
+            ('GET', r'/v1/checkout/sessions/(?P<id>[\w-]+)', lambda id: account.retrieve(account.sessions, id, 'checkout.session')),
+            ('GET', r'/v1/payment_intents/(?P<id>[\w-]+)', lambda id: account.retrieve(account.payment_intents, id, 'payment_intent')),
+            ('POST', r'/v1/refunds', lambda: account.create_refund(params)),
+        ]
+        try:
+            match = re.fullmatch(r'/pay/(?P<id>[\w-]+)', path)
+            if match and method == 'GET':
+                self._pay(match['id'])
+                return
+            for route_method, pattern, action in routes:
+                match = re.fullmatch(pattern, path)
+                if match and route_method == method:
+                    body = action(**match.groupdict())
+                    if idempotency_key:
+                        account.idempotent_responses[idempotency_key] = (200, body)
+                    self._respond(200, body)
+                    return
+            raise FakeStripeError(404, f'Unrecognized request URL ({method}: {path}).')
+        except FakeStripeError as e:
+            self._respond(e.status, {'error': {
+                'type': 'invalid_request_error', 'message': str(e), 'param': e.param,
+            }})
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
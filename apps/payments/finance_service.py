@@ -1,272 +1,181 @@
 """
 Centralized finance service for all revenue calculations across domains.
 Single source of truth for financial data.
+
+FinanceContext holds the datasets behind one request's figures: each base
+dataset (ledger totals, expense totals, per-item sales) is fetched once with
+a grouped values().annotate() query and every derived figure is computed
+from that result. Views share a context through FinanceService.for_request();
+the FinanceService static methods build a throwaway one.
 """
 from decimal import Decimal
 from django.db.models import Sum, Count, Q, F
 from django.utils import timezone
 from datetime import datetime, timedelta
-from .models import StripePayment
+from .models import StripePayment, LedgerEntry, RevenueRollup
+from . import rollups
+from .ledger import ledger_entries, summarise_ledger, ledger_totals, transaction_feed
 
+ZERO = Decimal('0.00')
+EXPENSE_AREAS = ['workshops', 'courses', 'private_teaching', 'digital_products', 'general']
 
-class FinanceService:
-    """
-    Centralized service for all financial calculations.
-    Used by all domains (workshops, courses, private_teaching) to ensure consistency.
-    """
 
-    @staticmethod
-    def get_teacher_revenue_summary(teacher, start_date=None, end_date=None):
-        """
-        Get complete revenue summary for a teacher across all domains.
-        Queries actual tables (not StripePayment) for accurate totals.
+def _to_decimal(value):
+    """Sums of float fields (lesson fees) as Decimal"""
+    return Decimal(str(value)) if value else ZERO
 
-        Args:
-            teacher: User object (instructor)
-            start_date: Optional start date filter
-            end_date: Optional end date filter
 
-        Returns:
-            dict with total_revenue, revenue_by_domain, payment_count, etc.
-        """
-        from apps.workshops.models import WorkshopRegistration
-        from apps.courses.models import CourseEnrollment
-        from apps.private_teaching.models import Order
-        from django.conf import settings
-
-        commission_rate = settings.PLATFORM_COMMISSION_PERCENTAGE / 100
-
-        # ===== WORKSHOPS =====
-        workshop_registrations = WorkshopRegistration.objects.filter(
-            session__workshop__instructor=teacher,
-            status='registered',
-        ).filter(
-            Q(payment_status='paid') | Q(payment_status='completed') | Q(payment_status='not_required')
-        )
+def _teacher_share(revenue):
+    from django.conf import settings
 
-        if start_date:
-            workshop_registrations = workshop_registrations.filter(paid_at__gte=start_date)
-        if end_date:
-            workshop_registrations = workshop_registrations.filter(paid_at__lte=end_date)
-
-        workshops_gross = workshop_registrations.aggregate(
-            total=Sum('payment_amount')
-        )['total'] or Decimal('0.00')
-        workshops_count = workshop_registrations.count()
-        workshops_revenue = workshops_gross * (1 - Decimal(str(commission_rate)))
-
-        # ===== COURSES =====
-        # Get all enrollments (both active and cancelled) for accurate revenue tracking
-        course_enrollments = CourseEnrollment.objects.filter(
-            course__instructor=teacher
-        ).filter(
-            Q(payment_status='completed') | Q(payment_status='not_required')
-        )
-
-        if start_date:
-            # Use paid_at if available, fallback to enrolled_at for older records
-            course_enrollments = course_enrollments.filter(
-                Q(paid_at__gte=start_date) | Q(paid_at__isnull=True, enrolled_at__gte=start_date)
-            )
-        if end_date:
-            course_enrollments = course_enrollments.filter(
-                Q(paid_at__lte=end_date) | Q(paid_at__isnull=True, enrolled_at__lte=end_date)
-            )
-
-        # Calculate gross from ALL enrollments (including cancelled ones)
-        # This ensures refunds are netted against the original revenue
-        courses_gross = course_enrollments.aggregate(
-            total=Sum('payment_amount')
-        )['total'] or Decimal('0.00')
-
-        # Count only active enrollments for enrollment count
-        courses_count = course_enrollments.filter(is_active=True).count()
-
-        # Calculate refunds from cancelled course enrollments
-        from apps.courses.models import CourseCancellationRequest
-
-        course_refunds = CourseCancellationRequest.objects.filter(
-            enrollment__course__instructor=teacher,
-            status=CourseCancellationRequest.COMPLETED,
-            refund_processed_at__isnull=False
-        )
-
-        if start_date:
-            course_refunds = course_refunds.filter(refund_processed_at__gte=start_date)
-        if end_date:
-            course_refunds = course_refunds.filter(refund_processed_at__lte=end_date)
-
-        total_course_refunds = course_refunds.aggregate(
-            total=Sum('refund_amount')
-        )['total']
-        # Ensure it's a Decimal, not float
-        total_course_refunds = Decimal(str(total_course_refunds)) if total_course_refunds else Decimal('0.00')
-
-        # Subtract refunds from gross revenue (can result in zero or negative if all refunded)
-        courses_gross = courses_gross - total_course_refunds
-        courses_revenue = courses_gross * (1 - Decimal(str(commission_rate)))
-
-        # ===== PRIVATE TEACHING - LESSONS =====
-        # Query OrderItems directly to only sum items for this teacher
-        # (An order can contain lessons from multiple teachers)
-        from apps.private_teaching.models import OrderItem
-
-        order_items_query = OrderItem.objects.filter(
-            lesson__teacher=teacher,
-            order__payment_status='completed'
-        ).select_related('order')
-
-        if start_date:
-            order_items_query = order_items_query.filter(order__created_at__gte=start_date)
-        if end_date:
-            order_items_query = order_items_query.filter(order__created_at__lte=end_date)
+    commission_rate = settings.PLATFORM_COMMISSION_PERCENTAGE / 100
+    return revenue * (1 - Decimal(str(commission_rate)))
 
-        private_lessons_gross = order_items_query.aggregate(
-            total=Sum('price_paid')
-        )['total'] or Decimal('0.00')
 
-        # Count unique orders (not items) for this teacher
-        private_orders = Order.objects.filter(
-            items__lesson__teacher=teacher,
-            payment_status='completed'
-        ).distinct()
-        if start_date:
-            private_orders = private_orders.filter(created_at__gte=start_date)
-        if end_date:
-            private_orders = private_orders.filter(created_at__lte=end_date)
-        private_lessons_count = private_orders.count()
-
-        # Calculate refunds from cancelled lessons
-        from apps.private_teaching.models import LessonCancellationRequest
-        from lessons.models import Lesson
-
-        refund_requests = LessonCancellationRequest.objects.filter(
-            teacher=teacher,
-            status=LessonCancellationRequest.COMPLETED,
-            refund_processed_at__isnull=False
-        ).select_related('lesson')
+class FinanceContext:
+    """
+    Request-scoped finance datasets for one teacher.
 
-        if start_date:
-            refund_requests = refund_requests.filter(refund_processed_at__gte=start_date)
-        if end_date:
-            refund_requests = refund_requests.filter(refund_processed_at__lte=end_date)
+    Every loader is memoised on its arguments, so a page that shows the
+    revenue summary, per-domain totals and breakdowns for the same period
+    queries each underlying table once.
+    """
 
-        # Sum up refund amounts (these are already minus platform fee)
-        total_refunds = refund_requests.aggregate(
-            total=Sum('refund_amount')
-        )['total']
-        # Ensure it's a Decimal, not float
-        total_refunds = Decimal(str(total_refunds)) if total_refunds else Decimal('0.00')
+    def __init__(self, teacher):
+        self.teacher = teacher
+        self._cache = {}
 
-        # Subtract refunds from gross revenue
-        private_lessons_gross = private_lessons_gross - total_refunds
+    def _memo(self, key, loader):
+        if key not in self._cache:
+            self._cache[key] = loader()
+        return self._cache[key]
 
-        # ===== PRIVATE TEACHING - EXAM REGISTRATIONS =====
-        from apps.private_teaching.models import ExamRegistration
+    # =========================================================================
+    # BASE DATASETS
+    # =========================================================================
 
-        exam_registrations = ExamRegistration.objects.filter(
-            teacher=teacher,
-            payment_status='completed'
+    def ledger_summary(self, start_date=None, end_date=None):
+        """summarise_ledger() over all domains for a period (one grouped query)"""
+        return self._memo(
+            ('ledger', start_date, end_date),
+            lambda: summarise_ledger(ledger_entries(self.teacher, start_date, end_date))
         )
 
-        if start_date:
-            exam_registrations = exam_registrations.filter(paid_at__gte=start_date)
-        if end_date:
-            exam_registrations = exam_registrations.filter(paid_at__lte=end_date)
+    def expense_totals(self, start_date=None, end_date=None):
+        """
+        Expense totals by business area for a period (one grouped query).
 
-        exams_gross = exam_registrations.aggregate(
-            total=Sum('fee_amount')
-        )['total'] or Decimal('0.00')
-        exams_count = exam_registrations.count()
+        Returns:
+            dict with total, count and by_area ({area: Decimal})
+        """
+        def load():
+            from apps.expenses.models import Expense
 
-        # Combine private teaching revenue
-        private_gross = private_lessons_gross + exams_gross
-        private_count = private_lessons_count + exams_count
-        private_revenue = private_gross * (1 - Decimal(str(commission_rate)))
+            expenses = Expense.objects.filter(created_by=self.teacher)
+            if start_date:
+                expenses = expenses.filter(date__gte=start_date.date())
+            if end_date:
+                expenses = expenses.filter(date__lte=end_date.date())
 
-        # ===== DIGITAL PRODUCTS =====
-        from apps.digital_products.models import ProductPurchase
+            by_area = {area: ZERO for area in EXPENSE_AREAS}
+            count = 0
+            for row in expenses.order_by().values('business_area').annotate(total=Sum('amount'), count=Count('id')):
+                by_area[row['business_area']] = row['total'] or ZERO
+                count += row['count']
 
-        digital_purchases = ProductPurchase.objects.filter(
-            product__teacher=teacher,
-            payment_status='completed'
-        )
+            return {
+                'total': sum(by_area.values(), ZERO),
+                'count': count,
+                'by_area': by_area,
+            }
 
-        if start_date:
-            digital_purchases = digital_purchases.filter(paid_at__gte=start_date)
-        if end_date:
-            digital_purchases = digital_purchases.filter(paid_at__lte=end_date)
+        return self._memo(('expenses', start_date, end_date), load)
 
-        digital_gross = digital_purchases.aggregate(
-            total=Sum('payment_amount')
-        )['total'] or Decimal('0.00')
-        digital_count = digital_purchases.count()
-        digital_revenue = digital_gross * (1 - Decimal(str(commission_rate)))
+    def _lesson_groups(self, start_date=None, end_date=None):
+        """Paid lessons grouped by (student, subject), with counts and sums"""
+        def load():
+            from lessons.models import Lesson
 
-        # ===== TOTALS =====
-        total_gross = workshops_gross + courses_gross + private_gross + digital_gross
-        total_revenue = workshops_revenue + courses_revenue + private_revenue + digital_revenue
-        total_commission = total_gross - total_revenue
-        total_count = workshops_count + courses_count + private_count + digital_count
+            lessons = Lesson.objects.filter(
+                teacher=self.teacher,
+                payment_status='Paid',
+                is_deleted=False
+            )
+            if start_date:
+                lessons = lessons.filter(lesson_date__gte=start_date)
+            if end_date:
+                lessons = lessons.filter(lesson_date__lte=end_date)
+
+            return list(lessons.order_by().values('student_id', 'subject_id').annotate(
+                count=Count('id'),
+                price_paid=Sum('order_item__price_paid'),
+                fees=Sum('fee')
+            ))
+
+        return self._memo(('lessons', start_date, end_date), load)
+
+    # =========================================================================
+    # SUMMARIES
+    # =========================================================================
+
+    def revenue_summary(self, start_date=None, end_date=None):
+        """See FinanceService.get_teacher_revenue_summary()"""
+        summary = self.ledger_summary(start_date, end_date)
+
+        totals = ledger_totals(summary)
+        workshops = ledger_totals(summary, domain='workshops')
+        courses = ledger_totals(summary, domain='courses')
+        private = ledger_totals(summary, domain='private_teaching')
+        private_lessons = ledger_totals(
+            summary,
+            domain='private_teaching',
+            source_types=[LedgerEntry.ORDER_ITEM, LedgerEntry.LESSON_CANCELLATION]
+        )
+        exams = ledger_totals(summary, domain='private_teaching', source_types=[LedgerEntry.EXAM_REGISTRATION])
+        digital = ledger_totals(summary, domain='digital_products')
 
         return {
-            'total_revenue': total_revenue,
-            'total_gross': total_gross,
-            'total_commission': total_commission,
-            'payment_count': total_count,
+            'total_revenue': totals['net'],
+            'total_gross': totals['gross'],
+            'total_commission': totals['commission'],
+            'payment_count': totals['count'],
             'by_domain': {
                 'workshops': {
-                    'revenue': workshops_revenue,
-                    'count': workshops_count,
+                    'revenue': workshops['net'],
+                    'count': workshops['count'],
                 },
                 'courses': {
-                    'revenue': courses_revenue,
-                    'count': courses_count,
+                    'revenue': courses['net'],
+                    'count': courses['count'],
                 },
                 'private_teaching': {
-                    'revenue': private_revenue,
-                    'count': private_count,
+                    'revenue': private['net'],
+                    'count': private['count'],
                     'breakdown': {
                         'lessons': {
-                            'revenue': private_lessons_gross * (1 - Decimal(str(commission_rate))),
-                            'count': private_lessons_count,
+                            'revenue': private_lessons['net'],
+                            'count': private_lessons['count'],
                         },
                         'exams': {
-                            'revenue': exams_gross * (1 - Decimal(str(commission_rate))),
-                            'count': exams_count,
+                            'revenue': exams['net'],
+                            'count': exams['count'],
                         },
                     },
                 },
                 'digital_products': {
-                    'revenue': digital_revenue,
-                    'count': digital_count,
+                    'revenue': digital['net'],
+                    'count': digital['count'],
                 },
             }
         }
 
-    @staticmethod
-    def get_domain_revenue(teacher, domain, start_date=None, end_date=None):
-        """
-        Get revenue for a specific domain.
-        Queries actual tables (not StripePayment) for accurate totals.
-
-        Args:
-            teacher: User object
-            domain: 'workshops', 'courses', or 'private_teaching'
-            start_date: Optional start date filter
-            end_date: Optional end date filter
-
-        Returns:
-            dict with revenue totals and transaction list
-        """
-        from django.conf import settings
-        commission_rate = settings.PLATFORM_COMMISSION_PERCENTAGE / 100
-
+    def domain_revenue(self, domain, start_date=None, end_date=None):
+        """See FinanceService.get_domain_revenue()"""
         if domain == 'workshops':
             from apps.workshops.models import WorkshopRegistration
 
             query = WorkshopRegistration.objects.filter(
-                session__workshop__instructor=teacher,
+                session__workshop__instructor=self.teacher,
                 status='registered',
             ).filter(
                 Q(payment_status='paid') | Q(payment_status='completed') | Q(payment_status='not_required')
@@ -277,18 +186,14 @@ class FinanceService:
             if end_date:
                 query = query.filter(paid_at__lte=end_date)
 
-            total_gross = query.aggregate(total=Sum('payment_amount'))['total'] or Decimal('0.00')
-            payment_count = query.count()
-            total_revenue = total_gross * (1 - Decimal(str(commission_rate)))
-            total_commission = total_gross - total_revenue
             transactions = query.select_related('session__workshop', 'student').order_by('-paid_at')
 
         elif domain == 'courses':
-            from apps.courses.models import CourseEnrollment, CourseCancellationRequest
+            from apps.courses.models import CourseEnrollment
 
-            # Get ALL enrollments (including cancelled) to properly account for refunds
+            # All enrollments (including cancelled) so refunded ones are listed too
             query = CourseEnrollment.objects.filter(
-                course__instructor=teacher
+                course__instructor=self.teacher
             ).filter(
                 Q(payment_status='completed') | Q(payment_status='not_required')
             )
@@ -302,82 +207,29 @@ class FinanceService:
                     Q(paid_at__lte=end_date) | Q(paid_at__isnull=True, enrolled_at__lte=end_date)
                 )
 
-            total_gross = query.aggregate(total=Sum('payment_amount'))['total'] or Decimal('0.00')
-            # Count only active enrollments
-            payment_count = query.filter(is_active=True).count()
-
-            # Calculate refunds
-            course_refunds = CourseCancellationRequest.objects.filter(
-                enrollment__course__instructor=teacher,
-                status=CourseCancellationRequest.COMPLETED,
-                refund_processed_at__isnull=False
-            )
-
-            if start_date:
-                course_refunds = course_refunds.filter(refund_processed_at__gte=start_date)
-            if end_date:
-                course_refunds = course_refunds.filter(refund_processed_at__lte=end_date)
-
-            total_refunds = course_refunds.aggregate(
-                total=Sum('refund_amount')
-            )['total']
-            # Ensure it's a Decimal, not float
-            total_refunds = Decimal(str(total_refunds)) if total_refunds else Decimal('0.00')
-
-            # Net revenue after refunds (can be zero or negative if fully refunded)
-            total_gross = total_gross - total_refunds
-            total_revenue = total_gross * (1 - Decimal(str(commission_rate)))
-            total_commission = total_gross - total_revenue
             transactions = query.select_related('course', 'student').order_by('-paid_at')
 
         elif domain == 'private_teaching':
-            from apps.private_teaching.models import Order, OrderItem, ExamRegistration
-
-            # Query OrderItems directly to only sum items for this teacher
-            # (An order can contain lessons from multiple teachers)
-            order_items_query = OrderItem.objects.filter(
-                lesson__teacher=teacher,
-                order__payment_status='completed'
-            ).select_related('order')
-
-            if start_date:
-                order_items_query = order_items_query.filter(order__created_at__gte=start_date)
-            if end_date:
-                order_items_query = order_items_query.filter(order__created_at__lte=end_date)
+            from apps.private_teaching.models import Order, ExamRegistration
 
-            lessons_gross = order_items_query.aggregate(total=Sum('price_paid'))['total'] or Decimal('0.00')
-
-            # Count unique orders (not items) for this teacher
             orders_query = Order.objects.filter(
-                items__lesson__teacher=teacher,
+                items__lesson__teacher=self.teacher,
                 payment_status='completed'
             ).distinct()
             if start_date:
                 orders_query = orders_query.filter(created_at__gte=start_date)
             if end_date:
                 orders_query = orders_query.filter(created_at__lte=end_date)
-            lessons_count = orders_query.count()
 
-            # Exam registrations
             exams_query = ExamRegistration.objects.filter(
-                teacher=teacher,
+                teacher=self.teacher,
                 payment_status='completed'
             )
-
             if start_date:
                 exams_query = exams_query.filter(paid_at__gte=start_date)
             if end_date:
                 exams_query = exams_query.filter(paid_at__lte=end_date)
 
-            exams_gross = exams_query.aggregate(total=Sum('fee_amount'))['total'] or Decimal('0.00')
-            exams_count = exams_query.count()
-
-            # Combine totals
-            total_gross = lessons_gross + exams_gross
-            payment_count = lessons_count + exams_count
-            total_revenue = total_gross * (1 - Decimal(str(commission_rate)))
-            total_commission = total_gross - total_revenue
-
             # Combine transactions (orders and exams)
             # Note: This returns a list instead of queryset since we're combining two models
             transactions = list(orders_query.select_related('student').order_by('-created_at')) + \
@@ -387,7 +239,7 @@ class FinanceService:
             from apps.digital_products.models import ProductPurchase
 
             query = ProductPurchase.objects.filter(
-                product__teacher=teacher,
+                product__teacher=self.teacher,
                 payment_status='completed'
             )
 
@@ -396,46 +248,45 @@ class FinanceService:
             if end_date:
                 query = query.filter(paid_at__lte=end_date)
 
-            total_gross = query.aggregate(total=Sum('payment_amount'))['total'] or Decimal('0.00')
-            payment_count = query.count()
-            total_revenue = total_gross * (1 - Decimal(str(commission_rate)))
-            total_commission = total_gross - total_revenue
             transactions = query.select_related('product', 'student').order_by('-paid_at')
 
         else:
             return {
                 'domain': domain,
-                'total_revenue': Decimal('0.00'),
-                'total_gross': Decimal('0.00'),
-                'total_commission': Decimal('0.00'),
+                'total_revenue': ZERO,
+                'total_gross': ZERO,
+                'total_commission': ZERO,
                 'payment_count': 0,
                 'transactions': [],
             }
 
+        # Served from the all-domain ledger summary shared with revenue_summary()
+        totals = ledger_totals(self.ledger_summary(start_date, end_date), domain=domain)
+
         return {
             'domain': domain,
-            'total_revenue': total_revenue,
-            'total_gross': total_gross,
-            'total_commission': total_commission,
-            'payment_count': payment_count,
+            'total_revenue': totals['net'],
+            'total_gross': totals['gross'],
+            'total_commission': totals['commission'],
+            'payment_count': totals['count'],
             'transactions': transactions,
         }
 
-    @staticmethod
-    def get_workshop_revenue_breakdown(teacher, start_date=None, end_date=None):
-        """
-        Get revenue breakdown by individual workshops.
-        Includes both active and refunded registrations.
+    # =========================================================================
+    # BREAKDOWNS
+    # =========================================================================
 
-        Returns:
-            list of dicts with workshop info, revenue, and individual transactions
-        """
+    def workshop_revenue_breakdown(self, start_date=None, end_date=None):
+        """See FinanceService.get_workshop_revenue_breakdown()"""
+        return self._memo(
+            ('workshops', start_date, end_date),
+            lambda: self._load_workshop_breakdown(start_date, end_date)
+        )
+
+    def _load_workshop_breakdown(self, start_date, end_date):
         from apps.workshops.models import Workshop, WorkshopRegistration
-        from django.conf import settings
         from django.db.models import Prefetch
 
-        commission_rate = settings.PLATFORM_COMMISSION_PERCENTAGE / 100
-
         # Build registration queryset with filters
         registration_qs = WorkshopRegistration.objects.filter(
             Q(payment_status='completed', status='registered') |  # Active paid registrations
@@ -448,7 +299,7 @@ class FinanceService:
             registration_qs = registration_qs.filter(paid_at__lte=end_date)
 
         # Prefetch registrations to avoid N+1 queries
-        workshops = Workshop.objects.filter(instructor=teacher).prefetch_related(
+        workshops = Workshop.objects.filter(instructor=self.teacher).prefetch_related(
             Prefetch(
                 'sessions__registrations',
                 queryset=registration_qs.select_related('student', 'session'),
@@ -465,14 +316,11 @@ class FinanceService:
 
             # Calculate revenue only from active (non-cancelled) registrations
             active_registrations = [r for r in registrations if r.status == 'registered']
-            total_revenue = sum((r.payment_amount or Decimal('0.00') for r in active_registrations), Decimal('0.00'))
+            total_revenue = sum((r.payment_amount or ZERO for r in active_registrations), ZERO)
 
             # Get refunded registrations
             refunded_registrations = [r for r in registrations if r.status == 'cancelled']
-            refunded_amount = sum((r.payment_amount or Decimal('0.00') for r in refunded_registrations), Decimal('0.00'))
-
-            # Calculate teacher share (after commission) - only on active revenue
-            teacher_share = total_revenue * (1 - Decimal(str(commission_rate)))
+            refunded_amount = sum((r.payment_amount or ZERO for r in refunded_registrations), ZERO)
 
             # Include workshops that have any transactions (active or refunded)
             if total_revenue > 0 or refunded_amount > 0:
@@ -482,7 +330,8 @@ class FinanceService:
                 breakdown.append({
                     'workshop': workshop,
                     'total_revenue': total_revenue,
-                    'teacher_share': teacher_share,
+                    # Teacher share (after commission) - only on active revenue
+                    'teacher_share': _teacher_share(total_revenue),
                     'registrations_count': len(active_registrations),
                     'refunded_count': len(refunded_registrations),
                     'refunded_amount': refunded_amount,
@@ -494,79 +343,74 @@ class FinanceService:
 
         return breakdown
 
-    @staticmethod
-    def get_course_revenue_breakdown(teacher, start_date=None, end_date=None):
-        """
-        Get revenue breakdown by individual courses.
-        Includes both active and refunded enrollments.
+    def course_revenue_breakdown(self, start_date=None, end_date=None):
+        """See FinanceService.get_course_revenue_breakdown()"""
+        return self._memo(
+            ('courses', start_date, end_date),
+            lambda: self._load_course_breakdown(start_date, end_date)
+        )
 
-        Returns:
-            list of dicts with course info, revenue, and refund details
-        """
+    def _load_course_breakdown(self, start_date, end_date):
         from apps.courses.models import Course, CourseEnrollment, CourseCancellationRequest
-        from django.conf import settings
-
-        commission_rate = settings.PLATFORM_COMMISSION_PERCENTAGE / 100
-
-        # Get all courses for this teacher
-        courses = Course.objects.filter(instructor=teacher)
 
-        breakdown = []
-        for course in courses:
-            # Get all enrollments for this course (including cancelled with refunds)
-            enrollments = CourseEnrollment.objects.filter(
-                course=course
-            ).filter(
-                Q(payment_status='completed', is_active=True) |  # Active paid enrollments
-                Q(payment_status='completed', is_active=False)   # Cancelled/refunded enrollments
+        # Paid enrollments across all of the teacher's courses (active and cancelled/refunded)
+        enrollments = CourseEnrollment.objects.filter(
+            course__instructor=self.teacher,
+            payment_status='completed'
+        )
+        if start_date:
+            enrollments = enrollments.filter(
+                Q(paid_at__gte=start_date) | Q(paid_at__isnull=True, enrolled_at__gte=start_date)
             )
-
-            if start_date:
-                enrollments = enrollments.filter(
-                    Q(paid_at__gte=start_date) | Q(paid_at__isnull=True, enrolled_at__gte=start_date)
-                )
-            if end_date:
-                enrollments = enrollments.filter(
-                    Q(paid_at__lte=end_date) | Q(paid_at__isnull=True, enrolled_at__lte=end_date)
-                )
-
-            # Calculate revenue only from active (non-cancelled) enrollments
-            active_enrollments = enrollments.filter(is_active=True)
-            total_revenue = active_enrollments.aggregate(
-                revenue=Sum('payment_amount')
-            )['revenue'] or Decimal('0.00')
-
-            # Get refunded enrollments
-            course_refunds = CourseCancellationRequest.objects.filter(
-                enrollment__course=course,
-                status=CourseCancellationRequest.COMPLETED,
-                refund_processed_at__isnull=False
+        if end_date:
+            enrollments = enrollments.filter(
+                Q(paid_at__lte=end_date) | Q(paid_at__isnull=True, enrolled_at__lte=end_date)
             )
 
-            if start_date:
-                course_refunds = course_refunds.filter(refund_processed_at__gte=start_date)
-            if end_date:
-                course_refunds = course_refunds.filter(refund_processed_at__lte=end_date)
+        refunds = CourseCancellationRequest.objects.filter(
+            enrollment__course__instructor=self.teacher,
+            status=CourseCancellationRequest.COMPLETED,
+            refund_processed_at__isnull=False
+        )
+        if start_date:
+            refunds = refunds.filter(refund_processed_at__gte=start_date)
+        if end_date:
+            refunds = refunds.filter(refund_processed_at__lte=end_date)
+
+        # Revenue only counts active (non-cancelled) enrollments
+        sales = {
+            row['course_id']: row
+            for row in enrollments.order_by().values('course_id').annotate(
+                revenue=Sum('payment_amount', filter=Q(is_active=True)),
+                count=Count('id', filter=Q(is_active=True))
+            )
+        }
+        refunded = {
+            row['enrollment__course_id']: row
+            for row in refunds.order_by().values('enrollment__course_id').annotate(
+                amount=Sum('refund_amount'),
+                count=Count('id')
+            )
+        }
 
-            refunded_amount = course_refunds.aggregate(
-                revenue=Sum('refund_amount')
-            )['revenue']
-            # Ensure it's a Decimal, not float
-            refunded_amount = Decimal(str(refunded_amount)) if refunded_amount else Decimal('0.00')
+        courses = Course.objects.in_bulk(set(sales) | set(refunded))
 
-            # Calculate teacher share (after commission) - only on active revenue
-            teacher_share = total_revenue * (1 - Decimal(str(commission_rate)))
+        breakdown = []
+        for course_id, course in courses.items():
+            total_revenue = (sales.get(course_id) or {}).get('revenue') or ZERO
+            refunded_amount = _to_decimal((refunded.get(course_id) or {}).get('amount'))
 
             # Include courses that have any transactions (active or refunded)
             if total_revenue > 0 or refunded_amount > 0:
                 breakdown.append({
                     'course': course,
                     'total_revenue': total_revenue,
-                    'teacher_share': teacher_share,
-                    'enrollments_count': active_enrollments.count(),
-                    'refunded_count': course_refunds.count(),
+                    # Teacher share (after commission) - only on active revenue
+                    'teacher_share': _teacher_share(total_revenue),
+                    'enrollments_count': (sales.get(course_id) or {}).get('count', 0),
+                    'refunded_count': (refunded.get(course_id) or {}).get('count', 0),
                     'refunded_amount': refunded_amount,
-                    'transactions': enrollments.select_related('student').order_by('-paid_at'),
+                    'transactions': enrollments.filter(course_id=course_id).select_related('student').order_by('-paid_at'),
                 })
 
         # Sort by total revenue (active + refunded) descending to show busiest courses first
@@ -574,128 +418,87 @@ class FinanceService:
 
         return breakdown
 
-    @staticmethod
-    def get_private_teaching_revenue_breakdown(teacher, start_date=None, end_date=None):
-        """
-        Get revenue breakdown by student and subject for private teaching.
-        Returns one row per subject per student, showing lessons and exam revenue separately.
-        Includes refunded lessons as negative amounts.
+    def private_teaching_revenue_breakdown(self, start_date=None, end_date=None):
+        """See FinanceService.get_private_teaching_revenue_breakdown()"""
+        return self._memo(
+            ('private_teaching', start_date, end_date),
+            lambda: self._load_private_teaching_breakdown(start_date, end_date)
+        )
 
-        Returns:
-            list of dicts with student, subject, and revenue info
-        """
-        from apps.private_teaching.models import Order, OrderItem, ExamRegistration, Subject, LessonCancellationRequest
+    def _load_private_teaching_breakdown(self, start_date, end_date):
+        from apps.private_teaching.models import ExamRegistration, Subject, LessonCancellationRequest
         from django.contrib.auth.models import User
-        from lessons.models import Lesson
-        from django.conf import settings
 
-        commission_rate = settings.PLATFORM_COMMISSION_PERCENTAGE / 100
         breakdown_dict = {}  # Key: (student_id, subject_id)
 
-        # Get paid lessons and group by student and subject
-        lessons_query = Lesson.objects.filter(
-            teacher=teacher,
-            payment_status='Paid',
-            is_deleted=False
-        ).select_related('student', 'subject', 'order_item__order')
-
-        if start_date:
-            lessons_query = lessons_query.filter(lesson_date__gte=start_date)
-        if end_date:
-            lessons_query = lessons_query.filter(lesson_date__lte=end_date)
-
-        for lesson in lessons_query:
-            key = (lesson.student.id, lesson.subject.id)
+        def row_for(key):
             if key not in breakdown_dict:
                 breakdown_dict[key] = {
-                    'student': lesson.student,
-                    'subject': lesson.subject,
                     'lessons_count': 0,
-                    'lessons_revenue': Decimal('0.00'),
+                    'lessons_revenue': ZERO,
                     'refunded_count': 0,
-                    'refunded_amount': Decimal('0.00'),
+                    'refunded_amount': ZERO,
                     'exams_count': 0,
-                    'exams_revenue': Decimal('0.00'),
+                    'exams_revenue': ZERO,
                 }
+            return breakdown_dict[key]
 
-            breakdown_dict[key]['lessons_count'] += 1
-            # Get the price from the order item
-            if hasattr(lesson, 'order_item') and lesson.order_item:
-                price = Decimal(str(lesson.order_item.price_paid)) if lesson.order_item.price_paid else Decimal('0.00')
-                breakdown_dict[key]['lessons_revenue'] += price
+        # Paid lessons, priced from their order items
+        for group in self._lesson_groups(start_date, end_date):
+            row = row_for((group['student_id'], group['subject_id']))
+            row['lessons_count'] += group['count']
+            row['lessons_revenue'] += group['price_paid'] or ZERO
 
-        # Get refunded lessons and subtract from revenue
+        # Refunded lessons, at the original lesson fee (before platform fee deduction)
         refund_requests = LessonCancellationRequest.objects.filter(
-            teacher=teacher,
+            teacher=self.teacher,
             status=LessonCancellationRequest.COMPLETED,
             refund_processed_at__isnull=False
-        ).select_related('lesson__subject', 'student')
-
+        )
         if start_date:
             refund_requests = refund_requests.filter(refund_processed_at__gte=start_date)
         if end_date:
             refund_requests = refund_requests.filter(refund_processed_at__lte=end_date)
 
-        for refund in refund_requests:
-            lesson = refund.lesson
-            key = (refund.student.id, lesson.subject.id)
-
-            if key not in breakdown_dict:
-                breakdown_dict[key] = {
-                    'student': refund.student,
-                    'subject': lesson.subject,
-                    'lessons_count': 0,
-                    'lessons_revenue': Decimal('0.00'),
-                    'refunded_count': 0,
-                    'refunded_amount': Decimal('0.00'),
-                    'exams_count': 0,
-                    'exams_revenue': Decimal('0.00'),
-                }
-
-            # Track refunded lessons separately
-            breakdown_dict[key]['refunded_count'] += 1
-            # Original lesson fee (before platform fee deduction)
-            fee = Decimal(str(lesson.fee)) if lesson.fee else Decimal('0.00')
-            breakdown_dict[key]['refunded_amount'] += fee
+        for group in refund_requests.order_by().values('student_id', 'lesson__subject_id').annotate(
+            count=Count('id'),
+            fees=Sum('lesson__fee')
+        ):
+            row = row_for((group['student_id'], group['lesson__subject_id']))
+            row['refunded_count'] += group['count']
+            row['refunded_amount'] += _to_decimal(group['fees'])
 
-        # Get paid exam registrations and group by student and subject
+        # Paid exam registrations
         exams_query = ExamRegistration.objects.filter(
-            teacher=teacher,
+            teacher=self.teacher,
             payment_status='completed'
-        ).select_related('student', 'subject')
-
+        )
         if start_date:
             exams_query = exams_query.filter(paid_at__gte=start_date)
         if end_date:
             exams_query = exams_query.filter(paid_at__lte=end_date)
 
-        for exam in exams_query:
-            key = (exam.student.id, exam.subject.id)
-            if key not in breakdown_dict:
-                breakdown_dict[key] = {
-                    'student': exam.student,
-                    'subject': exam.subject,
-                    'lessons_count': 0,
-                    'lessons_revenue': Decimal('0.00'),
-                    'exams_count': 0,
-                    'exams_revenue': Decimal('0.00'),
-                }
+        for group in exams_query.order_by().values('student_id', 'subject_id').annotate(
+            count=Count('id'),
+            fees=Sum('fee_amount')
+        ):
+            row = row_for((group['student_id'], group['subject_id']))
+            row['exams_count'] += group['count']
+            row['exams_revenue'] += group['fees'] or ZERO
 
-            breakdown_dict[key]['exams_count'] += 1
-            fee_amount = Decimal(str(exam.fee_amount)) if exam.fee_amount else Decimal('0.00')
-            breakdown_dict[key]['exams_revenue'] += fee_amount
+        students = User.objects.in_bulk({student_id for student_id, _ in breakdown_dict})
+        subjects = Subject.objects.in_bulk({subject_id for _, subject_id in breakdown_dict})
 
         # Build final breakdown list
         breakdown = []
-        for data in breakdown_dict.values():
+        for (student_id, subject_id), data in breakdown_dict.items():
             # Net revenue = lessons + exams - refunds
             net_lessons_revenue = data['lessons_revenue'] - data['refunded_amount']
             total_revenue = net_lessons_revenue + data['exams_revenue']
-            teacher_share = total_revenue * (1 - Decimal(str(commission_rate)))
 
             breakdown.append({
-                'student': data['student'],
-                'subject': data['subject'],
+                'student': students[student_id],
+                'subject': subjects[subject_id],
                 'lessons_count': data['lessons_count'],
                 'lessons_revenue': data['lessons_revenue'],
                 'refunded_count': data['refunded_count'],
@@ -704,7 +507,7 @@ class FinanceService:
                 'exams_count': data['exams_count'],
                 'exams_revenue': data['exams_revenue'],
                 'total_revenue': total_revenue,
-                'teacher_share': teacher_share,
+                'teacher_share': _teacher_share(total_revenue),
             })
 
         # Sort by student name, then subject name
@@ -712,56 +515,34 @@ class FinanceService:
 
         return breakdown
 
-    @staticmethod
-    def get_private_teaching_subject_breakdown(teacher, start_date=None, end_date=None):
-        """
-        Get revenue breakdown by subject for private teaching.
+    def private_teaching_subject_breakdown(self, start_date=None, end_date=None):
+        """See FinanceService.get_private_teaching_subject_breakdown()"""
+        return self._memo(
+            ('subjects', start_date, end_date),
+            lambda: self._load_subject_breakdown(start_date, end_date)
+        )
 
-        Returns:
-            list of dicts with subject info and revenue
-        """
+    def _load_subject_breakdown(self, start_date, end_date):
         from apps.private_teaching.models import Subject
-        from lessons.models import Lesson
-        from django.conf import settings
 
-        commission_rate = settings.PLATFORM_COMMISSION_PERCENTAGE / 100
+        # Roll the (student, subject) lesson groups up to subjects
+        subject_data = {}
+        for group in self._lesson_groups(start_date, end_date):
+            data = subject_data.setdefault(group['subject_id'], {
+                'total_lessons': 0,
+                'total_students': 0,
+                'total_revenue': ZERO,
+            })
+            data['total_lessons'] += group['count']
+            data['total_students'] += 1
+            data['total_revenue'] += _to_decimal(group['fees'])
 
-        # Get all paid lessons for this teacher
-        lessons_query = Lesson.objects.filter(
-            teacher=teacher,
-            payment_status='Paid',
-            is_deleted=False
-        ).select_related('subject', 'student')
-
-        if start_date:
-            lessons_query = lessons_query.filter(lesson_date__gte=start_date)
-        if end_date:
-            lessons_query = lessons_query.filter(lesson_date__lte=end_date)
-
-        # Group by subject and aggregate
-        from django.db.models import Count
-        subject_data = lessons_query.values(
-            'subject__id',
-            'subject__subject'
-        ).annotate(
-            total_lessons=Count('id'),
-            total_students=Count('student', distinct=True),
-            total_revenue=Sum('fee')
-        ).order_by('-total_revenue')
+        subjects = Subject.objects.in_bulk(subject_data)
+        total_all_revenue = sum((data['total_revenue'] for data in subject_data.values()), ZERO)
 
         breakdown = []
-        total_all_revenue = Decimal('0.00')
-
-        # First pass to calculate total revenue for percentages
-        for item in subject_data:
-            revenue = item['total_revenue']
-            total_all_revenue += Decimal(str(revenue)) if revenue else Decimal('0.00')
-
-        # Second pass to build breakdown with percentages
-        for item in subject_data:
-            revenue = item['total_revenue']
-            subject_revenue = Decimal(str(revenue)) if revenue else Decimal('0.00')
-            teacher_share = subject_revenue * (1 - Decimal(str(commission_rate)))
+        for subject_id, data in subject_data.items():
+            subject_revenue = data['total_revenue']
 
             # Calculate percentage of total revenue
             if total_all_revenue > 0:
@@ -770,298 +551,279 @@ class FinanceService:
                 percentage = 0
 
             # Calculate average per lesson
-            if item['total_lessons'] > 0:
-                avg_per_lesson = subject_revenue / Decimal(str(item['total_lessons']))
+            if data['total_lessons'] > 0:
+                avg_per_lesson = subject_revenue / Decimal(str(data['total_lessons']))
             else:
-                avg_per_lesson = Decimal('0.00')
+                avg_per_lesson = ZERO
 
             breakdown.append({
-                'subject_name': item['subject__subject'],
-                'subject_id': item['subject__id'],
-                'total_students': item['total_students'],
-                'total_lessons': item['total_lessons'],
+                'subject_name': subjects[subject_id].subject,
+                'subject_id': subject_id,
+                'total_students': data['total_students'],
+                'total_lessons': data['total_lessons'],
                 'total_revenue': subject_revenue,
-                'teacher_share': teacher_share,
+                'teacher_share': _teacher_share(subject_revenue),
                 'percentage': percentage,
                 'avg_per_lesson': avg_per_lesson,
             })
 
+        breakdown.sort(key=lambda x: x['total_revenue'], reverse=True)
+
         return breakdown
 
+    def digital_products_revenue_breakdown(self, start_date=None, end_date=None):
+        """See FinanceService.get_digital_products_revenue_breakdown()"""
+        return self._memo(
+            ('digital_products', start_date, end_date),
+            lambda: self._load_digital_products_breakdown(start_date, end_date)
+        )
+
+    def _load_digital_products_breakdown(self, start_date, end_date):
+        from apps.digital_products.models import DigitalProduct, ProductPurchase
+
+        purchases = ProductPurchase.objects.filter(
+            product__teacher=self.teacher,
+            payment_status='completed'
+        )
+        if start_date:
+            purchases = purchases.filter(paid_at__gte=start_date)
+        if end_date:
+            purchases = purchases.filter(paid_at__lte=end_date)
+
+        sales = {
+            row['product_id']: row
+            for row in purchases.order_by().values('product_id').annotate(
+                revenue=Sum('payment_amount'),
+                count=Count('id')
+            )
+            if row['revenue'] and row['revenue'] > 0
+        }
+        products = DigitalProduct.objects.in_bulk(sales)
+
+        breakdown = []
+        for product_id, product in products.items():
+            total_revenue = sales[product_id]['revenue']
+            breakdown.append({
+                'product': product,
+                'total_revenue': total_revenue,
+                'teacher_share': _teacher_share(total_revenue),
+                'sales_count': sales[product_id]['count'],
+                'transactions': purchases.filter(product_id=product_id).select_related('student').order_by('-paid_at'),
+            })
+
+        # Sort by total revenue descending
+        breakdown.sort(key=lambda x: x['total_revenue'], reverse=True)
+
+        return breakdown
+
+
+class FinanceService:
+    """
+    Centralized service for all financial calculations.
+    Used by all domains (workshops, courses, private_teaching) to ensure consistency.
+    """
+
     @staticmethod
-    def get_digital_products_revenue_breakdown(teacher, start_date=None, end_date=None):
+    def for_request(request):
         """
-        Get revenue breakdown by individual digital products.
+        The FinanceContext shared by everything rendering this request.
+        Views that show several figures should read them from here so
+        overlapping datasets are only queried once.
+        """
+        context = getattr(request, '_finance_context', None)
+        if context is None or context.teacher != request.user:
+            context = FinanceContext(request.user)
+            request._finance_context = context
+        return context
 
-        Returns:
-            list of dicts with product info, revenue, and sales count
+    @staticmethod
+    def get_teacher_revenue_summary(teacher, start_date=None, end_date=None):
         """
-        from apps.digital_products.models import DigitalProduct, ProductPurchase
-        from django.conf import settings
+        Get complete revenue summary for a teacher across all domains.
+        Reads the revenue ledger (one grouped query over the teacher's entries).
+
+        Args:
+            teacher: User object (instructor)
+            start_date: Optional start date filter
+            end_date: Optional end date filter
 
-        commission_rate = settings.PLATFORM_COMMISSION_PERCENTAGE / 100
+        Returns:
+            dict with total_revenue, revenue_by_domain, payment_count, etc.
+            Revenue figures are teacher net after commission and refunds;
+            counts are numbers of charges.
+        """
+        return FinanceContext(teacher).revenue_summary(start_date, end_date)
 
-        # Get all products for this teacher
-        products = DigitalProduct.objects.filter(teacher=teacher)
+    @staticmethod
+    def get_domain_revenue(teacher, domain, start_date=None, end_date=None):
+        """
+        Get revenue for a specific domain.
+        Totals come from the revenue ledger; the transaction list is the
+        domain's own records (registrations, enrollments, orders, purchases).
 
-        breakdown = []
-        for product in products:
-            # Get all purchases for this product
-            purchases = ProductPurchase.objects.filter(
-                product=product,
-                payment_status='completed'
-            )
+        Args:
+            teacher: User object
+            domain: 'workshops', 'courses', or 'private_teaching'
+            start_date: Optional start date filter
+            end_date: Optional end date filter
 
-            if start_date:
-                purchases = purchases.filter(paid_at__gte=start_date)
-            if end_date:
-                purchases = purchases.filter(paid_at__lte=end_date)
+        Returns:
+            dict with revenue totals and transaction list
+        """
+        return FinanceContext(teacher).domain_revenue(domain, start_date, end_date)
 
-            # Calculate revenue
-            total_revenue = purchases.aggregate(
-                revenue=Sum('payment_amount')
-            )['revenue'] or Decimal('0.00')
+    @staticmethod
+    def get_workshop_revenue_breakdown(teacher, start_date=None, end_date=None):
+        """
+        Get revenue breakdown by individual workshops.
+        Includes both active and refunded registrations.
 
-            sales_count = purchases.count()
+        Returns:
+            list of dicts with workshop info, revenue, and individual transactions
+        """
+        return FinanceContext(teacher).workshop_revenue_breakdown(start_date, end_date)
 
-            # Calculate teacher share (after commission)
-            teacher_share = total_revenue * (1 - Decimal(str(commission_rate)))
+    @staticmethod
+    def get_course_revenue_breakdown(teacher, start_date=None, end_date=None):
+        """
+        Get revenue breakdown by individual courses.
+        Includes both active and refunded enrollments.
 
-            # Include products that have sales
-            if total_revenue > 0:
-                breakdown.append({
-                    'product': product,
-                    'total_revenue': total_revenue,
-                    'teacher_share': teacher_share,
-                    'sales_count': sales_count,
-                    'transactions': purchases.select_related('student').order_by('-paid_at'),
-                })
+        Returns:
+            list of dicts with course info, revenue, and refund details
+        """
+        return FinanceContext(teacher).course_revenue_breakdown(start_date, end_date)
 
-        # Sort by total revenue descending
-        breakdown.sort(key=lambda x: x['total_revenue'], reverse=True)
+    @staticmethod
+    def get_private_teaching_revenue_breakdown(teacher, start_date=None, end_date=None):
+        """
+        Get revenue breakdown by student and subject for private teaching.
+        Returns one row per subject per student, showing lessons and exam revenue separately.
+        Includes refunded lessons as negative amounts.
 
-        return breakdown
+        Returns:
+            list of dicts with student, subject, and revenue info
+        """
+        return FinanceContext(teacher).private_teaching_revenue_breakdown(start_date, end_date)
 
     @staticmethod
-    def get_recent_transactions(teacher, limit=10):
+    def get_private_teaching_subject_breakdown(teacher, start_date=None, end_date=None):
         """
-        Get most recent completed transactions for a teacher across all domains.
-        Queries actual source tables for accurate transaction list.
+        Get revenue breakdown by subject for private teaching.
 
         Returns:
-            list of dicts with transaction details
+            list of dicts with subject info and revenue
         """
-        from apps.workshops.models import WorkshopRegistration
-        from apps.courses.models import CourseEnrollment
-        from apps.private_teaching.models import Order
-        from django.conf import settings
-
-        commission_rate = settings.PLATFORM_COMMISSION_PERCENTAGE / 100
-        transactions = []
-
-        # Get workshop registrations (both active and refunded)
-        workshop_regs = WorkshopRegistration.objects.filter(
-            session__workshop__instructor=teacher,
-        ).filter(
-            Q(payment_status='paid', status='registered') |
-            Q(payment_status='completed', status='registered') |
-            Q(payment_status='not_required', status='registered') |
-            Q(payment_status='completed', status='cancelled')  # Include refunded registrations
-        ).select_related('session__workshop', 'student').order_by('-paid_at')[:limit * 2]  # Get more to ensure we have enough after filtering
-
-        for reg in workshop_regs:
-            amount = reg.payment_amount
-            is_refunded = reg.status == 'cancelled'
-
-            if is_refunded:
-                # Refunded transaction shows as negative
-                teacher_share = Decimal('0.00')
-                display_amount = -amount
-            else:
-                # Active transaction
-                teacher_share = amount * (1 - Decimal(str(commission_rate)))
-                display_amount = amount
-
-            transactions.append({
-                'date': reg.paid_at or reg.registration_date,
-                'domain': 'workshops',
-                'domain_display': 'Workshop (Refunded)' if is_refunded else 'Workshop',
-                'description': f"{reg.session.workshop.title} - {reg.session.start_datetime.strftime('%b %d, %Y')}",
-                'student': reg.student,
-                'amount': display_amount,
-                'teacher_share': teacher_share,
-                'is_refunded': is_refunded,
-            })
+        return FinanceContext(teacher).private_teaching_subject_breakdown(start_date, end_date)
 
-        # Get course enrollments (both active and refunded)
-        course_enrollments = CourseEnrollment.objects.filter(
-            course__instructor=teacher
-        ).filter(
-            Q(payment_status='completed') | Q(payment_status='not_required')
-        ).select_related('course', 'student').order_by('-paid_at')[:limit * 2]  # Get more to ensure we have enough after filtering
-
-        for enrollment in course_enrollments:
-            amount = enrollment.payment_amount
-            is_refunded = not enrollment.is_active
-
-            if is_refunded:
-                # Refunded transaction shows as negative
-                teacher_share = Decimal('0.00')
-                display_amount = -amount
-            else:
-                # Active transaction
-                teacher_share = amount * (1 - Decimal(str(commission_rate)))
-                display_amount = amount
-
-            transactions.append({
-                'date': enrollment.paid_at or enrollment.enrolled_at,
-                'domain': 'courses',
-                'domain_display': 'Course (Refunded)' if is_refunded else 'Course',
-                'description': enrollment.course.title,
-                'student': enrollment.student,
-                'amount': display_amount,
-                'teacher_share': teacher_share,
-                'is_refunded': is_refunded,
-            })
+    @staticmethod
+    def get_digital_products_revenue_breakdown(teacher, start_date=None, end_date=None):
+        """
+        Get revenue breakdown by individual digital products.
 
-        # Get private teaching orders
-        private_orders = Order.objects.filter(
-            items__lesson__teacher=teacher,
-            payment_status='completed'
-        ).distinct().select_related('student').prefetch_related('items__lesson').order_by('-created_at')[:limit]
-
-        for order in private_orders:
-            amount = order.total_amount
-            teacher_share = amount * (1 - Decimal(str(commission_rate)))
-
-            # Get lesson subjects from order items
-            lessons = [item.lesson for item in order.items.all() if item.lesson.teacher == teacher]
-            if lessons:
-                if len(lessons) == 1:
-                    description = lessons[0].subject
-                else:
-                    description = f"{lessons[0].subject} + {len(lessons)-1} more"
-            else:
-                description = f"Order #{order.order_number}"
-
-            transactions.append({
-                'date': order.created_at,
-                'domain': 'private_teaching',
-                'domain_display': 'Private Lesson',
-                'description': description,
-                'student': order.student,
-                'amount': amount,
-                'teacher_share': teacher_share,
-                'is_refunded': False,
-            })
+        Returns:
+            list of dicts with product info, revenue, and sales count
+        """
+        return FinanceContext(teacher).digital_products_revenue_breakdown(start_date, end_date)
 
-        # Get refunded private lessons
-        from apps.private_teaching.models import LessonCancellationRequest
+    @staticmethod
+    def get_recent_transactions(teacher, limit=10):
+        """
+        Get most recent charges and refunds for a teacher across all domains.
+        Reads the revenue ledger, newest first (first page of get_transaction_feed).
 
-        refund_requests = LessonCancellationRequest.objects.filter(
-            teacher=teacher,
-            status=LessonCancellationRequest.COMPLETED,
-            refund_processed_at__isnull=False
-        ).select_related('lesson__subject', 'student').order_by('-refund_processed_at')[:limit]
-
-        for refund in refund_requests:
-            # Refund shows as negative amount
-            # The refund_amount is already net of platform fee, but we need to show the original lesson fee
-            lesson = refund.lesson
-            original_amount = lesson.fee if lesson.fee else Decimal('0.00')
-
-            # Teacher loses their share of this lesson
-            teacher_lost = refund.refund_amount  # This is what student gets back (net of platform fee)
-
-            transactions.append({
-                'date': refund.refund_processed_at,
-                'domain': 'private_teaching',
-                'domain_display': 'Private Lesson (Refunded)',
-                'description': f"{lesson.subject.subject} - {lesson.lesson_date.strftime('%b %d, %Y')}",
-                'student': refund.student,
-                'amount': -original_amount,  # Show as negative
-                'teacher_share': -teacher_lost,  # Teacher loses this amount
-                'is_refunded': True,
-            })
+        Returns:
+            list of dicts with transaction details
+        """
+        return FinanceService.get_transaction_feed(teacher, limit=limit)['transactions']
 
-        # Get exam registrations
-        from apps.private_teaching.models import ExamRegistration
+    @staticmethod
+    def get_transaction_feed(teacher, cursor=None, limit=20, domain=None):
+        """
+        Page through a teacher's charges and refunds, newest first.
 
-        exam_registrations = ExamRegistration.objects.filter(
-            teacher=teacher,
-            payment_status='completed'
-        ).select_related('student', 'exam_board', 'subject', 'child_profile').order_by('-paid_at')[:limit]
-
-        for exam in exam_registrations:
-            amount = exam.fee_amount
-            teacher_share = amount * (1 - Decimal(str(commission_rate)))
-
-            transactions.append({
-                'date': exam.paid_at,
-                'domain': 'private_teaching',
-                'domain_display': 'Exam Registration',
-                'description': f"{exam.display_name} - {exam.subject.subject}",
-                'student': exam.student,
-                'amount': amount,
-                'teacher_share': teacher_share,
-            })
+        Args:
+            cursor: next_cursor from the previous page (None for the first page)
+            limit: Transactions per page
+            domain: Optional domain filter
 
-        # Get digital product purchases
-        from apps.digital_products.models import ProductPurchase
+        Returns:
+            dict with transactions (same keys as get_recent_transactions)
+            and next_cursor (None on the last page)
 
-        digital_purchases = ProductPurchase.objects.filter(
-            product__teacher=teacher,
-            payment_status='completed'
-        ).select_related('product', 'student').order_by('-paid_at')[:limit]
-
-        for purchase in digital_purchases:
-            amount = purchase.payment_amount
-            teacher_share = amount * (1 - Decimal(str(commission_rate)))
-
-            transactions.append({
-                'date': purchase.paid_at,
-                'domain': 'digital_products',
-                'domain_display': 'Digital Product',
-                'description': purchase.product.title,
-                'student': purchase.student,
-                'amount': amount,
-                'teacher_share': teacher_share,
-                'is_refunded': False,
-            })
+        Raises:
+            ValueError: if the cursor is malformed
+        """
+        entries, next_cursor = transaction_feed(teacher, cursor=cursor, limit=limit, domain=domain)
 
-        # Sort all transactions by date (most recent first) and limit
-        transactions.sort(key=lambda x: x['date'] if x['date'] else timezone.now() - timedelta(days=365), reverse=True)
-        return transactions[:limit]
+        return {
+            'transactions': [
+                {
+                    'id': entry.id,
+                    'date': entry.occurred_at,
+                    'domain': entry.domain,
+                    'domain_display': entry.display_type,
+                    'description': entry.description,
+                    'student': entry.student,
+                    'amount': entry.gross_amount,
+                    'teacher_share': entry.net_amount,
+                    'is_refunded': entry.is_refund,
+                }
+                for entry in entries
+            ],
+            'next_cursor': next_cursor,
+        }
 
     @staticmethod
     def get_revenue_trend(teacher, domain=None, days=30):
         """
         Get daily revenue trend for the last N days.
-        Excludes refunded payments from revenue calculations.
+        Reads the daily revenue rollups; revenue is teacher net after refunds.
 
         Returns:
             list of dicts with date and revenue
         """
-        end_date = timezone.now()
-        start_date = end_date - timedelta(days=days)
-
-        # Only include completed payments, exclude refunded
-        query = StripePayment.objects.filter(
-            teacher=teacher,
-            status='completed',  # Exclude 'refunded', 'pending', 'failed'
-            completed_at__gte=start_date
-        )
+        since = timezone.localdate() - timedelta(days=days)
+        return rollups.trend(teacher, RevenueRollup.DAY, since, domain=domain)
+
+    @staticmethod
+    def get_monthly_revenue_trend(teacher, since, domain=None):
+        """
+        Get monthly revenue from the month containing `since` onwards.
+        Reads the monthly revenue rollups.
+
+        Returns:
+            list of dicts with date (first of the month) and revenue
+        """
+        return rollups.trend(teacher, RevenueRollup.MONTH, since.replace(day=1), domain=domain)
 
-        if domain:
-            query = query.filter(domain=domain)
+    @staticmethod
+    def get_period_revenue_summary(teacher, start_date=None, end_date=None):
+        """
+        Revenue totals per domain for a period, read from the day/month/tax year
+        rollups rather than the ledger. Used by the P&L statements, where the
+        period is usually a whole tax year.
 
-        # Group by date
-        from django.db.models.functions import TruncDate
-        daily_revenue = query.annotate(
-            date=TruncDate('completed_at')
-        ).values('date').annotate(
-            revenue=Sum('teacher_share'),
-            count=Count('id')
-        ).order_by('date')
+        Same shape as get_teacher_revenue_summary() without the private
+        teaching lessons/exams breakdown. Periods are resolved to whole days.
+        """
+        by_domain = rollups.domain_totals(teacher, start_date, end_date)
 
-        return list(daily_revenue)
+        def domain_summary(domain):
+            totals = by_domain.get(domain, {})
+            return {
+                'revenue': totals.get('net', Decimal('0.00')),
+                'count': totals.get('count', 0),
+            }
+
+        return {
+            'total_revenue': sum((row['net'] for row in by_domain.values()), Decimal('0.00')),
+            'total_gross': sum((row['gross'] for row in by_domain.values()), Decimal('0.00')),
+            'total_commission': sum((row['commission'] for row in by_domain.values()), Decimal('0.00')),
+            'total_refunds': sum((row['refunds'] for row in by_domain.values()), Decimal('0.00')),
+            'payment_count': sum(row['count'] for row in by_domain.values()),
+            'by_domain': {
+                domain: domain_summary(domain)
+                for domain, _ in StripePayment.DOMAIN_CHOICES
+            }
+        }
@@ -0,0 +1,274 @@
+"""
+Bulk Cart Fulfilment
+
+Fulfils multi-item checkouts from the Stripe webhook in a fixed number of
+queries, so a 10-item cart costs about the same as a 1-item cart:
+
+- Cart rows are fetched in one query and registrations, terms acceptances
+  and purchases are written with bulk_create.
+- Counters (session seats, workshop registrations, product sales) are set in
+  one UPDATE per table instead of a save() and recount per item.
+- Ledger entries go through ledger.record_entries(), one insert for the cart.
+- The student gets one consolidated confirmation and each instructor one
+  notification per registration. They are queued in the email outbox in the
+  same transaction, so a retried webhook never sends them twice.
+
+bulk_create and update() skip model save() and post_save signals, so every
+side effect those would have had is done explicitly here.
+"""
+
+import logging
+import uuid
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import ledger
+
+logger = logging.getLogger(__name__)
+
+# Registration statuses that hold a seat (as WorkshopSession.update_registration_count)
+SEAT_STATUSES = ['registered', 'promoted', 'attended']
+
+
+def _count_subquery(queryset, field):
+    """Correlated COUNT(*) of queryset rows whose field matches the outer row"""
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+        total=Count('pk')
+    ).values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+def _notify(description, send, *args):
+    """Queue a notification; failures are logged and don't undo the fulfilment"""
+    try:
+        send(*args)
+    except Exception as e:
+        logger.error(f"Failed to send {description}: {e}")
+
+
+# =============================================================================
+# WORKSHOPS
+# =============================================================================
+
+def terms_version_from_metadata(metadata: Dict):
+    """
+    The WorkshopTermsAndConditions version accepted at checkout, falling back
+    to the current version. None if the checkout didn't record terms.
+    """
+    from apps.workshops.models import WorkshopTermsAndConditions
+
+    version_number = metadata.get('terms_version')
+    if not version_number:
+        return None
+
+    try:
+        return WorkshopTermsAndConditions.objects.get(version=int(version_number))
+    except (WorkshopTermsAndConditions.DoesNotExist, ValueError):
+        logger.info(f"  Terms version {version_number} not found, using current")
+        terms_version = WorkshopTermsAndConditions.objects.filter(is_current=True).first()
+        if not terms_version:
+            logger.warning(f"  No current terms found")
+        return terms_version
+
+
+def refresh_workshop_counts(session_ids):
+    """Recount seats for sessions and registrations for their workshops, one UPDATE each"""
+    from apps.workshops.models import Workshop, WorkshopRegistration, WorkshopSession
+
+    WorkshopSession.objects.filter(id__in=session_ids).update(
+        current_registrations=_count_subquery(
+            WorkshopRegistration.objects.filter(status__in=SEAT_STATUSES), 'session'
+        )
+    )
+    Workshop.objects.filter(sessions__id__in=session_ids).update(
+        total_registrations=_count_subquery(
+            WorkshopRegistration.objects.filter(status__in=['registered', 'attended']), 'session__workshop'
+        )
+    )
+
+
+def fulfil_workshop_cart(user, item_ids: List[str], metadata: Dict, stripe_payment) -> List:
+    """
+    Register a student for every session in a paid workshop cart.
+
+    Cart items that no longer exist (already fulfilled) are skipped. Runs in
+    one transaction: if anything fails nothing is registered and the webhook
+    inbox retries the event.
+
+    Returns:
+        The created WorkshopRegistration objects
+    """
+    from apps.workshops.models import WorkshopCartItem, WorkshopRegistration, TermsAcceptance
+
+    cart_items = list(
+        WorkshopCartItem.objects.select_related(
+            'session__workshop__instructor', 'child_profile'
+        ).filter(id__in=item_ids)
+    )
+    missing = set(item_ids) - {str(item.id) for item in cart_items}
+    for item_id in missing:
+        logger.warning(f"  ✗ Cart item {item_id} not found (may have been already processed)")
+    if not cart_items:
+        return []
+
+    # All sessions of one workshop that must be booked as a whole series are
+    # linked so they can be cancelled together.
+    series_registration_id = None
+    workshops = {item.session.workshop for item in cart_items}
+    if len(item_ids) > 1 and len(workshops) == 1:
+        workshop = workshops.pop()
+        if workshop.is_series and workshop.require_full_series_registration:
+            series_registration_id = uuid.uuid4()
+            logger.info(f"Detected mandatory series purchase: {workshop.title} ({series_registration_id})")
+
+    paid_at = timezone.now()
+    registrations = [
+        WorkshopRegistration(
+            session=item.session,
+            student=user,
+            email=item.email or user.email,
+            phone=item.phone or '',
+            emergency_contact=item.emergency_contact or '',
+            experience_level=item.experience_level or '',
+            expectations=item.expectations or '',
+            special_requirements=item.special_requirements or '',
+            child_profile=item.child_profile,
+            status='registered',
+            payment_status='completed',
+            payment_amount=item.price,
+            stripe_payment_intent_id=stripe_payment.stripe_payment_intent_id,
+            stripe_checkout_session_id=stripe_payment.stripe_checkout_session_id,
+            paid_at=paid_at,
+            series_registration_id=series_registration_id
+        )
+        for item in cart_items
+    ]
+
+    with transaction.atomic():
+        WorkshopRegistration.objects.bulk_create(registrations)
+
+        terms_version = terms_version_from_metadata(metadata)
+        if terms_version:
+            TermsAcceptance.objects.bulk_create([
+                TermsAcceptance(
+                    student=user,
+                    registration=registration,
+                    terms_version=terms_version,
+                    ip_address=metadata.get('terms_ip_address') or None,
+                    user_agent=metadata.get('terms_user_agent', '')
+                )
+                for registration in registrations
+            ])
+
+        refresh_workshop_counts({item.session_id for item in cart_items})
+        ledger.record_workshop_registrations(registrations, stripe_payment)
+        WorkshopCartItem.objects.filter(id__in=[item.id for item in cart_items]).delete()
+
+        from apps.workshops.notifications import InstructorNotificationService, StudentNotificationService
+        for registration in registrations:
+            _notify(
+                'instructor notification',
+                InstructorNotificationService.send_new_registration_notification, registration
+            )
+        if user.email:
+            _notify(
+                'cart confirmation email',
+                StudentNotificationService.send_cart_registration_confirmation,
+                user, registrations, stripe_payment.total_amount
+            )
+
+    logger.info(f"Created {len(registrations)} workshop registrations for {user.username}")
+    return registrations
+
+
+# =============================================================================
+# PRIVATE TEACHING
+# =============================================================================
+
+def mark_lessons_paid(lesson_ids: List[str]) -> int:
+    """
+    Mark an order's lessons as paid in one UPDATE.
+    Payment status isn't a schedule field, so skipping the Lesson save
+    signals leaves no availability cache stale.
+    """
+    from lessons.models import Lesson
+
+    lesson_ids = [lesson_id.strip() for lesson_id in lesson_ids if lesson_id.strip()]
+    if not lesson_ids:
+        return 0
+    try:
+        updated = Lesson.objects.filter(id__in=lesson_ids).update(payment_status='Paid')
+    except Exception as e:
+        # Malformed UUIDs fail validation for the whole batch
+        logger.error(f"updating lessons {lesson_ids}: {e}")
+        return 0
+    if updated != len(set(lesson_ids)):
+        logger.warning(f"Marked {updated} of {len(set(lesson_ids))} lessons as Paid")
+    return updated
+
+
+# =============================================================================
+# DIGITAL PRODUCTS
+# =============================================================================
+
+def fulfil_product_cart(student, product_ids: List[str], stripe_payment, cart_id: Optional[str] = None) -> List:
+    """
+    Create purchases for every product in a paid digital product cart.
+    Products the student already owns are skipped.
+
+    Returns:
+        The created ProductPurchase objects
+    """
+    from apps.digital_products.models import DigitalProduct, ProductPurchase, DigitalProductCartItem
+    from apps.digital_products.notifications import send_cart_purchase_confirmation
+
+    products = DigitalProduct.objects.select_related('teacher').in_bulk(product_ids)
+    for product_id in set(product_ids) - {str(pk) for pk in products}:
+        logger.error(f"Product {product_id} not found")
+
+    owned = set(
+        ProductPurchase.objects.filter(student=student, product__in=products.values())
+        .values_list('product_id', flat=True)
+    )
+    cart_prices = dict(
+        DigitalProductCartItem.objects.filter(cart__user=student, product__in=products.values())
+        .values_list('product_id', 'price')
+    )
+
+    paid_at = timezone.now()
+    purchases = [
+        ProductPurchase(
+            product=product,
+            student=student,
+            payment_status='completed',
+            payment_amount=cart_prices.get(product.id, product.price),
+            stripe_payment_intent_id=stripe_payment.stripe_payment_intent_id,
+            stripe_checkout_session_id=stripe_payment.stripe_checkout_session_id,
+            paid_at=paid_at
+        )
+        for product in products.values()
+        if product.id not in owned
+    ]
+
+    with transaction.atomic():
+        ProductPurchase.objects.bulk_create(purchases)
+        DigitalProduct.objects.filter(id__in=[purchase.product_id for purchase in purchases]).update(
+            total_sales=F('total_sales') + 1
+        )
+        ledger.record_product_purchases(purchases, stripe_payment)
+
+        if cart_id:
+            DigitalProductCartItem.objects.filter(cart_id=cart_id).delete()
+            logger.info(f"Cleared cart {cart_id}")
+
+        if purchases:
+            _notify(
+                'cart purchase confirmation email', send_cart_purchase_confirmation, student, purchases
+            )
+
+    logger.info(f"Created {len(purchases)} product purchases for {student.username}")
+    return purchases
@@ -0,0 +1,485 @@
+"""
+Revenue Ledger
+
+Writes and reads LedgerEntry rows, the append-only record of every charge
+and refund that affects a teacher's revenue.
+
+Writing:
+- record_*() helpers are called where payments complete (Stripe webhook,
+  checkout success) and where refunds are processed.
+- Each entry is keyed by (source_type, source_id, entry_type), so recording
+  the same event twice is a no-op. record_entries() writes a whole cart's
+  entries in one insert. The backfill_revenue_ledger command relies
+  on this to fill in history safely.
+- Commission is split with calculate_commission() when the entry is written
+  and never recomputed. Refunds are stored as negative amounts.
+- New entries are added to the day/month/tax year rollups (rollups.py) in
+  the same transaction.
+
+Reading:
+- ledger_entries() is the indexed (teacher, occurred_at) scan every finance
+  view starts from; summarise_ledger() totals it in one grouped query.
+- transaction_feed() pages through a teacher's entries newest first with a
+  keyset cursor on (occurred_at, id), so every page costs the same.
+"""
+
+import functools
+import logging
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Sum, Count, Q
+from django.utils import timezone
+
+from apps.core import keyset
+
+from .models import LedgerEntry
+from .rollups import apply_entries, apply_entry
+from .utils import calculate_commission
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+
+# Fields record_entry() copies from a built entry when it creates the row
+_ENTRY_FIELDS = (
+    'teacher', 'student', 'domain', 'description', 'gross_amount',
+    'commission_amount', 'net_amount', 'stripe_payment', 'occurred_at',
+)
+
+
+def _build_entry(
+    *,
+    teacher,
+    domain: str,
+    source_type: str,
+    source_id,
+    amount,
+    entry_type: str = LedgerEntry.CHARGE,
+    student=None,
+    occurred_at=None,
+    description: str = '',
+    stripe_payment=None
+) -> Optional[LedgerEntry]:
+    """Unsaved ledger entry with its commission split (None for zero amounts)"""
+    amount = Decimal(str(amount or 0))
+    if amount <= 0:
+        return None
+
+    commission, teacher_share = calculate_commission(amount)
+    sign = -1 if entry_type == LedgerEntry.REFUND else 1
+
+    return LedgerEntry(
+        source_type=source_type,
+        source_id=str(source_id),
+        entry_type=entry_type,
+        teacher=teacher,
+        student=student,
+        domain=domain,
+        description=description[:255],
+        gross_amount=sign * amount,
+        commission_amount=sign * commission,
+        net_amount=sign * teacher_share,
+        stripe_payment=stripe_payment,
+        occurred_at=occurred_at or timezone.now(),
+    )
+
+
+def record_entry(
+    *,
+    teacher,
+    domain: str,
+    source_type: str,
+    source_id,
+    amount,
+    entry_type: str = LedgerEntry.CHARGE,
+    student=None,
+    occurred_at=None,
+    description: str = '',
+    stripe_payment=None
+) -> Tuple[Optional[LedgerEntry], bool]:
+    """
+    Append a ledger entry unless this source event is already recorded.
+
+    Args:
+        amount: Positive amount charged or refunded (refunds are negated here)
+
+    Returns:
+        (entry, created) - (None, False) for zero amounts, which are not revenue
+    """
+    built = _build_entry(
+        teacher=teacher,
+        domain=domain,
+        source_type=source_type,
+        source_id=source_id,
+        amount=amount,
+        entry_type=entry_type,
+        student=student,
+        occurred_at=occurred_at,
+        description=description,
+        stripe_payment=stripe_payment
+    )
+    if built is None:
+        return None, False
+
+    with transaction.atomic():
+        entry, created = LedgerEntry.objects.get_or_create(
+            source_type=built.source_type,
+            source_id=built.source_id,
+            entry_type=built.entry_type,
+            defaults={field: getattr(built, field) for field in _ENTRY_FIELDS}
+        )
+        if created:
+            apply_entry(entry)
+
+    return entry, created
+
+
+def record_entries(specs: List[Dict]) -> List[LedgerEntry]:
+    """
+    Append several ledger entries at once (a whole cart checkout).
+
+    Each spec holds record_entry() keyword arguments. Already recorded source
+    events and zero amounts are skipped, as with record_entry(). Costs one
+    lookup, one insert and one rollup update per bucket, however many entries
+    there are.
+
+    Returns:
+        The newly created entries
+    """
+    candidates = {}
+    for spec in specs:
+        entry = _build_entry(**spec)
+        if entry is not None:
+            candidates.setdefault((entry.source_type, entry.source_id, entry.entry_type), entry)
+    if not candidates:
+        return []
+
+    with transaction.atomic():
+        existing = LedgerEntry.objects.filter(
+            source_type__in={key[0] for key in candidates},
+            source_id__in={key[1] for key in candidates},
+        ).values_list('source_type', 'source_id', 'entry_type')
+        for key in existing:
+            candidates.pop(key, None)
+
+        entries = LedgerEntry.objects.bulk_create(list(candidates.values()))
+        apply_entries(entries)
+
+    return entries
+
+
+def _safely(recorder):
+    """
+    Run a recorder without letting a ledger failure break payment fulfilment.
+    Anything missed can be filled in with `manage.py backfill_revenue_ledger`.
+    """
+    @functools.wraps(recorder)
+    def wrapper(*args, **kwargs):
+        try:
+            return recorder(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Failed to write revenue ledger entry ({recorder.__name__}): {e}")
+            return None
+    return wrapper
+
+
+# =============================================================================
+# WORKSHOPS
+# =============================================================================
+
+def _workshop_description(registration) -> str:
+    session = registration.session
+    return f"{session.workshop.title} - {session.start_datetime.strftime('%b %d, %Y')}"
+
+
+@_safely
+def record_workshop_registration(registration, stripe_payment=None):
+    """Charge for a paid workshop registration"""
+    return record_entry(
+        teacher=registration.session.workshop.instructor,
+        student=registration.student,
+        domain='workshops',
+        source_type=LedgerEntry.WORKSHOP_REGISTRATION,
+        source_id=registration.id,
+        amount=registration.payment_amount,
+        occurred_at=registration.paid_at or registration.registration_date,
+        description=_workshop_description(registration),
+        stripe_payment=stripe_payment
+    )
+
+
+@_safely
+def record_workshop_registrations(registrations, stripe_payment=None):
+    """Charges for the paid registrations of a workshop cart checkout"""
+    return record_entries([
+        dict(
+            teacher=registration.session.workshop.instructor,
+            student=registration.student,
+            domain='workshops',
+            source_type=LedgerEntry.WORKSHOP_REGISTRATION,
+            source_id=registration.id,
+            amount=registration.payment_amount,
+            occurred_at=registration.paid_at or registration.registration_date,
+            description=_workshop_description(registration),
+            stripe_payment=stripe_payment
+        )
+        for registration in registrations
+    ])
+
+
+@_safely
+def record_workshop_refund(registration, amount=None, stripe_payment=None, occurred_at=None):
+    """Refund of a workshop registration (defaults to the full amount paid)"""
+    return record_entry(
+        teacher=registration.session.workshop.instructor,
+        student=registration.student,
+        domain='workshops',
+        source_type=LedgerEntry.WORKSHOP_REGISTRATION,
+        source_id=registration.id,
+        amount=registration.payment_amount if amount is None else amount,
+        entry_type=LedgerEntry.REFUND,
+        occurred_at=occurred_at,
+        description=_workshop_description(registration),
+        stripe_payment=stripe_payment
+    )
+
+
+# =============================================================================
+# COURSES
+# =============================================================================
+
+@_safely
+def record_course_enrollment(enrollment, stripe_payment=None):
+    """Charge for a paid course enrollment"""
+    return record_entry(
+        teacher=enrollment.course.instructor,
+        student=enrollment.student,
+        domain='courses',
+        source_type=LedgerEntry.COURSE_ENROLLMENT,
+        source_id=enrollment.id,
+        amount=enrollment.payment_amount,
+        occurred_at=enrollment.paid_at or enrollment.enrolled_at,
+        description=enrollment.course.title,
+        stripe_payment=stripe_payment
+    )
+
+
+@_safely
+def record_course_refund(cancellation, stripe_payment=None):
+    """Refund processed for a CourseCancellationRequest"""
+    enrollment = cancellation.enrollment
+    return record_entry(
+        teacher=enrollment.course.instructor,
+        student=enrollment.student,
+        domain='courses',
+        source_type=LedgerEntry.COURSE_CANCELLATION,
+        source_id=cancellation.id,
+        amount=cancellation.refund_amount,
+        entry_type=LedgerEntry.REFUND,
+        occurred_at=cancellation.refund_processed_at,
+        description=enrollment.course.title,
+        stripe_payment=stripe_payment
+    )
+
+
+# =============================================================================
+# PRIVATE TEACHING
+# =============================================================================
+
+def _lesson_description(lesson) -> str:
+    return f"{lesson.subject.subject} - {lesson.lesson_date.strftime('%b %d, %Y')}"
+
+
+@_safely
+def record_order(order, stripe_payment=None):
+    """
+    Charges for a completed private teaching order, one per lesson.
+    An order can contain lessons from several teachers, so each item is
+    credited to its own lesson's teacher.
+    """
+    items = order.items.select_related('lesson__teacher', 'lesson__subject')
+    return record_entries([
+        dict(
+            teacher=item.lesson.teacher,
+            student=order.student,
+            domain='private_teaching',
+            source_type=LedgerEntry.ORDER_ITEM,
+            source_id=item.id,
+            amount=item.price_paid,
+            occurred_at=order.completed_at or order.created_at,
+            description=_lesson_description(item.lesson),
+            stripe_payment=stripe_payment
+        )
+        for item in items
+    ])
+
+
+@_safely
+def record_lesson_refund(cancellation, stripe_payment=None):
+    """Refund processed for a LessonCancellationRequest"""
+    return record_entry(
+        teacher=cancellation.teacher,
+        student=cancellation.student,
+        domain='private_teaching',
+        source_type=LedgerEntry.LESSON_CANCELLATION,
+        source_id=cancellation.id,
+        amount=cancellation.refund_amount,
+        entry_type=LedgerEntry.REFUND,
+        occurred_at=cancellation.refund_processed_at,
+        description=_lesson_description(cancellation.lesson),
+        stripe_payment=stripe_payment
+    )
+
+
+@_safely
+def record_exam_registration(exam, stripe_payment=None):
+    """Charge for a paid exam registration"""
+    return record_entry(
+        teacher=exam.teacher,
+        student=exam.student,
+        domain='private_teaching',
+        source_type=LedgerEntry.EXAM_REGISTRATION,
+        source_id=exam.id,
+        amount=exam.fee_amount or exam.payment_amount,
+        occurred_at=exam.paid_at,
+        description=f"{exam.display_name} - {exam.subject.subject}",
+        stripe_payment=stripe_payment
+    )
+
+
+# =============================================================================
+# DIGITAL PRODUCTS
+# =============================================================================
+
+@_safely
+def record_product_purchase(purchase, stripe_payment=None):
+    """Charge for a digital product purchase"""
+    return record_entry(
+        teacher=purchase.product.teacher,
+        student=purchase.student,
+        domain='digital_products',
+        source_type=LedgerEntry.PRODUCT_PURCHASE,
+        source_id=purchase.id,
+        amount=purchase.payment_amount,
+        occurred_at=purchase.paid_at or purchase.purchased_at,
+        description=purchase.product.title,
+        stripe_payment=stripe_payment
+    )
+
+
+@_safely
+def record_product_purchases(purchases, stripe_payment=None):
+    """Charges for the purchases of a digital product cart checkout"""
+    return record_entries([
+        dict(
+            teacher=purchase.product.teacher,
+            student=purchase.student,
+            domain='digital_products',
+            source_type=LedgerEntry.PRODUCT_PURCHASE,
+            source_id=purchase.id,
+            amount=purchase.payment_amount,
+            occurred_at=purchase.paid_at or purchase.purchased_at,
+            description=purchase.product.title,
+            stripe_payment=stripe_payment
+        )
+        for purchase in purchases
+    ])
+
+
+# =============================================================================
+# READING
+# =============================================================================
+
+def ledger_entries(teacher, start_date=None, end_date=None, domain=None):
+    """A teacher's ledger entries, optionally limited to a period and domain"""
+    entries = LedgerEntry.objects.filter(teacher=teacher)
+    if start_date:
+        entries = entries.filter(occurred_at__gte=start_date)
+    if end_date:
+        entries = entries.filter(occurred_at__lte=end_date)
+    if domain:
+        entries = entries.filter(domain=domain)
+    return entries
+
+
+def summarise_ledger(entries) -> Dict[Tuple[str, str, str], Dict]:
+    """
+    Total a set of ledger entries in one grouped query.
+
+    Returns:
+        {
+            (domain, source_type, entry_type): {
+                'gross': Decimal, 'commission': Decimal, 'net': Decimal, 'count': int
+            },
+            ...
+        }
+    """
+    rows = entries.order_by().values('domain', 'source_type', 'entry_type').annotate(
+        gross=Sum('gross_amount'),
+        commission=Sum('commission_amount'),
+        net=Sum('net_amount'),
+        count=Count('id')
+    )
+    return {
+        (row['domain'], row['source_type'], row['entry_type']): {
+            'gross': row['gross'] or ZERO,
+            'commission': row['commission'] or ZERO,
+            'net': row['net'] or ZERO,
+            'count': row['count'],
+        }
+        for row in rows
+    }
+
+
+def ledger_totals(summary: Dict, domain=None, source_types=None) -> Dict:
+    """
+    Combine summarise_ledger() groups into gross/commission/net totals.
+    'count' is the number of charges; refunds only reduce the amounts.
+    """
+    totals = {'gross': ZERO, 'commission': ZERO, 'net': ZERO, 'count': 0}
+    for (row_domain, source_type, entry_type), row in summary.items():
+        if domain and row_domain != domain:
+            continue
+        if source_types and source_type not in source_types:
+            continue
+        totals['gross'] += row['gross']
+        totals['commission'] += row['commission']
+        totals['net'] += row['net']
+        if entry_type == LedgerEntry.CHARGE:
+            totals['count'] += row['count']
+    return totals
+
+
+def transaction_feed(teacher, cursor: Optional[str] = None, limit: int = 20, domain=None) -> Tuple[List[LedgerEntry], Optional[str]]:
+    """
+    One page of a teacher's charges and refunds, newest first.
+
+    Pages are keyed on (occurred_at, id) rather than offsets, so a page deep
+    in the history costs the same as the first and entries recorded while
+    paging never shift or repeat rows.
+
+    Args:
+        cursor: next_cursor from the previous page (None for the first page)
+        limit: Entries per page
+
+    Returns:
+        (entries, next_cursor) - next_cursor is None on the last page
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    entries = ledger_entries(teacher, domain=domain).select_related('student')
+
+    if cursor:
+        occurred_at, entry_id = keyset.decode_cursor(cursor)
+        entries = entries.filter(
+            Q(occurred_at__lt=occurred_at) | Q(occurred_at=occurred_at, id__lt=int(entry_id))
+        )
+
+    page = list(entries.order_by('-occurred_at', '-id')[:limit + 1])
+    if len(page) > limit:
+        page = page[:limit]
+        return page, keyset.encode_cursor(page[-1].occurred_at, page[-1].pk)
+    return page, None
@@ -0,0 +1,352 @@
+"""
+Checkout and Webhook Load Test
+
+Drives complete checkouts through stripe_service.py and StripeWebhookView
+against the local Stripe stand-in (fake_stripe.py), shared by the
+payments_load_test management command and the payments tests.
+
+For every simulated checkout, on a pool of worker threads:
+1. create the Checkout Session through stripe_service (HTTP to FakeStripe)
+2. pay it, which makes FakeStripe sign and deliver checkout.session.completed
+   and payment_intent.succeeded to the webhook through the full middleware
+   stack
+3. process each event from the webhook inbox, counting its queries
+
+- build_checkouts(): per-domain fixtures (workshop carts, course enrollments,
+  private lesson orders, digital product carts) and the stripe_service call
+  each checkout makes
+- run_load_test(): runs the checkouts concurrently and returns per-domain
+  latency percentiles, queries per event and error rates
+"""
+
+import logging
+import time
+import traceback
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta, time as clock
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import stripe_service, webhook_inbox
+from .fake_stripe import FakeStripe
+from .models import WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+DOMAINS = ('workshops', 'courses', 'private_teaching', 'digital_products')
+ITEMS_PER_CART = 3
+SUCCESS_URL = 'http://localhost/checkout/success/?session_id={CHECKOUT_SESSION_ID}'
+CANCEL_URL = 'http://localhost/checkout/cancel/'
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile (None for no values)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def _student(prefix: str, index: int):
+    return User.objects.create_user(username=f'{prefix}_{index}', email=f'{prefix}_{index}@example.com')
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+def _workshop_checkouts(count: int, prefix: str) -> List[Dict]:
+    from apps.private_teaching.models import Cart
+    from apps.workshops.models import Workshop, WorkshopSession, WorkshopCartItem
+
+    instructor = User.objects.create_user(username=f'{prefix}_instructor', email=f'{prefix}_instructor@example.com')
+    workshop = Workshop.objects.create(
+        title='Load Test Workshop', slug=f'{prefix}-workshop', description='Load test',
+        short_description='Load test', learning_objectives='Load test', instructor=instructor,
+        is_free=False, price=Decimal('15.00'), status='published'
+    )
+    start = timezone.now() + timedelta(days=14)
+    sessions = [
+        WorkshopSession.objects.create(
+            workshop=workshop,
+            start_datetime=start + timedelta(days=index),
+            end_datetime=start + timedelta(days=index, hours=2),
+            max_participants=count + 10
+        )
+        for index in range(ITEMS_PER_CART)
+    ]
+
+    checkouts = []
+    for index in range(count):
+        student = _student(f'{prefix}_workshop_student', index)
+        cart = Cart.objects.create(user=student)
+        items = [
+            WorkshopCartItem.objects.create(cart=cart, session=session, price=workshop.price)
+            for session in sessions
+        ]
+        checkouts.append({
+            'create': stripe_service.create_checkout_session_with_items,
+            'kwargs': dict(
+                line_items=[
+                    {'name': workshop.title, 'description': f'{item.session.start_datetime:%b %d, %Y}', 'amount': item.price}
+                    for item in items
+                ],
+                student=student,
+                teacher=instructor,
+                domain='workshops',
+                metadata={'cart_item_ids': ','.join(str(item.id) for item in items), 'item_count': len(items)},
+            ),
+        })
+    return checkouts
+
+
+def _course_checkouts(count: int, prefix: str) -> List[Dict]:
+    from apps.courses.models import Course, CourseEnrollment
+
+    instructor = User.objects.create_user(username=f'{prefix}_course_instructor', email=f'{prefix}_course_instructor@example.com')
+    course = Course.objects.create(
+        title='Load Test Course', slug=f'{prefix}-course', description='Load test',
+        cost=Decimal('30.00'), instructor=instructor, status='published'
+    )
+
+    checkouts = []
+    for index in range(count):
+        student = _student(f'{prefix}_course_student', index)
+        enrollment = CourseEnrollment.objects.create(
+            course=course, student=student, payment_status='pending', payment_amount=course.cost
+        )
+        checkouts.append({
+            'create': stripe_service.create_checkout_session,
+            'kwargs': dict(
+                amount=course.cost,
+                student=student,
+                teacher=instructor,
+                domain='courses',
+                metadata={'enrollment_id': str(enrollment.id), 'course_id': str(course.id), 'child_id': ''},
+                item_name=course.title,
+            ),
+        })
+    return checkouts
+
+
+def _private_teaching_checkouts(count: int, prefix: str) -> List[Dict]:
+    from lessons.models import Lesson
+    from apps.private_teaching.models import LessonRequest, Order, OrderItem, Subject
+
+    teacher = User.objects.create_user(username=f'{prefix}_teacher', email=f'{prefix}_teacher@example.com')
+    subject = Subject.objects.create(teacher=teacher, subject='Recorder', base_price_60min=Decimal('40.00'))
+    first_day = date.today() + timedelta(days=7)
+
+    checkouts = []
+    for index in range(count):
+        student = _student(f'{prefix}_lesson_student', index)
+        lesson_request = LessonRequest.objects.create(student=student)
+        lessons = [
+            Lesson.objects.create(
+                lesson_request=lesson_request, student=student, teacher=teacher, subject=subject,
+                lesson_date=first_day + timedelta(days=number * 7), lesson_time=clock(9 + index % 10, 0),
+                duration_in_minutes='60', location='Online', approved_status='Accepted', status='Assigned'
+            )
+            for number in range(ITEMS_PER_CART)
+        ]
+        order = Order.objects.create(
+            student=student, total_amount=subject.base_price_60min * len(lessons),
+            payment_status='pending', payment_method='stripe'
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, lesson=lesson, price_paid=subject.base_price_60min) for lesson in lessons
+        ])
+        checkouts.append({
+            'create': stripe_service.create_checkout_session,
+            'kwargs': dict(
+                amount=order.total_amount,
+                student=student,
+                teacher=teacher,
+                domain='private_teaching',
+                metadata={'order_id': str(order.id), 'lesson_ids': ','.join(str(lesson.id) for lesson in lessons)},
+            ),
+        })
+    return checkouts
+
+
+def _digital_product_checkouts(count: int, prefix: str) -> List[Dict]:
+    from apps.digital_products.models import DigitalProduct, DigitalProductCartItem
+    from apps.private_teaching.models import Cart
+
+    teacher = User.objects.create_user(username=f'{prefix}_product_teacher', email=f'{prefix}_product_teacher@example.com')
+    products = [
+        DigitalProduct.objects.create(
+            slug=f'{prefix}-product-{index}', title=f'Load Test Product {index}', short_description='Load test',
+            teacher=teacher, product_type=DigitalProduct.PRODUCT_TYPE_CHOICES[0][0],
+            price=Decimal('8.00'), status='published'
+        )
+        for index in range(ITEMS_PER_CART)
+    ]
+
+    checkouts = []
+    for index in range(count):
+        student = _student(f'{prefix}_product_student', index)
+        cart = Cart.objects.create(user=student)
+        DigitalProductCartItem.objects.bulk_create([
+            DigitalProductCartItem(cart=cart, product=product, price=product.price) for product in products
+        ])
+        checkouts.append({
+            'create': stripe_service.create_checkout_session_with_items,
+            'kwargs': dict(
+                line_items=[{'name': product.title, 'amount': product.price} for product in products],
+                student=student,
+                teacher=teacher,
+                domain='digital_products',
+                metadata={'product_ids': ','.join(str(product.id) for product in products), 'cart_id': str(cart.id)},
+            ),
+        })
+    return checkouts
+
+
+BUILDERS: Dict[str, Callable[[int, str], List[Dict]]] = {
+    'workshops': _workshop_checkouts,
+    'courses': _course_checkouts,
+    'private_teaching': _private_teaching_checkouts,
+    'digital_products': _digital_product_checkouts,
+}
+
+
+def build_checkouts(domain: str, count: int, prefix: str = 'loadtest') -> List[Dict]:
+    """
+    Create fixtures for count checkouts in a domain.
+
+    Returns:
+        [{'create': stripe_service function, 'kwargs': {...}}, ...]
+    """
+    return BUILDERS[domain](count, f'{prefix}_{domain}')
+
+
+# =============================================================================
+# DRIVER
+# =============================================================================
+
+def _deliver_in_process(payload: str, signature: str) -> int:
+    """FakeStripe deliver callable: POST to the webhook through the test client"""
+    response = Client().post(
+        reverse('payments:stripe_webhook'), payload,
+        content_type='application/json', HTTP_STRIPE_SIGNATURE=signature
+    )
+    return response.status_code
+
+
+def _run_checkout(fake: FakeStripe, checkout: Dict) -> Dict:
+    """One checkout, start to finish. Never raises; failures are recorded"""
+    started = time.perf_counter()
+    result = {
+        'checkout_ms': None, 'ack_ms': [], 'process_ms': [], 'queries': [], 'total_ms': None, 'error': None,
+        'started': started, 'finished': None,
+    }
+    try:
+        session = checkout['create'](
+            success_url=SUCCESS_URL, cancel_url=CANCEL_URL, **checkout['kwargs']
+        )
+        result['checkout_ms'] = (time.perf_counter() - started) * 1000
+
+        for delivery in fake.complete_checkout(session.id):
+            if delivery['status'] != 200:
+                raise RuntimeError(f"Webhook returned {delivery['status']} for {delivery['event']['type']}")
+            result['ack_ms'].append(delivery['ms'])
+
+            webhook_event = WebhookEvent.objects.get(stripe_event_id=delivery['event']['id'])
+            if not webhook_inbox.claim(webhook_event.pk):
+                raise RuntimeError(f'Event {webhook_event.stripe_event_id} was already claimed')
+            webhook_event.refresh_from_db()
+            event_started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                processed = webhook_inbox.process_event(webhook_event)
+            result['process_ms'].append((time.perf_counter() - event_started) * 1000)
+            result['queries'].append(len(queries))
+            if not processed:
+                raise RuntimeError(webhook_event.last_error.strip().splitlines()[-1])
+
+        result['total_ms'] = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+        logger.debug(traceback.format_exc())
+    finally:
+        connection.close()
+        result['finished'] = time.perf_counter()
+    return result
+
+
+def _summarise(values: List[float]) -> Dict:
+    return {
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': max(values) if values else None,
+    }
+
+
+def run_load_test(checkouts: Dict[str, List[Dict]], concurrency: int = 8) -> Dict[str, Dict]:
+    """
+    Run every checkout concurrently against a FakeStripe server.
+
+    Args:
+        checkouts: {domain: build_checkouts(domain, ...)}
+        concurrency: Worker threads (checkouts in flight at once)
+
+    Returns:
+        {
+            domain: {
+                'checkouts': int, 'errors': int, 'error_rate': float,
+                'throughput': checkouts per second while the domain's checkouts ran,
+                'checkout_ms' / 'ack_ms' / 'process_ms' / 'total_ms':
+                    {'p50', 'p95', 'p99', 'max'},
+                'queries_per_event': {'avg', 'max'},
+                'sample_errors': [str, ...],
+            },
+            ...
+        }
+    """
+    secret = settings.STRIPE_WEBHOOK_SECRET or 'whsec_load_test'
+    fake = FakeStripe(secret, deliver=_deliver_in_process)
+
+    jobs = [(domain, checkout) for domain, items in checkouts.items() for checkout in items]
+    results = defaultdict(list)
+
+    # Processing is driven here, one claimed event at a time, instead of by the inbox thread pool
+    with override_settings(STRIPE_WEBHOOK_SECRET=secret, WEBHOOK_INBOX_WORKERS=0), fake.patched():
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='load-test') as pool:
+            futures = [(domain, pool.submit(_run_checkout, fake, checkout)) for domain, checkout in jobs]
+            for domain, future in futures:
+                results[domain].append(future.result())
+
+    report = {}
+    for domain, domain_results in results.items():
+        errors = [result['error'] for result in domain_results if result['error']]
+        queries = [count for result in domain_results for count in result['queries']]
+        elapsed = max(r['finished'] for r in domain_results) - min(r['started'] for r in domain_results)
+        report[domain] = {
+            'checkouts': len(domain_results),
+            'errors': len(errors),
+            'error_rate': len(errors) / len(domain_results),
+            'throughput': len(domain_results) / elapsed if elapsed else None,
+            'checkout_ms': _summarise([r['checkout_ms'] for r in domain_results if r['checkout_ms'] is not None]),
+            'ack_ms': _summarise([ms for r in domain_results for ms in r['ack_ms']]),
+            'process_ms': _summarise([ms for r in domain_results for ms in r['process_ms']]),
+            'total_ms': _summarise([r['total_ms'] for r in domain_results if r['total_ms'] is not None]),
+            'queries_per_event': {
+                'avg': sum(queries) / len(queries) if queries else None,
+                'max': max(queries) if queries else None,
+            },
+            'sample_errors': sorted(set(errors))[:5],
+        }
+    return report
@@ -0,0 +1,158 @@
+"""
+Management command to backfill the revenue ledger from existing payment records.
+
+Records a ledger entry for every completed workshop registration, course
+enrollment, private lesson order item, exam registration and digital product
+purchase, plus every processed course, lesson and workshop refund. Entries are
+keyed by their source, so the command is safe to re-run: anything already in
+the ledger is skipped.
+
+Usage:
+    python manage.py backfill_revenue_ledger
+    python manage.py backfill_revenue_ledger --dry-run
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.payments import ledger
+from apps.payments.models import LedgerEntry, StripePayment
+
+
+class Command(BaseCommand):
+    help = 'Backfill the revenue ledger from existing payments and refunds'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many entries would be created without saving them',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Rows fetched per database round trip',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        chunk_size = options['chunk_size']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made\n'))
+
+        with transaction.atomic():
+            before = LedgerEntry.objects.count()
+
+            for label, sources, recorder in self.get_sources():
+                created_before = LedgerEntry.objects.count()
+                processed = 0
+                for source in sources.iterator(chunk_size=chunk_size):
+                    recorder(source)
+                    processed += 1
+                created = LedgerEntry.objects.count() - created_before
+                self.stdout.write(f'  {label}: {processed} checked, {created} new entries')
+
+            created_total = LedgerEntry.objects.count() - before
+
+            if dry_run:
+                transaction.set_rollback(True)
+
+        self.stdout.write('\n' + '='*60)
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS('\nDRY RUN COMPLETE'))
+            self.stdout.write(f'Would create {created_total} ledger entries')
+        else:
+            self.stdout.write(self.style.SUCCESS('\nCOMPLETE'))
+            self.stdout.write(f'Created {created_total} ledger entries')
+
+        self.stdout.write('')
+
+    def get_sources(self):
+        """(label, queryset, recorder) for every kind of ledger entry"""
+        from apps.workshops.models import WorkshopRegistration
+        from apps.courses.models import CourseEnrollment, CourseCancellationRequest
+        from apps.private_teaching.models import Order, LessonCancellationRequest, ExamRegistration
+        from apps.digital_products.models import ProductPurchase
+
+        refunded_payments = {
+            payment.stripe_payment_intent_id: payment
+            for payment in StripePayment.objects.filter(status='refunded', domain='workshops')
+        }
+
+        def record_workshop_refund(registration):
+            stripe_payment = refunded_payments.get(registration.stripe_payment_intent_id)
+            if stripe_payment:
+                ledger.record_workshop_refund(
+                    registration,
+                    stripe_payment=stripe_payment,
+                    occurred_at=stripe_payment.refunded_at
+                )
+
+        return [
+            (
+                'Workshop registrations',
+                WorkshopRegistration.objects.filter(
+                    payment_status__in=['paid', 'completed'],
+                    payment_amount__gt=0
+                ).select_related('session__workshop__instructor', 'student'),
+                ledger.record_workshop_registration,
+            ),
+            (
+                'Workshop refunds',
+                WorkshopRegistration.objects.filter(
+                    status='cancelled',
+                    payment_status__in=['paid', 'completed'],
+                    payment_amount__gt=0,
+                    stripe_payment_intent_id__in=list(refunded_payments)
+                ).select_related('session__workshop__instructor', 'student'),
+                record_workshop_refund,
+            ),
+            (
+                'Course enrollments',
+                CourseEnrollment.objects.filter(
+                    payment_status='completed',
+                    payment_amount__gt=0
+                ).select_related('course__instructor', 'student'),
+                ledger.record_course_enrollment,
+            ),
+            (
+                'Course refunds',
+                CourseCancellationRequest.objects.filter(
+                    status=CourseCancellationRequest.COMPLETED,
+                    refund_processed_at__isnull=False,
+                    refund_amount__gt=0
+                ).select_related('enrollment__course__instructor', 'enrollment__student'),
+                ledger.record_course_refund,
+            ),
+            (
+                'Private lesson orders',
+                Order.objects.filter(payment_status='completed').select_related('student'),
+                ledger.record_order,
+            ),
+            (
+                'Private lesson refunds',
+                LessonCancellationRequest.objects.filter(
+                    status=LessonCancellationRequest.COMPLETED,
+                    refund_processed_at__isnull=False,
+                    refund_amount__gt=0
+                ).select_related('teacher', 'student', 'lesson__subject'),
+                ledger.record_lesson_refund,
+            ),
+            (
+                'Exam registrations',
+                ExamRegistration.objects.filter(payment_status='completed').select_related(
+                    'teacher', 'student', 'subject', 'exam_board'
+                ),
+                ledger.record_exam_registration,
+            ),
+            (
+                'Digital product purchases',
+                ProductPurchase.objects.filter(
+                    payment_status='completed',
+                    payment_amount__gt=0
+                ).select_related('product__teacher', 'student'),
+                ledger.record_product_purchase,
+            ),
+        ]
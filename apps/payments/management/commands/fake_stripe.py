@@ -0,0 +1,51 @@
+"""
+Management command to run the local Stripe stand-in for development.
+
+Serves the Checkout Session, Payment Intent and Refund endpoints used by
+stripe_service.py and posts signed webhook events to this site's webhook.
+Start it, then run the site with STRIPE_API_BASE pointing at it:
+
+    python manage.py fake_stripe
+    STRIPE_API_BASE=http://127.0.0.1:12111 python manage.py runserver
+
+Checkout redirects go to the stand-in's /pay/<session id> page, which pays
+immediately and sends the browser back to the success URL.
+
+Usage:
+    python manage.py fake_stripe
+    python manage.py fake_stripe --port 12111 --webhook-url http://localhost:8000/payments/webhook/
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from apps.payments.fake_stripe import FakeStripe, http_deliverer
+
+
+class Command(BaseCommand):
+    help = 'Run a local stand-in for the Stripe API that sends signed webhooks to this site'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on')
+        parser.add_argument('--port', type=int, default=12111, help='Port to listen on')
+        parser.add_argument('--webhook-url', help='Webhook endpoint (default: SITE_URL + the payments webhook path)')
+
+    def handle(self, *args, **options):
+        if not settings.STRIPE_WEBHOOK_SECRET:
+            raise CommandError('STRIPE_WEBHOOK_SECRET must be set so webhook signatures can be verified')
+
+        webhook_url = options['webhook_url'] or settings.SITE_URL.rstrip('/') + reverse('payments:stripe_webhook')
+        fake = FakeStripe(settings.STRIPE_WEBHOOK_SECRET, deliver=http_deliverer(webhook_url))
+        base_url = fake.serve(options['host'], options['port'])
+
+        self.stdout.write(self.style.SUCCESS(f'Fake Stripe API listening on {base_url}'))
+        self.stdout.write(f'Delivering webhooks to {webhook_url}')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            fake.shutdown()
+            self.stdout.write(f'Stopped after {len(fake.events)} events')
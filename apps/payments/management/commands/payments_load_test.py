@@ -0,0 +1,105 @@
+"""
+Management command to load test checkouts and the Stripe webhook.
+
+Creates a throwaway test database (as `manage.py test` does), builds
+fixtures for each domain, then runs the checkouts concurrently against the
+local Stripe stand-in: Checkout Session creation through stripe_service,
+signed webhook delivery through the full middleware stack, and inbox
+processing. Nothing touches the configured database and no emails leave
+the process.
+
+Reports, per domain: throughput, error rate, p50/p95/p99/max latency for
+session creation, webhook acknowledgement, event processing and the whole
+checkout, and database queries per webhook event.
+
+Usage:
+    python manage.py payments_load_test
+    python manage.py payments_load_test --checkouts 200 --concurrency 16
+    python manage.py payments_load_test --domains workshops,digital_products
+"""
+
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from apps.payments.load_test import DOMAINS, build_checkouts, run_load_test
+
+
+class Command(BaseCommand):
+    help = 'Simulate concurrent checkouts per domain against a local Stripe stand-in and report latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checkouts', type=int, default=50, help='Checkouts per domain')
+        parser.add_argument('--concurrency', type=int, default=8, help='Checkouts in flight at once')
+        parser.add_argument('--domains', default=','.join(DOMAINS), help='Comma-separated domains to exercise')
+
+    def handle(self, *args, **options):
+        domains = [domain.strip() for domain in options['domains'].split(',') if domain.strip()]
+        unknown = set(domains) - set(DOMAINS)
+        if unknown:
+            raise CommandError(f"Unknown domain(s): {', '.join(sorted(unknown))}. Choose from {', '.join(DOMAINS)}")
+        if options['checkouts'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--checkouts and --concurrency must be at least 1')
+
+        # Worker threads need a database they can share, so SQLite gets a
+        # temporary file instead of the in-memory test database. SQLite allows
+        # one writer at a time; IMMEDIATE transactions make the others wait
+        # for the lock instead of failing. Production (PostgreSQL) needs none of this.
+        sqlite_path = None
+        if connection.vendor == 'sqlite':
+            sqlite_path = os.path.join(tempfile.mkdtemp(), 'payments_load_test.sqlite3')
+            connection.settings_dict['TEST']['NAME'] = sqlite_path
+            connection.settings_dict['OPTIONS'].update(transaction_mode='IMMEDIATE', timeout=30)
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write(f"Building {options['checkouts']} checkout(s) for {', '.join(domains)}...")
+            checkouts = {domain: build_checkouts(domain, options['checkouts']) for domain in domains}
+
+            self.stdout.write(f"Running with concurrency {options['concurrency']}...")
+            report = run_load_test(checkouts, concurrency=options['concurrency'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            if sqlite_path:
+                connection.settings_dict['TEST']['NAME'] = None
+
+        self.print_report(report)
+
+        failed = sum(result['errors'] for result in report.values())
+        if failed:
+            raise CommandError(f'{failed} checkout(s) failed')
+        self.stdout.write(self.style.SUCCESS('All checkouts completed'))
+
+    def print_report(self, report):
+        def ms(value):
+            return f'{value:.1f}' if value is not None else '-'
+
+        for domain, result in report.items():
+            self.stdout.write('\n' + '=' * 72)
+            self.stdout.write(
+                f"{domain}: {result['checkouts']} checkouts, {result['throughput']:.1f}/s, "
+                f"{result['errors']} errors ({result['error_rate']:.1%})"
+            )
+            self.stdout.write('=' * 72)
+            self.stdout.write(f"{'latency (ms)':<24}{'p50':>12}{'p95':>12}{'p99':>12}{'max':>12}")
+            for key, label in (
+                ('checkout_ms', 'create session'),
+                ('ack_ms', 'webhook ack'),
+                ('process_ms', 'process event'),
+                ('total_ms', 'whole checkout'),
+            ):
+                stats = result[key]
+                self.stdout.write(
+                    f"{label:<24}{ms(stats['p50']):>12}{ms(stats['p95']):>12}{ms(stats['p99']):>12}{ms(stats['max']):>12}"
+                )
+            queries = result['queries_per_event']
+            if queries['avg'] is not None:
+                self.stdout.write(f"queries per event: avg {queries['avg']:.1f}, max {queries['max']}")
+            for error in result['sample_errors']:
+                self.stdout.write(self.style.ERROR(f'  ✗ {error}'))
+        self.stdout.write('')
@@ -0,0 +1,95 @@
+"""
+Management command to process the Stripe webhook inbox.
+
+The web process drains the inbox in background threads as events arrive.
+This command is the standalone worker: it processes retries as they fall due,
+picks up events left behind by a restart, and is the only worker when
+WEBHOOK_INBOX_WORKERS is 0. Run it under systemd/supervisor, or from cron
+with --once.
+
+Usage:
+    python manage.py process_webhook_inbox
+    python manage.py process_webhook_inbox --workers 4
+    python manage.py process_webhook_inbox --once
+    python manage.py process_webhook_inbox --requeue-dead
+    python manage.py process_webhook_inbox --stats
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from apps.payments import webhook_inbox
+
+
+def _drain_worker():
+    try:
+        return webhook_inbox.drain()
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Process pending Stripe webhook events with retries and dead-lettering'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Events processed in parallel')
+        parser.add_argument('--once', action='store_true', help='Drain the inbox once and exit')
+        parser.add_argument('--poll-interval', type=float, default=5, help='Seconds between polls when the inbox is empty')
+        parser.add_argument('--requeue-dead', action='store_true', help='Give dead-lettered events a fresh set of attempts and exit')
+        parser.add_argument('--stats', action='store_true', help='Show queue depth and processing times and exit')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+
+        if options['stats']:
+            self.show_stats()
+            return
+
+        if options['requeue_dead']:
+            requeued = webhook_inbox.requeue_dead()
+            self.stdout.write(self.style.SUCCESS(f'Requeued {requeued} dead-lettered events'))
+            return
+
+        self.stdout.write(f"Processing webhook inbox with {options['workers']} worker(s)")
+        try:
+            while True:
+                close_old_connections()
+                stale = webhook_inbox.requeue_stale()
+                if stale:
+                    self.stdout.write(self.style.WARNING(f'Requeued {stale} events abandoned mid-attempt'))
+
+                processed, failed = self.drain(options['workers'])
+                if processed or failed:
+                    self.stdout.write(f'Processed {processed}, failed {failed}')
+
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS('Webhook inbox worker stopped'))
+
+    def drain(self, workers):
+        if workers == 1:
+            results = [webhook_inbox.drain()]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='webhook-inbox') as pool:
+                results = list(pool.map(lambda _: _drain_worker(), range(workers)))
+        return sum(r['processed'] for r in results), sum(r['failed'] for r in results)
+
+    def show_stats(self):
+        stats = webhook_inbox.inbox_stats()
+        for status, count in stats['counts'].items():
+            self.stdout.write(f'{status:>12}: {count}')
+        if stats['oldest_due']:
+            self.stdout.write(f"Oldest due event received {stats['oldest_due']:%Y-%m-%d %H:%M:%S}")
+        if stats['avg_ms'] is not None:
+            self.stdout.write(
+                f"Processing time: avg {stats['avg_ms']:.0f}ms, "
+                f"p95 {stats['p95_ms']}ms, max {stats['max_ms']}ms"
+            )
@@ -0,0 +1,37 @@
+"""
+Management command to rebuild the day/month/UK tax year revenue rollups from the ledger.
+
+Rollups are kept up to date as ledger entries are recorded, including by
+backfill_revenue_ledger. Run this to repair drift or after changing how
+buckets are computed.
+
+Usage:
+    python manage.py rebuild_revenue_rollups
+    python manage.py rebuild_revenue_rollups --teacher 42
+"""
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.payments.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild revenue rollups (day, month, tax year) from the revenue ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teacher', type=int, help='Only rebuild rollups for this teacher (user ID)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Ledger rows fetched per database round trip')
+
+    def handle(self, *args, **options):
+        teacher = None
+        if options['teacher']:
+            try:
+                teacher = User.objects.get(pk=options['teacher'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['teacher']} not found")
+
+        written = rebuild_rollups(teacher=teacher, chunk_size=options['chunk_size'])
+
+        scope = f'teacher {teacher.username}' if teacher else 'all teachers'
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} rollup rows for {scope}'))
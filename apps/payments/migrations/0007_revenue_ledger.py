@@ -0,0 +1,43 @@
+# Generated by Django 5.2.9 on 2026-10-16 19:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_alter_stripepayment_domain'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(choices=[('workshops', 'Workshops'), ('courses', 'Courses'), ('private_teaching', 'Private Teaching'), ('digital_products', 'Digital Products')], max_length=50)),
+                ('entry_type', models.CharField(choices=[('charge', 'Charge'), ('refund', 'Refund')], default='charge', max_length=20)),
+                ('source_type', models.CharField(choices=[('workshop_registration', 'Workshop Registration'), ('course_enrollment', 'Course Enrollment'), ('course_cancellation', 'Course Cancellation'), ('order_item', 'Private Lesson'), ('lesson_cancellation', 'Private Lesson Cancellation'), ('exam_registration', 'Exam Registration'), ('product_purchase', 'Digital Product Purchase')], max_length=50)),
+                ('source_id', models.CharField(max_length=64)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('gross_amount', models.DecimalField(decimal_places=2, help_text='Amount paid by (or refunded to) the student', max_digits=10)),
+                ('commission_amount', models.DecimalField(decimal_places=2, help_text='Platform commission', max_digits=10)),
+                ('net_amount', models.DecimalField(decimal_places=2, help_text='Teacher share', max_digits=10)),
+                ('currency', models.CharField(default='gbp', max_length=3)),
+                ('occurred_at', models.DateTimeField(help_text='When the payment or refund happened')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('stripe_payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='payments.stripepayment')),
+                ('student', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_payments', to=settings.AUTH_USER_MODEL)),
+                ('teacher', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Ledger Entry',
+                'verbose_name_plural': 'Ledger Entries',
+                'ordering': ['-occurred_at', '-id'],
+                'indexes': [models.Index(fields=['teacher', 'occurred_at'], name='payments_le_teacher_30e665_idx')],
+                'constraints': [models.UniqueConstraint(fields=('source_type', 'source_id', 'entry_type'), name='unique_ledger_entry_per_source')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.9 on 2026-10-16 19:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_revenue_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(choices=[('workshops', 'Workshops'), ('courses', 'Courses'), ('private_teaching', 'Private Teaching'), ('digital_products', 'Digital Products')], max_length=50)),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month'), ('tax_year', 'UK Tax Year')], max_length=20)),
+                ('period_start', models.DateField(help_text='First day of the bucket (April 6 for tax years)')),
+                ('gross_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('commission_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('net_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('refund_amount', models.DecimalField(decimal_places=2, default=0, help_text='Total refunded (positive)', max_digits=12)),
+                ('charge_count', models.PositiveIntegerField(default=0)),
+                ('refund_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Revenue Rollup',
+                'verbose_name_plural': 'Revenue Rollups',
+                'ordering': ['teacher', 'period', 'period_start'],
+                'indexes': [models.Index(fields=['teacher', 'period', 'period_start'], name='payments_re_teacher_568af5_idx')],
+                'constraints': [models.UniqueConstraint(fields=('teacher', 'domain', 'period', 'period_start'), name='unique_revenue_rollup_bucket')],
+            },
+        ),
+    ]
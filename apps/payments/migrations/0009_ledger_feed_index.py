@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-16 19:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0008_revenue_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ledgerentry',
+            name='payments_le_teacher_30e665_idx',
+        ),
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['teacher', 'occurred_at', 'id'], name='payments_le_teacher_03c89a_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0009_ledger_feed_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='revenuerollup',
+            index=models.Index(fields=['period', 'period_start'], name='payments_re_period_2050c7_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0010_rollup_platform_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stripe_event_id', models.CharField(max_length=255, unique=True)),
+                ('event_type', models.CharField(max_length=100)),
+                ('payload', models.JSONField(help_text='Verified event body as received from Stripe')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('processed', 'Processed'), ('failed', 'Failed (will retry)'), ('dead', 'Dead letter')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Not claimed again before this time')),
+                ('locked_at', models.DateTimeField(blank=True, help_text='When a worker claimed the event', null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('processing_ms', models.PositiveIntegerField(blank=True, help_text='Duration of the last attempt', null=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Webhook Event',
+                'verbose_name_plural': 'Webhook Events',
+                'ordering': ['received_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='payments_we_status_a02aee_idx')],
+            },
+        ),
+    ]
@@ -94,3 +94,230 @@ class StripePayment(models.Model):
         if self.status != 'refunded' or not self.refund_amount:
             return False
         return self.refund_amount < self.total_amount
+
+
+class LedgerEntry(models.Model):
+    """
+    Append-only revenue ledger: one row per charge or refund.
+
+    Written when a payment completes or a refund is processed (see ledger.py)
+    and never updated afterwards. Corrections are new rows. Gross, commission
+    and teacher net amounts are fixed at the time of the event, so revenue
+    reports are a single scan over (teacher, occurred_at).
+    """
+
+    CHARGE = 'charge'
+    REFUND = 'refund'
+
+    ENTRY_TYPE_CHOICES = [
+        (CHARGE, 'Charge'),
+        (REFUND, 'Refund'),
+    ]
+
+    # Source objects (one charge and at most one refund per source)
+    WORKSHOP_REGISTRATION = 'workshop_registration'
+    COURSE_ENROLLMENT = 'course_enrollment'
+    COURSE_CANCELLATION = 'course_cancellation'
+    ORDER_ITEM = 'order_item'
+    LESSON_CANCELLATION = 'lesson_cancellation'
+    EXAM_REGISTRATION = 'exam_registration'
+    PRODUCT_PURCHASE = 'product_purchase'
+
+    SOURCE_TYPE_CHOICES = [
+        (WORKSHOP_REGISTRATION, 'Workshop Registration'),
+        (COURSE_ENROLLMENT, 'Course Enrollment'),
+        (COURSE_CANCELLATION, 'Course Cancellation'),
+        (ORDER_ITEM, 'Private Lesson'),
+        (LESSON_CANCELLATION, 'Private Lesson Cancellation'),
+        (EXAM_REGISTRATION, 'Exam Registration'),
+        (PRODUCT_PURCHASE, 'Digital Product Purchase'),
+    ]
+
+    # Labels used in transaction lists
+    TYPE_LABELS = {
+        WORKSHOP_REGISTRATION: 'Workshop',
+        COURSE_ENROLLMENT: 'Course',
+        COURSE_CANCELLATION: 'Course',
+        ORDER_ITEM: 'Private Lesson',
+        LESSON_CANCELLATION: 'Private Lesson',
+        EXAM_REGISTRATION: 'Exam Registration',
+        PRODUCT_PURCHASE: 'Digital Product',
+    }
+
+    teacher = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='ledger_entries')
+    student = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_payments')
+    domain = models.CharField(max_length=50, choices=StripePayment.DOMAIN_CHOICES)
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPE_CHOICES, default=CHARGE)
+
+    # What the entry was recorded for
+    source_type = models.CharField(max_length=50, choices=SOURCE_TYPE_CHOICES)
+    source_id = models.CharField(max_length=64)
+    description = models.CharField(max_length=255, blank=True)
+
+    # Financial details (negative for refunds)
+    gross_amount = models.DecimalField(max_digits=10, decimal_places=2, help_text="Amount paid by (or refunded to) the student")
+    commission_amount = models.DecimalField(max_digits=10, decimal_places=2, help_text="Platform commission")
+    net_amount = models.DecimalField(max_digits=10, decimal_places=2, help_text="Teacher share")
+    currency = models.CharField(max_length=3, default='gbp')
+
+    stripe_payment = models.ForeignKey(
+        StripePayment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ledger_entries'
+    )
+
+    # Timestamps
+    occurred_at = models.DateTimeField(help_text="When the payment or refund happened")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-occurred_at', '-id']
+        verbose_name = 'Ledger Entry'
+        verbose_name_plural = 'Ledger Entries'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source_type', 'source_id', 'entry_type'],
+                name='unique_ledger_entry_per_source'
+            ),
+        ]
+        indexes = [
+            # Also serves the keyset transaction feed, ordered by (occurred_at, id)
+            models.Index(fields=['teacher', 'occurred_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_entry_type_display()} - {self.domain} - £{self.gross_amount}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Ledger entries are append-only; record a new entry instead")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Ledger entries are append-only and cannot be deleted")
+
+    @property
+    def is_refund(self):
+        return self.entry_type == self.REFUND
+
+    @property
+    def display_type(self):
+        """Label for transaction lists, e.g. 'Course (Refunded)'"""
+        label = self.TYPE_LABELS.get(self.source_type, self.get_domain_display())
+        return f"{label} (Refunded)" if self.is_refund else label
+
+
+class RevenueRollup(models.Model):
+    """
+    Pre-summed revenue for one teacher, domain and period bucket.
+
+    Each ledger entry is added to its day, month and UK tax year buckets when
+    it is recorded (see rollups.py), so trend charts and P&L statements read
+    a handful of rows instead of the raw ledger. Rebuild from the ledger with
+    `manage.py rebuild_revenue_rollups`.
+    """
+
+    DAY = 'day'
+    MONTH = 'month'
+    TAX_YEAR = 'tax_year'
+
+    PERIOD_CHOICES = [
+        (DAY, 'Day'),
+        (MONTH, 'Month'),
+        (TAX_YEAR, 'UK Tax Year'),
+    ]
+
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='revenue_rollups')
+    domain = models.CharField(max_length=50, choices=StripePayment.DOMAIN_CHOICES)
+    period = models.CharField(max_length=20, choices=PERIOD_CHOICES)
+    period_start = models.DateField(help_text="First day of the bucket (April 6 for tax years)")
+
+    # Totals of ledger entries in the bucket (refunds included as negatives)
+    gross_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    commission_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    net_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    refund_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Total refunded (positive)")
+    charge_count = models.PositiveIntegerField(default=0)
+    refund_count = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['teacher', 'period', 'period_start']
+        verbose_name = 'Revenue Rollup'
+        verbose_name_plural = 'Revenue Rollups'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['teacher', 'domain', 'period', 'period_start'],
+                name='unique_revenue_rollup_bucket'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['teacher', 'period', 'period_start']),
+            # Platform-wide reads (staff finance report) select buckets for every teacher
+            models.Index(fields=['period', 'period_start']),
+        ]
+
+    def __str__(self):
+        return f"{self.teacher} - {self.domain} - {self.period} {self.period_start}: £{self.net_amount}"
+
+
+class WebhookEvent(models.Model):
+    """
+    Inbox of verified Stripe webhook events awaiting processing.
+
+    The webhook view stores each event here and returns 200 straight away;
+    workers (webhook_inbox.py) claim and process events afterwards, retrying
+    failures with backoff. The unique Stripe event id makes redelivered
+    events no-ops.
+    """
+
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    PROCESSED = 'processed'
+    FAILED = 'failed'
+    DEAD = 'dead'
+
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (PROCESSED, 'Processed'),
+        (FAILED, 'Failed (will retry)'),
+        (DEAD, 'Dead letter'),
+    ]
+
+    stripe_event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField(help_text="Verified event body as received from Stripe")
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now, help_text="Not claimed again before this time")
+    locked_at = models.DateTimeField(null=True, blank=True, help_text="When a worker claimed the event")
+    last_error = models.TextField(blank=True)
+
+    # Metrics
+    processing_ms = models.PositiveIntegerField(null=True, blank=True, help_text="Duration of the last attempt")
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['received_at']
+        verbose_name = 'Webhook Event'
+        verbose_name_plural = 'Webhook Events'
+        indexes = [
+            # Workers claim due events: status in (pending, failed), next_attempt_at <= now
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.stripe_event_id} ({self.status})"
+
+    @property
+    def lag(self):
+        """Time from receipt to successful processing"""
+        if self.processed_at:
+            return self.processed_at - self.received_at
+        return None
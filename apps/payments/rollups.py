@@ -0,0 +1,354 @@
+"""
+Revenue Rollups
+
+Day, month and UK tax year totals per teacher and domain, kept in
+RevenueRollup and maintained from the revenue ledger:
+- apply_entry()/apply_entries() add new LedgerEntry rows to their three
+  buckets. ledger.py calls them in the same transaction that writes the
+  entries.
+- rebuild_rollups() recomputes buckets from the ledger (rebuild_revenue_rollups
+  command), for backfills or after changing the bucketing rules.
+
+Readers cover an arbitrary date range with the fewest buckets: whole tax
+years, then whole months, then single days at the edges. A year-long P&L is a
+few dozen rows, whatever the transaction volume. Buckets use local dates, so
+ranges are resolved to whole days. Passing teacher=None reads across the whole
+platform (the staff finance report), still as a handful of grouped queries.
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import F, Min, Q, Sum
+from django.utils import timezone
+
+from .models import LedgerEntry, RevenueRollup
+
+ZERO = Decimal('0.00')
+PERIODS = (RevenueRollup.DAY, RevenueRollup.MONTH, RevenueRollup.TAX_YEAR)
+
+
+# =============================================================================
+# BUCKETS
+# =============================================================================
+
+def tax_year_start(day: date) -> date:
+    """Start of the UK tax year (April 6 to April 5) containing a date"""
+    start = date(day.year, 4, 6)
+    return start if day >= start else date(day.year - 1, 4, 6)
+
+
+def tax_year_end(start: date) -> date:
+    return date(start.year + 1, 4, 5)
+
+
+def month_end(start: date) -> date:
+    next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+
+def period_starts(occurred_at) -> List[Tuple[str, date]]:
+    """The (period, period_start) buckets a ledger timestamp belongs to"""
+    day = timezone.localtime(occurred_at).date()
+    return [
+        (RevenueRollup.DAY, day),
+        (RevenueRollup.MONTH, day.replace(day=1)),
+        (RevenueRollup.TAX_YEAR, tax_year_start(day)),
+    ]
+
+
+def covering_buckets(start_day: date, end_day: date) -> Dict[str, List[date]]:
+    """
+    The fewest buckets that exactly cover [start_day, end_day]: whole tax
+    years where they fit, then whole months, then single days.
+
+    Returns:
+        {'tax_year': [date, ...], 'month': [...], 'day': [...]}
+    """
+    buckets = {period: [] for period in PERIODS}
+    cursor = start_day
+    while cursor <= end_day:
+        if cursor.month == 4 and cursor.day == 6 and tax_year_end(cursor) <= end_day:
+            buckets[RevenueRollup.TAX_YEAR].append(cursor)
+            cursor = tax_year_end(cursor) + timedelta(days=1)
+        elif cursor.day == 1 and month_end(cursor) <= end_day:
+            buckets[RevenueRollup.MONTH].append(cursor)
+            cursor = month_end(cursor) + timedelta(days=1)
+        else:
+            buckets[RevenueRollup.DAY].append(cursor)
+            cursor += timedelta(days=1)
+    return buckets
+
+
+def _local_day(value) -> Optional[date]:
+    if value is None:
+        return None
+    if hasattr(value, 'tzinfo'):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+
+def rollups_for_range(teacher, start_date=None, end_date=None):
+    """
+    RevenueRollup rows covering a date range (datetimes are resolved to
+    local days), for one teacher or everyone (teacher=None). With no start
+    date the range begins at the first tax year on record.
+    """
+    rollups = RevenueRollup.objects.all()
+    if teacher is not None:
+        rollups = rollups.filter(teacher=teacher)
+
+    end_day = _local_day(end_date) or timezone.localdate()
+    start_day = _local_day(start_date)
+    if start_day is None:
+        start_day = rollups.filter(period=RevenueRollup.TAX_YEAR).aggregate(
+            first=Min('period_start')
+        )['first']
+        if start_day is None:
+            return rollups.none()
+    if end_day < start_day:
+        return rollups.none()
+
+    bucket_filter = Q(pk__in=[])
+    for period, starts in covering_buckets(start_day, end_day).items():
+        if starts:
+            bucket_filter |= Q(period=period, period_start__in=starts)
+    return rollups.filter(bucket_filter)
+
+
+# =============================================================================
+# WRITING
+# =============================================================================
+
+def apply_entry(entry: LedgerEntry):
+    """Add a newly recorded ledger entry to its day, month and tax year buckets"""
+    apply_entries([entry])
+
+
+def apply_entries(entries: List[LedgerEntry]):
+    """
+    Add newly recorded ledger entries to their buckets. Entries sharing a
+    bucket are summed first, so a batch from one checkout touches each bucket
+    once however many entries it holds.
+    """
+    deltas = defaultdict(lambda: {
+        'gross': ZERO, 'commission': ZERO, 'net': ZERO, 'refunds': ZERO, 'charges': 0, 'refund_count': 0
+    })
+    for entry in entries:
+        if entry.teacher_id is None:
+            continue
+        is_refund = entry.entry_type == LedgerEntry.REFUND
+        for period, period_start in period_starts(entry.occurred_at):
+            delta = deltas[(entry.teacher_id, entry.domain, period, period_start)]
+            delta['gross'] += entry.gross_amount
+            delta['commission'] += entry.commission_amount
+            delta['net'] += entry.net_amount
+            if is_refund:
+                delta['refunds'] -= entry.gross_amount
+                delta['refund_count'] += 1
+            else:
+                delta['charges'] += 1
+
+    with transaction.atomic():
+        for (teacher_id, domain, period, period_start), delta in deltas.items():
+            rollup, _ = RevenueRollup.objects.get_or_create(
+                teacher_id=teacher_id,
+                domain=domain,
+                period=period,
+                period_start=period_start
+            )
+            RevenueRollup.objects.filter(pk=rollup.pk).update(
+                gross_amount=F('gross_amount') + delta['gross'],
+                commission_amount=F('commission_amount') + delta['commission'],
+                net_amount=F('net_amount') + delta['net'],
+                refund_amount=F('refund_amount') + delta['refunds'],
+                charge_count=F('charge_count') + delta['charges'],
+                refund_count=F('refund_count') + delta['refund_count'],
+                updated_at=timezone.now()
+            )
+
+
+def rebuild_rollups(teacher=None, chunk_size: int = 2000) -> int:
+    """
+    Recompute rollups from the ledger, for one teacher or everyone.
+
+    Returns:
+        Number of rollup rows written
+    """
+    entries = LedgerEntry.objects.filter(teacher__isnull=False)
+    rollups = RevenueRollup.objects.all()
+    if teacher is not None:
+        entries = entries.filter(teacher=teacher)
+        rollups = rollups.filter(teacher=teacher)
+
+    totals = defaultdict(lambda: {
+        'gross_amount': ZERO,
+        'commission_amount': ZERO,
+        'net_amount': ZERO,
+        'refund_amount': ZERO,
+        'charge_count': 0,
+        'refund_count': 0,
+    })
+
+    rows = entries.order_by().values_list(
+        'teacher_id', 'domain', 'entry_type', 'occurred_at',
+        'gross_amount', 'commission_amount', 'net_amount'
+    )
+    for teacher_id, domain, entry_type, occurred_at, gross, commission, net in rows.iterator(chunk_size=chunk_size):
+        is_refund = entry_type == LedgerEntry.REFUND
+        for period, period_start in period_starts(occurred_at):
+            bucket = totals[(teacher_id, domain, period, period_start)]
+            bucket['gross_amount'] += gross
+            bucket['commission_amount'] += commission
+            bucket['net_amount'] += net
+            if is_refund:
+                bucket['refund_amount'] -= gross
+                bucket['refund_count'] += 1
+            else:
+                bucket['charge_count'] += 1
+
+    with transaction.atomic():
+        rollups.delete()
+        RevenueRollup.objects.bulk_create(
+            [
+                RevenueRollup(
+                    teacher_id=teacher_id,
+                    domain=domain,
+                    period=period,
+                    period_start=period_start,
+                    **values
+                )
+                for (teacher_id, domain, period, period_start), values in totals.items()
+            ],
+            batch_size=500
+        )
+
+    return len(totals)
+
+
+# =============================================================================
+# READING
+# =============================================================================
+
+def domain_totals(teacher, start_date=None, end_date=None) -> Dict[str, Dict]:
+    """
+    Totals per domain over a date range, in one query over the covering buckets.
+    teacher=None totals the whole platform.
+
+    Returns:
+        {
+            'courses': {'gross': Decimal, 'commission': Decimal, 'net': Decimal,
+                        'refunds': Decimal, 'count': int, 'refund_count': int},
+            ...
+        }
+    """
+    rows = rollups_for_range(teacher, start_date, end_date).order_by().values('domain').annotate(
+        gross=Sum('gross_amount'),
+        commission=Sum('commission_amount'),
+        net=Sum('net_amount'),
+        refunds=Sum('refund_amount'),
+        count=Sum('charge_count'),
+        refund_count=Sum('refund_count')
+    )
+    return {
+        row['domain']: {
+            'gross': row['gross'] or ZERO,
+            'commission': row['commission'] or ZERO,
+            'net': row['net'] or ZERO,
+            'refunds': row['refunds'] or ZERO,
+            'count': row['count'] or 0,
+            'refund_count': row['refund_count'] or 0,
+        }
+        for row in rows
+    }
+
+
+def trend(teacher, period: str, since: date, domain=None, until: Optional[date] = None) -> List[Dict]:
+    """
+    Per-bucket totals from a start date, oldest first, summed across domains
+    unless one is given. teacher=None sums the whole platform.
+
+    Returns:
+        [{'date': date, 'revenue': Decimal, 'gross': Decimal,
+          'commission': Decimal, 'count': int}, ...]
+    """
+    rollups = RevenueRollup.objects.filter(period=period, period_start__gte=since)
+    if teacher is not None:
+        rollups = rollups.filter(teacher=teacher)
+    if until:
+        rollups = rollups.filter(period_start__lte=until)
+    if domain:
+        rollups = rollups.filter(domain=domain)
+
+    return [
+        {
+            'date': row['period_start'],
+            'revenue': row['revenue'] or ZERO,
+            'gross': row['gross'] or ZERO,
+            'commission': row['commission'] or ZERO,
+            'count': row['count'] or 0,
+        }
+        for row in rollups.order_by('period_start').values('period_start').annotate(
+            revenue=Sum('net_amount'),
+            gross=Sum('gross_amount'),
+            commission=Sum('commission_amount'),
+            count=Sum('charge_count')
+        )
+    ]
+
+
+def teacher_totals(start_date=None, end_date=None, domain=None, order_by: str = 'gross'):
+    """
+    Platform-wide totals per teacher over a date range, largest first, as
+    one grouped query over the covering buckets. The result is a lazy
+    values() queryset, so callers can paginate it or stream it with
+    .iterator().
+
+    Rows:
+        {'teacher_id', 'teacher__username', 'teacher__first_name',
+         'teacher__last_name', 'teacher__email', 'gross', 'commission',
+         'net', 'refunds', 'count', 'refund_count'}
+    """
+    rollups = rollups_for_range(None, start_date, end_date)
+    if domain:
+        rollups = rollups.filter(domain=domain)
+
+    return rollups.order_by().values(
+        'teacher_id', 'teacher__username', 'teacher__first_name', 'teacher__last_name', 'teacher__email'
+    ).annotate(
+        gross=Sum('gross_amount'),
+        commission=Sum('commission_amount'),
+        net=Sum('net_amount'),
+        refunds=Sum('refund_amount'),
+        count=Sum('charge_count'),
+        refund_count=Sum('refund_count')
+    ).order_by(f'-{order_by}', 'teacher_id')
+
+
+def teacher_domain_totals(teacher_ids, start_date=None, end_date=None) -> Dict[int, Dict[str, Dict]]:
+    """
+    Per-domain totals for a set of teachers (e.g. one page of teacher_totals)
+    in one query grouped by teacher and domain.
+
+    Returns:
+        {teacher_id: {domain: {'gross': Decimal, 'commission': Decimal, 'net': Decimal}}}
+    """
+    rows = rollups_for_range(None, start_date, end_date).filter(
+        teacher_id__in=teacher_ids
+    ).order_by().values('teacher_id', 'domain').annotate(
+        gross=Sum('gross_amount'),
+        commission=Sum('commission_amount'),
+        net=Sum('net_amount')
+    )
+
+    totals = defaultdict(dict)
+    for row in rows:
+        totals[row['teacher_id']][row['domain']] = {
+            'gross': row['gross'] or ZERO,
+            'commission': row['commission'] or ZERO,
+            'net': row['net'] or ZERO,
+        }
+    return totals
@@ -0,0 +1,311 @@
+"""
+Stripe Gateway
+
+Every call this project makes to the Stripe API goes through one
+StripeGateway per process (get_gateway()), so a slow or failing Stripe
+degrades checkout pages instead of tying up the web workers:
+
+- A stripe.StripeClient on a requests-based HTTP client. Each thread keeps
+  its own pooled keep-alive session, so calls reuse TLS connections.
+- Explicit connect/read timeouts (STRIPE_CONNECT_TIMEOUT, STRIPE_READ_TIMEOUT)
+  and a bounded number of network retries (STRIPE_MAX_NETWORK_RETRIES).
+- Idempotency keys on every create call. Retries of one call reuse its key,
+  so Stripe never creates a session or refund twice.
+- A circuit breaker. After STRIPE_BREAKER_FAILURES consecutive failures
+  (connection errors, timeouts, rate limits, 5xx) calls fail immediately with
+  StripeUnavailable for STRIPE_BREAKER_RESET_SECONDS, then a single trial call
+  decides whether to close it again. Card and validation errors are the
+  caller's problem and don't count.
+- A latency histogram per operation. Calls slower than STRIPE_SLOW_CALL_MS
+  are logged; stats() feeds the admin portal's Stripe health endpoint.
+
+StripeUnavailable is a StripeError, so existing error handling keeps working.
+The gateway is rebuilt when a STRIPE_* setting changes (override_settings).
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+import stripe
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is unbounded)
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class StripeUnavailable(stripe.error.StripeError):
+    """Raised without calling Stripe while the circuit breaker is open"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            'Payments are temporarily unavailable. Please try again in a few minutes.'
+        )
+        self.retry_after = retry_after
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def is_outage(error: Exception) -> bool:
+    """Whether an error means Stripe itself is degraded (rather than a bad request)"""
+    if isinstance(error, (stripe.error.APIConnectionError, stripe.error.RateLimitError)):
+        return True
+    return isinstance(error, stripe.error.StripeError) and (error.http_status or 0) >= 500
+
+
+# =============================================================================
+# CIRCUIT BREAKER
+# =============================================================================
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed: calls go through. open: calls are refused until reset_seconds
+    have passed. half_open: one trial call is let through; success closes the
+    breaker, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise StripeUnavailable if the call shouldn't be attempted"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = self.opened_at + self.reset_seconds - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return
+            raise StripeUnavailable(retry_after=max(remaining, 0))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info('Stripe circuit breaker closed')
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                    logger.error(
+                        f'Stripe circuit breaker opened after {self.failures} consecutive failures; '
+                        f'failing fast for {self.reset_seconds}s'
+                    )
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """Call finished with an error that says nothing about Stripe's health"""
+        with self._lock:
+            self._trial_running = False
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self.failures, 'trips': self.trips}
+
+
+# =============================================================================
+# LATENCY HISTOGRAM
+# =============================================================================
+
+class LatencyHistogram:
+    """Bucketed call latencies for one operation"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float, error: bool = False):
+        with self._lock:
+            self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+            self.count += 1
+            self.errors += error
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, pct: float) -> Optional[int]:
+        """Upper bound of the bucket holding the pct-th percentile (max_ms for the last bucket)"""
+        if not self.count:
+            return None
+        rank = self.count * pct / 100
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else round(self.max_ms)
+        return round(self.max_ms)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            labels = [f'<={bound}ms' for bound in LATENCY_BUCKETS_MS] + [f'>{LATENCY_BUCKETS_MS[-1]}ms']
+            return {
+                'count': self.count,
+                'errors': self.errors,
+                'avg_ms': round(self.total_ms / self.count, 1) if self.count else None,
+                'p50_ms': self.percentile(50),
+                'p95_ms': self.percentile(95),
+                'p99_ms': self.percentile(99),
+                'max_ms': round(self.max_ms, 1),
+                'buckets': dict(zip(labels, self.buckets)),
+            }
+
+
+# =============================================================================
+# GATEWAY
+# =============================================================================
+
+class StripeGateway:
+    """Timeouts, retries, idempotency, circuit breaking and latency metrics around a StripeClient"""
+
+    def __init__(self):
+        timeout = (_setting('STRIPE_CONNECT_TIMEOUT', 3), _setting('STRIPE_READ_TIMEOUT', 10))
+        base_addresses = {'api': settings.STRIPE_API_BASE} if _setting('STRIPE_API_BASE', '') else {}
+        self.client = stripe.StripeClient(
+            settings.STRIPE_SECRET_KEY,
+            http_client=stripe.RequestsClient(timeout=timeout),
+            base_addresses=base_addresses,
+            max_network_retries=_setting('STRIPE_MAX_NETWORK_RETRIES', 1),
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=_setting('STRIPE_BREAKER_FAILURES', 5),
+            reset_seconds=_setting('STRIPE_BREAKER_RESET_SECONDS', 30),
+        )
+        self.latency = {}
+        self._latency_lock = threading.Lock()
+
+    def _histogram(self, operation: str) -> LatencyHistogram:
+        with self._latency_lock:
+            return self.latency.setdefault(operation, LatencyHistogram())
+
+    def call(self, operation: str, method, *args, **kwargs):
+        """Run one Stripe API call through the breaker, timing it"""
+        self.breaker.before_call()
+        started = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except stripe.error.StripeError as e:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._histogram(operation).observe(elapsed_ms, error=True)
+            logger.warning(f'Stripe {operation} failed after {elapsed_ms:.0f}ms: {e}')
+            if is_outage(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._histogram(operation).observe(elapsed_ms)
+        self.breaker.record_success()
+        if elapsed_ms > _setting('STRIPE_SLOW_CALL_MS', 2000):
+            logger.warning(f'Slow Stripe call: {operation} took {elapsed_ms:.0f}ms')
+        return result
+
+    # =========================================================================
+    # API
+    # =========================================================================
+
+    def create_checkout_session(self, params: Dict, idempotency_key: Optional[str] = None):
+        return self.call(
+            'checkout.sessions.create', self.client.checkout.sessions.create,
+            params=params, options={'idempotency_key': idempotency_key or str(uuid.uuid4())}
+        )
+
+    def retrieve_checkout_session(self, session_id: str):
+        return self.call('checkout.sessions.retrieve', self.client.checkout.sessions.retrieve, session_id)
+
+    def retrieve_payment_intent(self, payment_intent_id: str):
+        return self.call('payment_intents.retrieve', self.client.payment_intents.retrieve, payment_intent_id)
+
+    def create_refund(self, params: Dict, idempotency_key: Optional[str] = None):
+        return self.call(
+            'refunds.create', self.client.refunds.create,
+            params=params, options={'idempotency_key': idempotency_key or str(uuid.uuid4())}
+        )
+
+    def stats(self) -> Dict:
+        """
+        Returns:
+            {'breaker': {'state', 'consecutive_failures', 'trips'},
+             'latency': {operation: LatencyHistogram.snapshot(), ...}}
+        """
+        with self._latency_lock:
+            histograms = dict(self.latency)
+        return {
+            'breaker': self.breaker.snapshot(),
+            'latency': {operation: histogram.snapshot() for operation, histogram in sorted(histograms.items())},
+        }
+
+
+def idempotency_key(prefix: str, params: Dict) -> str:
+    """
+    Key derived from a request's parameters, for calls that must happen at
+    most once however many times they are submitted (e.g. the refund for a
+    given cancellation request).
+    """
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f'{prefix}-{digest[:32]}'
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> StripeGateway:
+    """The process-wide gateway, created on first use"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = StripeGateway()
+        return _gateway
+
+
+def reset_gateway():
+    """Drop the gateway so the next call rebuilds it from settings (and clears its stats)"""
+    global _gateway
+    with _gateway_lock:
+        _gateway = None
+
+
+@receiver(setting_changed)
+def _stripe_setting_changed(sender, setting, **kwargs):
+    if setting.startswith('STRIPE_'):
+        reset_gateway()
@@ -1,9 +1,11 @@
 import stripe
 from django.conf import settings
 from django.urls import reverse
+from .stripe_gateway import get_gateway, idempotency_key
 from .utils import format_stripe_amount, calculate_commission
 
 # Initialize Stripe with secret key
+# (API calls go through the gateway, which has its own client; see stripe_gateway.py)
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
 
@@ -60,9 +62,9 @@ def create_checkout_session(
         product_name = item_name or f'{domain.replace("_", " ").title()} Payment'
         product_description = item_description or f'Payment for {domain.replace("_", " ")} on RECORDERED'
 
-        session = stripe.checkout.Session.create(
-            payment_method_types=['card'],
-            line_items=[{
+        session = get_gateway().create_checkout_session({
+            'payment_method_types': ['card'],
+            'line_items': [{
                 'price_data': {
                     'currency': 'gbp',
                     'unit_amount': format_stripe_amount(amount),
@@ -73,12 +75,12 @@ def create_checkout_session(
                 },
                 'quantity': 1,
             }],
-            mode='payment',
-            success_url=success_url,
-            cancel_url=cancel_url,
-            customer_email=student.email,
-            metadata=session_metadata,
-        )
+            'mode': 'payment',
+            'success_url': success_url,
+            'cancel_url': cancel_url,
+            'customer_email': student.email,
+            'metadata': session_metadata,
+        })
         return session
     except stripe.error.StripeError as e:
         # Log the error
@@ -89,7 +91,7 @@ def create_checkout_session(
 def retrieve_session(session_id):
     """Retrieve a Checkout Session by ID"""
     try:
-        return stripe.checkout.Session.retrieve(session_id)
+        return get_gateway().retrieve_checkout_session(session_id)
     except stripe.error.StripeError as e:
         print(f"Error retrieving session: {str(e)}")
         raise
@@ -158,15 +160,15 @@ def create_checkout_session_with_items(
 
     # Create Checkout Session
     try:
-        session = stripe.checkout.Session.create(
-            payment_method_types=['card'],
-            line_items=stripe_line_items,
-            mode='payment',
-            success_url=success_url,
-            cancel_url=cancel_url,
-            customer_email=student.email,
-            metadata=session_metadata,
-        )
+        session = get_gateway().create_checkout_session({
+            'payment_method_types': ['card'],
+            'line_items': stripe_line_items,
+            'mode': 'payment',
+            'success_url': success_url,
+            'cancel_url': cancel_url,
+            'customer_email': student.email,
+            'metadata': session_metadata,
+        })
         return session
     except stripe.error.StripeError as e:
         print(f"Stripe error: {str(e)}")
@@ -176,7 +178,7 @@ def create_checkout_session_with_items(
 def retrieve_payment_intent(payment_intent_id):
     """Retrieve a Payment Intent by ID"""
     try:
-        return stripe.PaymentIntent.retrieve(payment_intent_id)
+        return get_gateway().retrieve_payment_intent(payment_intent_id)
     except stripe.error.StripeError as e:
         print(f"Error retrieving payment intent: {str(e)}")
         raise
@@ -190,7 +192,9 @@ def create_refund(payment_intent_id, amount=None, reason=None, metadata=None):
         payment_intent_id: Stripe Payment Intent ID
         amount: Refund amount in standard currency (Decimal). If None, full refund.
         reason: Refund reason ('duplicate', 'fraudulent', or 'requested_by_customer')
-        metadata: Additional metadata dict
+        metadata: Additional metadata dict. When given it identifies the refund
+                  (e.g. the cancellation request), so resubmitting the same
+                  refund returns the original instead of refunding twice.
 
     Returns:
         stripe.Refund object
@@ -213,7 +217,8 @@ def create_refund(payment_intent_id, amount=None, reason=None, metadata=None):
             refund_params['metadata'] = metadata
 
         # Create the refund
-        refund = stripe.Refund.create(**refund_params)
+        key = idempotency_key('refund', refund_params) if metadata else None
+        refund = get_gateway().create_refund(refund_params, idempotency_key=key)
         return refund
 
     except stripe.error.StripeError as e:
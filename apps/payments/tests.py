@@ -0,0 +1,727 @@
+import io
+import json
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.payments import webhook_inbox
+from apps.payments.finance_service import FinanceContext, FinanceService
+from apps.payments.ledger import record_entry
+from apps.payments.models import LedgerEntry, RevenueRollup, StripePayment, WebhookEvent
+from apps.payments.rollups import covering_buckets, domain_totals, rebuild_rollups, teacher_totals
+
+
+@override_settings(PLATFORM_COMMISSION_PERCENTAGE=10)
+class RevenueLedgerTestCase(TestCase):
+    """Tests for the append-only revenue ledger and the finance reads built on it"""
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher', email='teacher@example.com')
+        self.student = User.objects.create_user(username='student', email='student@example.com')
+
+    def record(self, source_type, source_id, amount, entry_type=LedgerEntry.CHARGE, domain='courses', **kwargs):
+        entry, created = record_entry(
+            teacher=self.teacher,
+            student=self.student,
+            domain=domain,
+            source_type=source_type,
+            source_id=source_id,
+            amount=amount,
+            entry_type=entry_type,
+            **kwargs
+        )
+        return entry, created
+
+    def test_record_entry_is_idempotent_and_splits_commission(self):
+        entry, created = self.record(LedgerEntry.COURSE_ENROLLMENT, 1, '49.99')
+        self.assertTrue(created)
+        self.assertEqual(entry.gross_amount, Decimal('49.99'))
+        self.assertEqual(entry.commission_amount, Decimal('5.00'))
+        self.assertEqual(entry.net_amount, Decimal('44.99'))
+
+        again, created = self.record(LedgerEntry.COURSE_ENROLLMENT, 1, '49.99')
+        self.assertFalse(created)
+        self.assertEqual(again.pk, entry.pk)
+        self.assertEqual(LedgerEntry.objects.count(), 1)
+
+    def test_refunds_are_negative_and_zero_amounts_skipped(self):
+        self.record(LedgerEntry.COURSE_ENROLLMENT, 1, '100.00')
+        refund, _ = self.record(LedgerEntry.COURSE_CANCELLATION, 7, '100.00', entry_type=LedgerEntry.REFUND)
+        self.assertEqual(refund.gross_amount, Decimal('-100.00'))
+        self.assertEqual(refund.net_amount, Decimal('-90.00'))
+        self.assertEqual(refund.display_type, 'Course (Refunded)')
+
+        entry, created = self.record(LedgerEntry.COURSE_ENROLLMENT, 2, '0.00')
+        self.assertIsNone(entry)
+        self.assertFalse(created)
+
+    def test_entries_are_append_only(self):
+        entry, _ = self.record(LedgerEntry.COURSE_ENROLLMENT, 1, '10.00')
+        with self.assertRaises(ValueError):
+            entry.save()
+        with self.assertRaises(ValueError):
+            entry.delete()
+
+    def test_revenue_summary_reads_ledger_in_one_query(self):
+        now = timezone.now()
+        self.record(LedgerEntry.WORKSHOP_REGISTRATION, 1, '20.00', domain='workshops', occurred_at=now)
+        self.record(LedgerEntry.COURSE_ENROLLMENT, 1, '100.00', occurred_at=now)
+        self.record(LedgerEntry.COURSE_CANCELLATION, 1, '50.00', entry_type=LedgerEntry.REFUND, occurred_at=now)
+        self.record(LedgerEntry.ORDER_ITEM, 1, '40.00', domain='private_teaching', occurred_at=now)
+        self.record(LedgerEntry.EXAM_REGISTRATION, 1, '30.00', domain='private_teaching', occurred_at=now)
+        self.record(LedgerEntry.PRODUCT_PURCHASE, 1, '5.00', domain='digital_products', occurred_at=now - timedelta(days=40))
+
+        with self.assertNumQueries(1):
+            summary = FinanceService.get_teacher_revenue_summary(self.teacher)
+
+        self.assertEqual(summary['total_gross'], Decimal('145.00'))
+        self.assertEqual(summary['total_revenue'], Decimal('130.50'))
+        self.assertEqual(summary['total_commission'], Decimal('14.50'))
+        self.assertEqual(summary['payment_count'], 5)
+        self.assertEqual(summary['by_domain']['courses']['revenue'], Decimal('45.00'))
+        self.assertEqual(summary['by_domain']['courses']['count'], 1)
+        self.assertEqual(summary['by_domain']['private_teaching']['breakdown']['lessons']['revenue'], Decimal('36.00'))
+        self.assertEqual(summary['by_domain']['private_teaching']['breakdown']['exams']['count'], 1)
+
+        recent = FinanceService.get_teacher_revenue_summary(self.teacher, start_date=now - timedelta(days=30))
+        self.assertEqual(recent['by_domain']['digital_products']['count'], 0)
+        self.assertEqual(recent['payment_count'], 4)
+
+    def test_finance_context_shares_one_ledger_query_per_period(self):
+        now = timezone.now()
+        self.record(LedgerEntry.WORKSHOP_REGISTRATION, 1, '20.00', domain='workshops', occurred_at=now)
+        self.record(LedgerEntry.COURSE_ENROLLMENT, 1, '100.00', occurred_at=now)
+        self.record(LedgerEntry.COURSE_CANCELLATION, 1, '50.00', entry_type=LedgerEntry.REFUND, occurred_at=now)
+
+        finance = FinanceContext(self.teacher)
+        with self.assertNumQueries(1):
+            summary = finance.revenue_summary()
+            courses = finance.domain_revenue('courses')
+            workshops = finance.domain_revenue('workshops')
+
+        self.assertEqual(courses['total_revenue'], summary['by_domain']['courses']['revenue'])
+        self.assertEqual(courses['total_revenue'], Decimal('45.00'))
+        self.assertEqual(workshops['payment_count'], 1)
+        self.assertEqual(
+            courses['total_gross'],
+            FinanceService.get_domain_revenue(self.teacher, 'courses')['total_gross']
+        )
+
+    def test_transaction_feed_pages_with_keyset_cursor(self):
+        now = timezone.now()
+        for index in range(25):
+            # Pairs share a timestamp so the id tie-breaker is exercised
+            self.record(LedgerEntry.COURSE_ENROLLMENT, index, '10.00', occurred_at=now - timedelta(hours=index // 2))
+
+        expected = list(LedgerEntry.objects.order_by('-occurred_at', '-id').values_list('id', flat=True))
+        profile = self.teacher.profile
+        profile.is_teacher = True
+        profile.profile_completed = True
+        profile.email_verified = True
+        profile.save()
+        self.client.force_login(self.teacher)
+
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            params = {'limit': 10}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get(reverse('payments:transaction_feed'), params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            seen.extend(transaction['id'] for transaction in data['transactions'])
+            pages += 1
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, expected)
+
+        response = self.client.get(reverse('payments:transaction_feed'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_revenue_export_streams_csv_and_xlsx(self):
+        self.record(LedgerEntry.COURSE_ENROLLMENT, 1, '49.99', description='Recorder Basics')
+        self.record(LedgerEntry.COURSE_CANCELLATION, 1, '20.00', entry_type=LedgerEntry.REFUND, description='Recorder Basics')
+        profile = self.teacher.profile
+        profile.is_teacher = True
+        profile.profile_completed = True
+        profile.email_verified = True
+        profile.save()
+        self.client.force_login(self.teacher)
+
+        response = self.client.get(reverse('accounts:teacher_revenue_export'))
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Date,Type,Description,Student,Amount (£)')
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].endswith('-20.00'))
+        self.assertTrue(lines[2].endswith(',Course,Recorder Basics,student,49.99'))
+
+        response = self.client.get(reverse('accounts:teacher_revenue_export'), {'format': 'xlsx'})
+        self.assertTrue(response.streaming)
+        self.assertIn('.xlsx', response['Content-Disposition'])
+        workbook = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(workbook.testzip())
+        sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('<c r="E3"><v>49.99</v></c>', sheet)
+
+
+@override_settings(PLATFORM_COMMISSION_PERCENTAGE=10)
+@override_settings(PLATFORM_COMMISSION_PERCENTAGE=10)
+class FinanceBreakdownTestCase(TestCase):
+    """Tests pinning the per-item revenue breakdowns and their query counts"""
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher', email='teacher@example.com')
+        self.paid_at = timezone.now() - timedelta(days=3)
+        self.students = {}
+
+    def student(self, username):
+        if username not in self.students:
+            self.students[username] = User.objects.create_user(username=username, email=f'{username}@example.com')
+        return self.students[username]
+
+    def add_workshop(self, slug):
+        """One active and one refunded paid registration, plus an unpaid one"""
+        from apps.workshops.models import Workshop, WorkshopRegistration, WorkshopSession
+
+        workshop = Workshop.objects.create(
+            title=slug.title(), slug=slug, description='Workshop', short_description='Workshop',
+            learning_objectives='Playing', instructor=self.teacher, is_free=False, price=Decimal('20.00')
+        )
+        start = timezone.now() + timedelta(days=7)
+        session = WorkshopSession.objects.create(workshop=workshop, start_datetime=start, end_datetime=start + timedelta(hours=2))
+        for username, status, payment_status in [
+            (f'{slug}-active', 'registered', 'completed'),
+            (f'{slug}-refunded', 'cancelled', 'completed'),
+            (f'{slug}-unpaid', 'registered', 'pending'),
+        ]:
+            student = self.student(username)
+            WorkshopRegistration.objects.create(
+                session=session, student=student, email=student.email, status=status,
+                payment_status=payment_status, payment_amount=Decimal('20.00'), paid_at=self.paid_at
+            )
+        return workshop
+
+    def add_course(self, slug):
+        """One active and one refunded paid enrollment, plus an unpaid one"""
+        from apps.courses.models import Course, CourseCancellationRequest, CourseEnrollment
+
+        course = Course.objects.create(slug=slug, title=slug.title(), cost=Decimal('30.00'), instructor=self.teacher)
+        CourseEnrollment.objects.create(
+            course=course, student=self.student(f'{slug}-active'), payment_status='completed',
+            payment_amount=Decimal('30.00'), paid_at=self.paid_at
+        )
+        refunded = CourseEnrollment.objects.create(
+            course=course, student=self.student(f'{slug}-refunded'), payment_status='completed',
+            payment_amount=Decimal('30.00'), paid_at=self.paid_at, is_active=False
+        )
+        CourseCancellationRequest.objects.filter(pk=CourseCancellationRequest.objects.create(
+            student=refunded.student, enrollment=refunded
+        ).pk).update(
+            status=CourseCancellationRequest.COMPLETED, refund_amount=Decimal('30.00'), refund_processed_at=self.paid_at
+        )
+        CourseEnrollment.objects.create(
+            course=course, student=self.student(f'{slug}-unpaid'), payment_status='pending', payment_amount=Decimal('30.00')
+        )
+        return course
+
+    def add_private_teaching(self, prefix):
+        """
+        A student with three paid lessons (one refunded) in one subject, and
+        a student with only an exam in another subject
+        """
+        from apps.private_teaching.models import (
+            ExamBoard, ExamRegistration, LessonCancellationRequest, LessonRequest, Order, OrderItem, Subject
+        )
+        from lessons.models import Lesson
+
+        recorder = Subject.objects.create(teacher=self.teacher, subject=f'{prefix} Recorder', base_price_60min=Decimal('40.00'))
+        theory = Subject.objects.create(teacher=self.teacher, subject=f'{prefix} Theory', base_price_60min=Decimal('30.00'))
+        learner = self.student(f'{prefix}-learner')
+        lesson_request = LessonRequest.objects.create(student=learner)
+        order = Order.objects.create(student=learner, total_amount=Decimal('120.00'), payment_status='completed')
+
+        lessons = []
+        for week, (payment_status, is_deleted) in enumerate([
+            ('Paid', False), ('Paid', False), ('Paid', False), ('Paid', True), ('Not Paid', False)
+        ]):
+            lesson = Lesson.objects.create(
+                lesson_request=lesson_request, student=learner, teacher=self.teacher, subject=recorder,
+                lesson_date=date.today() - timedelta(days=7 * (week + 1)), lesson_time=datetime.min.time(),
+                duration_in_minutes='60', location='Online', approved_status='Accepted', status='Assigned',
+                payment_status=payment_status, is_deleted=is_deleted, fee=40.0
+            )
+            if payment_status == 'Paid':
+                OrderItem.objects.create(order=order, lesson=lesson, price_paid=Decimal('40.00'))
+            lessons.append(lesson)
+
+        LessonCancellationRequest.objects.create(
+            student=learner, teacher=self.teacher, lesson=lessons[0], hours_before_lesson=Decimal('48'),
+            status=LessonCancellationRequest.COMPLETED, refund_amount=Decimal('40.00'), refund_processed_at=self.paid_at
+        )
+
+        board, _ = ExamBoard.objects.get_or_create(name='ABRSM')
+        ExamRegistration.objects.create(
+            student=self.student(f'{prefix}-examinee'), teacher=self.teacher, subject=theory, exam_board=board,
+            grade_type=ExamRegistration.THEORY, grade_level=5, fee_amount=Decimal('55.00'),
+            payment_status='completed', paid_at=self.paid_at
+        )
+
+    def add_products(self, prefix):
+        """A product sold twice, a free sale and an unpaid sale"""
+        from apps.digital_products.models import DigitalProduct, ProductPurchase
+
+        products = [
+            DigitalProduct.objects.create(
+                slug=f'{prefix}-{index}', title=f'{prefix} {index}', short_description='Sheet music',
+                teacher=self.teacher, product_type=DigitalProduct.PRODUCT_TYPE_CHOICES[0][0],
+                price=Decimal('8.00'), status='published'
+            )
+            for index in range(3)
+        ]
+        for product, username, amount, payment_status in [
+            (products[0], f'{prefix}-buyer-1', Decimal('8.00'), 'completed'),
+            (products[0], f'{prefix}-buyer-2', Decimal('8.00'), 'completed'),
+            (products[1], f'{prefix}-buyer-1', Decimal('0.00'), 'completed'),
+            (products[2], f'{prefix}-buyer-1', Decimal('8.00'), 'pending'),
+        ]:
+            ProductPurchase.objects.create(
+                product=product, student=self.student(username), payment_amount=amount,
+                payment_status=payment_status, paid_at=self.paid_at
+            )
+        return products[0]
+
+    def add_everything(self, prefix):
+        return {
+            'workshop': self.add_workshop(f'{prefix}-workshop'),
+            'course': self.add_course(f'{prefix}-course'),
+            'product': self.add_products(f'{prefix}-product'),
+            'private_teaching': self.add_private_teaching(prefix),
+        }
+
+    def breakdown_queries(self):
+        """Queries each breakdown costs on a fresh context"""
+        counts = {}
+        for name in [
+            'workshop_revenue_breakdown', 'course_revenue_breakdown', 'private_teaching_revenue_breakdown',
+            'private_teaching_subject_breakdown', 'digital_products_revenue_breakdown'
+        ]:
+            finance = FinanceContext(self.teacher)
+            with CaptureQueriesContext(connection) as queries:
+                getattr(finance, name)()
+            counts[name] = len(queries)
+        return counts
+
+    def test_breakdowns(self):
+        created = self.add_everything('first')
+        finance = FinanceContext(self.teacher)
+
+        [workshop] = finance.workshop_revenue_breakdown()
+        self.assertEqual(workshop['workshop'], created['workshop'])
+        self.assertEqual(
+            (workshop['total_revenue'], workshop['teacher_share'], workshop['registrations_count'],
+             workshop['refunded_count'], workshop['refunded_amount'], len(workshop['transactions'])),
+            (Decimal('20.00'), Decimal('18.00'), 1, 1, Decimal('20.00'), 2)
+        )
+
+        [course] = finance.course_revenue_breakdown()
+        self.assertEqual(course['course'], created['course'])
+        self.assertEqual(
+            (course['total_revenue'], course['teacher_share'], course['enrollments_count'],
+             course['refunded_count'], course['refunded_amount'], course['transactions'].count()),
+            (Decimal('30.00'), Decimal('27.00'), 1, 1, Decimal('30.00'), 2)
+        )
+
+        # Refunds are taken off lesson revenue; an exam without lessons gets its own row
+        rows = finance.private_teaching_revenue_breakdown()
+        self.assertEqual([(row['student'].username, row['subject'].subject) for row in rows], [
+            ('first-examinee', 'first Theory'), ('first-learner', 'first Recorder')
+        ])
+        exam_only, lessons = rows
+        self.assertEqual(
+            (exam_only['lessons_count'], exam_only['lessons_revenue'], exam_only['refunded_count'],
+             exam_only['exams_count'], exam_only['exams_revenue'], exam_only['total_revenue']),
+            (0, Decimal('0.00'), 0, 1, Decimal('55.00'), Decimal('55.00'))
+        )
+        self.assertEqual(
+            (lessons['lessons_count'], lessons['lessons_revenue'], lessons['refunded_count'],
+             lessons['refunded_amount'], lessons['net_lessons_revenue'], lessons['exams_count'],
+             lessons['total_revenue'], lessons['teacher_share']),
+            (3, Decimal('120.00'), 1, Decimal('40.00'), Decimal('80.00'), 0, Decimal('80.00'), Decimal('72.00'))
+        )
+
+        # Subjects count lesson fees only
+        [subject] = finance.private_teaching_subject_breakdown()
+        self.assertEqual(
+            (subject['subject_name'], subject['total_students'], subject['total_lessons'],
+             subject['total_revenue'], subject['percentage'], subject['avg_per_lesson']),
+            ('first Recorder', 1, 3, Decimal('120.0'), 100, Decimal('40.0'))
+        )
+
+        [product] = finance.digital_products_revenue_breakdown()
+        self.assertEqual(product['product'], created['product'])
+        self.assertEqual(
+            (product['total_revenue'], product['teacher_share'], product['sales_count'], product['transactions'].count()),
+            (Decimal('16.00'), Decimal('14.40'), 2, 2)
+        )
+
+    def test_breakdown_queries_do_not_grow_with_rows(self):
+        self.add_everything('first')
+        queries = self.breakdown_queries()
+        self.assertEqual(queries, {
+            'workshop_revenue_breakdown': 3,
+            'course_revenue_breakdown': 3,
+            'private_teaching_revenue_breakdown': 5,
+            'private_teaching_subject_breakdown': 2,
+            'digital_products_revenue_breakdown': 2,
+        })
+
+        self.add_everything('second')
+        self.assertEqual(self.breakdown_queries(), queries)
+        self.assertEqual(len(FinanceContext(self.teacher).private_teaching_revenue_breakdown()), 4)
+
+        # Memoised per context
+        finance = FinanceContext(self.teacher)
+        finance.workshop_revenue_breakdown()
+        with self.assertNumQueries(0):
+            finance.workshop_revenue_breakdown()
+
+
+class RevenueRollupTestCase(TestCase):
+    """Tests for the day/month/tax year rollups maintained from the ledger"""
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher', email='teacher@example.com')
+
+    def record(self, source_id, amount, occurred_at, entry_type=LedgerEntry.CHARGE, domain='courses'):
+        record_entry(
+            teacher=self.teacher,
+            domain=domain,
+            source_type=LedgerEntry.COURSE_ENROLLMENT,
+            source_id=source_id,
+            amount=amount,
+            entry_type=entry_type,
+            occurred_at=occurred_at
+        )
+
+    def test_covering_buckets_prefers_largest_periods(self):
+        buckets = covering_buckets(date(2024, 4, 6), date(2025, 4, 5))
+        self.assertEqual(buckets, {'tax_year': [date(2024, 4, 6)], 'month': [], 'day': []})
+
+        buckets = covering_buckets(date(2024, 3, 30), date(2024, 6, 2))
+        self.assertEqual(buckets['month'], [date(2024, 4, 1), date(2024, 5, 1)])
+        self.assertEqual(buckets['day'], [date(2024, 3, 30), date(2024, 3, 31), date(2024, 6, 1), date(2024, 6, 2)])
+        self.assertEqual(buckets['tax_year'], [])
+
+    def test_incremental_rollups_match_rebuild_and_ledger(self):
+        tz = timezone.get_current_timezone()
+        self.record(1, '100.00', datetime(2024, 4, 5, 12, 0, tzinfo=tz))
+        self.record(2, '40.00', datetime(2024, 4, 6, 9, 0, tzinfo=tz), domain='workshops')
+        self.record(3, '60.00', datetime(2024, 11, 20, 9, 0, tzinfo=tz))
+        self.record(3, '60.00', datetime(2024, 12, 1, 9, 0, tzinfo=tz), entry_type=LedgerEntry.REFUND)
+        self.record(4, '25.00', datetime(2025, 4, 5, 23, 0, tzinfo=tz))
+
+        incremental = sorted(RevenueRollup.objects.values_list(
+            'domain', 'period', 'period_start', 'gross_amount', 'net_amount', 'refund_amount', 'charge_count', 'refund_count'
+        ))
+        self.assertEqual(rebuild_rollups(), len(incremental))
+        rebuilt = sorted(RevenueRollup.objects.values_list(
+            'domain', 'period', 'period_start', 'gross_amount', 'net_amount', 'refund_amount', 'charge_count', 'refund_count'
+        ))
+        self.assertEqual(incremental, rebuilt)
+
+        start = datetime(2024, 4, 6, tzinfo=tz)
+        end = datetime(2025, 4, 5, 23, 59, 59, tzinfo=tz)
+        with self.assertNumQueries(1):
+            period_summary = FinanceService.get_period_revenue_summary(self.teacher, start, end)
+        ledger_summary = FinanceService.get_teacher_revenue_summary(self.teacher, start, end)
+
+        self.assertEqual(period_summary['total_gross'], Decimal('65.00'))
+        self.assertEqual(period_summary['total_refunds'], Decimal('60.00'))
+        for key in ('total_revenue', 'total_gross', 'total_commission', 'payment_count'):
+            self.assertEqual(period_summary[key], ledger_summary[key])
+        self.assertEqual(period_summary['by_domain']['workshops'], ledger_summary['by_domain']['workshops'])
+
+        months = FinanceService.get_monthly_revenue_trend(self.teacher, date(2024, 11, 15))
+        self.assertEqual([row['date'] for row in months], [date(2024, 11, 1), date(2024, 12, 1), date(2025, 4, 1)])
+        self.assertEqual(months[1]['revenue'], Decimal('-54.00'))
+
+    @override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_platform_finance_report_uses_constant_queries(self):
+        tz = timezone.get_current_timezone()
+        other = User.objects.create_user(username='other', email='other@example.com', first_name='Olive')
+        self.record(1, '100.00', datetime(2024, 5, 1, 12, 0, tzinfo=tz))
+        self.record(1, '100.00', datetime(2024, 5, 2, 12, 0, tzinfo=tz), entry_type=LedgerEntry.REFUND)
+        record_entry(
+            teacher=other, domain='workshops', source_type=LedgerEntry.WORKSHOP_REGISTRATION,
+            source_id=1, amount='300.00', occurred_at=datetime(2024, 6, 1, 12, 0, tzinfo=tz)
+        )
+
+        start, end = date(2024, 4, 6), date(2025, 4, 5)
+        platform = domain_totals(None, start, end)
+        self.assertEqual(platform['workshops']['commission'], Decimal('30.00'))
+        self.assertEqual(platform['courses']['refunds'], Decimal('100.00'))
+        self.assertEqual(platform['courses']['gross'], Decimal('0.00'))
+
+        ranked = list(teacher_totals(start, end))
+        self.assertEqual([row['teacher_id'] for row in ranked], [other.id, self.teacher.id])
+
+        staff = User.objects.create_user(username='staff', email='staff@example.com', is_staff=True)
+        staff.profile.profile_completed = True
+        staff.profile.email_verified = True
+        staff.profile.save()
+        self.client.force_login(staff)
+        params = {'period': 'custom', 'start_date': '2024-04-06', 'end_date': '2025-04-05'}
+        response = self.client.get(reverse('admin_portal:finance_report'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['totals']['commission'], Decimal('30.00'))
+        self.assertEqual(response.context['teachers'][0]['name'], 'Olive')
+
+        for index in range(5):
+            teacher = User.objects.create_user(username=f'teacher{index}')
+            record_entry(
+                teacher=teacher, domain='courses', source_type=LedgerEntry.COURSE_ENROLLMENT,
+                source_id=100 + index, amount='10.00', occurred_at=datetime(2024, 7, 1, 12, 0, tzinfo=tz)
+            )
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse('admin_portal:finance_report'), params)
+        for index in range(5, 15):
+            teacher = User.objects.create_user(username=f'teacher{index}')
+            record_entry(
+                teacher=teacher, domain='courses', source_type=LedgerEntry.COURSE_ENROLLMENT,
+                source_id=100 + index, amount='10.00', occurred_at=datetime(2024, 7, 1, 12, 0, tzinfo=tz)
+            )
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(reverse('admin_portal:finance_report'), params)
+        self.assertEqual(len(few), len(many))
+
+        response = self.client.get(reverse('admin_portal:finance_report'), {**params, 'format': 'csv'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 18)
+        self.assertTrue(lines[1].startswith('Olive,other@example.com,300.00,30.00'))
+
+
+@override_settings(WEBHOOK_MAX_ATTEMPTS=2, WEBHOOK_RETRY_BASE_SECONDS=0)
+class WebhookInboxTestCase(TestCase):
+    """Tests for the Stripe webhook inbox"""
+
+    def event(self, event_id='evt_1'):
+        return {
+            'id': event_id,
+            'type': 'checkout.session.completed',
+            'data': {'object': {'id': 'cs_1', 'payment_intent': 'pi_1', 'metadata': {'domain': 'courses', 'total_amount': '20.00'}}},
+        }
+
+    def test_webhook_is_acknowledged_once_and_processed_later(self):
+        body = json.dumps(self.event())
+        with patch('stripe.Webhook.construct_event', side_effect=lambda payload, *args: json.loads(payload)):
+            for _ in range(2):
+                response = self.client.post(
+                    reverse('payments:stripe_webhook'), body,
+                    content_type='application/json', HTTP_STRIPE_SIGNATURE='t=1,v1=x'
+                )
+                self.assertEqual(response.status_code, 200)
+
+        webhook_event = WebhookEvent.objects.get()
+        self.assertEqual(webhook_event.status, WebhookEvent.PENDING)
+        self.assertFalse(StripePayment.objects.exists())
+
+        self.assertEqual(webhook_inbox.drain(), {'processed': 1, 'failed': 0})
+        webhook_event.refresh_from_db()
+        self.assertEqual(webhook_event.status, WebhookEvent.PROCESSED)
+        self.assertEqual(webhook_event.attempts, 1)
+        self.assertIsNotNone(webhook_event.processing_ms)
+        self.assertEqual(StripePayment.objects.get().total_amount, Decimal('20.00'))
+
+        # Already processed: claiming again does nothing
+        self.assertFalse(webhook_inbox.claim(webhook_event.pk))
+
+    def test_failed_events_are_retried_then_dead_lettered(self):
+        webhook_event, created = webhook_inbox.enqueue(self.event())
+        self.assertTrue(created)
+
+        with patch('apps.payments.views.StripeWebhookView.handle_event', side_effect=RuntimeError('boom')):
+            self.assertEqual(webhook_inbox.drain(), {'processed': 0, 'failed': 2})
+
+        webhook_event.refresh_from_db()
+        self.assertEqual(webhook_event.status, WebhookEvent.DEAD)
+        self.assertEqual(webhook_event.attempts, 2)
+        self.assertIn('RuntimeError: boom', webhook_event.last_error)
+        self.assertEqual(webhook_inbox.inbox_stats()['counts'][WebhookEvent.DEAD], 1)
+
+        self.assertEqual(webhook_inbox.requeue_dead(), 1)
+        self.assertEqual(webhook_inbox.drain(), {'processed': 1, 'failed': 0})
+        webhook_event.refresh_from_db()
+        self.assertEqual(webhook_event.status, WebhookEvent.PROCESSED)
+        self.assertEqual(webhook_event.last_error, '')
+
+
+@override_settings(PLATFORM_COMMISSION_PERCENTAGE=10)
+class CartFulfilmentTestCase(TestCase):
+    """Tests for bulk fulfilment of multi-item cart checkouts"""
+
+    def setUp(self):
+        from apps.private_teaching.models import Cart
+        from apps.workshops.models import Workshop
+
+        self.instructor = User.objects.create_user(username='instructor', email='instructor@example.com')
+        self.workshop = Workshop.objects.create(
+            title='Consort Playing', slug='consort-playing', description='Consort',
+            short_description='Consort', learning_objectives='Ensemble skills', instructor=self.instructor,
+            is_free=False, price=Decimal('20.00')
+        )
+        self.cart = Cart.objects.create(user=User.objects.create_user(username='buyer', email='buyer@example.com'))
+
+    def checkout(self, sessions):
+        from apps.workshops.models import WorkshopCartItem, WorkshopSession
+
+        start = timezone.now() + timedelta(days=7)
+        items = []
+        for index in range(sessions):
+            session = WorkshopSession.objects.create(
+                workshop=self.workshop,
+                start_datetime=start + timedelta(days=index),
+                end_datetime=start + timedelta(days=index, hours=2)
+            )
+            items.append(WorkshopCartItem.objects.create(cart=self.cart, session=session, price=Decimal('20.00')))
+
+        stripe_payment = StripePayment.objects.create(
+            stripe_payment_intent_id=f'pi_{StripePayment.objects.count()}', stripe_checkout_session_id='cs_1',
+            domain='workshops', student=self.cart.user, total_amount=Decimal('20.00') * sessions,
+            platform_commission=Decimal('0.00'), teacher_share=Decimal('0.00')
+        )
+        metadata = {'student_id': str(self.cart.user.id)}
+        item_ids = ','.join(str(item.id) for item in items)
+
+        from apps.payments.views import StripeWebhookView
+        with CaptureQueriesContext(connection) as queries:
+            StripeWebhookView().handle_workshop_cart_payment(metadata, stripe_payment, item_ids)
+        return items, len(queries)
+
+    def test_workshop_cart_is_fulfilled_in_constant_queries(self):
+        from apps.workshops.models import WorkshopCartItem, WorkshopRegistration
+
+        self.checkout(1)  # Creates the rollup buckets
+        items, one_item_queries = self.checkout(1)
+        items, ten_item_queries = self.checkout(10)
+        self.assertEqual(one_item_queries, ten_item_queries)
+
+        self.assertFalse(WorkshopCartItem.objects.exists())
+        self.assertEqual(WorkshopRegistration.objects.filter(payment_status='completed').count(), 12)
+        for item in items:
+            item.session.refresh_from_db()
+            self.assertEqual(item.session.current_registrations, 1)
+        self.workshop.refresh_from_db()
+        self.assertEqual(self.workshop.total_registrations, 12)
+
+        self.assertEqual(LedgerEntry.objects.filter(domain='workshops').count(), 12)
+        rollup = RevenueRollup.objects.get(teacher=self.instructor, period=RevenueRollup.TAX_YEAR)
+        self.assertEqual(rollup.gross_amount, Decimal('240.00'))
+        self.assertEqual(rollup.charge_count, 12)
+
+
+class FakeStripeTestCase(TestCase):
+    """Tests for the local Stripe stand-in used by the load test"""
+
+    @override_settings(STRIPE_WEBHOOK_SECRET='whsec_test', WEBHOOK_INBOX_WORKERS=0)
+    def test_checkout_round_trip_through_webhook(self):
+        from apps.digital_products.models import ProductPurchase
+        from apps.payments.fake_stripe import FakeStripe
+        from apps.payments.load_test import SUCCESS_URL, CANCEL_URL, _deliver_in_process, build_checkouts
+
+        checkout = build_checkouts('digital_products', 1)[0]
+        fake = FakeStripe('whsec_test', deliver=_deliver_in_process)
+        with fake.patched():
+            session = checkout['create'](success_url=SUCCESS_URL, cancel_url=CANCEL_URL, **checkout['kwargs'])
+            deliveries = fake.complete_checkout(session.id)
+
+        self.assertEqual([d['status'] for d in deliveries], [200, 200])
+        self.assertEqual(
+            set(WebhookEvent.objects.values_list('event_type', flat=True)),
+            {'checkout.session.completed', 'payment_intent.succeeded'}
+        )
+        self.assertEqual(webhook_inbox.drain(), {'processed': 2, 'failed': 0})
+
+        student = checkout['kwargs']['student']
+        self.assertEqual(ProductPurchase.objects.filter(student=student, payment_status='completed').count(), 3)
+        self.assertEqual(StripePayment.objects.get(stripe_checkout_session_id=session.id).status, 'completed')
+
+
+@override_settings(STRIPE_BREAKER_FAILURES=2, STRIPE_BREAKER_RESET_SECONDS=60)
+class StripeGatewayTestCase(TestCase):
+    """Tests for timeouts, idempotency and circuit breaking around the Stripe API"""
+
+    params = {
+        'payment_method_types': ['card'],
+        'line_items': [{
+            'price_data': {'currency': 'gbp', 'unit_amount': 1500, 'product_data': {'name': 'Lesson'}},
+            'quantity': 1,
+        }],
+        'mode': 'payment',
+        'success_url': 'https://example.com/success',
+        'cancel_url': 'https://example.com/cancel',
+    }
+
+    def test_create_calls_are_idempotent(self):
+        from apps.payments.fake_stripe import FakeStripe
+        from apps.payments.stripe_gateway import get_gateway
+
+        with FakeStripe('whsec_test').patched() as fake:
+            first = get_gateway().create_checkout_session(self.params, idempotency_key='checkout-1')
+            again = get_gateway().create_checkout_session(self.params, idempotency_key='checkout-1')
+            other = get_gateway().create_checkout_session(self.params)
+            stats = get_gateway().stats()
+
+        self.assertEqual(first.id, again.id)
+        self.assertNotEqual(first.id, other.id)
+        self.assertEqual(len(fake.sessions), 2)
+        self.assertEqual(stats['latency']['checkout.sessions.create']['count'], 3)
+
+    def test_breaker_fails_fast_while_stripe_is_down(self):
+        import stripe
+        from apps.payments.fake_stripe import FakeStripe
+        from apps.payments.stripe_gateway import StripeUnavailable, get_gateway
+
+        with FakeStripe('whsec_test').patched() as fake:
+            fake.outage = 503
+            for _ in range(2):
+                with self.assertRaises(stripe.error.APIError):
+                    get_gateway().create_checkout_session(self.params)
+            self.assertEqual(get_gateway().breaker.state, 'open')
+
+            fake.outage = None
+            with self.assertRaises(StripeUnavailable):
+                get_gateway().create_checkout_session(self.params)
+            self.assertEqual(len(fake.sessions), 0)
+
+            # After the reset period one trial call goes through and closes the breaker
+            get_gateway().breaker.opened_at -= 60
+            get_gateway().create_checkout_session(self.params)
+            self.assertEqual(get_gateway().breaker.state, 'closed')
+
+    def test_invalid_requests_do_not_open_breaker(self):
+        import stripe
+        from apps.payments.fake_stripe import FakeStripe
+        from apps.payments.stripe_gateway import get_gateway
+
+        with FakeStripe('whsec_test').patched():
+            for _ in range(3):
+                with self.assertRaises(stripe.error.InvalidRequestError):
+                    get_gateway().retrieve_payment_intent('pi_missing')
+            self.assertEqual(get_gateway().breaker.state, 'closed')
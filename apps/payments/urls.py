@@ -8,6 +8,7 @@ urlpatterns = [
 
     # Finance Dashboard
     path('finance/', views.FinanceDashboardView.as_view(), name='finance_dashboard'),
+    path('finance/transactions/', views.TransactionFeedView.as_view(), name='transaction_feed'),
     path('finance/profit-loss/', views.ProfitLossView.as_view(), name='profit_loss'),
     path('finance/profit-loss/export-csv/', views.ProfitLossCSVExportView.as_view(), name='profit_loss_csv'),
     path('finance/workshops/', views.WorkshopRevenueView.as_view(), name='workshop_revenue'),
@@ -1,3 +1,4 @@
+import json
 import stripe
 import logging
 from django.conf import settings
@@ -7,9 +8,11 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.shortcuts import redirect
 from django.contrib import messages
+from django.db import transaction
 from decimal import Decimal
 
 from .models import StripePayment
+from . import fulfilment, ledger, webhook_inbox
 from .stripe_service import retrieve_session, retrieve_payment_intent
 from .utils import format_amount_from_stripe
 
@@ -37,11 +40,25 @@ class StripeWebhookView(View):
             # Invalid signature
             return HttpResponse(status=400)
 
-        # Log the event type for debugging
-        logger.info(f"Stripe webhook received: {event['type']}")
-        print(f"[WEBHOOK DEBUG] Event type: {event['type']}", flush=True)
+        # Store the event and acknowledge it straight away. Fulfilment (registrations,
+        # orders, emails) runs in the background from the inbox, so slow handlers
+        # can't push Stripe past its timeout and into retrying.
+        webhook_event, created = webhook_inbox.enqueue(json.loads(payload))
+        logger.info(
+            f"Stripe webhook received: {event['type']} ({event['id']})"
+            f"{'' if created else ' - duplicate delivery, already in inbox'}"
+        )
+
+        if created:
+            transaction.on_commit(webhook_inbox.schedule)
+
+        return HttpResponse(status=200)
 
-        # Handle the event
+    def handle_event(self, event):
+        """
+        Dispatch a verified event to its handler.
+        Called by the webhook inbox worker (webhook_inbox.process_event).
+        """
         if event['type'] == 'checkout.session.completed':
             session = event['data']['object']
             self.handle_checkout_session_completed(session)
@@ -63,8 +80,6 @@ class StripeWebhookView(View):
             logger.info(f"Unhandled webhook event type: {event['type']}")
             print(f"[WEBHOOK DEBUG] Unhandled event: {event['type']}", flush=True)
 
-        return HttpResponse(status=200)
-    
     def handle_checkout_session_completed(self, session):
         """Handle successful checkout session completion"""
         metadata = session.get('metadata', {})
@@ -188,34 +203,19 @@ class StripeWebhookView(View):
             registration: WorkshopRegistration object
             metadata: Stripe metadata dict containing terms acceptance data
         """
-        from apps.workshops.models import WorkshopTermsAndConditions, TermsAcceptance
+        from apps.workshops.models import TermsAcceptance
 
-        # Extract terms data from metadata
-        version_number = metadata.get('terms_version')
-        if not version_number:
-            logger.info(f"  No terms version in metadata for registration {registration.id}")
+        terms_version = fulfilment.terms_version_from_metadata(metadata)
+        if not terms_version:
+            logger.info(f"  No terms accepted in metadata for registration {registration.id}")
             return None
 
-        try:
-            # Convert to int if it's a string
-            if isinstance(version_number, str):
-                version_number = int(version_number)
-
-            terms_version = WorkshopTermsAndConditions.objects.get(version=version_number)
-        except (WorkshopTermsAndConditions.DoesNotExist, ValueError):
-            # If specific version not found, use current version
-            logger.info(f"  Terms version {version_number} not found, using current")
-            terms_version = WorkshopTermsAndConditions.objects.filter(is_current=True).first()
-            if not terms_version:
-                logger.warning(f"  No current terms found")
-                return None
-
         # Create TermsAcceptance record
         terms_acceptance = TermsAcceptance.objects.create(
             student=registration.student,
             registration=registration,
             terms_version=terms_version,
-            ip_address=metadata.get('terms_ip_address', ''),
+            ip_address=metadata.get('terms_ip_address') or None,
             user_agent=metadata.get('terms_user_agent', '')
         )
 
@@ -225,7 +225,6 @@ class StripeWebhookView(View):
     def handle_private_teaching_payment(self, metadata, stripe_payment):
         """Update private teaching order when payment succeeds"""
         from apps.private_teaching.models import Order, OrderItem
-        from lessons.models import Lesson
         from django.core.mail import send_mail
         from django.utils import timezone
 
@@ -242,18 +241,10 @@ class StripeWebhookView(View):
                 stripe_payment.order_id = order_id
                 stripe_payment.save()
 
+                ledger.record_order(order, stripe_payment)
+
                 # Mark lessons as paid
-                lesson_ids = metadata.get('lesson_ids', '').split(',')
-                for lesson_id in lesson_ids:
-                    if lesson_id:
-                        try:
-                            # Lesson IDs are UUIDs, not integers - don't convert
-                            lesson = Lesson.objects.get(id=lesson_id.strip())
-                            lesson.payment_status = 'Paid'
-                            lesson.save()
-                            logger.info(f"Marked lesson {lesson_id} as Paid")
-                        except (Lesson.DoesNotExist, ValueError) as e:
-                            logger.error(f"updating lesson {lesson_id}: {e}")
+                fulfilment.mark_lessons_paid(metadata.get('lesson_ids', '').split(','))
 
                 # Send payment confirmation email to student
                 try:
@@ -279,6 +270,30 @@ class StripeWebhookView(View):
                 logger.info(f"Private teaching order {order_id} marked as completed")
             except Order.DoesNotExist:
                 logger.warning(f"Order {order_id} not found")
+
+        exam_id = metadata.get('exam_id')
+        if exam_id:
+            self.handle_exam_payment(exam_id, stripe_payment)
+
+    def handle_exam_payment(self, exam_id, stripe_payment):
+        """Mark an exam registration as paid and record its fee"""
+        from apps.private_teaching.models import ExamRegistration
+        from django.utils import timezone
+
+        try:
+            exam = ExamRegistration.objects.select_related('teacher', 'student', 'subject').get(id=exam_id)
+        except (ExamRegistration.DoesNotExist, ValueError):
+            logger.warning(f"ExamRegistration {exam_id} not found")
+            return
+
+        if exam.payment_status != 'completed':
+            exam.payment_status = 'completed'
+            exam.paid_at = timezone.now()
+            exam.stripe_payment_intent_id = stripe_payment.stripe_payment_intent_id
+            exam.save(update_fields=['payment_status', 'paid_at', 'stripe_payment_intent_id'])
+
+        ledger.record_exam_registration(exam, stripe_payment)
+        logger.info(f"Exam registration {exam_id} marked as paid")
     
     def handle_workshop_payment(self, metadata, stripe_payment):
         """Update workshop registration when payment succeeds"""
@@ -344,6 +359,8 @@ class StripeWebhookView(View):
                 stripe_payment.workshop_id = workshop.id
                 stripe_payment.save()
 
+                ledger.record_workshop_registration(registration, stripe_payment)
+
                 # Send confirmation email to student
                 try:
                     from apps.workshops.notifications import StudentNotificationService
@@ -356,159 +373,32 @@ class StripeWebhookView(View):
                 logger.warning(f"WorkshopRegistration {registration_id} not found")
 
     def handle_workshop_cart_payment(self, metadata, stripe_payment, cart_item_ids):
-        """Handle cart-based workshop payment (multiple sessions)"""
-        from apps.workshops.models import WorkshopRegistration, WorkshopCartItem
+        """
+        Handle cart-based workshop payment (multiple sessions).
+        The whole cart is fulfilled in bulk (see fulfilment.py); errors
+        propagate so the webhook inbox rolls back and retries the event.
+        """
         from django.contrib.auth.models import User
-        from django.core.mail import send_mail
-        from django.utils import timezone
-        import uuid
 
         logger.info(f"\n=== WORKSHOP CART PAYMENT WEBHOOK ===")
-        logger.info(f"Metadata: {metadata}")
         logger.info(f"Cart Item IDs: {cart_item_ids}")
         logger.info(f"Stripe Payment ID: {stripe_payment.stripe_payment_intent_id}")
 
-        item_ids = [id.strip() for id in cart_item_ids.split(',')]
+        item_ids = [id.strip() for id in cart_item_ids.split(',') if id.strip()]
         user_id = metadata.get('student_id')
 
-        logger.info(f"Processing {len(item_ids)} cart items for user {user_id}")
-
         try:
             user = User.objects.get(id=user_id)
-            logger.info(f"Found user: {user.username} ({user.email})")
-            created_registrations = []
-
-            # REFACTORING NOTE: This series detection logic is complex and should be simplified.
-            # Consider adding an explicit 'is_series_purchase' flag to WorkshopCartItem model
-            # to avoid having to query and analyze all items before processing.
-
-            # Check if this is a mandatory series purchase by examining all cart items
-            cart_items = WorkshopCartItem.objects.select_related(
-                'session__workshop'
-            ).filter(id__in=item_ids)
-
-            # Detect if all items belong to same workshop with mandatory series registration
-            is_mandatory_series = False
-            series_registration_id = None
-
-            if len(item_ids) > 1:
-                workshops = set(item.session.workshop for item in cart_items)
-                if len(workshops) == 1:
-                    workshop = workshops.pop()
-                    if workshop.is_series and workshop.require_full_series_registration:
-                        is_mandatory_series = True
-                        series_registration_id = uuid.uuid4()
-                        logger.info(f"Detected mandatory series purchase: {workshop.title}")
-                        logger.info(f"Generated series_registration_id: {series_registration_id}")
-
-            for item_id in item_ids:
-                logger.info(f"\n  Processing cart item: {item_id}")
-                try:
-                    cart_item = WorkshopCartItem.objects.select_related(
-                        'session__workshop__instructor',
-                        'session__workshop__category',
-                        'child_profile'
-                    ).get(id=item_id)
-
-                    logger.info(f"  Found cart item: {cart_item.session.workshop.title}")
-                    logger.info(f"  Session: {cart_item.session.start_datetime}")
-                    logger.info(f"  Price: £{cart_item.price}")
-
-                    # Create registration with data from cart item
-                    registration = WorkshopRegistration.objects.create(
-                        session=cart_item.session,
-                        student=user,
-                        email=cart_item.email or user.email,
-                        phone=cart_item.phone or '',
-                        emergency_contact=cart_item.emergency_contact or '',
-                        experience_level=cart_item.experience_level or '',
-                        expectations=cart_item.expectations or '',
-                        special_requirements=cart_item.special_requirements or '',
-                        child_profile=cart_item.child_profile,
-                        status='registered',
-                        payment_status='completed',
-                        payment_amount=cart_item.price,
-                        stripe_payment_intent_id=stripe_payment.stripe_payment_intent_id,
-                        stripe_checkout_session_id=stripe_payment.stripe_checkout_session_id,
-                        paid_at=timezone.now(),
-                        series_registration_id=series_registration_id  # Link series registrations together
-                    )
-
-                    logger.info(f"  ✓ Created registration ID: {registration.id}")
-
-                    # Create terms acceptance record
-                    self._create_terms_acceptance_from_metadata(registration, metadata)
-                    logger.info(f"    - Status: {registration.status}")
-                    logger.info(f"    - Payment Status: {registration.payment_status}")
-                    logger.info(f"    - Paid At: {registration.paid_at}")
-                    logger.info(f"    - Registration Date: {registration.registration_date}")
-
-                    # Update session registration count
-                    session = cart_item.session
-                    session.current_registrations = session.registrations.filter(
-                        status__in=['registered', 'promoted', 'attended']
-                    ).count()
-                    session.save(update_fields=['current_registrations'])
-
-                    # Update workshop total registrations
-                    workshop = session.workshop
-                    workshop.total_registrations = WorkshopRegistration.objects.filter(
-                        session__workshop=workshop,
-                        status__in=['registered', 'attended']
-                    ).count()
-                    workshop.save(update_fields=['total_registrations'])
-
-                    # Send notification to instructor
-                    try:
-                        from apps.workshops.notifications import InstructorNotificationService
-                        InstructorNotificationService.send_new_registration_notification(registration)
-                        logger.info(f"  ✓ Sent notification to instructor {session.workshop.instructor.email}")
-                    except Exception as e:
-                        logger.info(f"  ✗ Failed to send instructor notification: {e}")
-
-                    # Store for email
-                    created_registrations.append(registration)
-
-                    # Delete cart item
-                    cart_item.delete()
-                    logger.info(f"  ✓ Deleted cart item {item_id}")
-
-                except WorkshopCartItem.DoesNotExist:
-                    logger.warning(f"  ✗ Cart item {item_id} not found (may have been already processed)")
-                except Exception as e:
-                    import traceback
-                    logger.info(f"  ✗ Error processing cart item {item_id}: {str(e)}")
-                    logger.info(f"  Traceback: {traceback.format_exc()}")
-
-            # Send consolidated confirmation email
-            if created_registrations and user.email:
-                try:
-                    logger.info(f"\nSending confirmation email to {user.email}...")
-                    from apps.workshops.notifications import StudentNotificationService
-                    StudentNotificationService.send_cart_registration_confirmation(
-                        user, created_registrations, stripe_payment.total_amount
-                    )
-                    logger.info(f"✓ Email sent successfully")
-                except Exception as e:
-                    logger.info(f"✗ Error sending cart confirmation email: {e}")
-
-            logger.info(f"\n=== SUMMARY ===")
-            logger.info(f"Successfully created {len(created_registrations)} registrations:")
-            for reg in created_registrations:
-                logger.info(f"  - {reg.session.workshop.title} (ID: {reg.id}, Status: {reg.status}, Payment: {reg.payment_status})")
-
-            # Mark payment as completed
-            stripe_payment.mark_completed()
-            logger.info(f"✓ Marked StripePayment {stripe_payment.id} as completed")
-            logger.info(f"=== END WORKSHOP CART PAYMENT ===\n")
-
         except User.DoesNotExist:
             logger.warning(f"✗ User {user_id} not found")
-        except Exception as e:
-            import traceback
-            logger.info(f"✗ Error in handle_workshop_cart_payment: {str(e)}")
-            logger.info(f"Traceback: {traceback.format_exc()}")
+            return
 
+        fulfilment.fulfil_workshop_cart(user, item_ids, metadata, stripe_payment)
+
+        # Mark payment as completed
+        stripe_payment.mark_completed()
+        logger.info(f"✓ Marked StripePayment {stripe_payment.id} as completed")
+        logger.info(f"=== END WORKSHOP CART PAYMENT ===\n")
 
     def handle_course_payment(self, metadata, stripe_payment):
         """Update course enrollment when payment succeeds"""
@@ -542,6 +432,8 @@ class StripeWebhookView(View):
                 stripe_payment.course_id = course.id
                 stripe_payment.save()
 
+                ledger.record_course_enrollment(enrollment, stripe_payment)
+
                 # Send notification to instructor
                 try:
                     from apps.courses.notifications import InstructorNotificationService
@@ -562,8 +454,8 @@ class StripeWebhookView(View):
 
     def handle_digital_product_payment(self, metadata, stripe_payment):
         """Handle digital product purchase when payment succeeds"""
-        from apps.digital_products.models import DigitalProduct, ProductPurchase, DigitalProductCartItem
-        from apps.digital_products.notifications import send_purchase_confirmation, send_cart_purchase_confirmation
+        from apps.digital_products.models import DigitalProduct, ProductPurchase
+        from apps.digital_products.notifications import send_purchase_confirmation
         from django.utils import timezone
 
         logger.info(f">>> handle_digital_product_payment called")
@@ -594,6 +486,8 @@ class StripeWebhookView(View):
                 product.total_sales += 1
                 product.save(update_fields=['total_sales'])
 
+                ledger.record_product_purchase(purchase, stripe_payment)
+
                 # Send download email
                 try:
                     send_purchase_confirmation(purchase)
@@ -607,57 +501,13 @@ class StripeWebhookView(View):
                 logger.error(f"Product {product_id} not found")
 
         elif product_ids:
-            # Cart purchase (multiple products)
-            product_id_list = [pid.strip() for pid in product_ids.split(',')]
-            student = stripe_payment.student
-            created_purchases = []
-
-            for pid in product_id_list:
-                try:
-                    product = DigitalProduct.objects.get(id=pid)
-
-                    # Get price from cart item
-                    cart_item = DigitalProductCartItem.objects.filter(
-                        cart__user=student,
-                        product=product
-                    ).first()
-
-                    purchase_price = cart_item.price if cart_item else product.price
-
-                    # Create purchase record
-                    purchase = ProductPurchase.objects.create(
-                        product=product,
-                        student=student,
-                        payment_status='completed',
-                        payment_amount=purchase_price,
-                        stripe_payment_intent_id=stripe_payment.stripe_payment_intent_id,
-                        stripe_checkout_session_id=stripe_payment.stripe_checkout_session_id,
-                        paid_at=timezone.now()
-                    )
-
-                    # Update product sales count
-                    product.total_sales += 1
-                    product.save(update_fields=['total_sales'])
-
-                    created_purchases.append(purchase)
-                    logger.info(f"Created ProductPurchase {purchase.id} for product {product.title}")
-
-                except DigitalProduct.DoesNotExist:
-                    logger.error(f"Product {pid} not found")
-
-            # Clear cart items
-            cart_id = metadata.get('cart_id')
-            if cart_id:
-                DigitalProductCartItem.objects.filter(cart_id=cart_id).delete()
-                logger.info(f"Cleared cart {cart_id}")
-
-            # Send consolidated email with all purchases
-            if created_purchases:
-                try:
-                    send_cart_purchase_confirmation(student, created_purchases)
-                    logger.info(f"Sent cart purchase confirmation email to {student.email}")
-                except Exception as e:
-                    logger.error(f"Failed to send cart purchase confirmation email: {e}")
+            # Cart purchase (multiple products), fulfilled in bulk
+            fulfilment.fulfil_product_cart(
+                stripe_payment.student,
+                [pid.strip() for pid in product_ids.split(',') if pid.strip()],
+                stripe_payment,
+                cart_id=metadata.get('cart_id')
+            )
 
         # Mark payment as completed
         stripe_payment.mark_completed()
@@ -711,50 +561,32 @@ class FinanceDashboardView(LoginRequiredMixin, TeacherOnlyMixin, DateRangeMixin,
             start_date = timezone.now() - timedelta(days=365)
             end_date = None
 
+        # Shared per-request datasets - each is queried once however many widgets use it
+        finance = FinanceService.for_request(self.request)
+
         # Get overall summary
-        summary = FinanceService.get_teacher_revenue_summary(teacher, start_date, end_date)
+        summary = finance.revenue_summary(start_date, end_date)
 
-        # Get recent transactions
-        recent_transactions = FinanceService.get_recent_transactions(teacher, limit=10)
+        # Get recent transactions (first page of the transaction feed)
+        feed = FinanceService.get_transaction_feed(teacher, limit=10)
+        recent_transactions = feed['transactions']
 
         # Get revenue trend
         trend = FinanceService.get_revenue_trend(teacher, days=30)
 
-        # Get expense data
-        from apps.expenses.models import Expense
-        expense_queryset = Expense.objects.filter(created_by=teacher)
-
-        if start_date:
-            expense_queryset = expense_queryset.filter(date__gte=start_date.date())
-
-        # Calculate total expenses
-        total_expenses = expense_queryset.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-
-        # Calculate expenses by business area
-        expenses_by_area = expense_queryset.values('business_area').annotate(
-            total=Sum('amount')
-        ).order_by('business_area')
-
-        expense_breakdown = {
-            'workshops': Decimal('0.00'),
-            'courses': Decimal('0.00'),
-            'private_teaching': Decimal('0.00'),
-            'digital_products': Decimal('0.00'),
-            'general': Decimal('0.00'),
-        }
-
-        for item in expenses_by_area:
-            expense_breakdown[item['business_area']] = item['total']
+        # Get expense totals, count and business area breakdown (one grouped query)
+        expenses = finance.expense_totals(start_date)
+        total_expenses = expenses['total']
+        expense_breakdown = expenses['by_area']
+        expense_count = expenses['count']
 
         # Calculate net profit
         net_profit = summary['total_revenue'] - total_expenses
 
-        # Add expense count
-        expense_count = expense_queryset.count()
-
         context.update({
             'summary': summary,
             'recent_transactions': recent_transactions,
+            'transactions_next_cursor': feed['next_cursor'],
             'trend': trend,
             'selected_range': date_range,
             'total_expenses': total_expenses,
@@ -766,34 +598,85 @@ class FinanceDashboardView(LoginRequiredMixin, TeacherOnlyMixin, DateRangeMixin,
         return context
 
 
+class TransactionFeedView(LoginRequiredMixin, TeacherOnlyMixin, View):
+    """
+    JSON transaction feed for infinite scrolling on the finance dashboard.
+
+    GET params:
+        cursor: next_cursor from the previous page (omit for the first page)
+        limit: Transactions per page (default 20, max 100)
+        domain: Optional domain filter (workshops, courses, ...)
+
+    Returns:
+        {"transactions": [...], "next_cursor": "..." or null}
+    """
+    max_limit = 100
+
+    def handle_no_permission(self):
+        return JsonResponse({'error': 'Teacher account required'}, status=403)
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.GET.get('limit', 20)), 1), self.max_limit)
+        except ValueError:
+            return JsonResponse({'error': 'limit must be a number'}, status=400)
+
+        domain = request.GET.get('domain') or None
+        if domain and domain not in dict(StripePayment.DOMAIN_CHOICES):
+            return JsonResponse({'error': f'Unknown domain: {domain}'}, status=400)
+
+        try:
+            feed = FinanceService.get_transaction_feed(
+                request.user,
+                cursor=request.GET.get('cursor') or None,
+                limit=limit,
+                domain=domain
+            )
+        except ValueError:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+        return JsonResponse({
+            'transactions': [
+                {
+                    'id': transaction['id'],
+                    'date': transaction['date'].isoformat(),
+                    'domain': transaction['domain'],
+                    'domain_display': transaction['domain_display'],
+                    'description': transaction['description'],
+                    'student': (
+                        transaction['student'].get_full_name() or transaction['student'].username
+                    ) if transaction['student'] else '',
+                    'amount': str(transaction['amount']),
+                    'teacher_share': str(transaction['teacher_share']),
+                    'is_refunded': transaction['is_refunded'],
+                }
+                for transaction in feed['transactions']
+            ],
+            'next_cursor': feed['next_cursor'],
+        })
+
+
 class WorkshopRevenueView(LoginRequiredMixin, TeacherOnlyMixin, DateRangeMixin, TemplateView):
     """Detailed workshop revenue breakdown"""
     template_name = 'payments/workshop_revenue.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        teacher = self.request.user
 
         # Get date range using mixin
         start_date, end_date = self.get_date_range()
         date_range = self.request.GET.get('range', '30')
 
+        finance = FinanceService.for_request(self.request)
+
         # Get domain revenue
-        domain_data = FinanceService.get_domain_revenue(teacher, 'workshops', start_date, end_date)
+        domain_data = finance.domain_revenue('workshops', start_date, end_date)
 
         # Get workshop breakdown
-        workshop_breakdown = FinanceService.get_workshop_revenue_breakdown(teacher, start_date, end_date)
+        workshop_breakdown = finance.workshop_revenue_breakdown(start_date, end_date)
 
         # Get workshop expenses
-        from apps.expenses.models import Expense
-        workshop_expenses = Expense.objects.filter(
-            created_by=teacher,
-            business_area='workshops'
-        )
-        if start_date:
-            workshop_expenses = workshop_expenses.filter(date__gte=start_date.date())
-
-        total_expenses = workshop_expenses.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        total_expenses = finance.expense_totals(start_date)['by_area']['workshops']
         net_profit = domain_data['total_revenue'] - total_expenses
 
         context.update({
@@ -813,28 +696,21 @@ class CourseRevenueView(LoginRequiredMixin, TeacherOnlyMixin, DateRangeMixin, Te
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        teacher = self.request.user
 
         # Get date range using mixin
         start_date, end_date = self.get_date_range()
         date_range = self.request.GET.get('range', '30')
 
+        finance = FinanceService.for_request(self.request)
+
         # Get domain revenue
-        domain_data = FinanceService.get_domain_revenue(teacher, 'courses', start_date, end_date)
+        domain_data = finance.domain_revenue('courses', start_date, end_date)
 
         # Get course breakdown
-        course_breakdown = FinanceService.get_course_revenue_breakdown(teacher, start_date, end_date)
+        course_breakdown = finance.course_revenue_breakdown(start_date, end_date)
 
         # Get course expenses
-        from apps.expenses.models import Expense
-        course_expenses = Expense.objects.filter(
-            created_by=teacher,
-            business_area='courses'
-        )
-        if start_date:
-            course_expenses = course_expenses.filter(date__gte=start_date.date())
-
-        total_expenses = course_expenses.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        total_expenses = finance.expense_totals(start_date)['by_area']['courses']
         net_profit = domain_data['total_revenue'] - total_expenses
 
         context.update({
@@ -854,28 +730,21 @@ class PrivateTeachingRevenueView(LoginRequiredMixin, TeacherOnlyMixin, DateRange
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        teacher = self.request.user
 
         # Get date range using mixin
         start_date, end_date = self.get_date_range()
         date_range = self.request.GET.get('range', '30')
 
+        finance = FinanceService.for_request(self.request)
+
         # Get domain revenue
-        domain_data = FinanceService.get_domain_revenue(teacher, 'private_teaching', start_date, end_date)
+        domain_data = finance.domain_revenue('private_teaching', start_date, end_date)
 
         # Get student breakdown
-        student_breakdown = FinanceService.get_private_teaching_revenue_breakdown(teacher, start_date, end_date)
+        student_breakdown = finance.private_teaching_revenue_breakdown(start_date, end_date)
 
         # Get private teaching expenses
-        from apps.expenses.models import Expense
-        private_teaching_expenses = Expense.objects.filter(
-            created_by=teacher,
-            business_area='private_teaching'
-        )
-        if start_date:
-            private_teaching_expenses = private_teaching_expenses.filter(date__gte=start_date.date())
-
-        total_expenses = private_teaching_expenses.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        total_expenses = finance.expense_totals(start_date)['by_area']['private_teaching']
         net_profit = domain_data['total_revenue'] - total_expenses
 
         context.update({
@@ -895,28 +764,21 @@ class PrivateTeachingSubjectRevenueView(LoginRequiredMixin, TeacherOnlyMixin, Da
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        teacher = self.request.user
 
         # Get date range using mixin
         start_date, end_date = self.get_date_range()
         date_range = self.request.GET.get('range', '30')
 
+        finance = FinanceService.for_request(self.request)
+
         # Get domain revenue
-        domain_data = FinanceService.get_domain_revenue(teacher, 'private_teaching', start_date, end_date)
+        domain_data = finance.domain_revenue('private_teaching', start_date, end_date)
 
         # Get subject breakdown
-        subject_breakdown = FinanceService.get_private_teaching_subject_breakdown(teacher, start_date, end_date)
+        subject_breakdown = finance.private_teaching_subject_breakdown(start_date, end_date)
 
         # Get private teaching expenses
-        from apps.expenses.models import Expense
-        private_teaching_expenses = Expense.objects.filter(
-            created_by=teacher,
-            business_area='private_teaching'
-        )
-        if start_date:
-            private_teaching_expenses = private_teaching_expenses.filter(date__gte=start_date.date())
-
-        total_expenses = private_teaching_expenses.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        total_expenses = finance.expense_totals(start_date)['by_area']['private_teaching']
         net_profit = domain_data['total_revenue'] - total_expenses
 
         context.update({
@@ -985,34 +847,14 @@ class ProfitLossView(LoginRequiredMixin, TeacherOnlyMixin, DateRangeMixin, Templ
             start_date_str = start_date.strftime('%Y-%m-%d') if start_date else ''
             end_date_str = end_date.strftime('%Y-%m-%d') if end_date else ''
 
-        # Get revenue summary
-        summary = FinanceService.get_teacher_revenue_summary(teacher, start_date, end_date)
-
-        # Get expense data
-        from apps.expenses.models import Expense
-        expense_queryset = Expense.objects.filter(created_by=teacher)
-
-        if start_date:
-            expense_queryset = expense_queryset.filter(date__gte=start_date.date())
-
-        # Calculate total expenses
-        total_expenses = expense_queryset.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        # Get revenue summary (from the day/month/tax year rollups)
+        summary = FinanceService.get_period_revenue_summary(teacher, start_date, end_date)
 
-        # Calculate expenses by business area
-        expenses_by_area = expense_queryset.values('business_area').annotate(
-            total=Sum('amount')
-        ).order_by('business_area')
-
-        expense_breakdown = {
-            'workshops': Decimal('0.00'),
-            'courses': Decimal('0.00'),
-            'private_teaching': Decimal('0.00'),
-            'digital_products': Decimal('0.00'),
-            'general': Decimal('0.00'),
-        }
-
-        for item in expenses_by_area:
-            expense_breakdown[item['business_area']] = item['total']
+        # Get expense totals and business area breakdown (one grouped query)
+        finance = FinanceService.for_request(self.request)
+        expenses = finance.expense_totals(start_date)
+        total_expenses = expenses['total']
+        expense_breakdown = expenses['by_area']
 
         # Calculate net profit by business area
         profit_by_area = {
@@ -1053,27 +895,24 @@ class ProfitLossView(LoginRequiredMixin, TeacherOnlyMixin, DateRangeMixin, Templ
 
         twelve_months_ago = timezone.now() - relativedelta(months=12)
 
-        # Monthly revenue trend - aggregate by month to match expense structure
-        monthly_revenue = StripePayment.objects.filter(
-            teacher=teacher,
-            status='completed',
-            completed_at__gte=twelve_months_ago
-        ).annotate(
-            month=TruncMonth('completed_at')
-        ).values('month').annotate(
-            total=Sum('teacher_share')
-        ).order_by('month')
+        # Monthly revenue trend from the monthly rollups - matches the expense structure
+        monthly_revenue = FinanceService.get_monthly_revenue_trend(teacher, twelve_months_ago.date())
 
         # Convert monthly revenue to JSON-safe format for template
         revenue_trend = json.dumps([
             {
-                'date': item['month'].strftime('%Y-%m-%d'),
-                'amount': float(item['total'])
+                'date': item['date'].strftime('%Y-%m-%d'),
+                'amount': float(item['revenue'])
             }
             for item in monthly_revenue
         ])
 
         # Monthly expense trend
+        from apps.expenses.models import Expense
+        expense_queryset = Expense.objects.filter(created_by=teacher)
+        if start_date:
+            expense_queryset = expense_queryset.filter(date__gte=start_date.date())
+
         monthly_expenses = expense_queryset.filter(
             date__gte=twelve_months_ago.date()
         ).annotate(
@@ -1099,13 +938,25 @@ class ProfitLossView(LoginRequiredMixin, TeacherOnlyMixin, DateRangeMixin, Templ
 
 
 
+def _money(amount):
+    """Amount rounded to pence for P&L exports"""
+    return Decimal(amount).quantize(Decimal("0.01"))
+
+
+def _margin(net_profit, revenue):
+    """Profit margin percentage for P&L exports ('-' when there is no revenue)"""
+    if revenue > 0:
+        return (Decimal(net_profit) / Decimal(revenue) * 100).quantize(Decimal("0.1"))
+    return "-"
+
+
 class ProfitLossCSVExportView(LoginRequiredMixin, TeacherOnlyMixin, View):
     """
-    Export Profit & Loss statement as CSV file for tax/accounting purposes.
+    Export Profit & Loss statement as a streamed CSV (or XLSX with
+    ?format=xlsx) file for tax/accounting purposes.
     """
 
     def get(self, request):
-        import csv
         from datetime import datetime
 
         teacher = request.user
@@ -1137,129 +988,68 @@ class ProfitLossCSVExportView(LoginRequiredMixin, TeacherOnlyMixin, View):
             start_date_str = tax_year_start.strftime("%Y-%m-%d")
             end_date_str = tax_year_end.strftime("%Y-%m-%d")
 
-        # Get revenue summary
-        summary = FinanceService.get_teacher_revenue_summary(teacher, start_date, end_date)
-
-        # Get expense data
-        from apps.expenses.models import Expense
-        expense_queryset = Expense.objects.filter(created_by=teacher)
-
-        if start_date:
-            expense_queryset = expense_queryset.filter(date__gte=start_date.date())
-        if end_date:
-            expense_queryset = expense_queryset.filter(date__lte=end_date.date())
-
-        total_expenses = expense_queryset.aggregate(total=Sum("amount"))["total"] or Decimal("0.00")
-
-        # Calculate expenses by business area
-        expenses_by_area = expense_queryset.values("business_area").annotate(
-            total=Sum("amount")
-        ).order_by("business_area")
-
-        expense_breakdown = {
-            "workshops": Decimal("0.00"),
-            "courses": Decimal("0.00"),
-            "private_teaching": Decimal("0.00"),
-            "digital_products": Decimal("0.00"),
-            "general": Decimal("0.00"),
-        }
-
-        for item in expenses_by_area:
-            expense_breakdown[item["business_area"]] = item["total"]
-
-        # Calculate net profit by business area
-        profit_by_area = {
-            "workshops": {
-                "revenue": summary["by_domain"]["workshops"]["revenue"],
-                "expenses": expense_breakdown["workshops"],
-                "net_profit": summary["by_domain"]["workshops"]["revenue"] - expense_breakdown["workshops"],
-            },
-            "courses": {
-                "revenue": summary["by_domain"]["courses"]["revenue"],
-                "expenses": expense_breakdown["courses"],
-                "net_profit": summary["by_domain"]["courses"]["revenue"] - expense_breakdown["courses"],
-            },
-            "private_teaching": {
-                "revenue": summary["by_domain"]["private_teaching"]["revenue"],
-                "expenses": expense_breakdown["private_teaching"],
-                "net_profit": summary["by_domain"]["private_teaching"]["revenue"] - expense_breakdown["private_teaching"],
-            },
-            "digital_products": {
-                "revenue": summary["by_domain"]["digital_products"]["revenue"],
-                "expenses": expense_breakdown["digital_products"],
-                "net_profit": summary["by_domain"]["digital_products"]["revenue"] - expense_breakdown["digital_products"],
-            },
-            "general": {
-                "revenue": Decimal("0.00"),
-                "expenses": expense_breakdown["general"],
-                "net_profit": -expense_breakdown["general"],
-            },
-        }
-
-        net_profit = summary["total_revenue"] - total_expenses
-
-        # Create CSV response
-        response = HttpResponse(content_type="text/csv")
-        filename = f"profit_loss_{start_date_str}_to_{end_date_str}.csv"
-        response["Content-Disposition"] = f'attachment; filename="{filename}"'
-
-        writer = csv.writer(response)
-
-        # Header
-        writer.writerow(["Profit & Loss Statement"])
-        writer.writerow([f"Period: {start_date_str} to {end_date_str}"])
-        writer.writerow([f"Teacher: {teacher.get_full_name()}"])
-        writer.writerow([f"Generated: {timezone.now().strftime('%Y-%m-%d %H:%M')}"])
-        writer.writerow([])  # Empty row
-
-        # Column headers
-        writer.writerow(["Business Area", "Revenue (£)", "Expenses (£)", "Net Profit (£)", "Profit Margin (%)"])
-
-        # Data rows
-        for area_key, area_name in [
-            ("workshops", "Workshops"),
-            ("courses", "Courses"),
-            ("private_teaching", "Private Teaching"),
-            ("digital_products", "Digital Products"),
-            ("general", "General/Shared"),
-        ]:
-            area_data = profit_by_area[area_key]
-            revenue = float(area_data["revenue"])
-            expenses = float(area_data["expenses"])
-            net_profit_val = float(area_data["net_profit"])
-
-            if revenue > 0:
-                profit_margin = (net_profit_val / revenue) * 100
-            else:
-                profit_margin = 0
-
-            writer.writerow([
-                area_name,
-                f"{revenue:.2f}",
-                f"{expenses:.2f}",
-                f"{net_profit_val:.2f}",
-                f"{profit_margin:.1f}" if revenue > 0 else "-"
-            ])
-
-        # Total row
-        writer.writerow([])  # Empty row
-        writer.writerow([
-            "TOTAL",
-            f'{float(summary["total_revenue"]):.2f}',
-            f"{float(total_expenses):.2f}",
-            f"{float(net_profit):.2f}",
-            f'{(float(net_profit) / float(summary["total_revenue"]) * 100):.1f}' if summary["total_revenue"] > 0 else "-"
-        ])
-
-        # Additional info
-        writer.writerow([])
-        writer.writerow([])
-        writer.writerow(["Additional Information"])
-        writer.writerow(["Gross Revenue", f'£{float(summary["total_gross"]):.2f}'])
-        writer.writerow(["Platform Fee (10%)", f'£{float(summary["total_commission"]):.2f}'])
-        writer.writerow(["Net Revenue", f'£{float(summary["total_revenue"]):.2f}'])
-        writer.writerow(["Total Expenses", f"£{float(total_expenses):.2f}"])
-        writer.writerow(["Net Profit", f"£{float(net_profit):.2f}"])
-
-        return response
+        from apps.core.exports import export_format, export_response
+
+        def rows():
+            # Header rows go out before any totals are queried
+            yield ["Profit & Loss Statement"]
+            yield [f"Period: {start_date_str} to {end_date_str}"]
+            yield [f"Teacher: {teacher.get_full_name()}"]
+            yield [f"Generated: {timezone.now().strftime('%Y-%m-%d %H:%M')}"]
+            yield []  # Empty row
+
+            # Get revenue summary (from the day/month/tax year rollups)
+            summary = FinanceService.get_period_revenue_summary(teacher, start_date, end_date)
+
+            # Get expense totals and business area breakdown (one grouped query)
+            expenses = FinanceService.for_request(request).expense_totals(start_date, end_date)
+            total_expenses = expenses["total"]
+            expense_breakdown = expenses["by_area"]
+
+            net_profit = summary["total_revenue"] - total_expenses
+
+            # Column headers
+            yield ["Business Area", "Revenue (£)", "Expenses (£)", "Net Profit (£)", "Profit Margin (%)"]
+
+            # Data rows
+            for area_key, area_name in [
+                ("workshops", "Workshops"),
+                ("courses", "Courses"),
+                ("private_teaching", "Private Teaching"),
+                ("digital_products", "Digital Products"),
+                ("general", "General/Shared"),
+            ]:
+                # General doesn't have revenue - it is always a cost
+                revenue = summary["by_domain"][area_key]["revenue"] if area_key != "general" else Decimal("0.00")
+                expenses = expense_breakdown[area_key]
+                yield [
+                    area_name,
+                    _money(revenue),
+                    _money(expenses),
+                    _money(revenue - expenses),
+                    _margin(revenue - expenses, revenue),
+                ]
+
+            # Total row
+            yield []  # Empty row
+            yield [
+                "TOTAL",
+                _money(summary["total_revenue"]),
+                _money(total_expenses),
+                _money(net_profit),
+                _margin(net_profit, summary["total_revenue"]),
+            ]
+
+            # Additional info
+            yield []
+            yield []
+            yield ["Additional Information"]
+            yield ["Gross Revenue (£)", _money(summary["total_gross"])]
+            yield ["Platform Fee (£)", _money(summary["total_commission"])]
+            yield ["Net Revenue (£)", _money(summary["total_revenue"])]
+            yield ["Total Expenses (£)", _money(total_expenses)]
+            yield ["Net Profit (£)", _money(net_profit)]
+
+        filename = f"profit_loss_{start_date_str}_to_{end_date_str}"
+        return export_response(rows(), filename, export_format(request), sheet_name="Profit & Loss")
 
@@ -0,0 +1,256 @@
+"""
+Stripe Webhook Inbox
+
+StripeWebhookView verifies each event, stores it here as a WebhookEvent and
+returns 200 straight away. Fulfilment happens afterwards:
+
+- schedule() is called once the request's transaction commits and hands a
+  drain() to a small in-process thread pool (WEBHOOK_INBOX_WORKERS threads).
+- `manage.py process_webhook_inbox` runs the same drain() as a standalone
+  worker and picks up anything the web process didn't finish (restarts,
+  retries that fall due later, WEBHOOK_INBOX_WORKERS = 0). recordered.crontab
+  runs it with --once every minute.
+
+Events are keyed by Stripe's event id, so redelivered events are stored once
+and processed once. Workers claim an event with a conditional UPDATE, so two
+workers never process the same event. A failed attempt is retried with
+exponential backoff (WEBHOOK_RETRY_BASE_SECONDS, doubling) and the event is
+dead-lettered after WEBHOOK_MAX_ATTEMPTS; dead events can be requeued from
+the admin or the command. Each attempt's duration is kept in processing_ms.
+"""
+
+import logging
+import time
+import traceback
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, Max
+from django.utils import timezone
+
+from apps.core import background
+
+from .models import WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+_pool = background.BackgroundPool('webhook-inbox', 'WEBHOOK_INBOX_WORKERS', 2)
+
+
+def _setting(name: str, default: int) -> int:
+    return getattr(settings, name, default)
+
+
+# =============================================================================
+# RECEIVING
+# =============================================================================
+
+def enqueue(event: Dict) -> Tuple[WebhookEvent, bool]:
+    """
+    Store a verified Stripe event for processing.
+
+    Returns:
+        (webhook_event, created) - created is False for a redelivered event,
+        which is left as it is
+    """
+    return WebhookEvent.objects.get_or_create(
+        stripe_event_id=event['id'],
+        defaults={
+            'event_type': event.get('type', ''),
+            'payload': event,
+        }
+    )
+
+
+def schedule():
+    """
+    Drain the inbox on the in-process worker pool.
+    Does nothing when WEBHOOK_INBOX_WORKERS is 0 (process_webhook_inbox only).
+    """
+    _pool.submit(drain)
+
+
+# =============================================================================
+# PROCESSING
+# =============================================================================
+
+def due_events():
+    """Events ready for an attempt, oldest first"""
+    return WebhookEvent.objects.filter(
+        status__in=[WebhookEvent.PENDING, WebhookEvent.FAILED],
+        next_attempt_at__lte=timezone.now()
+    ).order_by('next_attempt_at', 'id')
+
+
+def claim(event_id: int) -> bool:
+    """
+    Mark an event as being processed by this worker.
+    The status check and update are one statement, so only one worker wins.
+    """
+    now = timezone.now()
+    claimed = WebhookEvent.objects.filter(
+        pk=event_id,
+        status__in=[WebhookEvent.PENDING, WebhookEvent.FAILED],
+        next_attempt_at__lte=now
+    ).update(status=WebhookEvent.PROCESSING, locked_at=now)
+    return claimed == 1
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before the next attempt: base, 2x base, 4x base, ..."""
+    base = _setting('WEBHOOK_RETRY_BASE_SECONDS', 30)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def process_event(webhook_event: WebhookEvent) -> bool:
+    """
+    Run the handler for a claimed event and record the outcome.
+
+    The handler runs in its own transaction, so a failed attempt leaves no
+    partial fulfilment behind before it is retried.
+
+    Returns:
+        True if the event was processed
+    """
+    from .views import StripeWebhookView
+
+    webhook_event.attempts += 1
+    started = time.monotonic()
+    try:
+        with transaction.atomic():
+            StripeWebhookView().handle_event(webhook_event.payload)
+    except Exception as e:
+        webhook_event.processing_ms = int((time.monotonic() - started) * 1000)
+        webhook_event.last_error = ''.join(traceback.format_exception(e))[-5000:]
+        webhook_event.locked_at = None
+
+        if webhook_event.attempts >= _setting('WEBHOOK_MAX_ATTEMPTS', 5):
+            webhook_event.status = WebhookEvent.DEAD
+            logger.error(
+                f"Webhook event {webhook_event.stripe_event_id} ({webhook_event.event_type}) "
+                f"dead-lettered after {webhook_event.attempts} attempts: {e}"
+            )
+        else:
+            webhook_event.status = WebhookEvent.FAILED
+            webhook_event.next_attempt_at = timezone.now() + retry_delay(webhook_event.attempts)
+            logger.warning(
+                f"Webhook event {webhook_event.stripe_event_id} ({webhook_event.event_type}) "
+                f"failed on attempt {webhook_event.attempts}, retrying at {webhook_event.next_attempt_at}: {e}"
+            )
+        webhook_event.save(update_fields=[
+            'status', 'attempts', 'next_attempt_at', 'locked_at', 'last_error', 'processing_ms'
+        ])
+        return False
+
+    webhook_event.status = WebhookEvent.PROCESSED
+    webhook_event.processing_ms = int((time.monotonic() - started) * 1000)
+    webhook_event.processed_at = timezone.now()
+    webhook_event.locked_at = None
+    webhook_event.last_error = ''
+    webhook_event.save(update_fields=[
+        'status', 'attempts', 'locked_at', 'last_error', 'processing_ms', 'processed_at'
+    ])
+    logger.info(
+        f"Webhook event {webhook_event.stripe_event_id} ({webhook_event.event_type}) "
+        f"processed in {webhook_event.processing_ms}ms"
+    )
+    return True
+
+
+def drain(max_events: Optional[int] = None) -> Dict[str, int]:
+    """
+    Claim and process due events until none are left (or max_events is reached).
+    Safe to run from several threads or processes at once.
+
+    Returns:
+        {'processed': int, 'failed': int}
+    """
+    results = {'processed': 0, 'failed': 0}
+    handled = 0
+
+    while max_events is None or handled < max_events:
+        batch = list(due_events().values_list('id', flat=True)[:20])
+        if not batch:
+            break
+
+        claimed_any = False
+        for event_id in batch:
+            if max_events is not None and handled >= max_events:
+                break
+            if not claim(event_id):
+                continue  # Another worker got there first
+            claimed_any = True
+            handled += 1
+            webhook_event = WebhookEvent.objects.get(pk=event_id)
+            if process_event(webhook_event):
+                results['processed'] += 1
+            else:
+                results['failed'] += 1
+
+        if not claimed_any:
+            break
+
+    return results
+
+
+# =============================================================================
+# MAINTENANCE
+# =============================================================================
+
+def requeue_stale(minutes: Optional[int] = None) -> int:
+    """
+    Release events claimed by a worker that died mid-attempt.
+    The interrupted attempt is not counted.
+    """
+    minutes = _setting('WEBHOOK_STALE_MINUTES', 10) if minutes is None else minutes
+    cutoff = timezone.now() - timedelta(minutes=minutes)
+    return WebhookEvent.objects.filter(
+        status=WebhookEvent.PROCESSING,
+        locked_at__lt=cutoff
+    ).update(status=WebhookEvent.PENDING, locked_at=None, next_attempt_at=timezone.now())
+
+
+def requeue_dead(queryset=None) -> int:
+    """Give dead-lettered events a fresh set of attempts"""
+    return background.requeue_dead(WebhookEvent.objects.all() if queryset is None else queryset)
+
+
+def inbox_stats() -> Dict:
+    """
+    Queue depth and processing times.
+
+    Returns:
+        {
+            'counts': {status: int, ...},
+            'oldest_due': datetime or None,
+            'avg_ms': float or None,
+            'max_ms': int or None,
+            'p95_ms': int or None,
+        }
+    """
+    counts = {status: 0 for status, _ in WebhookEvent.STATUS_CHOICES}
+    for row in WebhookEvent.objects.order_by().values('status').annotate(count=Count('id')):
+        counts[row['status']] = row['count']
+
+    processed = WebhookEvent.objects.filter(
+        status=WebhookEvent.PROCESSED, processing_ms__isnull=False
+    )
+    timing = processed.aggregate(avg_ms=Avg('processing_ms'), max_ms=Max('processing_ms'))
+
+    p95_ms = None
+    total = counts[WebhookEvent.PROCESSED]
+    if total:
+        offset = min(int(total * 0.95), total - 1)
+        p95_ms = processed.order_by('processing_ms').values_list('processing_ms', flat=True)[offset]
+
+    oldest = due_events().values_list('received_at', flat=True).first()
+
+    return {
+        'counts': counts,
+        'oldest_due': oldest,
+        'avg_ms': timing['avg_ms'],
+        'max_ms': timing['max_ms'],
+        'p95_ms': p95_ms,
+    }
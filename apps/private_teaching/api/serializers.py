@@ -160,3 +160,4 @@ class RecurringSlotSerializer(serializers.Serializer):
     available = serializers.BooleanField()
     conflict_reason = serializers.CharField(allow_null=True, required=False)
     subject_id = serializers.IntegerField()
+    alternatives = serializers.ListField(child=serializers.DateTimeField(), required=False)
@@ -9,6 +9,8 @@ from .views import (
     AvailabilityExceptionViewSet,
     TeacherAvailabilitySettingsViewSet,
     AvailableSlotsAPIView,
+    TeacherAvailabilitySearchAPIView,
+    SlotHoldAPIView,
     SubmitBookingAPIView,
     PreviewRecurringSlotsAPIView
 )
@@ -27,6 +29,8 @@ urlpatterns = [
 
     # Custom API endpoints
     path('student/available-slots/', AvailableSlotsAPIView.as_view(), name='available-slots'),
+    path('student/teacher-search/', TeacherAvailabilitySearchAPIView.as_view(), name='teacher-availability-search'),
+    path('student/slot-holds/', SlotHoldAPIView.as_view(), name='slot-holds'),
     path('student/submit-booking/', SubmitBookingAPIView.as_view(), name='submit-booking'),
     path('student/preview-recurring/', PreviewRecurringSlotsAPIView.as_view(), name='preview-recurring-slots'),
 ]
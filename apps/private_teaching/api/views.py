@@ -7,7 +7,11 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
+from django.conf import settings as django_settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -31,10 +35,12 @@ from .serializers import (
     RecurringSlotSerializer
 )
 from apps.private_teaching.availability_engine import (
-    calculate_available_slots,
     check_slot_availability,
     generate_recurring_slots
 )
+from apps.private_teaching.availability_search import search_available_teachers
+from apps.private_teaching.slot_holds import lock_teacher_schedule, place_holds, release_holds
+from apps.private_teaching.slot_response_cache import available_slots_fingerprint, get_available_slots
 
 User = get_user_model()
 
@@ -174,6 +180,10 @@ class AvailableSlotsAPIView(APIView):
             - start_date: Start date (YYYY-MM-DD)
             - end_date: End date (YYYY-MM-DD)
             - duration: Lesson duration in minutes (30, 45, 60, 90)
+            - time_increment: Slot increment in minutes (optional, default 30)
+
+        Supports conditional GET: responses carry an ETag and
+        unchanged schedules answer 304 Not Modified.
 
         Returns:
         {
@@ -192,6 +202,7 @@ class AvailableSlotsAPIView(APIView):
         start_date_str = request.query_params.get('start_date')
         end_date_str = request.query_params.get('end_date')
         duration = int(request.query_params.get('duration', 60))
+        time_increment = int(request.query_params.get('time_increment', 30))
 
         # Validate parameters
         if not all([teacher_id, start_date_str, end_date_str]):
@@ -201,7 +212,7 @@ class AvailableSlotsAPIView(APIView):
             )
 
         try:
-            teacher = User.objects.get(id=teacher_id)
+            teacher = User.objects.select_related('availability_settings').get(id=teacher_id)
             start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
             end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
         except User.DoesNotExist:
@@ -212,15 +223,24 @@ class AvailableSlotsAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Call availability calculation engine
+        etag = available_slots_fingerprint(
+            teacher, start_date, end_date, duration, time_increment, hold_owner=request.user
+        )
+        if etag:
+            not_modified = get_conditional_response(request, etag=quote_etag(etag))
+            if not_modified is not None:
+                return not_modified
+
+        # Call availability calculation engine (via the response cache)
         try:
-            available_slots = calculate_available_slots(
-                teacher=teacher,
-                start_date=start_date,
-                end_date=end_date,
-                duration=duration
+            available_slots = get_available_slots(
+                teacher, start_date, end_date, duration, time_increment, etag, hold_owner=request.user
             )
-            return Response({'slots': available_slots})
+            response = Response({'slots': available_slots})
+            if etag:
+                response['ETag'] = quote_etag(etag)
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
         except Exception as e:
             import traceback
             print(f"[ERROR] Failed to calculate available slots: {str(e)}")
@@ -231,6 +251,169 @@ class AvailableSlotsAPIView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class TeacherAvailabilitySearchAPIView(APIView):
+    """
+    API endpoint for students to find teachers free at a given time
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Search teachers by availability
+        Query params:
+            - days_of_week: Comma-separated weekdays, 0=Monday (weekly search)
+            - start_date / end_date: Date range, YYYY-MM-DD (dated search)
+            - start_time: Earliest lesson start (HH:MM)
+            - end_time: Latest lesson end (HH:MM, default start_time + duration)
+            - duration: Lesson duration in minutes (default 60)
+            - subject: Optional subject name filter
+            - instrument: Optional instrument filter
+            - limit: Maximum teachers returned (default 20, max 50)
+
+        Returns:
+        {
+            "teachers": [
+                {
+                    "teacher_id": 12,
+                    "name": "Jane Smith",
+                    "slot_count": 2,
+                    ...
+                },
+                ...
+            ]
+        }
+        """
+        params = request.query_params
+        start_time_str = params.get('start_time')
+        if not start_time_str:
+            return Response(
+                {'error': 'Missing required parameter: start_time'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            duration = int(params.get('duration', 60))
+            limit = min(int(params.get('limit', 20)), 50)
+            window_start = datetime.strptime(start_time_str, '%H:%M').time()
+            if params.get('end_time'):
+                window_end = datetime.strptime(params['end_time'], '%H:%M').time()
+            else:
+                window_end = (datetime.combine(datetime.min, window_start) + timedelta(minutes=duration)).time()
+
+            days_of_week = None
+            if params.get('days_of_week'):
+                days_of_week = [int(day) for day in params['days_of_week'].split(',')]
+                if any(day < 0 or day > 6 for day in days_of_week):
+                    raise ValueError('days_of_week must be between 0 (Monday) and 6 (Sunday)')
+
+            start_date = end_date = None
+            if params.get('start_date') and params.get('end_date'):
+                start_date = datetime.strptime(params['start_date'], '%Y-%m-%d').date()
+                end_date = datetime.strptime(params['end_date'], '%Y-%m-%d').date()
+                if (end_date - start_date).days > 90:
+                    raise ValueError('Date range cannot exceed 90 days')
+
+            teachers = search_available_teachers(
+                window_start=window_start,
+                window_end=window_end,
+                duration=duration,
+                days_of_week=days_of_week,
+                start_date=start_date,
+                end_date=end_date,
+                subject=params.get('subject'),
+                instrument=params.get('instrument'),
+                limit=limit
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'teachers': teachers})
+
+
+class SlotHoldAPIView(APIView):
+    """
+    Reserve (POST) or release (DELETE) time slots while a student is booking
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """
+        Hold slots
+        Expected payload:
+        {
+            "teacher_id": 123,
+            "slots": [
+                {"datetime": "2025-06-15T09:00:00", "duration": 60},
+                ...
+            ]
+        }
+
+        Returns:
+        {
+            "holds": [
+                {"datetime": "...", "held": true, "token": "...", "expires_at": "...", "reason": ""},
+                {"datetime": "...", "held": false, "token": null, "expires_at": null, "reason": "..."}
+            ],
+            "hold_minutes": 10
+        }
+        """
+        try:
+            teacher = User.objects.get(id=request.data['teacher_id'])
+            slots = [
+                {
+                    'datetime': datetime.fromisoformat(slot['datetime'].replace('Z', '+00:00')),
+                    'duration': int(slot['duration'])
+                }
+                for slot in request.data['slots']
+            ]
+        except User.DoesNotExist:
+            return Response({'error': 'Teacher not found'}, status=status.HTTP_404_NOT_FOUND)
+        except KeyError as e:
+            return Response({'error': f'Missing required field: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid slot datetime or duration'}, status=status.HTTP_400_BAD_REQUEST)
+
+        holds = place_holds(teacher, request.user, slots)
+
+        return Response({
+            'holds': [
+                {
+                    **hold,
+                    'datetime': hold['datetime'].isoformat(),
+                    'token': str(hold['token']) if hold['token'] else None,
+                    'expires_at': hold['expires_at'].isoformat() if hold['expires_at'] else None,
+                }
+                for hold in holds
+            ],
+            'hold_minutes': django_settings.SLOT_HOLD_MINUTES
+        })
+
+    def delete(self, request):
+        """
+        Release holds
+        Expected payload (either):
+        {"tokens": ["...", "..."]}
+        {"teacher_id": 123}   // release all holds on this teacher
+        """
+        tokens = request.data.get('tokens')
+        teacher_id = request.data.get('teacher_id')
+        if tokens is None and teacher_id is None:
+            return Response({'error': 'Provide tokens or teacher_id'}, status=status.HTTP_400_BAD_REQUEST)
+
+        teacher = None
+        if teacher_id is not None:
+            try:
+                teacher = User.objects.get(id=teacher_id)
+            except (User.DoesNotExist, ValueError):
+                return Response({'error': 'Teacher not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            released = release_holds(request.user, tokens=tokens, teacher=teacher)
+        except ValidationError:
+            return Response({'error': 'Invalid hold token'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'released': released})
+
+
 class SubmitBookingAPIView(APIView):
     """
     Submit a lesson booking request from student
@@ -255,129 +438,138 @@ class SubmitBookingAPIView(APIView):
         try:
             teacher = User.objects.get(id=request.data['teacher_id'])
 
-            # Create LessonRequest
-            lesson_request = LessonRequest.objects.create(
-                student=request.user
-            )
-
-            # Handle child profile if provided (for guardian bookings)
-            child_profile_id = request.data.get('child_profile_id')
-            if child_profile_id:
-                from apps.accounts.models import ChildProfile
-                try:
-                    child_profile = ChildProfile.objects.get(
-                        id=child_profile_id,
-                        guardian=request.user
-                    )
-                    lesson_request.child_profile = child_profile
-                    lesson_request.save()
-                except ChildProfile.DoesNotExist:
-                    lesson_request.delete()
-                    return Response({
-                        'success': False,
-                        'error': 'Invalid child profile selected'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-
-            # First pass: Validate all lessons and check availability
-            validated_lessons = []
-            for lesson_data in request.data['lessons']:
-                # Get subject for this lesson
-                subject_id = lesson_data.get('subject_id')
-                if not subject_id:
-                    lesson_request.delete()
-                    return Response({
-                        'success': False,
-                        'error': 'subject_id is required for each lesson'
-                    }, status=status.HTTP_400_BAD_REQUEST)
+            # Serialise bookings for this teacher so concurrent submits
+            # cannot both pass validation for the same slot
+            with transaction.atomic():
+                lock_teacher_schedule(teacher)
 
-                try:
-                    subject = Subject.objects.get(id=subject_id)
-                except Subject.DoesNotExist:
-                    lesson_request.delete()
-                    return Response({
-                        'success': False,
-                        'error': f'Subject with id {subject_id} not found'
-                    }, status=status.HTTP_404_NOT_FOUND)
-
-                # Verify teacher offers this subject
-                if subject.teacher != teacher:
-                    lesson_request.delete()
-                    return Response({
-                        'success': False,
-                        'error': f'This teacher does not offer {subject.subject}'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-
-                # Parse datetime
-                slot_datetime_str = lesson_data['datetime']
-                # Handle ISO format with Z or timezone
-                if slot_datetime_str.endswith('Z'):
-                    slot_datetime_str = slot_datetime_str[:-1] + '+00:00'
-
-                slot_datetime = datetime.fromisoformat(slot_datetime_str)
-
-                # Validate slot is still available
-                is_available, reason = check_slot_availability(
-                    teacher=teacher,
-                    slot_datetime=slot_datetime,
-                    duration=lesson_data['duration']
+                # Create LessonRequest
+                lesson_request = LessonRequest.objects.create(
+                    student=request.user
                 )
 
-                if not is_available:
-                    # Rollback - delete lesson request
-                    lesson_request.delete()
-                    return Response({
-                        'success': False,
-                        'error': f'Time slot {slot_datetime} is no longer available: {reason}'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-
-                # Store validated data for creation
-                validated_lessons.append({
-                    'subject': subject,
-                    'datetime': slot_datetime,
-                    'duration': lesson_data['duration']
-                })
+                # Handle child profile if provided (for guardian bookings)
+                child_profile_id = request.data.get('child_profile_id')
+                if child_profile_id:
+                    from apps.accounts.models import ChildProfile
+                    try:
+                        child_profile = ChildProfile.objects.get(
+                            id=child_profile_id,
+                            guardian=request.user
+                        )
+                        lesson_request.child_profile = child_profile
+                        lesson_request.save()
+                    except ChildProfile.DoesNotExist:
+                        lesson_request.delete()
+                        return Response({
+                            'success': False,
+                            'error': 'Invalid child profile selected'
+                        }, status=status.HTTP_400_BAD_REQUEST)
+
+                # First pass: Validate all lessons and check availability
+                validated_lessons = []
+                for lesson_data in request.data['lessons']:
+                    # Get subject for this lesson
+                    subject_id = lesson_data.get('subject_id')
+                    if not subject_id:
+                        lesson_request.delete()
+                        return Response({
+                            'success': False,
+                            'error': 'subject_id is required for each lesson'
+                        }, status=status.HTTP_400_BAD_REQUEST)
+
+                    try:
+                        subject = Subject.objects.get(id=subject_id)
+                    except Subject.DoesNotExist:
+                        lesson_request.delete()
+                        return Response({
+                            'success': False,
+                            'error': f'Subject with id {subject_id} not found'
+                        }, status=status.HTTP_404_NOT_FOUND)
+
+                    # Verify teacher offers this subject
+                    if subject.teacher != teacher:
+                        lesson_request.delete()
+                        return Response({
+                            'success': False,
+                            'error': f'This teacher does not offer {subject.subject}'
+                        }, status=status.HTTP_400_BAD_REQUEST)
+
+                    # Parse datetime
+                    slot_datetime_str = lesson_data['datetime']
+                    # Handle ISO format with Z or timezone
+                    if slot_datetime_str.endswith('Z'):
+                        slot_datetime_str = slot_datetime_str[:-1] + '+00:00'
+
+                    slot_datetime = datetime.fromisoformat(slot_datetime_str)
+
+                    # Validate slot is still available
+                    is_available, reason = check_slot_availability(
+                        teacher=teacher,
+                        slot_datetime=slot_datetime,
+                        duration=lesson_data['duration'],
+                        hold_owner=request.user
+                    )
 
-            # Determine approval status
-            auto_approve = (
-                hasattr(teacher, 'availability_settings') and
-                teacher.availability_settings.auto_approve_bookings
-            )
-            approved_status = 'Accepted' if auto_approve else 'Pending'
-
-            # Second pass: Create all lessons (only after all validations pass)
-            created_lessons = []
-            for validated_lesson in validated_lessons:
-                lesson = Lesson.objects.create(
-                    lesson_request=lesson_request,
-                    student=request.user,
-                    teacher=teacher,
-                    subject=validated_lesson['subject'],
-                    lesson_date=validated_lesson['datetime'].date(),
-                    lesson_time=validated_lesson['datetime'].time(),
-                    duration_in_minutes=validated_lesson['duration'],
-                    location=request.data.get('location', 'Online'),
-                    approved_status=approved_status,
-                    payment_status='Not Paid',
-                    status='Draft'
-                )
-                created_lessons.append(lesson)
-
-            # Add initial message if provided
-            if request.data.get('message'):
-                LessonRequestMessage.objects.create(
-                    lesson_request=lesson_request,
-                    author=request.user,
-                    message=request.data['message']
+                    if not is_available:
+                        # Rollback - delete lesson request
+                        lesson_request.delete()
+                        return Response({
+                            'success': False,
+                            'error': f'Time slot {slot_datetime} is no longer available: {reason}'
+                        }, status=status.HTTP_400_BAD_REQUEST)
+
+                    # Store validated data for creation
+                    validated_lessons.append({
+                        'subject': subject,
+                        'datetime': slot_datetime,
+                        'duration': lesson_data['duration']
+                    })
+
+                # Determine approval status
+                auto_approve = (
+                    hasattr(teacher, 'availability_settings') and
+                    teacher.availability_settings.auto_approve_bookings
                 )
+                approved_status = 'Accepted' if auto_approve else 'Pending'
+
+                # Second pass: Create all lessons (only after all validations pass)
+                created_lessons = []
+                for validated_lesson in validated_lessons:
+                    lesson = Lesson.objects.create(
+                        lesson_request=lesson_request,
+                        student=request.user,
+                        teacher=teacher,
+                        subject=validated_lesson['subject'],
+                        lesson_date=validated_lesson['datetime'].date(),
+                        lesson_time=validated_lesson['datetime'].time(),
+                        duration_in_minutes=validated_lesson['duration'],
+                        location=request.data.get('location', 'Online'),
+                        approved_status=approved_status,
+                        payment_status='Not Paid',
+                        status='Draft'
+                    )
+                    created_lessons.append(lesson)
+
+                # Add initial message if provided
+                if request.data.get('message'):
+                    LessonRequestMessage.objects.create(
+                        lesson_request=lesson_request,
+                        author=request.user,
+                        message=request.data['message']
+                    )
 
-            # TODO: Send notification email to teacher
+                # Booking confirmed - the student's holds on this teacher are consumed
+                release_holds(request.user, teacher=teacher)
 
-            return Response({
-                'success': True,
-                'message': f'Successfully booked {len(created_lessons)} lessons',
-                'lesson_request_id': lesson_request.id,
-                'redirect_url': reverse('private_teaching:my_requests')
-            })
+                # TODO: Send notification email to teacher
+
+                return Response({
+                    'success': True,
+                    'message': f'Successfully booked {len(created_lessons)} lessons',
+                    'lesson_request_id': lesson_request.id,
+                    'redirect_url': reverse('private_teaching:my_requests')
+                })
 
         except User.DoesNotExist:
             return Response({
@@ -427,7 +619,8 @@ class PreviewRecurringSlotsAPIView(APIView):
                     "duration": 60,
                     "available": true,
                     "conflict_reason": null,
-                    "subject_id": 456
+                    "subject_id": 456,
+                    "alternatives": []
                 },
                 ...
             ],
@@ -466,7 +659,8 @@ class PreviewRecurringSlotsAPIView(APIView):
                 base_datetime=data['base_datetime'],
                 duration=data['duration'],
                 num_weeks=data['num_weeks'],
-                subject_id=data['subject_id']
+                subject_id=data['subject_id'],
+                hold_owner=request.user
             )
         except ValueError as e:
             return Response({
@@ -5,3 +5,6 @@ class PrivateTeachingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.private_teaching'
     verbose_name = 'Private Teaching'
+
+    def ready(self):
+        import apps.private_teaching.signals  # noqa
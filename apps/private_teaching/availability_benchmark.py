@@ -0,0 +1,350 @@
+"""
+Availability Engine Benchmark
+
+Synthetic schedules and a timing harness for the availability engine, shared
+by the benchmark_availability management command and the property tests.
+
+- build_synthetic_teacher(): a seeded teacher with a realistic weekly
+  template, many exceptions, thousands of booked lessons and a few slot holds
+- run_benchmarks(): times each engine entry point per mode and window size,
+  recording wall-clock milliseconds and query counts
+- frozen_clock(): pins "now" to BENCHMARK_NOW so a schedule starting on
+  BENCHMARK_START_DATE gives the same query counts whatever day it runs
+- compare_to_baseline(): lists every result that issues more queries than
+  the stored baseline, or whose speed-up over the reference engine has
+  shrunk. Wall-clock times depend on the machine, so comparing them with
+  the baseline directly is opt-in.
+"""
+
+import json
+import random
+import time as timer
+from contextlib import contextmanager
+from datetime import datetime, timedelta, date, time, timezone as dt_timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from lessons.models import Lesson
+from .availability_cache import invalidate_teacher
+from .availability_engine import (
+    AvailabilityWindow,
+    calculate_available_slots,
+    check_slot_availability,
+    generate_recurring_slots
+)
+from .models import (
+    TeacherAvailability,
+    AvailabilityException,
+    TeacherAvailabilitySettings,
+    LessonRequest,
+    SlotHold,
+    Subject
+)
+
+User = get_user_model()
+
+DEFAULT_BASELINE_PATH = Path(__file__).resolve().parent / 'benchmarks' / 'availability_baseline.json'
+DEFAULT_WINDOWS = (7, 30, 90)
+# A Monday, and a clock set three days before it (clear of any booking notice)
+BENCHMARK_START_DATE = date(2030, 1, 7)
+BENCHMARK_NOW = datetime(2030, 1, 4, 9, 0, tzinfo=dt_timezone.utc)
+LESSON_DURATIONS = (30, 60, 90)
+
+
+def _random_time(rng: random.Random, earliest_hour: int, latest_hour: int, step: int = 15) -> time:
+    minute_of_day = rng.randrange(earliest_hour * 60, latest_hour * 60, step)
+    return time(minute_of_day // 60, minute_of_day % 60)
+
+
+def _add_minutes(value: time, minutes: int) -> time:
+    total = min(value.hour * 60 + value.minute + minutes, 23 * 60 + 45)
+    return time(total // 60, total % 60)
+
+
+def build_synthetic_teacher(
+    seed: int = 0,
+    start_date: Optional[date] = None,
+    days: int = 90,
+    exceptions: int = 300,
+    lessons: int = 3000,
+    holds: int = 10,
+    prefix: str = 'synthetic'
+) -> Tuple[User, List[User]]:
+    """
+    Create a teacher whose schedule is generated from a seed.
+
+    Args:
+        seed: Random seed (same seed, same schedule)
+        start_date: First day of the schedule (default: today)
+        days: Number of days covered by exceptions and lessons
+        exceptions: Number of availability exceptions
+        lessons: Number of booked lessons (including some rejected/deleted ones)
+        holds: Number of slot holds (some already expired)
+        prefix: Username prefix for the generated users
+
+    Returns:
+        (teacher, students) - teacher has availability_settings loaded
+    """
+    rng = random.Random(seed)
+    start_date = start_date or date.today()
+
+    teacher = User.objects.create_user(username=f'{prefix}_teacher_{seed}', email=f'{prefix}_teacher_{seed}@example.com')
+    students = [
+        User.objects.create_user(username=f'{prefix}_student_{seed}_{index}', email=f'{prefix}_student_{seed}_{index}@example.com')
+        for index in range(3)
+    ]
+
+    TeacherAvailabilitySettings.objects.create(
+        teacher=teacher,
+        buffer_minutes=rng.choice([0, 0, 5, 10, 15]),
+        min_booking_notice_hours=rng.choice([0, 12, 24, 48]),
+        max_booking_days_ahead=rng.choice([days // 2 or 1, days + 30]),
+        use_availability_calendar=True,
+        max_recurring_lessons=52
+    )
+
+    # Weekly template: most days have one to three (possibly overlapping) blocks
+    template = []
+    for day_of_week in range(7):
+        if rng.random() < 0.2:
+            continue
+        for _ in range(rng.randint(1, 3)):
+            start_time = _random_time(rng, 7, 20)
+            template.append(TeacherAvailability(
+                teacher=teacher,
+                day_of_week=day_of_week,
+                start_time=start_time,
+                end_time=_add_minutes(start_time, rng.choice([60, 120, 180, 240, 300])),
+                is_active=rng.random() > 0.05
+            ))
+    TeacherAvailability.objects.bulk_create(template)
+
+    # Exceptions: whole-day blocks, partial blocks and special hours
+    exception_rows = []
+    for _ in range(exceptions):
+        exception_date = start_date + timedelta(days=rng.randrange(days))
+        kind = rng.random()
+        if kind < 0.2:
+            exception_rows.append(AvailabilityException(
+                teacher=teacher, exception_type='block', date=exception_date
+            ))
+            continue
+        start_time = _random_time(rng, 6, 21)
+        exception_rows.append(AvailabilityException(
+            teacher=teacher,
+            exception_type='block' if kind < 0.7 else 'available',
+            date=exception_date,
+            start_time=start_time,
+            end_time=_add_minutes(start_time, rng.choice([30, 60, 90, 120, 240])),
+            is_active=rng.random() > 0.05
+        ))
+    AvailabilityException.objects.bulk_create(exception_rows)
+
+    # Lessons: spread over the window, plus some history before it
+    subject = Subject.objects.create(teacher=teacher, subject='Recorder', base_price_60min=40)
+    lesson_request = LessonRequest.objects.create(student=students[0])
+    lesson_rows = []
+    for _ in range(lessons):
+        status_roll = rng.random()
+        lesson_rows.append(Lesson(
+            lesson_request=lesson_request,
+            student=rng.choice(students),
+            teacher=teacher,
+            subject=subject,
+            lesson_date=start_date + timedelta(days=rng.randrange(-30, days)),
+            lesson_time=_random_time(rng, 7, 21, step=rng.choice([15, 30])),
+            duration_in_minutes=str(rng.choice(LESSON_DURATIONS)),
+            location='Online',
+            approved_status='Rejected' if status_roll < 0.05 else 'Accepted',
+            is_deleted=0.05 <= status_roll < 0.08,
+            payment_status='Paid',
+            status='Assigned'
+        ))
+    Lesson.objects.bulk_create(lesson_rows)
+
+    # Slot holds by the first two students, about a third already expired
+    now = timezone.now()
+    hold_rows = []
+    for _ in range(holds):
+        slot = datetime.combine(start_date + timedelta(days=rng.randrange(days)), _random_time(rng, 8, 20))
+        hold_rows.append(SlotHold(
+            teacher=teacher,
+            student=rng.choice(students[:2]),
+            slot_datetime=timezone.make_aware(slot),
+            duration_in_minutes=rng.choice(LESSON_DURATIONS),
+            expires_at=now + timedelta(minutes=rng.choice([-5, 10, 10]))
+        ))
+    SlotHold.objects.bulk_create(hold_rows)
+
+    teacher = User.objects.select_related('availability_settings').get(pk=teacher.pk)
+    return teacher, students
+
+
+@contextmanager
+def frozen_clock(now: datetime = BENCHMARK_NOW):
+    """Pin timezone.now() (booking notice, horizon and hold expiry) to a fixed time"""
+    with mock.patch('django.utils.timezone.now', return_value=now):
+        yield
+
+
+def random_slot_datetimes(seed: int, start_date: date, days: int, count: int) -> List[datetime]:
+    """Aware datetimes on five-minute marks spread over a window"""
+    rng = random.Random(seed)
+    return [
+        timezone.make_aware(datetime.combine(
+            start_date + timedelta(days=rng.randrange(days)),
+            _random_time(rng, 6, 22, step=5)
+        ))
+        for _ in range(count)
+    ]
+
+
+def _measure(operation, repeat: int, before=None) -> Dict:
+    """Best wall-clock time over repeat runs, and the query count of one run"""
+    best = None
+    queries = 0
+    for _ in range(repeat):
+        if before:
+            before()
+        with CaptureQueriesContext(connection) as captured:
+            started = timer.perf_counter()
+            operation()
+            elapsed = (timer.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+        queries = len(captured)
+    return {'ms': round(best, 2), 'queries': queries}
+
+
+def run_benchmarks(
+    teacher,
+    start_date: date,
+    windows=DEFAULT_WINDOWS,
+    duration: int = 60,
+    time_increment: int = 30,
+    checks: int = 50,
+    repeat: int = 3,
+    hold_owner=None
+) -> Dict[str, Dict]:
+    """
+    Time the engine entry points for each window size.
+
+    Returns:
+        {
+            'calculate_available_slots:batched:30d': {'ms': 12.4, 'queries': 4},
+            ...
+        }
+    """
+    results = {}
+
+    for days in windows:
+        end_date = start_date + timedelta(days=days - 1)
+        suffix = f'{days}d'
+
+        def slots(**options):
+            return lambda: calculate_available_slots(
+                teacher, start_date, end_date,
+                duration=duration, time_increment=time_increment,
+                hold_owner=hold_owner, **options
+            )
+
+        results[f'calculate_available_slots:reference:{suffix}'] = _measure(slots(batched=False), repeat)
+        results[f'calculate_available_slots:batched:{suffix}'] = _measure(slots(), repeat)
+        results[f'calculate_available_slots:cached_cold:{suffix}'] = _measure(
+            slots(use_cache=True), repeat, before=lambda: invalidate_teacher(teacher.id)
+        )
+        results[f'calculate_available_slots:cached_warm:{suffix}'] = _measure(slots(use_cache=True), repeat)
+
+        slot_datetimes = random_slot_datetimes(days, start_date, days, checks)
+
+        def check_each():
+            for slot_datetime in slot_datetimes:
+                check_slot_availability(teacher, slot_datetime, duration, hold_owner=hold_owner)
+
+        def check_window():
+            window = AvailabilityWindow(teacher, start_date, end_date, hold_owner=hold_owner)
+            for slot_datetime in slot_datetimes:
+                window.check_slot(slot_datetime, duration)
+
+        results[f'check_slot_availability:reference:{suffix}'] = _measure(check_each, repeat)
+        results[f'check_slot_availability:window:{suffix}'] = _measure(check_window, repeat)
+
+        num_weeks = max(days // 7, 2)
+        base_datetime = datetime.combine(start_date, time(17, 0))
+        results[f'generate_recurring_slots:batched:{suffix}'] = _measure(
+            lambda: generate_recurring_slots(teacher, base_datetime, duration, num_weeks, 1, hold_owner=hold_owner),
+            repeat
+        )
+
+    return results
+
+
+def _reference_key(key: str) -> Optional[str]:
+    """'calculate_available_slots:batched:30d' -> 'calculate_available_slots:reference:30d'"""
+    parts = key.split(':')
+    if len(parts) != 3 or parts[1] == 'reference':
+        return None
+    return f'{parts[0]}:reference:{parts[2]}'
+
+
+def compare_to_baseline(
+    results: Dict[str, Dict],
+    baseline: Dict[str, Dict],
+    tolerance: float = 1.5,
+    noise_ms: float = 5.0,
+    timings: bool = False
+) -> List[str]:
+    """
+    Compare benchmark results with a baseline.
+
+    Query counts must not increase. An optimised mode may take up to
+    tolerance times its baseline share of the reference engine's time (as
+    measured in this run) plus noise_ms. With timings, every result's time
+    may also be up to tolerance times the baseline plus noise_ms; only
+    meaningful against a baseline recorded on the same machine.
+
+    Returns:
+        Human-readable regression messages (empty when nothing regressed)
+    """
+    regressions = []
+    for key, expected in baseline.items():
+        actual = results.get(key)
+        if actual is None:
+            regressions.append(f'{key}: missing from results')
+            continue
+        if actual['queries'] > expected['queries']:
+            regressions.append(f"{key}: {actual['queries']} queries (baseline {expected['queries']})")
+
+        reference_key = _reference_key(key)
+        if reference_key in results and reference_key in baseline and baseline[reference_key]['ms']:
+            share = expected['ms'] / baseline[reference_key]['ms']
+            allowed_ms = results[reference_key]['ms'] * share * tolerance + noise_ms
+            if actual['ms'] > allowed_ms:
+                regressions.append(
+                    f"{key}: {actual['ms']}ms against {results[reference_key]['ms']}ms for the reference "
+                    f"(baseline {share:.0%} of the reference, allowed {allowed_ms:.1f}ms)"
+                )
+
+        if timings:
+            allowed_ms = expected['ms'] * tolerance + noise_ms
+            if actual['ms'] > allowed_ms:
+                regressions.append(f"{key}: {actual['ms']}ms (baseline {expected['ms']}ms, allowed {allowed_ms:.1f}ms)")
+    return regressions
+
+
+def load_baseline(path=DEFAULT_BASELINE_PATH) -> Optional[Dict]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def save_baseline(config: Dict, results: Dict[str, Dict], path=DEFAULT_BASELINE_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({'config': config, 'results': results}, indent=2, sort_keys=True) + '\n')
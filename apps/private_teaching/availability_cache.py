@@ -0,0 +1,247 @@
+"""
+Free/Busy Availability Cache
+
+Stores a compact per-day bitmap of each teacher's free and busy minutes in
+TeacherFreeBusyDay, so repeat availability lookups skip the template,
+exception and lesson queries entirely.
+
+- Missing days are computed in one batch via AvailabilityWindow and saved.
+- Slot generation for any duration/increment is a bit scan over cached days.
+- Booking notice rules and slot holds are short-lived, so they are applied
+  at read time rather than stored in the bitmaps.
+- Signal handlers (signals.py) delete only the days whose inputs changed.
+- Rows are stamped with the teacher's schedule_version, and only rows of the
+  current version are read. A bitmap computed while a booking commits (its
+  signal finds no row to delete yet) is written under the old version, so it
+  is recomputed on the next read instead of being served indefinitely.
+
+Bitmaps use one-minute resolution, which keeps results identical to the
+engine for the HH:MM times teachers enter.
+"""
+
+from datetime import datetime, timedelta, date, time
+from typing import Dict, Iterable, List, Tuple
+
+from django.utils import timezone
+
+from .availability_engine import AvailabilityWindow
+from .models import TeacherFreeBusyDay, SlotHold
+
+
+MINUTES_PER_DAY = 24 * 60
+BITMAP_BYTES = MINUTES_PER_DAY // 8
+
+
+def _minute_of_day(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def _set_bits(bits: int, start_minute: int, end_minute: int) -> int:
+    """Set bits [start_minute, end_minute), clipped to the day"""
+    start_minute = max(start_minute, 0)
+    end_minute = min(end_minute, MINUTES_PER_DAY)
+    if end_minute <= start_minute:
+        return bits
+    return bits | (((1 << (end_minute - start_minute)) - 1) << start_minute)
+
+
+def _to_bytes(bits: int) -> bytes:
+    return bits.to_bytes(BITMAP_BYTES, 'little')
+
+
+def _from_bytes(value) -> int:
+    return int.from_bytes(bytes(value), 'little')
+
+
+def _free_runs(bits: int) -> Iterable[Tuple[int, int]]:
+    """
+    Yield (start_minute, end_minute) for each run of set bits.
+    Runs correspond to the merged available ranges for the day.
+    """
+    minute = 0
+    while bits:
+        # Skip the zero bits below the next run
+        gap = (bits & -bits).bit_length() - 1
+        bits >>= gap
+        minute += gap
+
+        # Measure the run of ones
+        inverted = ~bits
+        length = (inverted & -inverted).bit_length() - 1
+        yield (minute, minute + length)
+        bits >>= length
+        minute += length
+
+
+def build_day_bitmaps(window: AvailabilityWindow, target_date: date) -> Tuple[int, int]:
+    """
+    Compute (free_bits, busy_bits) for a date from a loaded AvailabilityWindow.
+    """
+    free_bits = 0
+    for time_range in window.ranges_for_date(target_date):
+        free_bits = _set_bits(
+            free_bits,
+            _minute_of_day(time_range['start']),
+            _minute_of_day(time_range['end'])
+        )
+
+    # Lesson intervals are aware datetimes; measure them from the start of the day
+    day_start = timezone.make_aware(datetime.combine(target_date, time(0, 0)))
+    busy_bits = 0
+    for lesson_start, lesson_end in window.lesson_intervals(target_date):
+        busy_bits = _set_bits(
+            busy_bits,
+            int((lesson_start - day_start).total_seconds() // 60),
+            int((lesson_end + window.buffer - day_start).total_seconds() // 60)
+        )
+
+    return free_bits, busy_bits
+
+
+def get_day_bitmaps(teacher, start_date: date, end_date: date, settings=None) -> Dict[date, Tuple[int, int]]:
+    """
+    Return {date: (free_bits, busy_bits)} for every date in the window.
+
+    Cached days cost a single query; missing or outdated days are computed
+    together through one AvailabilityWindow and written back in one upsert.
+    """
+    # Read the version before computing anything: a change that lands while
+    # we compute bumps it, and retires what we are about to write
+    settings = settings or teacher.availability_settings
+    version = settings.schedule_version
+
+    bitmaps = {
+        row_date: (_from_bytes(free_bits), _from_bytes(busy_bits))
+        for row_date, free_bits, busy_bits in TeacherFreeBusyDay.objects.filter(
+            teacher=teacher,
+            date__range=(start_date, end_date),
+            schedule_version=version
+        ).values_list('date', 'free_bits', 'busy_bits')
+    }
+
+    missing_dates = []
+    current_date = start_date
+    while current_date <= end_date:
+        if current_date not in bitmaps:
+            missing_dates.append(current_date)
+        current_date += timedelta(days=1)
+
+    if missing_dates:
+        window = AvailabilityWindow(
+            teacher, missing_dates[0], missing_dates[-1], settings=settings, include_holds=False
+        )
+        new_rows = []
+        for missing_date in missing_dates:
+            free_bits, busy_bits = build_day_bitmaps(window, missing_date)
+            bitmaps[missing_date] = (free_bits, busy_bits)
+            new_rows.append(TeacherFreeBusyDay(
+                teacher=teacher,
+                date=missing_date,
+                free_bits=_to_bytes(free_bits),
+                busy_bits=_to_bytes(busy_bits),
+                schedule_version=version
+            ))
+        # Replaces rows from older versions, and rows another request wrote concurrently
+        TeacherFreeBusyDay.objects.bulk_create(
+            new_rows,
+            update_conflicts=True,
+            unique_fields=['teacher', 'date'],
+            update_fields=['free_bits', 'busy_bits', 'schedule_version', 'computed_at']
+        )
+
+    return bitmaps
+
+
+def _held_bits(teacher, start_date: date, end_date: date, buffer_minutes: int, hold_owner=None) -> Dict[date, int]:
+    """Busy bits for other students' active slot holds (plus buffer), per date"""
+    holds = SlotHold.objects.filter(
+        teacher=teacher,
+        slot_datetime__date__range=(start_date, end_date),
+        expires_at__gt=timezone.now()
+    )
+    if hold_owner is not None:
+        holds = holds.exclude(student=hold_owner)
+
+    held = {}
+    for slot_datetime, duration_in_minutes in holds.values_list('slot_datetime', 'duration_in_minutes'):
+        local_start = timezone.localtime(slot_datetime)
+        start_minute = _minute_of_day(local_start.time())
+        held[local_start.date()] = _set_bits(
+            held.get(local_start.date(), 0),
+            start_minute,
+            start_minute + int(duration_in_minutes) + int(buffer_minutes)
+        )
+    return held
+
+
+def calculate_cached_available_slots(
+    teacher,
+    start_date: date,
+    end_date: date,
+    duration: int = 60,
+    time_increment: int = 30,
+    settings=None,
+    hold_owner=None
+) -> List[Dict]:
+    """
+    Available slots from the free/busy cache.
+    Same output as availability_engine.calculate_available_slots().
+    """
+    settings = settings or teacher.availability_settings
+    bitmaps = get_day_bitmaps(teacher, start_date, end_date, settings=settings)
+    held = _held_bits(teacher, start_date, end_date, settings.buffer_minutes, hold_owner)
+
+    now = timezone.now()
+    earliest = now + timedelta(hours=int(settings.min_booking_notice_hours))
+    latest = now + timedelta(days=int(settings.max_booking_days_ahead))
+    slot_length = timedelta(minutes=duration)
+    slot_mask = (1 << duration) - 1
+
+    available_slots = []
+
+    current_date = start_date
+    while current_date <= end_date:
+        free_bits, busy_bits = bitmaps[current_date]
+        busy_bits |= held.get(current_date, 0)
+
+        for run_start, run_end in _free_runs(free_bits):
+            start_minute = run_start
+            while start_minute + duration <= run_end:
+                if not (busy_bits >> start_minute) & slot_mask:
+                    slot = datetime.combine(current_date, time(start_minute // 60, start_minute % 60))
+                    slot_start = timezone.make_aware(slot)
+                    if earliest <= slot_start <= latest:
+                        available_slots.append({
+                            'datetime': slot.isoformat(),
+                            'duration': duration,
+                            'available': True,
+                            'end_datetime': (slot + slot_length).isoformat()
+                        })
+                start_minute += time_increment
+
+        current_date += timedelta(days=1)
+
+    return available_slots
+
+
+def invalidate_days(teacher_id, dates: Iterable[date]):
+    """Drop cached days for a teacher so they are recomputed on next read"""
+    dates = {d for d in dates if d is not None}
+    if teacher_id and dates:
+        TeacherFreeBusyDay.objects.filter(teacher_id=teacher_id, date__in=dates).delete()
+
+
+def invalidate_weekdays(teacher_id, weekdays: Iterable[int]):
+    """Drop cached days for a teacher that fall on the given weekdays (0=Monday)"""
+    iso_weekdays = {weekday + 1 for weekday in weekdays if weekday is not None}
+    if teacher_id and iso_weekdays:
+        TeacherFreeBusyDay.objects.filter(
+            teacher_id=teacher_id,
+            date__iso_week_day__in=iso_weekdays
+        ).delete()
+
+
+def invalidate_teacher(teacher_id):
+    """Drop every cached day for a teacher"""
+    if teacher_id:
+        TeacherFreeBusyDay.objects.filter(teacher_id=teacher_id).delete()
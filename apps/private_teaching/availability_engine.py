@@ -8,21 +8,41 @@ It combines:
 3. Existing booked lessons
 4. Buffer time requirements
 5. Advance booking rules
+6. Active slot holds (SlotHold) from other students, treated like lessons
+
+Two evaluation modes are available:
+- Reference mode: queries templates, exceptions and lessons per date/slot.
+  Simple and easy to follow, but query count grows with the window size.
+- Batched mode (default): loads everything for the window up front via
+  AvailabilityWindow and does the interval arithmetic in memory, so the
+  query count is constant regardless of window size.
+- Cached mode: reads per-day free/busy bitmaps from availability_cache,
+  computing (batched) and storing only the days not cached yet.
 """
 
+from bisect import bisect_left
+from collections import defaultdict
 from datetime import datetime, timedelta, date, time
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 from django.utils import timezone
-from .models import TeacherAvailability, AvailabilityException
+from .models import TeacherAvailability, AvailabilityException, SlotHold
 from lessons.models import Lesson
 
 
+LESSON_CONFLICT_REASON = "This time slot conflicts with an existing lesson"
+BUFFER_CONFLICT_REASON = "This time slot falls within the teacher's buffer time after an existing lesson"
+HOLD_CONFLICT_REASON = "This time slot is being booked by another student"
+
+
 def calculate_available_slots(
     teacher,
     start_date: date,
     end_date: date,
     duration: int = 60,
-    time_increment: int = 30
+    time_increment: int = 30,
+    batched: bool = True,
+    use_cache: bool = False,
+    hold_owner=None
 ) -> List[Dict]:
     """
     Calculate all available time slots for a teacher within a date range.
@@ -33,6 +53,12 @@ def calculate_available_slots(
         end_date: End date for availability search
         duration: Lesson duration in minutes (e.g., 60)
         time_increment: Slot increment in minutes (e.g., 30 means slots at 9:00, 9:30, 10:00...)
+        batched: Load the whole window in a fixed number of queries (default).
+            Set to False to use the per-date reference implementation.
+        use_cache: Read from (and fill) the per-day free/busy bitmap cache
+            in availability_cache. Takes precedence over batched.
+        hold_owner: User whose own slot holds should not block slots
+            (the student viewing the calendar)
 
     Returns:
         List of available slots:
@@ -50,7 +76,7 @@ def calculate_available_slots(
         For each date in range:
             1. Get base availability from weekly template
             2. Apply exceptions (blocks/special hours)
-            3. Exclude booked lessons
+            3. Exclude booked lessons and other students' slot holds
             4. Apply buffer time
             5. Apply min/max booking notice rules
             6. Generate slots at time_increment intervals
@@ -65,6 +91,16 @@ def calculate_available_slots(
     if not settings.use_availability_calendar:
         return []  # Fall back to old request system
 
+    if use_cache:
+        from .availability_cache import calculate_cached_available_slots
+        return calculate_cached_available_slots(
+            teacher, start_date, end_date, duration, time_increment, settings=settings, hold_owner=hold_owner
+        )
+
+    if batched:
+        window = AvailabilityWindow(teacher, start_date, end_date, settings=settings, hold_owner=hold_owner)
+        return window.calculate_available_slots(duration, time_increment)
+
     available_slots = []
 
     # Iterate through each date in the range
@@ -85,7 +121,7 @@ def calculate_available_slots(
 
             # Filter slots based on booking rules and existing lessons
             for slot in slots:
-                if _is_slot_available(teacher, slot, duration, settings):
+                if _is_slot_available(teacher, slot, duration, settings, hold_owner):
                     available_slots.append({
                         'datetime': slot.isoformat(),
                         'duration': duration,
@@ -128,7 +164,7 @@ def _get_available_ranges_for_date(teacher, target_date: date) -> List[Dict]:
         teacher=teacher,
         date=target_date,
         is_active=True
-    )
+    ).order_by('start_time', 'id')
 
     # If there's an all-day block exception, return empty
     all_day_block = exceptions.filter(
@@ -265,11 +301,31 @@ def _generate_slots_in_range(
     return slots
 
 
+def _active_hold_intervals(teacher, target_date: date, hold_owner=None) -> List[Tuple[datetime, datetime]]:
+    """
+    Active (unexpired) slot holds on a date as (start, end) intervals.
+    Holds belonging to hold_owner are skipped - a student's own holds never block them.
+    """
+    holds = SlotHold.objects.filter(
+        teacher=teacher,
+        slot_datetime__date=target_date,
+        expires_at__gt=timezone.now()
+    )
+    if hold_owner is not None:
+        holds = holds.exclude(student=hold_owner)
+
+    return [
+        (slot_datetime, slot_datetime + timedelta(minutes=duration))
+        for slot_datetime, duration in holds.values_list('slot_datetime', 'duration_in_minutes')
+    ]
+
+
 def _is_slot_available(
     teacher,
     slot_datetime: datetime,
     duration: int,
-    settings
+    settings,
+    hold_owner=None
 ) -> bool:
     """
     Check if a specific slot is available.
@@ -277,6 +333,7 @@ def _is_slot_available(
         1. Advance booking rules (min/max notice)
         2. Existing lessons (conflicts)
         3. Buffer time requirements
+        4. Other students' active slot holds
     """
     now = timezone.now()
 
@@ -324,16 +381,399 @@ def _is_slot_available(
         if slot_datetime < lesson_end_with_buffer and slot_end > lesson_start:
             return False  # Conflict found
 
+    # Held slots block like lessons (including buffer time)
+    buffer = timedelta(minutes=int(settings.buffer_minutes))
+    for hold_start, hold_end in _active_hold_intervals(teacher, slot_datetime.date(), hold_owner):
+        if slot_datetime < hold_end + buffer and slot_end > hold_start:
+            return False
+
     return True
 
 
+def _load_window_rows(
+    teacher_ids: List[int],
+    start_date: date,
+    end_date: date,
+    dates: Optional[List[date]] = None,
+    include_holds: bool = True,
+    hold_owner=None
+) -> Dict[int, Tuple[list, list, list, list]]:
+    """
+    Load raw availability inputs for teachers over a date window (four queries,
+    three when include_holds is False).
+    If dates is given, only exceptions, lessons and holds on those dates are
+    loaded (e.g. the weekly occurrences of a recurring series).
+
+    Returns:
+        {teacher_id: (template_rows, exception_rows, lesson_rows, hold_rows)}
+    """
+    rows = {teacher_id: ([], [], [], []) for teacher_id in teacher_ids}
+    if dates is not None:
+        exception_dates = {'date__in': dates}
+        lesson_dates = {'lesson_date__in': dates}
+        hold_dates = {'slot_datetime__date__in': dates}
+    else:
+        exception_dates = {'date__range': (start_date, end_date)}
+        lesson_dates = {'lesson_date__range': (start_date, end_date)}
+        hold_dates = {'slot_datetime__date__range': (start_date, end_date)}
+
+    # Query 1: weekly templates
+    template = TeacherAvailability.objects.filter(
+        teacher_id__in=teacher_ids,
+        is_active=True
+    ).order_by('start_time').values_list('teacher_id', 'day_of_week', 'start_time', 'end_time')
+    for teacher_id, *row in template:
+        rows[teacher_id][0].append(row)
+
+    # Query 2: exceptions in the window
+    exceptions = AvailabilityException.objects.filter(
+        teacher_id__in=teacher_ids,
+        is_active=True,
+        **exception_dates
+    ).order_by('date', 'start_time', 'id').values_list(
+        'teacher_id', 'date', 'exception_type', 'start_time', 'end_time'
+    )
+    for teacher_id, *row in exceptions:
+        rows[teacher_id][1].append(row)
+
+    # Query 3: booked lessons in the window
+    lessons = Lesson.objects.filter(
+        teacher_id__in=teacher_ids,
+        is_deleted=False,
+        **lesson_dates
+    ).exclude(
+        approved_status='Rejected'
+    ).values_list('teacher_id', 'lesson_date', 'lesson_time', 'duration_in_minutes')
+    for teacher_id, *row in lessons:
+        rows[teacher_id][2].append(row)
+
+    # Query 4: other students' active slot holds in the window
+    if include_holds:
+        holds = SlotHold.objects.filter(
+            teacher_id__in=teacher_ids,
+            expires_at__gt=timezone.now(),
+            **hold_dates
+        )
+        if hold_owner is not None:
+            holds = holds.exclude(student=hold_owner)
+        for teacher_id, *row in holds.values_list('teacher_id', 'slot_datetime', 'duration_in_minutes'):
+            rows[teacher_id][3].append(row)
+
+    return rows
+
+
+def _build_interval_index(intervals: List[Tuple[datetime, datetime]], buffer: timedelta):
+    """
+    Sort (start, end) intervals and precompute a running maximum of end + buffer,
+    so a single bisect can rule out conflicts for most slots.
+
+    Returns:
+        (starts, intervals, max_ends)
+    """
+    intervals = sorted(intervals)
+    starts = [start for start, _ in intervals]
+    max_ends = []
+    running_max = None
+    for _, end in intervals:
+        end_with_buffer = end + buffer
+        running_max = end_with_buffer if running_max is None else max(running_max, end_with_buffer)
+        max_ends.append(running_max)
+    return (starts, intervals, max_ends)
+
+
+def _find_interval_conflict(index, slot_start: datetime, slot_end: datetime, buffer: timedelta):
+    """
+    Check a slot against an interval index from _build_interval_index.
+
+    Returns:
+        None if free, 'lesson' if it overlaps an interval, or 'buffer' if it
+        only falls inside an interval's trailing buffer time.
+    """
+    if not index:
+        return None
+
+    starts, intervals, max_ends = index
+
+    # Only intervals starting before the slot ends can overlap it
+    position = bisect_left(starts, slot_end)
+    if position == 0 or max_ends[position - 1] <= slot_start:
+        return None
+
+    conflict = None
+    for interval_start, interval_end in intervals[:position]:
+        if slot_start < interval_end:
+            return 'lesson'
+        if slot_start < interval_end + buffer:
+            conflict = 'buffer'
+    return conflict
+
+
+class AvailabilityWindow:
+    """
+    All availability inputs for one teacher over a date window.
+
+    Loads the weekly template, exceptions, booked lessons and other
+    students' slot holds for the whole window in a fixed number of queries,
+    then answers per-date range and per-slot conflict questions in memory.
+    Results match the reference functions (_get_available_ranges_for_date,
+    _is_slot_available).
+
+    Usage:
+        window = AvailabilityWindow(teacher, start_date, end_date)
+        window.ranges_for_date(some_date)
+        window.calculate_available_slots(duration=60, time_increment=30)
+    """
+
+    def __init__(
+        self,
+        teacher,
+        start_date: date,
+        end_date: date,
+        settings=None,
+        rows=None,
+        dates=None,
+        include_holds: bool = True,
+        hold_owner=None
+    ):
+        self.teacher = teacher
+        self.start_date = start_date
+        self.end_date = end_date
+        self.settings = settings or teacher.availability_settings
+        self.buffer = timedelta(minutes=int(self.settings.buffer_minutes))
+
+        if rows is None:
+            rows = _load_window_rows(
+                [teacher.id], start_date, end_date,
+                dates=dates, include_holds=include_holds, hold_owner=hold_owner
+            )[teacher.id]
+        template_rows, exception_rows, lesson_rows, hold_rows = rows
+
+        # Weekly template, grouped by day of week
+        self._weekly = defaultdict(list)
+        for day_of_week, start_time, end_time in template_rows:
+            self._weekly[day_of_week].append((start_time, end_time))
+
+        # Exceptions in the window, grouped by date
+        self._exceptions = defaultdict(list)
+        for exception_date, exception_type, start_time, end_time in exception_rows:
+            self._exceptions[exception_date].append((exception_type, start_time, end_time))
+
+        # Booked lessons in the window, as sorted (start, end) intervals per date
+        lessons_by_date = defaultdict(list)
+        for lesson_date, lesson_time, duration_in_minutes in lesson_rows:
+            lesson_start = datetime.combine(lesson_date, lesson_time)
+            if timezone.is_naive(lesson_start):
+                lesson_start = timezone.make_aware(lesson_start)
+            lesson_end = lesson_start + timedelta(minutes=int(duration_in_minutes))
+            lessons_by_date[lesson_date].append((lesson_start, lesson_end))
+        self._lessons = {
+            lesson_date: _build_interval_index(intervals, self.buffer)
+            for lesson_date, intervals in lessons_by_date.items()
+        }
+
+        # Other students' slot holds, indexed the same way as lessons
+        holds_by_date = defaultdict(list)
+        for slot_datetime, duration_in_minutes in hold_rows:
+            holds_by_date[timezone.localtime(slot_datetime).date()].append(
+                (slot_datetime, slot_datetime + timedelta(minutes=int(duration_in_minutes)))
+            )
+        self._holds = {
+            hold_date: _build_interval_index(intervals, self.buffer)
+            for hold_date, intervals in holds_by_date.items()
+        }
+
+    @classmethod
+    def for_teachers(cls, teachers, start_date: date, end_date: date, hold_owner=None) -> Dict[int, 'AvailabilityWindow']:
+        """
+        Build windows for several teachers with the same window queries.
+        Teachers must have availability_settings loaded (select_related).
+
+        Returns:
+            {teacher_id: AvailabilityWindow}
+        """
+        teachers = list(teachers)
+        rows = _load_window_rows(
+            [teacher.id for teacher in teachers], start_date, end_date, hold_owner=hold_owner
+        )
+        return {
+            teacher.id: cls(teacher, start_date, end_date, rows=rows[teacher.id])
+            for teacher in teachers
+        }
+
+    def ranges_for_date(self, target_date: date) -> List[Dict]:
+        """
+        Available time ranges for a date: weekly template plus exceptions.
+        Same contract as _get_available_ranges_for_date().
+        """
+        exceptions = self._exceptions.get(target_date, [])
+
+        for exception_type, start_time, end_time in exceptions:
+            if exception_type == 'block' and start_time is None and end_time is None:
+                return []
+
+        # Fresh dicts per call - _merge_time_ranges mutates its input
+        final_ranges = [
+            {'start': start_time, 'end': end_time}
+            for start_time, end_time in self._weekly.get(target_date.weekday(), [])
+        ]
+
+        for exception_type, start_time, end_time in exceptions:
+            if start_time and end_time:
+                if exception_type == 'block':
+                    final_ranges = _subtract_time_range(final_ranges, start_time, end_time)
+                elif exception_type == 'available':
+                    final_ranges.append({'start': start_time, 'end': end_time})
+
+        return _merge_time_ranges(final_ranges)
+
+    def lesson_intervals(self, target_date: date) -> List[Tuple[datetime, datetime]]:
+        """Booked lessons on a date as sorted (start, end) aware datetimes, without buffer"""
+        day_lessons = self._lessons.get(target_date)
+        return list(day_lessons[1]) if day_lessons else []
+
+    def hold_intervals(self, target_date: date) -> List[Tuple[datetime, datetime]]:
+        """Other students' active holds on a date as sorted (start, end) aware datetimes"""
+        day_holds = self._holds.get(target_date)
+        return list(day_holds[1]) if day_holds else []
+
+    def find_lesson_conflict(self, slot_start: datetime, slot_end: datetime):
+        """
+        Find a booked lesson that conflicts with an aware slot interval.
+
+        Returns:
+            None if the slot is free, 'lesson' if it overlaps a lesson, or
+            'buffer' if it only falls inside a lesson's buffer time.
+        """
+        return _find_interval_conflict(self._lessons.get(slot_start.date()), slot_start, slot_end, self.buffer)
+
+    def is_held(self, slot_start: datetime, slot_end: datetime) -> bool:
+        """Whether another student's active hold (plus buffer) overlaps the slot"""
+        return _find_interval_conflict(self._holds.get(slot_start.date()), slot_start, slot_end, self.buffer) is not None
+
+    def check_slot(self, slot_datetime: datetime, duration: int) -> Tuple[bool, str]:
+        """
+        Check a single slot in memory.
+        Same (is_available, reason) contract as check_slot_availability().
+        """
+        if timezone.is_naive(slot_datetime):
+            slot_datetime = timezone.make_aware(slot_datetime)
+
+        now = timezone.now()
+        if slot_datetime < now + timedelta(hours=int(self.settings.min_booking_notice_hours)):
+            return (False, f"Bookings must be made at least {self.settings.min_booking_notice_hours} hours in advance")
+
+        if slot_datetime > now + timedelta(days=int(self.settings.max_booking_days_ahead)):
+            return (False, f"This date is too far ahead. Bookings can only be made up to {self.settings.max_booking_days_ahead} days in advance")
+
+        slot_end = slot_datetime + timedelta(minutes=duration)
+        slot_time = slot_datetime.time()
+        slot_end_time = slot_end.time()
+        is_in_available_range = any(
+            slot_time >= range_dict['start'] and slot_end_time <= range_dict['end']
+            for range_dict in self.ranges_for_date(slot_datetime.date())
+        )
+        if not is_in_available_range:
+            return (False, "Teacher is not available at this time")
+
+        conflict = self.find_lesson_conflict(slot_datetime, slot_end)
+        if conflict == 'lesson':
+            return (False, LESSON_CONFLICT_REASON)
+        if conflict == 'buffer':
+            return (False, BUFFER_CONFLICT_REASON)
+
+        if self.is_held(slot_datetime, slot_end):
+            return (False, HOLD_CONFLICT_REASON)
+
+        return (True, "")
+
+    def nearest_available_slots(
+        self,
+        slot_datetime: datetime,
+        duration: int,
+        count: int = 3,
+        time_increment: int = 30
+    ) -> List[datetime]:
+        """
+        Closest available slots on the same date as slot_datetime, nearest first.
+        Candidates are generated the same way as calculate_available_slots().
+        """
+        if timezone.is_naive(slot_datetime):
+            slot_datetime = timezone.make_aware(slot_datetime)
+
+        now = timezone.now()
+        earliest = now + timedelta(hours=int(self.settings.min_booking_notice_hours))
+        latest = now + timedelta(days=int(self.settings.max_booking_days_ahead))
+        slot_length = timedelta(minutes=duration)
+
+        candidates = []
+        target_date = slot_datetime.date()
+        for time_range in self.ranges_for_date(target_date):
+            for slot in _generate_slots_in_range(target_date, time_range['start'], time_range['end'], duration, time_increment):
+                candidate = slot.replace(tzinfo=slot_datetime.tzinfo)
+                if candidate == slot_datetime or candidate < earliest or candidate > latest:
+                    continue
+                if self.find_lesson_conflict(candidate, candidate + slot_length):
+                    continue
+                if self.is_held(candidate, candidate + slot_length):
+                    continue
+                candidates.append(candidate)
+
+        candidates.sort(key=lambda candidate: (abs(candidate - slot_datetime), candidate))
+        return candidates[:count]
+
+    def calculate_available_slots(self, duration: int = 60, time_increment: int = 30) -> List[Dict]:
+        """
+        Available slots across the whole window.
+        Same output as calculate_available_slots() in reference mode.
+        """
+        now = timezone.now()
+        earliest = now + timedelta(hours=int(self.settings.min_booking_notice_hours))
+        latest = now + timedelta(days=int(self.settings.max_booking_days_ahead))
+        slot_length = timedelta(minutes=duration)
+
+        available_slots = []
+
+        current_date = self.start_date
+        while current_date <= self.end_date:
+            for time_range in self.ranges_for_date(current_date):
+                slots = _generate_slots_in_range(
+                    date_obj=current_date,
+                    start_time=time_range['start'],
+                    end_time=time_range['end'],
+                    duration=duration,
+                    increment=time_increment
+                )
+
+                for slot in slots:
+                    slot_start = timezone.make_aware(slot) if timezone.is_naive(slot) else slot
+                    if slot_start < earliest or slot_start > latest:
+                        continue
+                    if self.find_lesson_conflict(slot_start, slot_start + slot_length):
+                        continue
+                    if self.is_held(slot_start, slot_start + slot_length):
+                        continue
+
+                    available_slots.append({
+                        'datetime': slot.isoformat(),
+                        'duration': duration,
+                        'available': True,
+                        'end_datetime': (slot + slot_length).isoformat()
+                    })
+
+            current_date += timedelta(days=1)
+
+        return available_slots
+
+
 def check_slot_availability(
     teacher,
     slot_datetime: datetime,
-    duration: int
+    duration: int,
+    hold_owner=None
 ) -> Tuple[bool, str]:
     """
     Check if a specific slot is available and return reason if not.
+    Slot holds belonging to hold_owner (the booking student) are not conflicts.
 
     Returns:
         (is_available: bool, reason: str)
@@ -342,6 +782,8 @@ def check_slot_availability(
         (True, "")
         (False, "Teacher is not available at this time")
         (False, "This time slot conflicts with an existing lesson")
+        (False, "This time slot falls within the teacher's buffer time after an existing lesson")
+        (False, "This time slot is being booked by another student")
         (False, "Bookings must be made at least 24 hours in advance")
     """
     # Check if teacher has availability settings
@@ -365,7 +807,7 @@ def check_slot_availability(
 
     max_advance = timedelta(days=int(settings.max_booking_days_ahead))
     if slot_datetime > now + max_advance:
-        return (False, f"Bookings can only be made up to {settings.max_booking_days_ahead} days in advance")
+        return (False, f"This date is too far ahead. Bookings can only be made up to {settings.max_booking_days_ahead} days in advance")
 
     # Check if time falls within teacher's available hours
     available_ranges = _get_available_ranges_for_date(teacher, slot_datetime.date())
@@ -389,6 +831,7 @@ def check_slot_availability(
         is_deleted=False
     ).exclude(approved_status='Rejected')
 
+    in_buffer = False
     for lesson in existing_lessons:
         lesson_start = datetime.combine(lesson.lesson_date, lesson.lesson_time)
         if timezone.is_naive(lesson_start):
@@ -398,7 +841,17 @@ def check_slot_availability(
         lesson_end_with_buffer = lesson_end + timedelta(minutes=int(settings.buffer_minutes))
 
         if slot_datetime < lesson_end_with_buffer and slot_end > lesson_start:
-            return (False, "This time slot conflicts with an existing lesson")
+            if slot_datetime < lesson_end:
+                return (False, LESSON_CONFLICT_REASON)
+            in_buffer = True
+
+    if in_buffer:
+        return (False, BUFFER_CONFLICT_REASON)
+
+    buffer = timedelta(minutes=int(settings.buffer_minutes))
+    for hold_start, hold_end in _active_hold_intervals(teacher, slot_datetime.date(), hold_owner):
+        if slot_datetime < hold_end + buffer and slot_end > hold_start:
+            return (False, HOLD_CONFLICT_REASON)
 
     return (True, "")
 
@@ -408,17 +861,25 @@ def generate_recurring_slots(
     base_datetime: datetime,
     duration: int,
     num_weeks: int,
-    subject_id: int
+    subject_id: int,
+    suggestions: int = 3,
+    hold_owner=None
 ) -> List[Dict]:
     """
     Generate weekly recurring lesson slots.
 
+    All occurrences are evaluated together: templates, exceptions and lessons
+    for every occurrence date are loaded once through AvailabilityWindow, so
+    the query count does not grow with num_weeks.
+
     Args:
         teacher: User object (teacher)
         base_datetime: Starting lesson datetime (e.g., "2025-01-06 18:00")
         duration: Lesson duration in minutes
         num_weeks: Number of weeks to generate
         subject_id: Subject for all recurring lessons
+        suggestions: Number of alternative slots to suggest for each conflicting week
+        hold_owner: User whose own slot holds should not count as conflicts
 
     Returns:
         List of slot dictionaries:
@@ -428,7 +889,8 @@ def generate_recurring_slots(
                 'duration': 60,
                 'available': True,
                 'conflict_reason': None,
-                'subject_id': 456
+                'subject_id': 456,
+                'alternatives': []  # nearest free slots that day when not available
             },
             ...
         ]
@@ -450,29 +912,38 @@ def generate_recurring_slots(
     if timezone.is_naive(base_datetime):
         base_datetime = timezone.make_aware(base_datetime)
 
-    # Generate slots for each week
-    recurring_slots = []
+    occurrences = [base_datetime + timedelta(weeks=week_num) for week_num in range(num_weeks)]
+
+    window = None
+    if settings.use_availability_calendar:
+        occurrence_dates = [occurrence.date() for occurrence in occurrences]
+        window = AvailabilityWindow(
+            teacher,
+            occurrence_dates[0],
+            occurrence_dates[-1],
+            settings=settings,
+            dates=occurrence_dates,
+            hold_owner=hold_owner
+        )
 
-    for week_num in range(num_weeks):
-        # Calculate slot datetime for this week
-        slot_datetime = base_datetime + timedelta(weeks=week_num)
+    recurring_slots = []
+    for slot_datetime in occurrences:
+        if window is None:
+            is_available, conflict_reason = (True, "")  # Availability checking disabled
+        else:
+            is_available, conflict_reason = window.check_slot(slot_datetime, duration)
 
-        # Check availability for this slot
-        is_available, conflict_reason = check_slot_availability(
-            teacher=teacher,
-            slot_datetime=slot_datetime,
-            duration=duration
-        )
+        alternatives = []
+        if not is_available and suggestions:
+            alternatives = window.nearest_available_slots(slot_datetime, duration, count=suggestions)
 
-        # Build result dictionary
-        slot_dict = {
+        recurring_slots.append({
             'datetime': slot_datetime,
             'duration': duration,
             'available': is_available,
             'conflict_reason': conflict_reason if not is_available else None,
-            'subject_id': subject_id
-        }
-
-        recurring_slots.append(slot_dict)
+            'subject_id': subject_id,
+            'alternatives': alternatives
+        })
 
     return recurring_slots
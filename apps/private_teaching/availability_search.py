@@ -0,0 +1,244 @@
+"""
+Cross-Teacher Availability Search
+
+Answers questions like "which teachers are free on Tuesdays at 17:00 for
+30 minutes" without running the engine once per teacher.
+
+Candidate teachers come from a single indexed query over weekly templates
+(day_of_week, start_time) and, for date searches, 'available' exceptions
+(date). Only those candidates are evaluated, and all of them are loaded
+together through AvailabilityWindow.for_teachers, so the number of
+queries stays fixed however many teachers are on the platform.
+
+Two search modes:
+- Weekly: day_of_week(s) given. Ranks teachers by the recurring time they
+  offer inside the time window (template only).
+- Dated: start_date/end_date given. Ranks teachers by the concrete bookable
+  slots inside the time window (exceptions, lessons and notice rules applied).
+"""
+
+from datetime import datetime, timedelta, date, time
+from typing import Dict, List, Optional
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from .availability_engine import AvailabilityWindow, _merge_time_ranges
+from .models import TeacherAvailability, AvailabilityException
+
+User = get_user_model()
+
+
+def _minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def _candidate_teacher_ids(
+    weekdays,
+    window_start: time,
+    window_end: time,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    subject: Optional[str] = None,
+    instrument: Optional[str] = None
+) -> List[int]:
+    """
+    Teachers whose template (or special hours in the date range) overlaps the
+    time window, filtered by subject/instrument. One query.
+    """
+    template_teachers = TeacherAvailability.objects.filter(
+        is_active=True,
+        day_of_week__in=weekdays,
+        start_time__lt=window_end,
+        end_time__gt=window_start
+    ).values('teacher_id')
+
+    teacher_filter = Q(id__in=template_teachers)
+
+    if start_date and end_date:
+        special_hours_teachers = AvailabilityException.objects.filter(
+            is_active=True,
+            exception_type='available',
+            date__range=(start_date, end_date),
+            start_time__lt=window_end,
+            end_time__gt=window_start
+        ).values('teacher_id')
+        teacher_filter |= Q(id__in=special_hours_teachers)
+
+    teachers = User.objects.filter(
+        teacher_filter,
+        is_active=True,
+        availability_settings__use_availability_calendar=True
+    )
+
+    if subject:
+        teachers = teachers.filter(
+            subjects__subject__icontains=subject,
+            subjects__is_active=True
+        )
+    if instrument:
+        teachers = teachers.filter(profile__instruments_taught__icontains=instrument)
+
+    return list(teachers.values_list('id', flat=True).distinct())
+
+
+def _teacher_summary(teacher) -> Dict:
+    return {
+        'teacher_id': teacher.id,
+        'name': teacher.get_full_name() or teacher.username,
+    }
+
+
+def _weekly_matches(teachers, weekdays, window_start, window_end, duration, time_increment) -> List[Dict]:
+    """Rank teachers by recurring template time inside the window"""
+    template = TeacherAvailability.objects.filter(
+        teacher__in=teachers,
+        is_active=True,
+        day_of_week__in=weekdays,
+        start_time__lt=window_end,
+        end_time__gt=window_start
+    ).values_list('teacher_id', 'day_of_week', 'start_time', 'end_time')
+
+    ranges_by_teacher_day = {}
+    for teacher_id, day_of_week, start_time, end_time in template:
+        ranges_by_teacher_day.setdefault((teacher_id, day_of_week), []).append({
+            'start': max(start_time, window_start),
+            'end': min(end_time, window_end)
+        })
+
+    teachers_by_id = {teacher.id: teacher for teacher in teachers}
+    matches = {}
+    for (teacher_id, day_of_week), ranges in ranges_by_teacher_day.items():
+        for time_range in _merge_time_ranges(ranges):
+            range_start = _minutes(time_range['start'])
+            range_end = _minutes(time_range['end'])
+            if range_end - range_start < duration:
+                continue
+
+            match = matches.setdefault(teacher_id, {
+                **_teacher_summary(teachers_by_id[teacher_id]),
+                'open_minutes': 0,
+                'slot_count': 0,
+                'days': set(),
+            })
+            match['open_minutes'] += range_end - range_start
+            match['slot_count'] += (range_end - range_start - duration) // time_increment + 1
+            match['days'].add(day_of_week)
+
+    results = []
+    for match in matches.values():
+        match['days'] = sorted(match['days'])
+        results.append(match)
+
+    results.sort(key=lambda m: (-m['slot_count'], -m['open_minutes'], m['teacher_id']))
+    return results
+
+
+def _dated_matches(teachers, start_date, end_date, window_start, window_end, duration, time_increment) -> List[Dict]:
+    """Rank teachers by concrete bookable slots inside the window"""
+    windows = AvailabilityWindow.for_teachers(teachers, start_date, end_date)
+
+    results = []
+    for teacher in teachers:
+        slots = [
+            slot for slot in windows[teacher.id].calculate_available_slots(duration, time_increment)
+            if _slot_in_time_window(slot, window_start, window_end)
+        ]
+        if not slots:
+            continue
+        results.append({
+            **_teacher_summary(teacher),
+            'slot_count': len(slots),
+            'first_available': slots[0]['datetime'],
+            'slots': slots,
+        })
+
+    results.sort(key=lambda m: (-m['slot_count'], m['first_available'], m['teacher_id']))
+    return results
+
+
+def _slot_in_time_window(slot: Dict, window_start: time, window_end: time) -> bool:
+    slot_start = datetime.fromisoformat(slot['datetime'])
+    slot_end = datetime.fromisoformat(slot['end_datetime'])
+    return (
+        slot_start.time() >= window_start and
+        slot_end.date() == slot_start.date() and
+        slot_end.time() <= window_end
+    )
+
+
+def search_available_teachers(
+    window_start: time,
+    window_end: time,
+    duration: int = 60,
+    days_of_week: Optional[List[int]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    time_increment: int = 30,
+    subject: Optional[str] = None,
+    instrument: Optional[str] = None,
+    limit: int = 20
+) -> List[Dict]:
+    """
+    Find teachers with availability inside a daily time window.
+
+    Args:
+        window_start: Earliest lesson start time (e.g., 17:00)
+        window_end: Latest lesson end time (e.g., 18:00)
+        duration: Lesson duration in minutes
+        days_of_week: Weekdays for a weekly search (0=Monday, 6=Sunday)
+        start_date/end_date: Date range for a dated search (takes precedence)
+        time_increment: Slot increment in minutes
+        subject: Optional subject name filter (matches Subject.subject)
+        instrument: Optional filter on UserProfile.instruments_taught
+        limit: Maximum number of teachers returned
+
+    Returns:
+        Teachers ranked by availability, most available first:
+        [
+            {
+                'teacher_id': 12,
+                'name': 'Jane Smith',
+                'slot_count': 4,
+                # weekly search:
+                'open_minutes': 120, 'days': [1],
+                # dated search:
+                'first_available': '2025-06-17T17:00:00', 'slots': [...]
+            },
+            ...
+        ]
+    """
+    if window_end <= window_start:
+        raise ValueError("Time window end must be after its start")
+
+    dated = start_date is not None and end_date is not None
+    if dated:
+        if end_date < start_date:
+            raise ValueError("end_date must not be before start_date")
+        weekdays = sorted({
+            (start_date + timedelta(days=offset)).weekday()
+            for offset in range(min((end_date - start_date).days + 1, 7))
+        })
+    elif days_of_week:
+        weekdays = sorted(set(days_of_week))
+    else:
+        raise ValueError("Provide days_of_week or a start_date/end_date range")
+
+    teacher_ids = _candidate_teacher_ids(
+        weekdays, window_start, window_end,
+        start_date=start_date if dated else None,
+        end_date=end_date if dated else None,
+        subject=subject,
+        instrument=instrument
+    )
+    if not teacher_ids:
+        return []
+
+    teachers = list(User.objects.filter(id__in=teacher_ids).select_related('availability_settings'))
+
+    if dated:
+        results = _dated_matches(teachers, start_date, end_date, window_start, window_end, duration, time_increment)
+    else:
+        results = _weekly_matches(teachers, weekdays, window_start, window_end, duration, time_increment)
+
+    return results[:limit]
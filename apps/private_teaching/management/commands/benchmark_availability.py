@@ -0,0 +1,138 @@
+"""
+Management command to benchmark the availability engine against a stored baseline.
+
+Builds synthetic teachers (realistic templates, hundreds of exceptions and
+thousands of lessons) inside a transaction that is rolled back afterwards,
+then times calculate_available_slots, check_slot_availability and
+generate_recurring_slots for each window size and engine mode. The schedule
+starts on a fixed date with the clock frozen just before it, so query counts
+don't depend on the day the command runs.
+
+Query counts and each optimised mode's speed relative to the reference
+engine are checked against the baseline. Absolute times vary from machine
+to machine: compare them with --timings against a baseline recorded on the
+same machine (--update-baseline).
+
+Usage:
+    python manage.py benchmark_availability
+    python manage.py benchmark_availability --windows 7,30,90 --lessons 5000
+    python manage.py benchmark_availability --update-baseline
+    python manage.py benchmark_availability --timings
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.private_teaching.availability_benchmark import (
+    BENCHMARK_START_DATE,
+    DEFAULT_BASELINE_PATH,
+    build_synthetic_teacher,
+    compare_to_baseline,
+    frozen_clock,
+    load_baseline,
+    run_benchmarks,
+    save_baseline
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the availability engine on synthetic schedules and fail on regressions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teachers', type=int, default=5, help='Synthetic teachers to create (the first is measured)')
+        parser.add_argument('--exceptions', type=int, default=300, help='Availability exceptions per teacher')
+        parser.add_argument('--lessons', type=int, default=3000, help='Booked lessons per teacher')
+        parser.add_argument('--windows', default='7,30,90', help='Comma-separated window sizes in days')
+        parser.add_argument('--duration', type=int, default=60, help='Lesson duration in minutes')
+        parser.add_argument('--checks', type=int, default=50, help='Slots checked per window by check_slot_availability')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best time is kept)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic schedules')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE_PATH), help='Baseline JSON file')
+        parser.add_argument('--tolerance', type=float, default=1.5, help='Allowed slowdown factor against the baseline')
+        parser.add_argument(
+            '--timings',
+            action='store_true',
+            help='Also compare absolute times with the baseline (only meaningful on the machine that recorded it)',
+        )
+        parser.add_argument(
+            '--update-baseline',
+            action='store_true',
+            help='Write these results as the new baseline instead of comparing',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            windows = [int(days) for days in options['windows'].split(',')]
+        except ValueError:
+            raise CommandError('--windows must be a comma-separated list of day counts')
+
+        config = {
+            'teachers': options['teachers'],
+            'exceptions': options['exceptions'],
+            'lessons': options['lessons'],
+            'windows': windows,
+            'duration': options['duration'],
+            'checks': options['checks'],
+            'seed': options['seed'],
+        }
+        span = max(windows)
+        start_date = BENCHMARK_START_DATE
+
+        self.stdout.write(
+            f"Building {config['teachers']} synthetic teacher(s): "
+            f"{config['exceptions']} exceptions and {config['lessons']} lessons each..."
+        )
+
+        with transaction.atomic(), frozen_clock():
+            teacher = None
+            for index in range(config['teachers']):
+                built, _ = build_synthetic_teacher(
+                    seed=config['seed'] + index,
+                    start_date=start_date,
+                    days=span,
+                    exceptions=config['exceptions'],
+                    lessons=config['lessons'],
+                    prefix='benchmark'
+                )
+                teacher = teacher or built
+
+            results = run_benchmarks(
+                teacher,
+                start_date,
+                windows=windows,
+                duration=config['duration'],
+                checks=config['checks'],
+                repeat=options['repeat']
+            )
+            transaction.set_rollback(True)
+
+        self.stdout.write('\n' + '=' * 72)
+        self.stdout.write(f"{'benchmark':<52}{'ms':>10}{'queries':>10}")
+        self.stdout.write('=' * 72)
+        for key, result in results.items():
+            self.stdout.write(f"{key:<52}{result['ms']:>10.2f}{result['queries']:>10}")
+        self.stdout.write('')
+
+        if options['update_baseline']:
+            save_baseline(config, results, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+            return
+
+        baseline = load_baseline(options['baseline'])
+        if baseline is None:
+            self.stdout.write(self.style.WARNING('No baseline found - run with --update-baseline to create one'))
+            return
+        if baseline['config'] != config:
+            raise CommandError(
+                f"Baseline was recorded with {baseline['config']}; rerun with matching options or --update-baseline"
+            )
+
+        regressions = compare_to_baseline(
+            results, baseline['results'], tolerance=options['tolerance'], timings=options['timings']
+        )
+        if regressions:
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(f'  ✗ {regression}'))
+            raise CommandError(f'{len(regressions)} benchmark regression(s) against the baseline')
+
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
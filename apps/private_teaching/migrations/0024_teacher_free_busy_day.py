@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-16 19:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('private_teaching', '0023_add_max_recurring_lessons'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeacherFreeBusyDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('free_bits', models.BinaryField(help_text='Available minutes, one bit per minute')),
+                ('busy_bits', models.BinaryField(help_text='Booked minutes (including buffer), one bit per minute')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('teacher', models.ForeignKey(help_text='Teacher this free/busy day belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='free_busy_days', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Teacher Free/Busy Day',
+                'verbose_name_plural': 'Teacher Free/Busy Days',
+                'db_table': 'private_teaching_teacher_free_busy_day',
+                'constraints': [models.UniqueConstraint(fields=('teacher', 'date'), name='unique_teacher_free_busy_day')],
+            },
+        ),
+    ]
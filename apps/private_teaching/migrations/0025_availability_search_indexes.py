@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-16 19:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('private_teaching', '0024_teacher_free_busy_day'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='availabilityexception',
+            index=models.Index(fields=['date', 'exception_type'], name='private_tea_date_992f52_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teacheravailability',
+            index=models.Index(fields=['day_of_week', 'start_time', 'end_time'], name='private_tea_day_of__bf3442_idx'),
+        ),
+    ]
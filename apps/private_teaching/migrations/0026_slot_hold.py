@@ -0,0 +1,37 @@
+# Generated by Django 5.2.9 on 2026-10-16 19:31
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('private_teaching', '0025_availability_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('slot_datetime', models.DateTimeField(help_text='Start of the held slot')),
+                ('duration_in_minutes', models.PositiveIntegerField(default=60)),
+                ('expires_at', models.DateTimeField(help_text='Hold is released automatically after this time')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('student', models.ForeignKey(help_text='Student holding the slot', on_delete=django.db.models.deletion.CASCADE, related_name='held_slots', to=settings.AUTH_USER_MODEL)),
+                ('teacher', models.ForeignKey(help_text='Teacher whose slot is held', on_delete=django.db.models.deletion.CASCADE, related_name='slot_holds', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Slot Hold',
+                'verbose_name_plural': 'Slot Holds',
+                'db_table': 'private_teaching_slot_hold',
+                'ordering': ['slot_datetime'],
+                'indexes': [models.Index(fields=['teacher', 'expires_at'], name='private_tea_teacher_28bc58_idx'), models.Index(fields=['student', 'teacher'], name='private_tea_student_81076d_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-16 19:36
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('private_teaching', '0026_slot_hold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teacheravailabilitysettings',
+            name='schedule_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='When the schedule version last changed', null=True),
+        ),
+        migrations.AddField(
+            model_name='teacheravailabilitysettings',
+            name='schedule_version',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, help_text="Changes whenever the teacher's availability, exceptions, settings or lessons change"),
+        ),
+    ]
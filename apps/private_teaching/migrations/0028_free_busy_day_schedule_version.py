@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('private_teaching', '0027_schedule_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teacherfreebusyday',
+            name='schedule_version',
+            field=models.UUIDField(help_text="The teacher's schedule_version when the bitmaps were computed", null=True),
+        ),
+    ]
@@ -158,6 +158,18 @@ class LessonRequestMessage(models.Model):
     def __str__(self):
         return f"{self.author.get_full_name()}: {self.message[:50]}"
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+
+        if adding:
+            from apps.core.live_events import publish_on_commit
+            publish_on_commit([f'lesson_request:{self.lesson_request_id}'], 'lesson_request_message', {
+                'lesson_request': self.lesson_request_id,
+                'id': self.id,
+                'author': self.author_id,
+            })
+
     def mark_as_read(self):
         """Mark message as read"""
         if not self.is_read:
@@ -1231,6 +1243,8 @@ class TeacherAvailability(models.Model):
         verbose_name_plural = 'Teacher Availability Slots'
         indexes = [
             models.Index(fields=['teacher', 'day_of_week']),
+            # Cross-teacher search: "who is available on this weekday at this time"
+            models.Index(fields=['day_of_week', 'start_time', 'end_time']),
         ]
 
     def __str__(self):
@@ -1299,6 +1313,8 @@ class AvailabilityException(models.Model):
         verbose_name_plural = 'Availability Exceptions'
         indexes = [
             models.Index(fields=['teacher', 'date']),
+            # Cross-teacher search: special hours in a date range
+            models.Index(fields=['date', 'exception_type']),
         ]
 
     def __str__(self):
@@ -1441,6 +1457,19 @@ class TeacherAvailabilitySettings(models.Model):
         help_text="Maximum number of lessons students can book in a recurring sequence (e.g., 8 = up to 8 weekly lessons)"
     )
 
+    # Schedule version stamp (replaced whenever any availability input changes)
+    schedule_version = models.UUIDField(
+        default=uuid.uuid4,
+        editable=False,
+        help_text="Changes whenever the teacher's availability, exceptions, settings or lessons change"
+    )
+    schedule_updated_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="When the schedule version last changed"
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -1454,6 +1483,92 @@ class TeacherAvailabilitySettings(models.Model):
         return f"Availability Settings - {teacher_name}"
 
 
+class SlotHold(models.Model):
+    """
+    Short-lived reservation of a time slot while a student completes booking.
+
+    Created when a student selects a slot, consumed when the booking is
+    submitted, and ignored once expires_at has passed. Active holds count
+    as busy time for every other student.
+    """
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    teacher = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='slot_holds',
+        help_text="Teacher whose slot is held"
+    )
+    student = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='held_slots',
+        help_text="Student holding the slot"
+    )
+    slot_datetime = models.DateTimeField(help_text="Start of the held slot")
+    duration_in_minutes = models.PositiveIntegerField(default=60)
+    expires_at = models.DateTimeField(help_text="Hold is released automatically after this time")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'private_teaching_slot_hold'
+        ordering = ['slot_datetime']
+        verbose_name = 'Slot Hold'
+        verbose_name_plural = 'Slot Holds'
+        indexes = [
+            models.Index(fields=['teacher', 'expires_at']),
+            models.Index(fields=['student', 'teacher']),
+        ]
+
+    def __str__(self):
+        return f"Hold {self.slot_datetime:%Y-%m-%d %H:%M} ({self.duration_in_minutes} min) - {self.student.username}"
+
+    @property
+    def slot_end(self):
+        from datetime import timedelta
+        return self.slot_datetime + timedelta(minutes=self.duration_in_minutes)
+
+
+class TeacherFreeBusyDay(models.Model):
+    """
+    Precomputed free/busy bitmaps for one teacher on one date.
+
+    Each bitmap holds one bit per minute of the day (bit 0 = 00:00):
+    - free_bits: minutes inside the teacher's available ranges
+      (weekly template with that date's exceptions applied)
+    - busy_bits: minutes covered by booked lessons plus buffer time
+
+    Rows are derived data maintained by apps.private_teaching.availability_cache
+    and deleted whenever an input for that date changes. Each row records the
+    teacher's schedule_version it was computed under; rows from an older
+    version are recomputed rather than served.
+    """
+    teacher = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='free_busy_days',
+        help_text="Teacher this free/busy day belongs to"
+    )
+    date = models.DateField()
+    free_bits = models.BinaryField(help_text="Available minutes, one bit per minute")
+    busy_bits = models.BinaryField(help_text="Booked minutes (including buffer), one bit per minute")
+    schedule_version = models.UUIDField(
+        null=True,
+        help_text="The teacher's schedule_version when the bitmaps were computed"
+    )
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'private_teaching_teacher_free_busy_day'
+        verbose_name = 'Teacher Free/Busy Day'
+        verbose_name_plural = 'Teacher Free/Busy Days'
+        constraints = [
+            models.UniqueConstraint(fields=['teacher', 'date'], name='unique_teacher_free_busy_day'),
+        ]
+
+    def __str__(self):
+        return f"Free/busy - {self.teacher.username} {self.date}"
+
+
 class PrivateLessonAssignment(models.Model):
     """
     Links assignments to private teaching context
@@ -0,0 +1,116 @@
+"""
+Signal handlers to keep the teacher free/busy cache in sync.
+
+Each handler invalidates only the cached days whose inputs changed:
+- TeacherAvailability: every date on the affected weekday(s)
+- AvailabilityException: the exception's date(s)
+- TeacherAvailabilitySettings: all days, when the buffer time changes
+- Lesson: the lesson's date(s), when scheduling fields change
+
+Every schedule change also replaces the teacher's schedule version, which
+retires their cached available-slots responses and ETags.
+"""
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from lessons.models import Lesson
+from .models import TeacherAvailability, AvailabilityException, TeacherAvailabilitySettings
+from .availability_cache import invalidate_days, invalidate_weekdays, invalidate_teacher
+from .slot_response_cache import bump_schedule_version
+
+
+LESSON_SCHEDULE_FIELDS = (
+    'teacher_id', 'lesson_date', 'lesson_time', 'duration_in_minutes', 'is_deleted', 'approved_status'
+)
+
+
+def _previous_values(sender, instance, fields):
+    """Fetch the stored values of fields for an existing row (None for new rows)"""
+    if instance._state.adding or instance.pk is None:
+        return None
+    return sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(pre_save, sender=TeacherAvailability)
+def remember_previous_availability_day(sender, instance, **kwargs):
+    instance._previous_schedule = _previous_values(sender, instance, ('teacher_id', 'day_of_week'))
+
+
+@receiver(post_save, sender=TeacherAvailability)
+@receiver(post_delete, sender=TeacherAvailability)
+def invalidate_free_busy_on_availability_change(sender, instance, **kwargs):
+    """Weekly template changed - drop cached days on the affected weekdays"""
+    previous = getattr(instance, '_previous_schedule', None)
+    if previous and previous['teacher_id'] != instance.teacher_id:
+        invalidate_weekdays(previous['teacher_id'], [previous['day_of_week']])
+        bump_schedule_version(previous['teacher_id'])
+    weekdays = [instance.day_of_week]
+    if previous:
+        weekdays.append(previous['day_of_week'])
+    invalidate_weekdays(instance.teacher_id, weekdays)
+    bump_schedule_version(instance.teacher_id)
+
+
+@receiver(pre_save, sender=AvailabilityException)
+def remember_previous_exception_date(sender, instance, **kwargs):
+    instance._previous_schedule = _previous_values(sender, instance, ('teacher_id', 'date'))
+
+
+@receiver(post_save, sender=AvailabilityException)
+@receiver(post_delete, sender=AvailabilityException)
+def invalidate_free_busy_on_exception_change(sender, instance, **kwargs):
+    """Exception changed - drop the cached day(s) it applies to"""
+    previous = getattr(instance, '_previous_schedule', None)
+    if previous and previous['teacher_id'] != instance.teacher_id:
+        invalidate_days(previous['teacher_id'], [previous['date']])
+        bump_schedule_version(previous['teacher_id'])
+    dates = [instance.date]
+    if previous:
+        dates.append(previous['date'])
+    invalidate_days(instance.teacher_id, dates)
+    bump_schedule_version(instance.teacher_id)
+
+
+@receiver(pre_save, sender=TeacherAvailabilitySettings)
+def remember_previous_buffer(sender, instance, **kwargs):
+    instance._previous_schedule = _previous_values(sender, instance, ('buffer_minutes',))
+
+
+@receiver(post_save, sender=TeacherAvailabilitySettings)
+def invalidate_free_busy_on_buffer_change(sender, instance, created, **kwargs):
+    """Buffer time is baked into every busy bitmap - drop all days when it changes"""
+    previous = getattr(instance, '_previous_schedule', None)
+    if created or previous is None or previous['buffer_minutes'] != instance.buffer_minutes:
+        invalidate_teacher(instance.teacher_id)
+    # Notice and booking-window settings shape responses too
+    bump_schedule_version(instance.teacher_id)
+
+
+@receiver(pre_save, sender=Lesson)
+def remember_previous_lesson_schedule(sender, instance, **kwargs):
+    instance._previous_schedule = _previous_values(sender, instance, LESSON_SCHEDULE_FIELDS)
+
+
+@receiver(post_save, sender=Lesson)
+def invalidate_free_busy_on_lesson_save(sender, instance, created, **kwargs):
+    """Lesson booked or rescheduled - drop the cached day(s) it touches"""
+    previous = getattr(instance, '_previous_schedule', None)
+    if previous:
+        current = {field: getattr(instance, field) for field in LESSON_SCHEDULE_FIELDS}
+        if all(str(previous[field]) == str(current[field]) for field in LESSON_SCHEDULE_FIELDS):
+            return  # Content-only edit (notes, homework...) - schedule unchanged
+        if previous['teacher_id'] != instance.teacher_id:
+            invalidate_days(previous['teacher_id'], [previous['lesson_date']])
+            bump_schedule_version(previous['teacher_id'])
+            previous = None
+    dates = [instance.lesson_date]
+    if previous:
+        dates.append(previous['lesson_date'])
+    invalidate_days(instance.teacher_id, dates)
+    bump_schedule_version(instance.teacher_id)
+
+
+@receiver(post_delete, sender=Lesson)
+def invalidate_free_busy_on_lesson_delete(sender, instance, **kwargs):
+    invalidate_days(instance.teacher_id, [instance.lesson_date])
+    bump_schedule_version(instance.teacher_id)
@@ -0,0 +1,147 @@
+"""
+Slot Holds
+
+Short-lived reservations that stop two students booking the same slot:
+1. Reserve: a student selects a slot -> SlotHold with an expiry time
+2. Confirm: the booking is submitted -> lessons created, holds consumed
+3. Expire: unconfirmed holds stop counting once expires_at passes
+
+Reserve and confirm both run inside lock_teacher_schedule(), a row lock on
+the teacher's user record, so concurrent requests for the same teacher are
+serialised while requests for different teachers proceed in parallel.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from django.conf import settings as django_settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .availability_engine import check_slot_availability
+from .models import SlotHold
+
+User = get_user_model()
+
+
+def lock_teacher_schedule(teacher):
+    """
+    Serialise schedule writes for one teacher until the current transaction ends.
+    Must be called inside transaction.atomic().
+    """
+    User.objects.select_for_update().only('id').get(pk=teacher.pk)
+
+
+def purge_expired_holds(teacher):
+    """Delete expired holds for a teacher"""
+    SlotHold.objects.filter(teacher=teacher, expires_at__lte=timezone.now()).delete()
+
+
+def place_holds(teacher, student, slots: List[Dict]) -> List[Dict]:
+    """
+    Reserve slots for a student.
+
+    Each slot is checked with check_slot_availability (ignoring the student's
+    own holds) under the teacher lock, so two students can never hold
+    overlapping time. Re-holding a slot the student already holds refreshes
+    its expiry instead of creating a duplicate.
+
+    Args:
+        slots: [{'datetime': aware datetime, 'duration': 60}, ...]
+
+    Returns:
+        One result per slot, in order:
+        [
+            {'datetime': ..., 'held': True, 'token': UUID, 'expires_at': ..., 'reason': ''},
+            {'datetime': ..., 'held': False, 'token': None, 'expires_at': None, 'reason': '...'},
+        ]
+    """
+    expires_at = timezone.now() + timedelta(minutes=django_settings.SLOT_HOLD_MINUTES)
+    results = []
+
+    with transaction.atomic():
+        lock_teacher_schedule(teacher)
+        purge_expired_holds(teacher)
+
+        existing = {
+            (hold.slot_datetime, hold.duration_in_minutes): hold
+            for hold in SlotHold.objects.filter(teacher=teacher, student=student)
+        }
+        active_count = len(existing)
+
+        for slot in slots:
+            slot_datetime = slot['datetime']
+            if timezone.is_naive(slot_datetime):
+                slot_datetime = timezone.make_aware(slot_datetime)
+            duration = int(slot['duration'])
+
+            hold = existing.get((slot_datetime, duration))
+            if hold:
+                hold.expires_at = expires_at
+                hold.save(update_fields=['expires_at'])
+                results.append(_hold_result(slot_datetime, hold))
+                continue
+
+            if active_count >= django_settings.SLOT_HOLD_MAX_PER_STUDENT:
+                results.append(_failed_result(slot_datetime, "You are holding too many slots. Complete or clear your booking first."))
+                continue
+
+            is_available, reason = check_slot_availability(
+                teacher=teacher,
+                slot_datetime=slot_datetime,
+                duration=duration,
+                hold_owner=student
+            )
+            if not is_available:
+                results.append(_failed_result(slot_datetime, reason))
+                continue
+
+            hold = SlotHold.objects.create(
+                teacher=teacher,
+                student=student,
+                slot_datetime=slot_datetime,
+                duration_in_minutes=duration,
+                expires_at=expires_at
+            )
+            existing[(slot_datetime, duration)] = hold
+            active_count += 1
+            results.append(_hold_result(slot_datetime, hold))
+
+    return results
+
+
+def release_holds(student, tokens=None, teacher=None) -> int:
+    """
+    Release a student's holds, either specific tokens or all holds for a teacher.
+
+    Returns:
+        Number of holds released
+    """
+    holds = SlotHold.objects.filter(student=student)
+    if tokens is not None:
+        holds = holds.filter(token__in=tokens)
+    if teacher is not None:
+        holds = holds.filter(teacher=teacher)
+    deleted, _ = holds.delete()
+    return deleted
+
+
+def _hold_result(slot_datetime: datetime, hold: SlotHold) -> Dict:
+    return {
+        'datetime': slot_datetime,
+        'held': True,
+        'token': hold.token,
+        'expires_at': hold.expires_at,
+        'reason': ''
+    }
+
+
+def _failed_result(slot_datetime: datetime, reason: str) -> Dict:
+    return {
+        'datetime': slot_datetime,
+        'held': False,
+        'token': None,
+        'expires_at': None,
+        'reason': reason
+    }
@@ -0,0 +1,113 @@
+"""
+Available-Slots Response Cache
+
+Lets the booking widget re-fetch a teacher's slots cheaply when nothing has
+changed since the last request:
+- TeacherAvailabilitySettings.schedule_version is replaced (signals.py)
+  whenever an availability input changes: template, exceptions, settings
+  or lessons.
+- The response fingerprint combines that stamp with the request parameters,
+  the active holds that apply to the requesting student (holds come and go
+  without a schedule edit) and a short time bucket, so the booking-notice
+  cut-off keeps moving.
+- The fingerprint is sent as the ETag for conditional GETs (304 Not Modified)
+  and keys the server-side response cache, so repeat requests skip slot
+  generation entirely. There is no Last-Modified: a hold being released or
+  expiring changes the response without a newer timestamp to report.
+"""
+
+import hashlib
+import uuid
+from datetime import date
+from typing import Dict, List, Optional
+
+from django.conf import settings as django_settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .availability_engine import calculate_available_slots
+from .models import TeacherAvailabilitySettings, SlotHold
+
+
+CACHE_KEY_PREFIX = 'available-slots'
+
+
+def bump_schedule_version(teacher_id):
+    """Give a teacher a new schedule version, retiring every cached response"""
+    if teacher_id:
+        TeacherAvailabilitySettings.objects.filter(teacher_id=teacher_id).update(
+            schedule_version=uuid.uuid4(),
+            schedule_updated_at=timezone.now()
+        )
+
+
+def available_slots_fingerprint(
+    teacher,
+    start_date: date,
+    end_date: date,
+    duration: int,
+    time_increment: int,
+    hold_owner=None
+) -> Optional[str]:
+    """
+    Fingerprint the available-slots response a student would receive.
+
+    Returns:
+        The ETag, or None if the teacher has no availability settings
+    """
+    settings = getattr(teacher, 'availability_settings', None)
+    if settings is None:
+        return None
+
+    now = timezone.now()
+    lifetime = max(django_settings.AVAILABLE_SLOTS_CACHE_SECONDS, 1)
+    bucket = int(now.timestamp()) // lifetime
+
+    holds = SlotHold.objects.filter(teacher=teacher, expires_at__gt=now)
+    if hold_owner is not None:
+        holds = holds.exclude(student=hold_owner)
+    hold_tokens = list(holds.order_by('token').values_list('token', flat=True))
+
+    fingerprint = ':'.join([
+        str(teacher.pk),
+        start_date.isoformat(),
+        end_date.isoformat(),
+        str(duration),
+        str(time_increment),
+        str(settings.schedule_version),
+        str(bucket),
+        ','.join(str(token) for token in hold_tokens),
+    ])
+    return hashlib.sha1(fingerprint.encode()).hexdigest()
+
+
+def get_available_slots(
+    teacher,
+    start_date: date,
+    end_date: date,
+    duration: int,
+    time_increment: int,
+    etag: Optional[str],
+    hold_owner=None
+) -> List[Dict]:
+    """
+    Available slots for a fingerprinted request, served from the response
+    cache when the same fingerprint has been computed before.
+    """
+    if etag is None:
+        return calculate_available_slots(
+            teacher, start_date, end_date,
+            duration=duration, time_increment=time_increment,
+            use_cache=True, hold_owner=hold_owner
+        )
+
+    cache_key = f'{CACHE_KEY_PREFIX}:{etag}'
+    slots = cache.get(cache_key)
+    if slots is None:
+        slots = calculate_available_slots(
+            teacher, start_date, end_date,
+            duration=duration, time_increment=time_increment,
+            use_cache=True, hold_owner=hold_owner
+        )
+        cache.set(cache_key, slots, django_settings.AVAILABLE_SLOTS_CACHE_SECONDS)
+    return slots
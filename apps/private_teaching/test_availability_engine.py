@@ -2,23 +2,35 @@
 Unit tests for Teacher Availability Calendar Engine
 """
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from datetime import datetime, date, time, timedelta
 from apps.private_teaching.models import (
     TeacherAvailability,
     AvailabilityException,
-    TeacherAvailabilitySettings
+    TeacherAvailabilitySettings,
+    LessonRequest,
+    Subject
 )
 from apps.private_teaching.availability_engine import (
+    AvailabilityWindow,
     calculate_available_slots,
     check_slot_availability,
+    generate_recurring_slots,
     _get_available_ranges_for_date,
     _subtract_time_range,
     _merge_time_ranges,
     _generate_slots_in_range,
     _is_slot_available
 )
+from apps.private_teaching.availability_search import search_available_teachers
+from apps.private_teaching.availability_benchmark import (
+    build_synthetic_teacher,
+    compare_to_baseline,
+    random_slot_datetimes
+)
 from lessons.models import Lesson
 from apps.accounts.models import UserProfile
 
@@ -77,6 +89,30 @@ class AvailabilityEngineTestCase(TestCase):
             is_active=True
         )
 
+        # First Monday at least 3 days out (clear of the 24h booking notice)
+        today = date.today()
+        days_ahead = 3
+        while (today + timedelta(days=days_ahead)).weekday() != 0:
+            days_ahead += 1
+        self.next_monday = today + timedelta(days=days_ahead)
+
+    def _create_lesson(self, student, subject, lesson_date, lesson_time, duration=60):
+        """Create a booked lesson (with its parent lesson request) for the teacher"""
+        lesson_request = LessonRequest.objects.create(student=student)
+        return Lesson.objects.create(
+            lesson_request=lesson_request,
+            student=student,
+            teacher=self.teacher,
+            subject=subject,
+            lesson_date=lesson_date,
+            lesson_time=lesson_time,
+            duration_in_minutes=str(duration),
+            location='Online',
+            approved_status='Accepted',
+            payment_status='Not Paid',
+            status='Draft'
+        )
+
     def test_time_range_merging(self):
         """Test that overlapping time ranges are merged correctly"""
         ranges = [
@@ -153,7 +189,7 @@ class AvailabilityEngineTestCase(TestCase):
         # Block 11:00-13:00 on this specific Monday
         AvailabilityException.objects.create(
             teacher=self.teacher,
-            exception_type='blocked',
+            exception_type='block',
             date=monday,
             start_time=time(11, 0),
             end_time=time(13, 0),
@@ -192,8 +228,8 @@ class AvailabilityEngineTestCase(TestCase):
 
     def test_calculate_available_slots(self):
         """Test full slot calculation for a date range"""
-        start_date = date(2025, 6, 16)  # Monday
-        end_date = date(2025, 6, 18)    # Wednesday
+        start_date = self.next_monday
+        end_date = self.next_monday + timedelta(days=2)  # Wednesday
 
         slots = calculate_available_slots(
             teacher=self.teacher,
@@ -278,21 +314,10 @@ class AvailabilityEngineTestCase(TestCase):
         )
 
         # Create existing lesson on Monday at 10:00
-        existing_lesson = Lesson.objects.create(
-            student=student,
-            teacher=self.teacher,
-            subject=subject,
-            lesson_date=date(2025, 6, 16),
-            lesson_time=time(10, 0),
-            duration_in_minutes=60,
-            location='Online',
-            approved_status='Accepted',
-            payment_status='Not Paid',
-            status='Draft'
-        )
+        self._create_lesson(student, subject, self.next_monday, time(10, 0))
 
         # Try to book same time
-        slot_datetime = datetime(2025, 6, 16, 10, 0)
+        slot_datetime = datetime.combine(self.next_monday, time(10, 0))
 
         is_available, reason = check_slot_availability(
             teacher=self.teacher,
@@ -324,21 +349,10 @@ class AvailabilityEngineTestCase(TestCase):
         )
 
         # Create lesson 10:00-11:00
-        Lesson.objects.create(
-            student=student,
-            teacher=self.teacher,
-            subject=subject,
-            lesson_date=date(2025, 6, 16),
-            lesson_time=time(10, 0),
-            duration_in_minutes=60,
-            location='Online',
-            approved_status='Accepted',
-            payment_status='Not Paid',
-            status='Draft'
-        )
+        self._create_lesson(student, subject, self.next_monday, time(10, 0))
 
         # Try to book 11:00-12:00 (should fail due to 15-min buffer)
-        slot_datetime = datetime(2025, 6, 16, 11, 0)
+        slot_datetime = datetime.combine(self.next_monday, time(11, 0))
         is_available, reason = check_slot_availability(
             teacher=self.teacher,
             slot_datetime=slot_datetime,
@@ -349,7 +363,7 @@ class AvailabilityEngineTestCase(TestCase):
         self.assertIn('buffer', reason.lower())
 
         # Try to book 11:15-12:15 (should succeed)
-        slot_datetime = datetime(2025, 6, 16, 11, 15)
+        slot_datetime = datetime.combine(self.next_monday, time(11, 15))
         is_available, reason = check_slot_availability(
             teacher=self.teacher,
             slot_datetime=slot_datetime,
@@ -405,7 +419,7 @@ class AvailabilityEngineTestCase(TestCase):
         # Block entire day (no start/end times)
         AvailabilityException.objects.create(
             teacher=self.teacher,
-            exception_type='blocked',
+            exception_type='block',
             date=monday,
             start_time=None,
             end_time=None,
@@ -462,6 +476,497 @@ class AvailabilityEngineTestCase(TestCase):
         self.assertEqual(ranges[1]['start'], time(14, 0))
         self.assertEqual(ranges[1]['end'], time(17, 0))
 
+    def test_batched_mode_matches_reference(self):
+        """Test that batched mode returns exactly the reference slots"""
+        student = User.objects.create_user(
+            username='batchstudent',
+            email='batch@test.com',
+            password='testpass123'
+        )
+        subject = Subject.objects.create(
+            teacher=self.teacher,
+            subject='Recorder',
+            base_price_60min=40.00
+        )
+        self.settings.buffer_minutes = 15
+        self.settings.save()
+
+        wednesday = self.next_monday + timedelta(days=2)
+        AvailabilityException.objects.create(
+            teacher=self.teacher,
+            exception_type='block',
+            date=self.next_monday,
+            start_time=time(12, 0),
+            end_time=time(13, 0)
+        )
+        AvailabilityException.objects.create(
+            teacher=self.teacher,
+            exception_type='available',
+            date=self.next_monday + timedelta(days=1),
+            start_time=time(18, 0),
+            end_time=time(20, 0)
+        )
+        AvailabilityException.objects.create(
+            teacher=self.teacher,
+            exception_type='block',
+            date=self.next_monday + timedelta(days=7)
+        )
+        self._create_lesson(student, subject, self.next_monday, time(10, 0))
+        self._create_lesson(student, subject, wednesday, time(14, 30), duration=30)
+
+        for duration, increment in [(60, 30), (30, 15), (90, 60)]:
+            reference = calculate_available_slots(
+                self.teacher, self.next_monday, self.next_monday + timedelta(days=13),
+                duration=duration, time_increment=increment, batched=False
+            )
+            batched = calculate_available_slots(
+                self.teacher, self.next_monday, self.next_monday + timedelta(days=13),
+                duration=duration, time_increment=increment
+            )
+            self.assertEqual(batched, reference)
+            self.assertGreater(len(batched), 0)
+
+    def test_batched_mode_constant_queries(self):
+        """Test that batched mode query count does not grow with the window"""
+        # Prime the cached settings relation so both windows issue the same queries
+        self.teacher = User.objects.select_related('availability_settings').get(pk=self.teacher.pk)
+
+        with self.assertNumQueries(4):
+            calculate_available_slots(self.teacher, self.next_monday, self.next_monday + timedelta(days=6))
+        with self.assertNumQueries(4):
+            calculate_available_slots(self.teacher, self.next_monday, self.next_monday + timedelta(days=89))
+
+    def test_window_lesson_conflict_reasons(self):
+        """Test that the window distinguishes lesson overlaps from buffer time"""
+        from django.utils import timezone
+
+        student = User.objects.create_user(
+            username='windowstudent',
+            email='window@test.com',
+            password='testpass123'
+        )
+        subject = Subject.objects.create(
+            teacher=self.teacher,
+            subject='Theory',
+            base_price_60min=30.00
+        )
+        self.settings.buffer_minutes = 15
+        self.settings.save()
+        self._create_lesson(student, subject, self.next_monday, time(10, 0))
+
+        window = AvailabilityWindow(self.teacher, self.next_monday, self.next_monday)
+        hour = timedelta(hours=1)
+
+        def at(hour_value, minute=0):
+            return timezone.make_aware(datetime.combine(self.next_monday, time(hour_value, minute)))
+
+        self.assertEqual(window.find_lesson_conflict(at(10, 30), at(10, 30) + hour), 'lesson')
+        self.assertEqual(window.find_lesson_conflict(at(11), at(11) + hour), 'buffer')
+        self.assertIsNone(window.find_lesson_conflict(at(11, 15), at(11, 15) + hour))
+        self.assertIsNone(window.find_lesson_conflict(at(9), at(10)))
+
+    def test_cached_mode_matches_reference(self):
+        """Test that the free/busy cache returns exactly the reference slots"""
+        student = User.objects.create_user(
+            username='cachestudent',
+            email='cache@test.com',
+            password='testpass123'
+        )
+        subject = Subject.objects.create(
+            teacher=self.teacher,
+            subject='Recorder',
+            base_price_60min=40.00
+        )
+        self.settings.buffer_minutes = 10
+        self.settings.save()
+        AvailabilityException.objects.create(
+            teacher=self.teacher,
+            exception_type='block',
+            date=self.next_monday,
+            start_time=time(12, 0),
+            end_time=time(13, 0)
+        )
+        self._create_lesson(student, subject, self.next_monday, time(9, 30), duration=30)
+        end_date = self.next_monday + timedelta(days=13)
+
+        for duration, increment in [(60, 30), (30, 15), (90, 60)]:
+            reference = calculate_available_slots(
+                self.teacher, self.next_monday, end_date,
+                duration=duration, time_increment=increment, batched=False
+            )
+            # Run twice: first fills the cache, second reads from it
+            for _ in range(2):
+                cached = calculate_available_slots(
+                    self.teacher, self.next_monday, end_date,
+                    duration=duration, time_increment=increment, use_cache=True
+                )
+                self.assertEqual(cached, reference)
+
+    def test_cached_mode_constant_queries_when_warm(self):
+        """Test that a fully cached window costs the bitmap and hold queries only"""
+        self.teacher = User.objects.select_related('availability_settings').get(pk=self.teacher.pk)
+        end_date = self.next_monday + timedelta(days=27)
+        calculate_available_slots(self.teacher, self.next_monday, end_date, use_cache=True)
+
+        with self.assertNumQueries(2):
+            calculate_available_slots(self.teacher, self.next_monday, end_date, use_cache=True)
+
+    def test_cache_invalidation_targets_affected_days(self):
+        """Test that input changes only invalidate the days they affect"""
+        from apps.private_teaching.models import TeacherFreeBusyDay
+
+        end_date = self.next_monday + timedelta(days=13)
+        calculate_available_slots(self.teacher, self.next_monday, end_date, use_cache=True)
+        self.assertEqual(TeacherFreeBusyDay.objects.filter(teacher=self.teacher).count(), 14)
+
+        # Exception: only its own date
+        exception = AvailabilityException.objects.create(
+            teacher=self.teacher,
+            exception_type='block',
+            date=self.next_monday
+        )
+        cached_dates = set(TeacherFreeBusyDay.objects.values_list('date', flat=True))
+        self.assertNotIn(self.next_monday, cached_dates)
+        self.assertEqual(len(cached_dates), 13)
+
+        # Moving the exception invalidates both the old and the new date
+        calculate_available_slots(self.teacher, self.next_monday, end_date, use_cache=True)
+        exception.date = self.next_monday + timedelta(days=1)
+        exception.save()
+        cached_dates = set(TeacherFreeBusyDay.objects.values_list('date', flat=True))
+        self.assertNotIn(self.next_monday, cached_dates)
+        self.assertNotIn(self.next_monday + timedelta(days=1), cached_dates)
+        self.assertEqual(len(cached_dates), 12)
+
+        # Weekly template: every Wednesday in the window
+        calculate_available_slots(self.teacher, self.next_monday, end_date, use_cache=True)
+        TeacherAvailability.objects.create(
+            teacher=self.teacher,
+            day_of_week=2,
+            start_time=time(19, 0),
+            end_time=time(20, 0)
+        )
+        cached_dates = set(TeacherFreeBusyDay.objects.values_list('date', flat=True))
+        self.assertEqual(len(cached_dates), 12)
+        self.assertTrue(all(d.weekday() != 2 for d in cached_dates))
+
+        # The new hours show up once recomputed
+        slots = calculate_available_slots(self.teacher, self.next_monday, end_date, use_cache=True)
+        wednesday_evening = datetime.combine(self.next_monday + timedelta(days=2), time(19, 0)).isoformat()
+        self.assertIn(wednesday_evening, [slot['datetime'] for slot in slots])
+
+    def test_cache_ignores_days_computed_under_an_older_schedule(self):
+        """Test that a bitmap written after a booking's invalidation is not served"""
+        from apps.private_teaching.models import TeacherFreeBusyDay
+
+        student = User.objects.create_user(username='racestudent', email='race@test.com', password='testpass123')
+        subject = Subject.objects.create(teacher=self.teacher, subject='Recorder', base_price_60min=40.00)
+        end_date = self.next_monday + timedelta(days=6)
+        before = calculate_available_slots(self.teacher, self.next_monday, end_date, use_cache=True)
+        computed = list(TeacherFreeBusyDay.objects.all())
+
+        # A booking commits while a slower request is still computing: its
+        # invalidation finds nothing, then the pre-booking bitmaps are written
+        TeacherFreeBusyDay.objects.all().delete()
+        self._create_lesson(student, subject, self.next_monday, time(10, 0))
+        TeacherFreeBusyDay.objects.bulk_create(computed)
+
+        fresh_teacher = User.objects.select_related('availability_settings').get(pk=self.teacher.pk)
+        slots = calculate_available_slots(fresh_teacher, self.next_monday, end_date, use_cache=True)
+        booked = datetime.combine(self.next_monday, time(10, 0)).isoformat()
+        self.assertIn(booked, [slot['datetime'] for slot in before])
+        self.assertNotIn(booked, [slot['datetime'] for slot in slots])
+        self.assertEqual(slots, calculate_available_slots(
+            fresh_teacher, self.next_monday, end_date, batched=False
+        ))
+        self.assertEqual(
+            set(TeacherFreeBusyDay.objects.values_list('schedule_version', flat=True)),
+            {fresh_teacher.availability_settings.schedule_version}
+        )
+
+    def test_recurring_series_matches_per_slot_checks(self):
+        """Test that the series evaluator agrees with check_slot_availability"""
+        student = User.objects.create_user(
+            username='seriesstudent',
+            email='series@test.com',
+            password='testpass123'
+        )
+        subject = Subject.objects.create(
+            teacher=self.teacher,
+            subject='Recorder',
+            base_price_60min=40.00
+        )
+        self.settings.buffer_minutes = 15
+        self.settings.max_recurring_lessons = 12
+        self.settings.save()
+
+        # Week 2 has a lesson, week 3 is blocked, week 4 is inside buffer time
+        self._create_lesson(student, subject, self.next_monday + timedelta(weeks=1), time(10, 30))
+        AvailabilityException.objects.create(
+            teacher=self.teacher,
+            exception_type='block',
+            date=self.next_monday + timedelta(weeks=2)
+        )
+        self._create_lesson(student, subject, self.next_monday + timedelta(weeks=3), time(9, 0))
+
+        base_datetime = datetime.combine(self.next_monday, time(10, 0))
+        slots = generate_recurring_slots(self.teacher, base_datetime, 60, 12, subject.id)
+
+        self.assertEqual(len(slots), 12)
+        for slot in slots:
+            expected = check_slot_availability(self.teacher, slot['datetime'], 60)
+            self.assertEqual((slot['available'], slot['conflict_reason'] or ''), expected)
+
+        self.assertEqual(
+            [slot['available'] for slot in slots[:5]],
+            [True, False, False, False, True]
+        )
+        self.assertIn('buffer', slots[3]['conflict_reason'])
+
+    def test_recurring_series_suggests_alternatives(self):
+        """Test that conflicting weeks get the nearest free slots that day"""
+        student = User.objects.create_user(
+            username='altstudent',
+            email='alt@test.com',
+            password='testpass123'
+        )
+        subject = Subject.objects.create(
+            teacher=self.teacher,
+            subject='Recorder',
+            base_price_60min=40.00
+        )
+        second_week = self.next_monday + timedelta(weeks=1)
+        self._create_lesson(student, subject, second_week, time(10, 0))
+
+        base_datetime = datetime.combine(self.next_monday, time(10, 0))
+        slots = generate_recurring_slots(self.teacher, base_datetime, 60, 3, subject.id)
+
+        self.assertEqual(slots[0]['alternatives'], [])
+        alternatives = [alt.time() for alt in slots[1]['alternatives']]
+        self.assertEqual(alternatives, [time(9, 0), time(11, 0), time(11, 30)])
+
+    def test_recurring_series_constant_queries(self):
+        """Test that query count does not grow with the number of weeks"""
+        self.settings.max_recurring_lessons = 40
+        self.settings.save()
+        teacher = User.objects.select_related('availability_settings').get(pk=self.teacher.pk)
+        base_datetime = datetime.combine(self.next_monday, time(10, 0))
+
+        with self.assertNumQueries(4):
+            generate_recurring_slots(teacher, base_datetime, 60, 4, 1)
+        with self.assertNumQueries(4):
+            generate_recurring_slots(teacher, base_datetime, 60, 12, 1)
+
+    def test_slot_holds_block_other_students(self):
+        """Test that another student's hold blocks a slot in every mode, but not for its owner"""
+        from django.utils import timezone
+        from apps.private_teaching.models import SlotHold
+
+        holder = User.objects.create_user(username='holder', email='holder@test.com', password='testpass123')
+        other = User.objects.create_user(username='other', email='other@test.com', password='testpass123')
+        slot_datetime = timezone.make_aware(datetime.combine(self.next_monday, time(10, 0)))
+        SlotHold.objects.create(
+            teacher=self.teacher,
+            student=holder,
+            slot_datetime=slot_datetime,
+            duration_in_minutes=60,
+            expires_at=timezone.now() + timedelta(minutes=10)
+        )
+        held_slot = datetime.combine(self.next_monday, time(10, 0)).isoformat()
+
+        for options in [{'batched': False}, {}, {'use_cache': True}]:
+            others_view = calculate_available_slots(
+                self.teacher, self.next_monday, self.next_monday, hold_owner=other, **options
+            )
+            holders_view = calculate_available_slots(
+                self.teacher, self.next_monday, self.next_monday, hold_owner=holder, **options
+            )
+            self.assertNotIn(held_slot, [slot['datetime'] for slot in others_view])
+            self.assertIn(held_slot, [slot['datetime'] for slot in holders_view])
+
+        is_available, reason = check_slot_availability(self.teacher, slot_datetime, 60, hold_owner=other)
+        self.assertFalse(is_available)
+        self.assertIn('being booked', reason)
+        is_available, _ = check_slot_availability(self.teacher, slot_datetime, 60, hold_owner=holder)
+        self.assertTrue(is_available)
+
+        # Expired holds stop counting
+        SlotHold.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        is_available, _ = check_slot_availability(self.teacher, slot_datetime, 60, hold_owner=other)
+        self.assertTrue(is_available)
+
+    def test_place_holds_rejects_overlapping_hold(self):
+        """Test that two students cannot hold overlapping time"""
+        from django.utils import timezone
+        from apps.private_teaching.models import SlotHold
+        from apps.private_teaching.slot_holds import place_holds, release_holds
+
+        first = User.objects.create_user(username='first', email='first@test.com', password='testpass123')
+        second = User.objects.create_user(username='second', email='second@test.com', password='testpass123')
+        ten = timezone.make_aware(datetime.combine(self.next_monday, time(10, 0)))
+        half_ten = ten + timedelta(minutes=30)
+
+        [held] = place_holds(self.teacher, first, [{'datetime': ten, 'duration': 60}])
+        self.assertTrue(held['held'])
+
+        [rejected] = place_holds(self.teacher, second, [{'datetime': half_ten, 'duration': 60}])
+        self.assertFalse(rejected['held'])
+        self.assertIsNone(rejected['token'])
+
+        # Re-holding refreshes rather than duplicating
+        [refreshed] = place_holds(self.teacher, first, [{'datetime': ten, 'duration': 60}])
+        self.assertEqual(refreshed['token'], held['token'])
+        self.assertEqual(SlotHold.objects.filter(student=first).count(), 1)
+
+        self.assertEqual(release_holds(first, tokens=[held['token']]), 1)
+        [accepted] = place_holds(self.teacher, second, [{'datetime': half_ten, 'duration': 60}])
+        self.assertTrue(accepted['held'])
+
+    def test_available_slots_api_conditional_get(self):
+        """Test ETag/304 handling and that schedule changes retire the ETag"""
+        from django.core.cache import cache
+        from rest_framework.test import APIClient
+
+        cache.clear()
+        student = User.objects.create_user(username='etagstudent', email='etag@test.com', password='testpass123')
+        client = APIClient()
+        client.force_authenticate(student)
+        params = {
+            'teacher_id': self.teacher.id,
+            'start_date': self.next_monday.isoformat(),
+            'end_date': (self.next_monday + timedelta(days=6)).isoformat(),
+            'duration': 60
+        }
+        url = '/private-teaching/api/student/available-slots/'
+
+        first = client.get(url, params)
+        self.assertEqual(first.status_code, 200)
+        self.assertGreater(len(first.data['slots']), 0)
+        etag = first['ETag']
+        # Holds can be released without a newer timestamp, so only the ETag validates
+        self.assertFalse(first.has_header('Last-Modified'))
+
+        repeat = client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(repeat.status_code, 304)
+        since = client.get(url, params, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(since.status_code, 200)
+
+        AvailabilityException.objects.create(
+            teacher=self.teacher,
+            exception_type='block',
+            date=self.next_monday
+        )
+        changed = client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+        self.assertLess(len(changed.data['slots']), len(first.data['slots']))
+
+
+class AvailabilityPropertyTestCase(TestCase):
+    """Randomised checks that every optimised engine mode matches the reference"""
+
+    SEEDS = range(6)
+    DAYS = 21
+
+    def _synthetic(self, seed):
+        import random
+        teacher, students = build_synthetic_teacher(
+            seed=seed, days=self.DAYS, exceptions=40, lessons=120, holds=6
+        )
+        rng = random.Random(seed)
+        return teacher, rng.choice([None] + students), rng
+
+    def test_slot_modes_match_reference(self):
+        """Test batched and cached slots equal the reference slots on random schedules"""
+        for seed in self.SEEDS:
+            with self.subTest(seed=seed):
+                teacher, hold_owner, rng = self._synthetic(seed)
+                start_date = date.today()
+                end_date = start_date + timedelta(days=self.DAYS - 1)
+                duration = rng.choice([30, 45, 60, 90])
+                increment = rng.choice([15, 30, 60])
+
+                reference = calculate_available_slots(
+                    teacher, start_date, end_date, duration=duration, time_increment=increment,
+                    batched=False, hold_owner=hold_owner
+                )
+                for options in [{}, {'use_cache': True}, {'use_cache': True}]:
+                    self.assertEqual(
+                        calculate_available_slots(
+                            teacher, start_date, end_date, duration=duration, time_increment=increment,
+                            hold_owner=hold_owner, **options
+                        ),
+                        reference
+                    )
+
+    def test_slot_checks_match_reference(self):
+        """Test window checks and recurring series agree with check_slot_availability"""
+        for seed in self.SEEDS:
+            with self.subTest(seed=seed):
+                teacher, hold_owner, rng = self._synthetic(seed)
+                start_date = date.today()
+                duration = rng.choice([30, 60, 90])
+                window = AvailabilityWindow(
+                    teacher, start_date, start_date + timedelta(days=self.DAYS - 1), hold_owner=hold_owner
+                )
+
+                for slot_datetime in random_slot_datetimes(seed, start_date, self.DAYS, 40):
+                    self.assertEqual(
+                        window.check_slot(slot_datetime, duration),
+                        check_slot_availability(teacher, slot_datetime, duration, hold_owner=hold_owner)
+                    )
+
+                [base_datetime] = random_slot_datetimes(seed + 100, start_date, 7, 1)
+                for slot in generate_recurring_slots(teacher, base_datetime, duration, 3, 1, hold_owner=hold_owner):
+                    is_available, reason = check_slot_availability(
+                        teacher, slot['datetime'], duration, hold_owner=hold_owner
+                    )
+                    self.assertEqual(slot['available'], is_available)
+                    self.assertEqual(slot['conflict_reason'], None if is_available else reason)
+
+    def test_compare_to_baseline_flags_regressions(self):
+        """Test that extra queries and large slowdowns are reported"""
+        baseline = {
+            'a': {'ms': 10.0, 'queries': 4},
+            'b': {'ms': 10.0, 'queries': 4},
+            'c': {'ms': 10.0, 'queries': 4},
+        }
+        results = {
+            'a': {'ms': 14.0, 'queries': 4},
+            'b': {'ms': 9.0, 'queries': 5},
+            'c': {'ms': 40.0, 'queries': 4},
+        }
+        regressions = compare_to_baseline(results, baseline, tolerance=1.5, noise_ms=5.0)
+        self.assertEqual(len(regressions), 1)  # Absolute times are only compared on request
+        self.assertTrue(regressions[0].startswith('b:'))
+
+        regressions = compare_to_baseline(results, baseline, tolerance=1.5, noise_ms=5.0, timings=True)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('b:'))
+        self.assertTrue(regressions[1].startswith('c:'))
+
+    def test_compare_to_baseline_scales_with_the_reference(self):
+        """Test that optimised modes are judged by their speed-up over the reference"""
+        baseline = {
+            'slots:reference:30d': {'ms': 100.0, 'queries': 100},
+            'slots:batched:30d': {'ms': 10.0, 'queries': 4},
+        }
+        # A machine twice as slow: same speed-up, no regression
+        slower_machine = {
+            'slots:reference:30d': {'ms': 200.0, 'queries': 100},
+            'slots:batched:30d': {'ms': 20.0, 'queries': 4},
+        }
+        self.assertEqual(compare_to_baseline(slower_machine, baseline), [])
+
+        # Batched lost most of its speed-up
+        regressed = {
+            'slots:reference:30d': {'ms': 100.0, 'queries': 100},
+            'slots:batched:30d': {'ms': 40.0, 'queries': 4},
+        }
+        regressions = compare_to_baseline(regressed, baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith('slots:batched:30d:'))
+
 
 class AvailabilityModelTestCase(TestCase):
     """Test cases for availability models"""
@@ -511,3 +1016,131 @@ class AvailabilityModelTestCase(TestCase):
         self.assertFalse(settings.use_availability_calendar)
         self.assertTrue(settings.auto_approve_bookings)
         self.assertEqual(settings.timezone, 'UTC')
+
+
+class AvailabilitySearchTestCase(TestCase):
+    """Test cases for cross-teacher availability search"""
+
+    def _create_teacher(self, username, instruments='Recorder', subject='Recorder', ranges=()):
+        teacher = User.objects.create_user(
+            username=username,
+            email=f'{username}@test.com',
+            password='testpass123'
+        )
+        profile, _ = UserProfile.objects.get_or_create(user=teacher)
+        profile.is_teacher = True
+        profile.instruments_taught = instruments
+        profile.save()
+        TeacherAvailabilitySettings.objects.create(
+            teacher=teacher,
+            min_booking_notice_hours=24,
+            max_booking_days_ahead=90,
+            use_availability_calendar=True
+        )
+        Subject.objects.create(teacher=teacher, subject=subject, base_price_60min=40.00)
+        for day_of_week, start_time, end_time in ranges:
+            TeacherAvailability.objects.create(
+                teacher=teacher,
+                day_of_week=day_of_week,
+                start_time=start_time,
+                end_time=end_time
+            )
+        return teacher
+
+    def setUp(self):
+        # Tuesday evenings: A has 16-19, B has 17-17:30, C only mornings
+        self.teacher_a = self._create_teacher('teacher_a', ranges=[(1, time(16, 0), time(19, 0))])
+        self.teacher_b = self._create_teacher(
+            'teacher_b', instruments='Flute', subject='Flute', ranges=[(1, time(17, 0), time(17, 30))]
+        )
+        self.teacher_c = self._create_teacher('teacher_c', ranges=[(1, time(9, 0), time(12, 0))])
+
+        today = date.today()
+        days_ahead = 3
+        while (today + timedelta(days=days_ahead)).weekday() != 1:
+            days_ahead += 1
+        self.next_tuesday = today + timedelta(days=days_ahead)
+
+    def test_weekly_search_ranks_by_availability(self):
+        """Test weekly search returns matching teachers, most available first"""
+        results = search_available_teachers(
+            window_start=time(17, 0),
+            window_end=time(18, 0),
+            duration=30,
+            days_of_week=[1]
+        )
+
+        self.assertEqual([r['teacher_id'] for r in results], [self.teacher_a.id, self.teacher_b.id])
+        self.assertEqual(results[0]['open_minutes'], 60)
+        self.assertEqual(results[0]['slot_count'], 2)
+        self.assertEqual(results[1]['slot_count'], 1)
+
+    def test_weekly_search_duration_and_filters(self):
+        """Test duration requirement and subject/instrument filters"""
+        results = search_available_teachers(
+            window_start=time(17, 0), window_end=time(18, 0), duration=60, days_of_week=[1]
+        )
+        self.assertEqual([r['teacher_id'] for r in results], [self.teacher_a.id])
+
+        results = search_available_teachers(
+            window_start=time(17, 0), window_end=time(18, 0), duration=30, days_of_week=[1],
+            instrument='flute'
+        )
+        self.assertEqual([r['teacher_id'] for r in results], [self.teacher_b.id])
+
+        results = search_available_teachers(
+            window_start=time(17, 0), window_end=time(18, 0), duration=30, days_of_week=[1],
+            subject='recorder'
+        )
+        self.assertEqual([r['teacher_id'] for r in results], [self.teacher_a.id])
+
+    def test_dated_search_applies_exceptions(self):
+        """Test dated search respects blocks and special hours"""
+        AvailabilityException.objects.create(
+            teacher=self.teacher_a,
+            exception_type='block',
+            date=self.next_tuesday
+        )
+        AvailabilityException.objects.create(
+            teacher=self.teacher_c,
+            exception_type='available',
+            date=self.next_tuesday,
+            start_time=time(17, 0),
+            end_time=time(18, 0)
+        )
+
+        results = search_available_teachers(
+            window_start=time(17, 0),
+            window_end=time(18, 0),
+            duration=30,
+            start_date=self.next_tuesday,
+            end_date=self.next_tuesday
+        )
+
+        self.assertEqual([r['teacher_id'] for r in results], [self.teacher_c.id, self.teacher_b.id])
+        self.assertEqual(results[0]['slot_count'], 2)
+        self.assertEqual(
+            results[0]['first_available'],
+            datetime.combine(self.next_tuesday, time(17, 0)).isoformat()
+        )
+
+    def test_dated_search_query_count_independent_of_teachers(self):
+        """Test dated search issues the same number of queries for more teachers"""
+        search_kwargs = dict(
+            window_start=time(17, 0),
+            window_end=time(18, 0),
+            duration=30,
+            start_date=self.next_tuesday,
+            end_date=self.next_tuesday + timedelta(days=27)
+        )
+        with CaptureQueriesContext(connection) as few:
+            search_available_teachers(**search_kwargs)
+
+        for index in range(5):
+            self._create_teacher(f'extra_{index}', ranges=[(1, time(17, 0), time(19, 0))])
+
+        with CaptureQueriesContext(connection) as many:
+            results = search_available_teachers(**search_kwargs)
+
+        self.assertEqual(len(results), 7)
+        self.assertEqual(len(many), len(few))
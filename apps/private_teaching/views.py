@@ -2435,6 +2435,9 @@ class ExamPaymentSuccessView(BaseCheckoutSuccessView):
             exam.paid_at = timezone.now()
             exam.save(update_fields=['payment_status', 'paid_at'])
 
+        from apps.payments.ledger import record_exam_registration
+        record_exam_registration(exam)
+
     def get_context_extras(self, exam):
         return {
             'exam': exam,
@@ -3370,6 +3373,9 @@ class TeacherRespondToCancellationView(TeacherProfileCompletedMixin, View):
                         cancellation_request.refund_processed_at = timezone.now()
                         cancellation_request.save()
 
+                        from apps.payments.ledger import record_lesson_refund
+                        record_lesson_refund(cancellation_request, stripe_payment)
+
                         # Soft delete the lesson
                         if cancellation_request.request_type == LessonCancellationRequest.CANCEL_WITH_REFUND:
                             lesson.is_deleted = True
@@ -187,6 +187,9 @@ class TicketMessage(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['ticket', 'created_at']),
+        ]
 
     def __str__(self):
         author = self.author.get_full_name() if self.author else self.author_name
@@ -201,8 +204,19 @@ class TicketMessage(models.Model):
             self.ticket.last_response_at = timezone.now()
             self.ticket.save()
 
+        adding = self._state.adding
         super().save(*args, **kwargs)
 
+        # Internal notes aren't pushed: the ticket's owner follows the same topic
+        if adding and not self.is_internal_note:
+            from apps.core.live_events import publish_on_commit
+            publish_on_commit([f'ticket:{self.ticket.ticket_number}'], 'ticket_message', {
+                'ticket': self.ticket.ticket_number,
+                'id': str(self.id),
+                'author': self.author_id,
+                'is_staff_reply': self.is_staff_reply,
+            })
+
 
 class TicketAttachment(models.Model):
     """File attachment for a ticket"""
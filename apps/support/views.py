@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages as django_messages
@@ -5,6 +6,7 @@ from django.db.models import Q, Count, Avg
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+from apps.core import keyset
 from .models import Ticket, TicketMessage, TicketAttachment
 from .forms import (
     PublicTicketForm, AuthenticatedTicketForm, TicketReplyForm,
@@ -101,7 +103,11 @@ def my_tickets(request):
 
 
 def ticket_detail(request, ticket_number):
-    """View ticket details and conversation thread"""
+    """
+    View ticket details and conversation thread.
+    Shows the newest THREAD_PAGE_SIZE messages; ?before= / ?after= return
+    older or newer ones as a JSON fragment (apps/core/keyset.py).
+    """
     ticket = get_object_or_404(Ticket, ticket_number=ticket_number)
 
     # Permission check: owner or staff
@@ -122,6 +128,11 @@ def ticket_detail(request, ticket_number):
     else:
         messages_list = ticket.messages.filter(is_internal_note=False).select_related('author').all()
 
+    if request.method == 'GET' and keyset.is_fragment_request(request):
+        return keyset.thread_fragment_response(
+            request, 'support/_ticket_messages.html', messages_list, 'created_at', settings.THREAD_PAGE_SIZE
+        )
+
     # Handle reply submission
     if request.method == 'POST':
         if request.user.is_staff:
@@ -158,9 +169,13 @@ def ticket_detail(request, ticket_number):
         else:
             form = TicketReplyForm()
 
+    page = keyset.thread_page(messages_list, 'created_at', settings.THREAD_PAGE_SIZE)
+
     context = {
         'ticket': ticket,
-        'messages': messages_list,
+        'messages': page.items,
+        'older_cursor': page.older_cursor,
+        'newer_cursor': page.newer_cursor,
         'form': form,
         'staff_members': User.objects.filter(is_staff=True),
     }
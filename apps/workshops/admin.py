@@ -9,7 +9,7 @@ from apps.core.admin import UserDisplayMixin, InstructorQuerysetMixin, PriceDisp
 from .models import (
     WorkshopCategory, Workshop, WorkshopSession,
     WorkshopRegistration, WorkshopMaterial, WorkshopInterest,
-    WorkshopCartItem, WorkshopTermsAndConditions, TermsAcceptance
+    WorkshopCartItem, WorkshopTermsAndConditions, TermsAcceptance, InterestNotificationRun
 )
 
 
@@ -357,6 +357,20 @@ class WorkshopInterestAdmin(admin.ModelAdmin):
     preferred_timing_display.short_description = 'Preferred Timing'
 
 
+@admin.register(InterestNotificationRun)
+class InterestNotificationRunAdmin(admin.ModelAdmin):
+    list_display = ['session', 'status', 'notified_count', 'total_recipients', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['session__workshop__title']
+    readonly_fields = [
+        'session', 'status', 'total_recipients', 'notified_count', 'last_error',
+        'created_at', 'started_at', 'finished_at',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(WorkshopCartItem)
 class WorkshopCartItemAdmin(admin.ModelAdmin):
     list_display = ['cart_user', 'workshop_title', 'session_date', 'price', 'added_at']
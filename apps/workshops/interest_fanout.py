@@ -0,0 +1,215 @@
+"""
+Workshop Interest Fan-out
+
+When an instructor adds a session, everyone who asked to hear about the
+workshop gets a "new session" email. Doing that inside the session's
+post_save made the instructor wait for every email, so instead:
+
+- start_for_session() records an InterestNotificationRun in the session's
+  transaction and schedules the run once it commits (a small in-process
+  thread pool, INTEREST_FANOUT_WORKERS threads).
+- The run renders the email once per chunk of INTEREST_FANOUT_CHUNK_SIZE
+  recipients and only substitutes each recipient's name. It claims the chunk
+  and marks it notified with one UPDATE, and sends all its messages with one
+  send_messages() call on a single mail connection (with the email outbox
+  that is one INSERT). Each chunk is its own transaction, so an interrupted
+  run resumes where it stopped without emailing anyone twice.
+- The run's counters are updated per chunk; the instructor sees them on the
+  Manage Sessions page.
+
+`manage.py send_interest_notifications` resumes runs the web process didn't
+finish, and is the only worker when INTEREST_FANOUT_WORKERS is 0.
+recordered.crontab runs it with --once every minute.
+"""
+
+import logging
+import traceback
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.html import escape
+
+from apps.core import background
+
+from .models import InterestNotificationRun, WorkshopInterest
+
+logger = logging.getLogger(__name__)
+
+_pool = background.BackgroundPool('interest-fanout', 'INTEREST_FANOUT_WORKERS', 1)
+
+
+def _setting(name: str, default: int) -> int:
+    return getattr(settings, name, default)
+
+
+def pending_interests(workshop):
+    """Interest requests still waiting for a new session email"""
+    return WorkshopInterest.objects.filter(
+        workshop=workshop,
+        is_active=True,
+        notify_immediately=True,
+        has_been_notified=False
+    )
+
+
+# =============================================================================
+# SCHEDULING
+# =============================================================================
+
+def start_for_session(session) -> Optional[InterestNotificationRun]:
+    """
+    Queue the new session emails for a session's workshop.
+    Nothing is queued when nobody is waiting.
+    """
+    total = pending_interests(session.workshop).count()
+    if not total:
+        return None
+
+    run = InterestNotificationRun.objects.create(session=session, total_recipients=total)
+    transaction.on_commit(lambda: schedule(run.pk))
+    logger.info(f"Queued new session notifications to {total} interested users for '{session.workshop.title}'")
+    return run
+
+
+def schedule(run_id: int):
+    """
+    Process a run on the in-process worker pool.
+    Does nothing when INTEREST_FANOUT_WORKERS is 0 (send_interest_notifications only).
+    """
+    _pool.submit(process_run, run_id)
+
+
+# =============================================================================
+# PROCESSING
+# =============================================================================
+
+def claim(run_id: int) -> bool:
+    """Mark a queued run as running; only one worker wins"""
+    return InterestNotificationRun.objects.filter(
+        pk=run_id, status=InterestNotificationRun.QUEUED
+    ).update(status=InterestNotificationRun.RUNNING, started_at=timezone.now()) == 1
+
+
+def send_chunk(run_id: int, session, chunk_size: int, mail_connection) -> int:
+    """
+    Claim and email the next chunk of waiting users, in one transaction.
+    The email is rendered once for the chunk (so seat counts stay current on
+    long runs) with the recipient's name filled in per message, and the
+    run's notified_count goes up by the number sent.
+
+    Returns:
+        Size of the chunk (0 when nobody is left)
+    """
+    from .notifications import WorkshopInterestNotificationService
+
+    placeholder = WorkshopInterestNotificationService.RECIPIENT_NAME
+
+    with transaction.atomic():
+        ids = list(pending_interests(session.workshop).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return 0
+
+        subject, text_message, html_message = (
+            WorkshopInterestNotificationService.render_new_session_notification(session)
+        )
+
+        # The status check is part of the UPDATE, so an interest claimed by a
+        # concurrent run (another new session) is skipped
+        sent_at = timezone.now()
+        WorkshopInterest.objects.filter(pk__in=ids, has_been_notified=False).update(
+            has_been_notified=True, notification_sent_at=sent_at
+        )
+        interests = WorkshopInterest.objects.filter(
+            pk__in=ids, notification_sent_at=sent_at
+        ).select_related('user')
+
+        messages = []
+        for interest in interests:
+            name = interest.user.first_name or interest.user.username
+            message = EmailMultiAlternatives(
+                subject=subject,
+                body=text_message.replace(placeholder, name),
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[interest.email],
+                connection=mail_connection
+            )
+            if html_message:
+                message.attach_alternative(html_message.replace(placeholder, escape(name)), 'text/html')
+            messages.append(message)
+
+        mail_connection.send_messages(messages)
+        InterestNotificationRun.objects.filter(pk=run_id).update(
+            notified_count=F('notified_count') + len(messages)
+        )
+    return len(ids)
+
+
+def process_run(run_id: int) -> bool:
+    """
+    Send every email in a run, chunk by chunk.
+
+    Returns:
+        True if the run completed
+    """
+    if not claim(run_id):
+        return False
+    run = InterestNotificationRun.objects.select_related('session__workshop__instructor').get(pk=run_id)
+    session = run.session
+    chunk_size = _setting('INTEREST_FANOUT_CHUNK_SIZE', 100)
+
+    mail_connection = get_connection(fail_silently=False)
+    try:
+        mail_connection.open()
+        while send_chunk(run_id, session, chunk_size, mail_connection):
+            pass
+    except Exception as e:
+        InterestNotificationRun.objects.filter(pk=run_id).update(
+            status=InterestNotificationRun.FAILED,
+            last_error=''.join(traceback.format_exception(e))[-5000:],
+            finished_at=timezone.now()
+        )
+        logger.error(f"Interest notification run {run_id} for '{session.workshop.title}' failed: {e}")
+        return False
+    finally:
+        mail_connection.close()
+
+    InterestNotificationRun.objects.filter(pk=run_id).update(
+        status=InterestNotificationRun.COMPLETED, finished_at=timezone.now(), last_error=''
+    )
+    run.refresh_from_db()
+    logger.info(
+        f"Sent {run.notified_count} new session notifications for workshop '{session.workshop.title}'"
+    )
+    return True
+
+
+# =============================================================================
+# MAINTENANCE
+# =============================================================================
+
+def requeue_unfinished(stale_minutes: Optional[int] = None) -> int:
+    """
+    Put failed runs, and runs whose worker died mid-run, back in the queue.
+    Already notified users are skipped when they resume.
+    """
+    stale_minutes = _setting('INTEREST_FANOUT_STALE_MINUTES', 10) if stale_minutes is None else stale_minutes
+    cutoff = timezone.now() - timedelta(minutes=stale_minutes)
+    failed = InterestNotificationRun.objects.filter(status=InterestNotificationRun.FAILED)
+    stale = InterestNotificationRun.objects.filter(status=InterestNotificationRun.RUNNING, started_at__lt=cutoff)
+    return (failed | stale).update(status=InterestNotificationRun.QUEUED, finished_at=None)
+
+
+def process_queued() -> int:
+    """Process every queued run; returns how many completed"""
+    completed = 0
+    run_ids = InterestNotificationRun.objects.filter(
+        status=InterestNotificationRun.QUEUED
+    ).order_by('created_at').values_list('pk', flat=True)
+    for run_id in list(run_ids):
+        completed += process_run(run_id)
+    return completed
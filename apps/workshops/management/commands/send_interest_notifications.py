@@ -0,0 +1,47 @@
+"""
+Management command to send queued "new session" emails to interested users.
+
+The web process works through each run in a background thread once the new
+session is saved. This command resumes runs that failed or were interrupted
+by a restart, and is the only worker when INTEREST_FANOUT_WORKERS is 0. Run
+it from cron, or continuously under systemd/supervisor.
+
+Usage:
+    python manage.py send_interest_notifications --once
+    python manage.py send_interest_notifications --poll-interval 30
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.workshops import interest_fanout
+
+
+class Command(BaseCommand):
+    help = 'Send queued new session notifications to users interested in a workshop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process queued runs once and exit')
+        parser.add_argument('--poll-interval', type=float, default=10, help='Seconds between polls')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                close_old_connections()
+                requeued = interest_fanout.requeue_unfinished()
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f'Resuming {requeued} unfinished run(s)'))
+
+                completed = interest_fanout.process_queued()
+                if completed:
+                    self.stdout.write(f'Completed {completed} run(s)')
+
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS('Interest notification worker stopped'))
@@ -955,6 +955,53 @@ class WorkshopInterest(models.Model):
         return dict(self.TIMING_PREFERENCES).get(self.preferred_timing, 'Flexible')
 
 
+class InterestNotificationRun(models.Model):
+    """
+    Fan-out of "new session" emails to everyone waiting on a workshop.
+
+    Created with the session and worked through in chunks after it commits
+    (interest_fanout.py); the counters show the instructor how far it got.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Sending'),
+        (COMPLETED, 'Completed'),
+        (FAILED, 'Failed'),
+    ]
+
+    session = models.OneToOneField(
+        WorkshopSession, on_delete=models.CASCADE, related_name='interest_notification_run'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    total_recipients = models.PositiveIntegerField(default=0)
+    notified_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Interest notifications for {self.session}: {self.notified_count}/{self.total_recipients}"
+
+    @property
+    def progress_percent(self):
+        if not self.total_recipients:
+            return 100
+        return min(100, round(self.notified_count * 100 / self.total_recipients))
+
+
 class WorkshopCartItem(models.Model):
     """
     Workshop session in shopping cart.
@@ -613,6 +613,35 @@ class WorkshopInterestNotificationService(BaseNotificationService):
             logger.error(f"Failed to send new session notification to {interest.user.username}: {str(e)}")
             return False
 
+    # Stands in for the recipient's name when one rendering is shared by many recipients
+    RECIPIENT_NAME = 'RECIPIENT_NAME_PLACEHOLDER'
+
+    @staticmethod
+    def render_new_session_notification(session):
+        """
+        Render the new session email once for every interested user.
+        The greeting contains RECIPIENT_NAME, to be replaced per recipient.
+
+        Returns:
+            (subject, text_message, html_message)
+        """
+        workshop = session.workshop
+        context = {
+            'workshop': workshop,
+            'session': session,
+            'user': {
+                'first_name': WorkshopInterestNotificationService.RECIPIENT_NAME,
+                'username': WorkshopInterestNotificationService.RECIPIENT_NAME,
+            },
+            'workshop_url': WorkshopInterestNotificationService._build_workshop_url(workshop),
+            'registration_url': WorkshopInterestNotificationService._build_registration_url(session),
+        }
+        return WorkshopInterestNotificationService.render_templated_email(
+            'workshops/emails/new_session_notification.txt',
+            context,
+            default_subject=f'New Session Available - {workshop.title}'
+        )
+
     @staticmethod
     def _build_registration_url(session):
         """Build URL for session registration page"""
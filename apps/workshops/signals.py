@@ -1,7 +1,6 @@
 from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from django.utils import timezone
-from .models import WorkshopRegistration, WorkshopSession, WorkshopInterest, Workshop
+from .models import WorkshopRegistration, WorkshopSession, Workshop
 from .image_utils import optimize_workshop_image
 import logging
 import sys
@@ -73,37 +72,11 @@ def process_waitlist_on_capacity_change(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=WorkshopSession)
 def notify_interested_users_on_new_session(sender, instance, created, **kwargs):
-    """Notify users who expressed interest when a new session is created"""
+    """Queue notifications to users who expressed interest when a new session is created"""
     if created and instance.is_active:
-        from .notifications import WorkshopInterestNotificationService
-        import logging
-        logger = logging.getLogger(__name__)
-
-        # Get all active interest requests for this workshop that want immediate notifications
-        interested_users = WorkshopInterest.objects.filter(
-            workshop=instance.workshop,
-            is_active=True,
-            notify_immediately=True,
-            has_been_notified=False
-        )
-
-        notification_count = 0
-        for interest in interested_users:
-            try:
-                # Send notification email
-                success = WorkshopInterestNotificationService.send_new_session_notification(interest, instance)
-
-                if success:
-                    # Mark as notified
-                    interest.has_been_notified = True
-                    interest.notification_sent_at = timezone.now()
-                    interest.save(update_fields=['has_been_notified', 'notification_sent_at'])
-                    notification_count += 1
-            except Exception as e:
-                logger.error(f"Failed to notify interested user {interest.user.username}: {str(e)}")
-
-        if notification_count > 0:
-            logger.info(f"Sent {notification_count} new session notifications for workshop '{instance.workshop.title}'")
+        # Sent in chunks after the session commits, see interest_fanout.py
+        from .interest_fanout import start_for_session
+        start_for_session(instance)
 
 
 @receiver(pre_save, sender=Workshop)
@@ -1,3 +1,70 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+
+@override_settings(INTEREST_FANOUT_CHUNK_SIZE=2)
+class InterestFanoutTestCase(TestCase):
+    """Tests for the new session fan-out to users interested in a workshop"""
+
+    def setUp(self):
+        from apps.workshops.models import Workshop, WorkshopInterest
+
+        instructor = User.objects.create_user(username='instructor', email='instructor@example.com')
+        self.workshop = Workshop.objects.create(
+            title='Baroque Ornamentation', slug='baroque-ornamentation', description='Ornaments',
+            short_description='Ornaments', learning_objectives='Trills', instructor=instructor,
+            is_free=False, price=Decimal('25.00')
+        )
+        names = ['Anna', 'Ben', 'Cleo', 'Dev', 'Eve & <Co>']
+        for index, name in enumerate(names):
+            user = User.objects.create_user(username=f'student{index}', email=f'student{index}@example.com', first_name=name)
+            WorkshopInterest.objects.create(workshop=self.workshop, user=user, email=user.email)
+        WorkshopInterest.objects.filter(user__username='student3').update(notify_immediately=False)
+
+    def create_session(self):
+        from apps.workshops.models import WorkshopSession
+
+        start = timezone.now() + timedelta(days=14)
+        with self.captureOnCommitCallbacks() as callbacks:
+            session = WorkshopSession.objects.create(
+                workshop=self.workshop, start_datetime=start, end_datetime=start + timedelta(hours=2)
+            )
+        return session, callbacks
+
+    def test_new_session_notifies_interested_users_in_chunks(self):
+        from apps.workshops import interest_fanout
+        from apps.workshops.models import InterestNotificationRun, WorkshopInterest
+        from apps.workshops.notifications import WorkshopInterestNotificationService
+
+        session, callbacks = self.create_session()
+        self.assertEqual(len(mail.outbox), 0)  # Nothing is sent while the session is saved
+        self.assertEqual(len(callbacks), 1)
+        run = session.interest_notification_run
+        self.assertEqual((run.status, run.total_recipients), (InterestNotificationRun.QUEUED, 4))
+
+        render = WorkshopInterestNotificationService.render_new_session_notification
+        with patch.object(WorkshopInterestNotificationService, 'render_new_session_notification', wraps=render) as rendered:
+            self.assertTrue(interest_fanout.process_run(run.pk))
+        self.assertEqual(rendered.call_count, 2)  # Once per chunk of 2
+
+        run.refresh_from_db()
+        self.assertEqual((run.status, run.notified_count, run.progress_percent), (InterestNotificationRun.COMPLETED, 4, 100))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [
+            'student0@example.com', 'student1@example.com', 'student2@example.com', 'student4@example.com'
+        ])
+        by_recipient = {message.to[0]: message for message in mail.outbox}
+        self.assertIn('Hi Anna,', by_recipient['student0@example.com'].body)
+        self.assertIn('Hi Eve & <Co>,', by_recipient['student4@example.com'].body)
+        self.assertIn('Eve &amp; &lt;Co&gt;,', by_recipient['student4@example.com'].alternatives[0][0])
+        self.assertEqual(WorkshopInterest.objects.filter(has_been_notified=False).count(), 1)
+
+        # Nobody is emailed twice: a later session has nobody left to notify
+        later_session, _ = self.create_session()
+        self.assertFalse(InterestNotificationRun.objects.filter(session=later_session).exists())
+        self.assertFalse(interest_fanout.process_run(run.pk))
@@ -811,6 +811,11 @@ class RegistrationCancelView(LoginRequiredMixin, View):
                             stripe_refund_id=refund.id
                         )
 
+                        from apps.payments.ledger import record_workshop_refund
+                        for cancelled_registration in registrations_to_cancel:
+                            if cancelled_registration.payment_status in ['paid', 'completed']:
+                                record_workshop_refund(cancelled_registration, stripe_payment=stripe_payment)
+
                         refund_processed = True
                         if is_series_cancellation:
                             session_count = len(registrations_to_cancel)
@@ -1388,7 +1393,7 @@ class ManageSessionsView(LoginRequiredMixin, TemplateView):
             registered_count=Count('registrations', filter=Q(registrations__status='registered')),
             waitlisted_count=Count('registrations', filter=Q(registrations__status='waitlisted')),
             attended_count=Count('registrations', filter=Q(registrations__status='attended'))
-        ).order_by('start_datetime')
+        ).select_related('interest_notification_run').order_by('start_datetime')
 
         # Add registration statistics for each session using annotated values
         for session in sessions:
@@ -1422,6 +1427,12 @@ class ManageSessionsView(LoginRequiredMixin, TemplateView):
             session.workshop = workshop
             session.save()
             messages.success(request, 'Session created successfully!')
+            if hasattr(session, 'interest_notification_run'):
+                messages.info(
+                    request,
+                    f'{session.interest_notification_run.total_recipients} interested students are being '
+                    f'notified about the new session. Progress is shown below.'
+                )
             return redirect('workshops:manage_sessions', slug=workshop.slug)
         else:
             messages.error(request, 'Please correct the errors below.')
@@ -1623,6 +1634,9 @@ class SessionRegistrationsView(LoginRequiredMixin, ListView):
                                     stripe_refund_id=refund.id
                                 )
 
+                                from apps.payments.ledger import record_workshop_refund
+                                record_workshop_refund(registration, stripe_payment=stripe_payment)
+
                                 refunded_count += 1
 
                                 # Send refund notification to student
@@ -24,6 +24,7 @@ print()
 print("1. EMAIL CONFIGURATION:")
 print(f"   DEBUG mode: {settings.DEBUG}")
 print(f"   EMAIL_BACKEND: {settings.EMAIL_BACKEND}")
+print(f"   EMAIL_DELIVERY_BACKEND: {getattr(settings, 'EMAIL_DELIVERY_BACKEND', 'NOT SET')}")
 if not settings.DEBUG:
     print(f"   EMAIL_HOST: {getattr(settings, 'EMAIL_HOST', 'NOT SET')}")
     print(f"   EMAIL_PORT: {getattr(settings, 'EMAIL_PORT', 'NOT SET')}")
@@ -129,7 +130,8 @@ print("END DIAGNOSTIC REPORT")
 print("=" * 60)
 print()
 print("NEXT STEPS:")
-print("1. If EMAIL_BACKEND is console and DEBUG is True, emails won't actually send")
+print("1. If EMAIL_DELIVERY_BACKEND is console and DEBUG is True, emails won't actually send")
+print("   Queued emails that failed: python manage.py send_email_outbox --stats")
 print("2. Check if student email addresses are empty or invalid")
 print("3. Check your email provider's logs for bounced emails")
 print("4. Run the test command above to manually trigger an email")
@@ -24,11 +24,23 @@ pip install -r requirements.txt
 echo "💾 Running database migrations..."
 python manage.py migrate --noinput
 
+# Fill the revenue ledger from payment records (finance pages read only the
+# ledger). Already recorded payments are skipped, so this is safe every deploy.
+echo "💷 Backfilling revenue ledger..."
+python manage.py backfill_revenue_ledger
+
 # Collect static files
 echo "📁 Collecting static files..."
 python manage.py collectstatic --noinput
 
+# Install background worker cron jobs (recordered.crontab), replacing the old ones
+echo "⏰ Installing worker cron jobs..."
+(crontab -l 2>/dev/null | grep -v 'recordered-worker'; cat recordered.crontab) | crontab -
+
 # Restart Gunicorn
+# Live events (LIVE_EVENTS_ENABLED) need the ASGI app behind uvicorn workers.
+# Before enabling them, set the gunicorn service's ExecStart to:
+#   gunicorn -k uvicorn.workers.UvicornWorker recordered.asgi:application
 echo "🔄 Restarting Gunicorn..."
 sudo systemctl restart gunicorn
 
@@ -118,6 +118,7 @@ TEMPLATES = [
                 'apps.messaging.context_processors.unread_messages',  # Unified messaging (includes course messages)
                 'apps.accounts.context_processors.email_verification_status',
                 'apps.admin_portal.context_processors.admin_metrics',  # Admin portal metrics
+                'apps.core.context_processors.live_events',  # Live events (SSE) switch
             ],
         },
     },
@@ -211,10 +212,13 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 20 * 1024 * 1024  # 20MB
 FILE_UPLOAD_MAX_MEMORY_SIZE = 20 * 1024 * 1024  # 20MB
 
 # Email settings
+# Emails are queued in the outbox (apps/core/email_outbox.py) and sent in the
+# background through EMAIL_DELIVERY_BACKEND
+EMAIL_BACKEND = 'apps.core.email_outbox.OutboxEmailBackend'
 if DEBUG:
-    EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+    EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 else:
-    EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
     EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
     EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
     EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
@@ -223,10 +227,52 @@ else:
 
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@workshopplatform.com')
 
+# Email outbox workers
+EMAIL_OUTBOX_WORKERS = config('EMAIL_OUTBOX_WORKERS', default=1, cast=int)  # In-process threads sending queued email (0 = leave it to send_email_outbox)
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=50, cast=int)  # Emails sent per SMTP connection
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)  # Attempts before an email is dead-lettered
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = config('EMAIL_OUTBOX_RETRY_BASE_SECONDS', default=60, cast=int)  # First retry delay, doubled on each failure
+EMAIL_OUTBOX_STALE_MINUTES = config('EMAIL_OUTBOX_STALE_MINUTES', default=10, cast=int)  # Claimed emails older than this are requeued
+
+# Workshop interest fan-out: "new session" emails to users waiting on a workshop
+INTEREST_FANOUT_WORKERS = config('INTEREST_FANOUT_WORKERS', default=1, cast=int)  # In-process threads (0 = leave it to send_interest_notifications)
+INTEREST_FANOUT_CHUNK_SIZE = config('INTEREST_FANOUT_CHUNK_SIZE', default=100, cast=int)  # Recipients rendered, claimed and sent together
+INTEREST_FANOUT_STALE_MINUTES = config('INTEREST_FANOUT_STALE_MINUTES', default=10, cast=int)  # Running runs older than this are resumed
+
+# New message emails are collected per recipient for this long, then sent as one digest (0 = one email per message)
+MESSAGE_DIGEST_WINDOW_MINUTES = config('MESSAGE_DIGEST_WINDOW_MINUTES', default=10, cast=int)
+
+# Messages per page of a conversation, ticket or course message thread (older pages load on demand)
+THREAD_PAGE_SIZE = config('THREAD_PAGE_SIZE', default=50, cast=int)
+
+# Most results returned by message search (apps/messaging/search.py)
+MESSAGE_SEARCH_RESULTS = config('MESSAGE_SEARCH_RESULTS', default=50, cast=int)
+
+# Live events (server-sent events, apps/core/live_events.py) - serve via recordered.asgi
+LIVE_EVENTS_ENABLED = config('LIVE_EVENTS_ENABLED', default=False, cast=bool)  # Only turn on once running under uvicorn workers (see deploy.sh)
+LIVE_EVENTS_HEARTBEAT_SECONDS = config('LIVE_EVENTS_HEARTBEAT_SECONDS', default=15, cast=int)  # Keepalive and cross-process badge check interval
+LIVE_EVENTS_MAX_CONNECTION_SECONDS = config('LIVE_EVENTS_MAX_CONNECTION_SECONDS', default=300, cast=int)  # Connections are closed after this; browsers reconnect
+LIVE_EVENTS_QUEUE_SIZE = config('LIVE_EVENTS_QUEUE_SIZE', default=100, cast=int)  # Events buffered per connection before it is told to reload
+
 # Stripe Payment Configuration
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY', default='')
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='')
 STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='')
+STRIPE_API_BASE = config('STRIPE_API_BASE', default='')  # e.g. http://127.0.0.1:12111 to use `manage.py fake_stripe` in development
+
+# Stripe gateway: keeps a slow or failing Stripe API from tying up web workers
+STRIPE_CONNECT_TIMEOUT = config('STRIPE_CONNECT_TIMEOUT', default=3, cast=float)  # Seconds to establish a connection
+STRIPE_READ_TIMEOUT = config('STRIPE_READ_TIMEOUT', default=10, cast=float)  # Seconds to wait for a response
+STRIPE_MAX_NETWORK_RETRIES = config('STRIPE_MAX_NETWORK_RETRIES', default=1, cast=int)  # Retries on connection errors (same idempotency key)
+STRIPE_BREAKER_FAILURES = config('STRIPE_BREAKER_FAILURES', default=5, cast=int)  # Consecutive failures that open the circuit breaker
+STRIPE_BREAKER_RESET_SECONDS = config('STRIPE_BREAKER_RESET_SECONDS', default=30, cast=float)  # Fail fast for this long before a trial call
+STRIPE_SLOW_CALL_MS = config('STRIPE_SLOW_CALL_MS', default=2000, cast=int)  # Calls slower than this are logged
+
+# Stripe webhook inbox: events are stored and acknowledged, then processed in the background
+WEBHOOK_INBOX_WORKERS = config('WEBHOOK_INBOX_WORKERS', default=2, cast=int)  # In-process threads draining the inbox (0 = leave it to process_webhook_inbox)
+WEBHOOK_MAX_ATTEMPTS = config('WEBHOOK_MAX_ATTEMPTS', default=5, cast=int)  # Attempts before an event is dead-lettered
+WEBHOOK_RETRY_BASE_SECONDS = config('WEBHOOK_RETRY_BASE_SECONDS', default=30, cast=int)  # First retry delay, doubled on each failure
+WEBHOOK_STALE_MINUTES = config('WEBHOOK_STALE_MINUTES', default=10, cast=int)  # Claimed events older than this are requeued
 
 # Currency Configuration
 CURRENCY_CODE = 'GBP'
@@ -243,6 +289,9 @@ WAITLIST_PROMOTION_HOURS = config('WAITLIST_PROMOTION_HOURS', default=48, cast=i
 # Private lesson policies
 PRIVATE_LESSON_CANCELLATION_HOURS = config('PRIVATE_LESSON_CANCELLATION_HOURS', default=48, cast=int)  # Hours notice required
 PRIVATE_LESSON_REFUND_REQUEST_DAYS = config('PRIVATE_LESSON_REFUND_REQUEST_DAYS', default=14, cast=int)  # Days after lesson to request refund
+SLOT_HOLD_MINUTES = config('SLOT_HOLD_MINUTES', default=10, cast=int)  # How long a selected slot is reserved while booking
+SLOT_HOLD_MAX_PER_STUDENT = config('SLOT_HOLD_MAX_PER_STUDENT', default=40, cast=int)  # Active holds per student per teacher
+AVAILABLE_SLOTS_CACHE_SECONDS = config('AVAILABLE_SLOTS_CACHE_SECONDS', default=60, cast=int)  # Lifetime of cached available-slots responses
 
 # Site configuration
 SITE_ID = 1
@@ -0,0 +1,71 @@
+/**
+ * Live Events
+ * Opens one server-sent events connection per page (apps/core/live_events.py),
+ * keeps the navbar message badge current and re-dispatches every event as a
+ * `live:<event>` DOM event that pages can listen for.
+ *
+ * Pages follow extra topics by adding elements with data-live-topic, e.g.
+ * <div data-live-topic="conversation:{{ conversation.id }}">
+ */
+
+(function () {
+    const config = document.getElementById('live-events');
+    if (!config || !window.EventSource) {
+        return;
+    }
+
+    const params = new URLSearchParams();
+    document.querySelectorAll('[data-live-topic]').forEach(function (element) {
+        params.append('topic', element.dataset.liveTopic);
+    });
+    const query = params.toString();
+    const source = new EventSource(config.dataset.url + (query ? '?' + query : ''));
+
+    // Update the navbar badge
+    function updateBadge(total) {
+        const badge = document.getElementById('messages-badge');
+        const link = document.getElementById('messages-link');
+        if (!badge || !link) {
+            return;
+        }
+        badge.textContent = total;
+        badge.classList.toggle('hidden', total === 0);
+        link.setAttribute('aria-label', total > 0 ? 'Messages, ' + total + ' unread' : 'Messages');
+    }
+
+    // Show a dismissible "refresh to see it" notice
+    function notice(text) {
+        if (document.getElementById('live-notice')) {
+            return;
+        }
+        const element = document.createElement('div');
+        element.id = 'live-notice';
+        element.className = 'alert alert-info shadow-lg fixed bottom-4 right-4 w-auto z-50';
+        const label = document.createElement('span');
+        label.textContent = text;
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = 'btn btn-sm btn-primary';
+        button.textContent = 'Refresh';
+        button.addEventListener('click', function () {
+            window.location.reload();
+        });
+        element.append(label, button);
+        document.body.appendChild(element);
+    }
+
+    ['badge', 'message', 'ticket_message', 'lesson_request_message', 'resync'].forEach(function (name) {
+        source.addEventListener(name, function (event) {
+            const data = JSON.parse(event.data);
+            if (name === 'badge') {
+                updateBadge(data.total);
+            }
+            if (name === 'resync') {
+                notice('You have new updates.');
+            }
+            document.dispatchEvent(new CustomEvent('live:' + name, { detail: data }));
+        });
+    });
+
+    window.LiveEvents = { notice: notice };
+})();
@@ -0,0 +1,86 @@
+/**
+ * Thread History
+ * Incremental loading for message threads paged with apps/core/keyset.py.
+ *
+ * A thread element carries data-thread-url and the cursors of the page it
+ * shows (data-older-cursor, data-newer-cursor), and contains:
+ *   [data-thread-items]  the rendered rows, oldest first
+ *   [data-thread-older]  optional "load older" control
+ *   [data-thread-empty]  optional placeholder, removed when rows arrive
+ */
+
+(function () {
+    function fetchPage(thread, param, cursor) {
+        const url = new URL(thread.dataset.threadUrl, window.location.origin);
+        url.searchParams.set(param, cursor || '');
+        return fetch(url, { headers: { 'Accept': 'application/json' } }).then(function (response) {
+            if (!response.ok) {
+                throw new Error('Failed to load messages (' + response.status + ')');
+            }
+            return response.json();
+        });
+    }
+
+    // Element that scrolls when rows are added above the visible ones
+    function scroller(thread) {
+        return getComputedStyle(thread).overflowY === 'auto' ? thread : document.scrollingElement;
+    }
+
+    function loadOlder(thread) {
+        const items = thread.querySelector('[data-thread-items]');
+        const element = scroller(thread);
+        const heightBefore = element.scrollHeight;
+
+        return fetchPage(thread, 'before', thread.dataset.olderCursor).then(function (page) {
+            items.insertAdjacentHTML('afterbegin', page.html);
+            thread.dataset.olderCursor = page.older_cursor || '';
+            if (!page.older_cursor) {
+                thread.querySelector('[data-thread-older]').remove();
+            }
+            // Keep the rows the user was reading where they were
+            element.scrollTop += element.scrollHeight - heightBefore;
+        });
+    }
+
+    function appendNewer(thread, added) {
+        return fetchPage(thread, 'after', thread.dataset.newerCursor).then(function (page) {
+            const items = thread.querySelector('[data-thread-items]');
+            const nearBottom = thread.scrollHeight - thread.scrollTop - thread.clientHeight < 100;
+            if (page.count) {
+                items.insertAdjacentHTML('beforeend', page.html);
+                const empty = thread.querySelector('[data-thread-empty]');
+                if (empty) {
+                    empty.remove();
+                }
+                if (nearBottom) {
+                    thread.scrollTop = thread.scrollHeight;
+                }
+            }
+            thread.dataset.newerCursor = page.newer_cursor || '';
+            added += page.count;
+            return page.has_newer ? appendNewer(thread, added) : added;
+        });
+    }
+
+    /**
+     * Append everything newer than the last row shown.
+     * Calls for one thread run one after another; resolves to the number of rows added.
+     */
+    function fetchNewer(thread) {
+        thread._pending = (thread._pending || Promise.resolve(0)).catch(function () {}).then(function () {
+            return appendNewer(thread, 0);
+        });
+        return thread._pending;
+    }
+
+    document.querySelectorAll('[data-thread-url]').forEach(function (thread) {
+        const older = thread.querySelector('[data-thread-older]');
+        if (older) {
+            older.addEventListener('click', function () {
+                loadOlder(thread);
+            });
+        }
+    });
+
+    window.ThreadHistory = { fetchNewer: fetchNewer, loadOlder: loadOlder };
+})();